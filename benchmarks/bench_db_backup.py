@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+"""
+線上備份基準
+
+一個寫入線程以固定節奏提交事件（模擬忙碌的伺服器），同時備份資料庫，
+比較寫入提交延遲（中位數 / p99 / 最大值）與備份重來次數：
+- 無備份（基線）
+- 分批 backup API（db_backup.backup_to），WAL 資料庫：固定讀快照
+- 分批 backup API，rollback journal 資料庫：來源被修改就重來，超過上限後一步複製完
+- 一步複製完的 backup API（pages=-1，備份期間持續持鎖）
+
+使用方式：
+    python benchmarks/bench_db_backup.py
+    python benchmarks/bench_db_backup.py --rows 200000 --pages-per-step 128
+"""
+
+import argparse
+import sqlite3
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+import config
+from db_backup import backup_to
+
+
+def build_database(path: Path, rows: int, wal: bool):
+    conn = sqlite3.connect(path)
+    if wal:
+        conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("CREATE TABLE event_logs (id INTEGER PRIMARY KEY, description TEXT)")
+    conn.executemany("INSERT INTO event_logs (description) VALUES (?)",
+                     ((f"你與長老談論修煉心得，事件 {i}" * 3,) for i in range(rows)))
+    conn.commit()
+    conn.close()
+
+
+def measure_writer(path: Path, backup):
+    """寫入線程每 2 ms 提交一次，返回 (提交延遲 ms 列表, 備份耗時 s)"""
+    latencies, stop = [], threading.Event()
+
+    def writer():
+        conn = sqlite3.connect(path, timeout=30)
+        while not stop.is_set():
+            start = time.perf_counter()
+            conn.execute("INSERT INTO event_logs (description) VALUES ('新事件')")
+            conn.commit()
+            latencies.append((time.perf_counter() - start) * 1000)
+            stop.wait(0.002)
+        conn.close()
+
+    thread = threading.Thread(target=writer)
+    thread.start()
+    start = time.perf_counter()
+    backup()
+    elapsed = time.perf_counter() - start
+    stop.set()
+    thread.join()
+    return latencies, elapsed
+
+
+def one_shot(source: Path, target: Path):
+    src, dst = sqlite3.connect(source), sqlite3.connect(target)
+    src.backup(dst, pages=-1)
+    dst.close()
+    src.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="線上備份基準")
+    parser.add_argument("--rows", type=int, default=300000)
+    parser.add_argument("--pages-per-step", type=int, default=config.DB_BACKUP_PAGES_PER_STEP)
+    parser.add_argument("--pause", type=float, default=config.DB_BACKUP_STEP_PAUSE)
+    args = parser.parse_args()
+
+    workdir = Path(tempfile.mkdtemp())
+    wal_db, journal_db = workdir / "wal.db", workdir / "journal.db"
+    build_database(wal_db, args.rows, wal=True)
+    build_database(journal_db, args.rows, wal=False)
+    print(f"資料庫 {wal_db.stat().st_size / 1e6:.0f} MB")
+
+    restarts = {}
+
+    def stepped(source, name):
+        restarts[name] = backup_to(source, workdir / f"{name}.bak", args.pages_per_step, args.pause)["restarts"]
+
+    cases = [
+        ("無備份", wal_db, lambda: time.sleep(1.0)),
+        ("分批（WAL）", wal_db, lambda: stepped(wal_db, "wal")),
+        ("分批（journal）", journal_db, lambda: stepped(journal_db, "journal")),
+        ("一步（journal）", journal_db, lambda: one_shot(journal_db, workdir / "oneshot.bak")),
+    ]
+    print(f"\n{'情境':<16} {'備份 (s)':>9} {'重來':>4} {'提交數':>6} {'中位數 (ms)':>11} {'p99 (ms)':>9} {'最大 (ms)':>9}")
+    for label, source, backup in cases:
+        latencies, elapsed = measure_writer(source, backup)
+        ordered = sorted(latencies)
+        p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+        restart_count = restarts.get("wal" if "WAL" in label else "journal", 0) if "分批" in label else 0
+        print(f"{label:<16} {elapsed:>9.2f} {restart_count:>4} {len(latencies):>6} "
+              f"{statistics.median(latencies):>11.2f} {p99:>9.2f} {max(latencies):>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
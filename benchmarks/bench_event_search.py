@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+"""
+事件全文檢索基準
+
+在暫存資料庫中灌入大量合成事件（經由觸發器同步 event_search），測量 search_events：
+- ≥ 3 字的詞（走 FTS5 trigram 索引）：常見詞 / 罕見詞 / 不存在的詞
+- 短詞（LIKE 掃描，命中越早越快；不存在時掃滿 config.EVENT_SEARCH_SCAN_LIMIT 條）
+並列出寫入耗時與資料庫大小（含索引）。
+
+使用方式：
+    python benchmarks/bench_event_search.py
+    python benchmarks/bench_event_search.py --events 200000 --runs 20
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+import config
+
+SUBJECTS = ["師兄", "守閣長老", "山賊", "靈狐", "掌門", "酒館掌櫃", "雜役弟子", "遊方道人"]
+VERBS = ["遞給你", "搶走了", "指點了", "丟下", "談起", "收下了"]
+OBJECTS = ["一株靈草", "半塊玉簡", "三枚靈石", "一柄鐵劍", "一壺烈酒", "一張殘圖", "築基丹"]
+RARE = "七彩琉璃盞"
+
+QUERIES = [
+    ("常見詞", "守閣長老"),
+    ("罕見詞", RARE),
+    ("多詞 AND", "掌門 築基丹"),
+    ("不存在", "不存在的東西"),
+    ("短詞（常見）", "靈草"),
+    ("短詞（不存在）", "龍鱗"),
+]
+
+
+def populate(db_path: Path, events: int, seed: int):
+    rng = random.Random(seed)
+
+    def rows():
+        for i in range(events):
+            obj = RARE if i == events // 10 else rng.choice(OBJECTS)
+            description = f"{rng.choice(SUBJECTS)}{rng.choice(VERBS)}{obj}（第 {i} 回）"
+            yield (1, f"地點{rng.randrange(30)}", "TALK", description, None, 1.0)
+
+    conn = sqlite3.connect(db_path)
+    conn.executemany("""
+        INSERT INTO event_logs (player_id, location, event_type, description, npc_involved, importance)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """, rows())
+    conn.commit()
+    conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="事件全文檢索基準")
+    parser.add_argument("--events", type=int, default=1000000)
+    parser.add_argument("--runs", type=int, default=10, help="每個查詢的重複次數（取中位數）")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    config.DB_PATH = Path(tempfile.mkdtemp()) / "bench_search.db"
+    from game_state import GameStateManager
+
+    db = GameStateManager()
+    start = time.perf_counter()
+    populate(config.DB_PATH, args.events, args.seed)
+    print(f"寫入 {args.events} 條事件（含觸發器）: {time.perf_counter() - start:.1f} 秒，"
+          f"資料庫 {os.path.getsize(config.DB_PATH) / 1e6:.0f} MB")
+
+    print(f"\n{'查詢':<16} {'命中':>4} {'中位數 (ms)':>12} {'最慢 (ms)':>10}")
+    for label, query in QUERIES:
+        samples, found = [], []
+        for _ in range(args.runs):
+            start = time.perf_counter()
+            found = db.search_events(1, query, limit=5)
+            samples.append((time.perf_counter() - start) * 1000)
+        print(f"{label:<16} {len(found):>4} {statistics.median(samples):>12.2f} {max(samples):>10.2f}")
+
+    os.remove(config.DB_PATH)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+"""
+導入時間基準
+
+以 `python -X importtime` 在新進程中導入各模組，報告總耗時與最慢的導入項，
+並測量延遲初始化的全局實例在第一次使用時的代價（OpenAI 客戶端、資料庫、NPC 註冊表）。
+
+使用方式：
+    python benchmarks/bench_import_time.py
+    python benchmarks/bench_import_time.py --runs 10 --top 15
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+SRC = Path(__file__).parent.parent / "src"
+
+MODULES = ["cultivation", "validators", "world_data", "npc_manager", "agent", "main"]
+
+# (前置導入, 觸發初始化的語句)；資料庫建在暫存目錄，不動 data/game_data.db
+FIRST_USE = {
+    "世界資料": ("import world_registry", "world_registry.world_registry.snapshot"),
+    "NPC 註冊表": ("import npc_manager", "npc_manager.npc_manager.get_all_npcs()"),
+    "OpenAI 客戶端": ("import agent", "agent.client.chat"),
+    "資料庫": ("import config, pathlib, tempfile\n"
+               "config.DB_PATH = pathlib.Path(tempfile.mkdtemp()) / 'bench.db'\n"
+               "import game_state",
+               "game_state.game_db.list_all_players()"),
+}
+
+FIRST_USE_TEMPLATE = """
+import time
+{setup}
+start = time.perf_counter()
+{statement}
+print(time.perf_counter() - start)
+"""
+
+
+def run_python(args, env):
+    return subprocess.run([sys.executable] + args, cwd=SRC, env=env,
+                          capture_output=True, text=True, check=True)
+
+
+def parse_importtime(stderr: str):
+    """解析 -X importtime 輸出，返回 [(累計微秒, 模組名)]"""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((int(cumulative_us), name.strip()))
+    return rows
+
+
+def import_profile(module: str, runs: int, env):
+    totals, last_rows = [], []
+    for _ in range(runs):
+        result = run_python(["-X", "importtime", "-c", f"import {module}"], env)
+        rows = parse_importtime(result.stderr)
+        totals.append(next(us for us, name in rows if name == module))
+        last_rows = rows
+    return statistics.median(totals) / 1000, last_rows
+
+
+def first_use_ms(setup: str, statement: str, runs: int, env) -> float:
+    code = FIRST_USE_TEMPLATE.format(setup=setup, statement=statement)
+    samples = [float(run_python(["-c", code], env).stdout.strip().splitlines()[-1]) for _ in range(runs)]
+    return statistics.median(samples) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="導入時間基準")
+    parser.add_argument("--runs", type=int, default=5, help="每項測量的進程數（取中位數）")
+    parser.add_argument("--top", type=int, default=10, help="列出 main 最慢的幾個導入")
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    env.setdefault("OPENAI_API_KEY", "sk-benchmark")
+
+    print(f"{'模組':<14} {'導入耗時 (ms)':>14}")
+    main_rows = []
+    for module in MODULES:
+        total_ms, rows = import_profile(module, args.runs, env)
+        if module == "main":
+            main_rows = rows
+        print(f"{module:<14} {total_ms:>14.1f}")
+
+    print(f"\nimport main 最慢的 {args.top} 項（累計，含子模組）:")
+    for cumulative_us, name in sorted(main_rows, reverse=True)[1:args.top + 1]:
+        print(f"  {cumulative_us / 1000:>8.1f} ms  {name}")
+
+    print(f"\n{'第一次使用':<14} {'耗時 (ms)':>10}")
+    for label, (setup, statement) in FIRST_USE.items():
+        print(f"{label:<14} {first_use_ms(setup, statement, args.runs, env):>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
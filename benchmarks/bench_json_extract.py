@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+"""
+JSON 提取吞吐量基準
+
+比較舊版 extract_json_from_text（每個平衡片段都 json.loads、不理會字串內括號）
+與 json_stream 單趟掃描器，在不同長度的 Director 輸出上的吞吐量。
+
+使用方式：
+    python benchmarks/bench_json_extract.py
+    python benchmarks/bench_json_extract.py --repeat 50
+"""
+
+import argparse
+import json
+import re
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from json_stream import JSONObjectScanner, extract_first_json_object
+
+
+def legacy_extract(text):
+    """舊版實作（僅供對照）"""
+    if not text:
+        return None
+    try:
+        return json.loads(text.strip())
+    except json.JSONDecodeError:
+        pass
+    match = re.search(r'```json\s*(\{.*?\})\s*```', text, re.DOTALL)
+    if match:
+        try:
+            return json.loads(match.group(1))
+        except json.JSONDecodeError:
+            pass
+    brace_count = 0
+    start_idx = -1
+    for i, char in enumerate(text):
+        if char == '{':
+            if brace_count == 0:
+                start_idx = i
+            brace_count += 1
+        elif char == '}':
+            brace_count -= 1
+            if brace_count == 0 and start_idx != -1:
+                try:
+                    return json.loads(text[start_idx:i + 1])
+                except json.JSONDecodeError:
+                    pass
+    return None
+
+
+def director_output(paragraphs: int) -> str:
+    """模擬 Director 輸出：說明文字 + 代碼塊 + 敘事中夾帶大量括號 + 尾隨逗號"""
+    narrative = "石壁上的符文 {玄} 與 {黃} 交錯，" * paragraphs
+    decision = {
+        "narrative": narrative,
+        "state_update": {"hp_change": -3, "mp_change": -10, "items_gained": ["靈草"] * 5},
+        "npc_relations": [{"npc_id": f"npc_{i:03d}", "affinity_change": 1} for i in range(10)],
+    }
+    body = json.dumps(decision, ensure_ascii=False, indent=2)
+    body = body.replace('"affinity_change": 1\n', '"affinity_change": 1,\n')
+    return "好的，以下是天道的決策 {格式說明}：\n```json\n" + body + "\n```\n以上。"
+
+
+def bench(fn, text, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn(text)
+    elapsed = time.perf_counter() - start
+    return elapsed, result
+
+
+def stream_extract(text, chunk_size=16):
+    scanner = JSONObjectScanner()
+    for i in range(0, len(text), chunk_size):
+        objects = scanner.feed(text[i:i + chunk_size])
+        if objects:
+            return objects[0]
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="JSON 提取吞吐量基準")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{'段落數':>6} {'大小(KB)':>9} {'舊版 MB/s':>10} {'掃描 MB/s':>10} {'串流 MB/s':>10}  舊版結果")
+    for paragraphs in (10, 100, 1000, 5000):
+        text = director_output(paragraphs)
+        size_mb = len(text.encode("utf-8")) / 1e6
+
+        legacy_time, legacy_result = bench(legacy_extract, text, args.repeat)
+        new_time, new_result = bench(extract_first_json_object, text, args.repeat)
+        stream_time, stream_result = bench(stream_extract, text, args.repeat)
+
+        assert new_result is not None and new_result == stream_result
+        legacy_ok = "正確" if legacy_result == new_result else "錯誤/失敗"
+
+        print(f"{paragraphs:>6} {size_mb * 1000:>9.1f} "
+              f"{size_mb * args.repeat / legacy_time:>10.1f} "
+              f"{size_mb * args.repeat / new_time:>10.1f} "
+              f"{size_mb * args.repeat / stream_time:>10.1f}  {legacy_ok}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+"""
+關鍵詞自動機基準
+
+比較「逐詞 text.find 找出所有出現位置」與 KeywordAutomaton 單趟掃描，
+在不同敘述長度與規則數量下的耗時；另外量測 ConsistencyValidator.validate 的整體耗時。
+
+使用方式：
+    python benchmarks/bench_keyword_automaton.py
+    python benchmarks/bench_keyword_automaton.py --repeat 50
+"""
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from keyword_automaton import KeywordAutomaton
+from validators import ConsistencyValidator
+
+
+SENTENCES = [
+    "你沿著山間小徑前行，松風徐徐。",
+    "霜焰獅怒吼一聲，牠的前爪受傷流血。",
+    "你沒有獲得任何東西，只感到丹田一陣疼痛。",
+    "張長老看了你一眼，說道：「你打算前往藥園嗎？」",
+    "你一劍刺中對手，對手踉蹌後退，身上多處受損。",
+    "你撿起地上的靈石，收入囊中。",
+    "遠處的師兄正在演練劍訣，劍光如虹。",
+]
+
+
+def make_narrative(length: int, rng: random.Random) -> str:
+    parts = []
+    size = 0
+    while size < length:
+        sentence = rng.choice(SENTENCES)
+        parts.append(sentence)
+        size += len(sentence)
+    return "".join(parts)[:length]
+
+
+def naive_find_all(keywords, text):
+    """逐詞 text.find 找出所有出現位置"""
+    matches = []
+    for keyword in keywords:
+        pos = text.find(keyword)
+        while pos != -1:
+            matches.append((pos, keyword))
+            pos = text.find(keyword, pos + 1)
+    return matches
+
+
+def synthetic_rules(count: int, rng: random.Random):
+    alphabet = "".join(set("".join(SENTENCES))) + "甲乙丙丁戊己庚辛壬癸"
+    return list({"".join(rng.choice(alphabet) for _ in range(rng.randint(2, 4)))
+                 for _ in range(count)})
+
+
+def timed(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return (time.perf_counter() - start) / repeat * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="關鍵詞自動機基準")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    validator = ConsistencyValidator()
+    validator_keywords = list(validator._automaton.keywords)
+
+    rule_sets = [
+        (f"驗證器詞表 ({len(validator_keywords)})", validator_keywords),
+        ("合成規則 (1000)", synthetic_rules(1000, rng)),
+        ("合成規則 (5000)", synthetic_rules(5000, rng)),
+    ]
+
+    print(f"{'規則集':<22} {'敘述長度':>8} {'逐詞 find (ms)':>15} {'自動機 (ms)':>12} {'加速':>7}")
+    for name, keywords in rule_sets:
+        build_start = time.perf_counter()
+        automaton = KeywordAutomaton(keywords)
+        build_ms = (time.perf_counter() - build_start) * 1000
+        for length in (300, 5_000, 50_000):
+            text = make_narrative(length, rng)
+            naive_ms, naive = timed(lambda: naive_find_all(keywords, text), args.repeat)
+            auto_ms, found = timed(lambda: automaton.find_all(text), args.repeat)
+            assert sorted(naive) == sorted((m.start, m.keyword) for m in found)
+            print(f"{name:<22} {length:>8} {naive_ms:>15.3f} {auto_ms:>12.3f} {naive_ms / auto_ms:>6.1f}x")
+        print(f"{'':<22} （自動機建構 {build_ms:.1f} ms，一次性）")
+
+    print("\nConsistencyValidator.validate（含所有輔助判斷）")
+    state_update = {"hp_change": -10, "items_gained": ["靈石"], "location_new": "青雲門·靈草堂"}
+    for length in (300, 5_000, 50_000):
+        text = make_narrative(length, rng)
+        validate_ms, _ = timed(lambda: validator.validate(text, state_update), args.repeat)
+        print(f"  敘述 {length:>6} 字: {validate_ms:.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+"""
+長期記憶檢索基準
+
+在暫存資料庫中為單一玩家灌入大量事件（隨機地點、意圖、NPC、狀態變化），測量：
+- 冷啟動檢索（從 event_logs 索引載入候選結構 + 打分）
+- 熱檢索（只對記憶體中的候選打分）
+- 舊做法 get_recent_events(limit=5) 的耗時（對照）
+
+使用方式：
+    python benchmarks/bench_memory_recall.py
+    python benchmarks/bench_memory_recall.py --events 100000 --queries 2000
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+import config
+from memory import score_importance
+
+INTENTS = ["MOVE", "TALK", "ATTACK", "INSPECT", "CULTIVATE", "REST", "TRADE"]
+
+
+def populate(db_path: Path, events: int, seed: int):
+    """以 executemany 直接寫入（逐條 log_event 建 10 萬條太慢）"""
+    rng = random.Random(seed)
+    locations = [f"地點{i}" for i in range(30)]
+    npcs = [f"npc_{i}" for i in range(40)]
+    rows = []
+    for i in range(events):
+        event_type = rng.choice(INTENTS)
+        npc = rng.choice(npcs) if rng.random() < 0.2 else None
+        changes = {"hp_change": -rng.randint(0, 60) if rng.random() < 0.1 else 0}
+        rows.append((1, rng.choice(locations), event_type, f"事件 {i}", npc,
+                     score_importance(event_type, npc, changes)))
+    conn = sqlite3.connect(db_path)
+    conn.executemany("""
+        INSERT INTO event_logs (player_id, location, event_type, description, npc_involved, importance)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """, rows)
+    conn.commit()
+    conn.close()
+    return locations, npcs
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="長期記憶檢索基準")
+    parser.add_argument("--events", type=int, default=100000, help="單一玩家的事件數")
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    config.DB_PATH = Path(workdir) / "bench_memory.db"
+    from game_state import GameStateManager
+
+    db = GameStateManager()
+    start = time.perf_counter()
+    locations, npcs = populate(config.DB_PATH, args.events, args.seed)
+    print(f"寫入 {args.events} 條事件: {time.perf_counter() - start:.1f} 秒")
+
+    rng = random.Random(args.seed)
+    queries = [(rng.choice(locations), rng.choice(npcs) if rng.random() < 0.5 else None,
+                rng.choice(INTENTS)) for _ in range(args.queries)]
+
+    start = time.perf_counter()
+    db.recall_memories(1, location=queries[0][0], npc_id=queries[0][1], intent=queries[0][2])
+    cold_ms = (time.perf_counter() - start) * 1000
+
+    # 先讓所有地點 / NPC 的候選桶載入，之後只量打分
+    for location, npc_id, intent in queries:
+        db.recall_memories(1, location=location, npc_id=npc_id, intent=intent)
+    warm = []
+    for location, npc_id, intent in queries:
+        start = time.perf_counter()
+        db.recall_memories(1, location=location, npc_id=npc_id, intent=intent, keywords=["事件 9"])
+        warm.append((time.perf_counter() - start) * 1e6)
+
+    recent = []
+    for _ in range(min(args.queries, 200)):
+        start = time.perf_counter()
+        db.get_recent_events(1, limit=5)
+        recent.append((time.perf_counter() - start) * 1e6)
+
+    print(f"冷啟動檢索:            {cold_ms:8.2f} ms")
+    print(f"熱檢索 中位數 / p99:    {statistics.median(warm):8.1f} / {percentile(warm, 0.99):.1f} µs")
+    print(f"get_recent_events 中位數: {statistics.median(recent):6.1f} µs（對照）")
+
+    os.remove(config.DB_PATH)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+"""
+敘述提取管線基準
+
+比較舊版 auto_fix_state 的提取方式（每次以字串模式 re.findall / re.search，
+逐詞 `in` 與逐條 re.search 過濾無效物品）與 NarrativeExtractor（預編譯模式、
+無效詞自動機、合併交替式）的耗時。
+
+使用方式：
+    python benchmarks/bench_narrative_extractor.py
+    python benchmarks/bench_narrative_extractor.py --repeat 2000
+"""
+
+import argparse
+import random
+import re
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from keyword_tables import (
+    REGEX_ITEM_GAIN, REGEX_HP_DAMAGE, REGEX_MOVEMENT,
+    INVALID_ITEM_WORDS, INVALID_ITEM_PATTERNS,
+)
+from validators import narrative_extractor
+
+
+SENTENCES = [
+    "長老微笑著賜予你一枚築基丹。",
+    "你獲得了長老的指導，心中多了幾分信心。",
+    "你在石縫中撿起一塊下品靈石。",
+    "你得到一些珍貴的靈草。",
+    "妖獸一爪抓來，你失去了 20 點生命。",
+    "經過長途跋涉，你終於進入了靈獸森林。",
+    "山風徐徐，松濤陣陣。",
+]
+
+
+def legacy_extract(narrative):
+    """舊版 auto_fix_state 的提取步驟"""
+    raw_items = list(set(match[1] for match in re.findall(REGEX_ITEM_GAIN, narrative)))
+    valid_items = []
+    for item in raw_items:
+        if any(invalid_word in item for invalid_word in INVALID_ITEM_WORDS):
+            continue
+        if any(re.search(pattern, item) for pattern in INVALID_ITEM_PATTERNS):
+            continue
+        valid_items.append(item)
+    damage_match = re.search(REGEX_HP_DAMAGE, narrative)
+    move_match = re.search(REGEX_MOVEMENT, narrative)
+    return (set(valid_items),
+            int(damage_match.group(1)) if damage_match else None,
+            move_match.group(2) if move_match else None)
+
+
+def extractor_extract(narrative):
+    items, _ = narrative_extractor.extract_items(narrative)
+    return (set(items),
+            narrative_extractor.extract_hp_damage(narrative),
+            narrative_extractor.extract_destination(narrative))
+
+
+def make_narrative(sentences: int, rng: random.Random) -> str:
+    return "".join(rng.choice(SENTENCES) for _ in range(sentences))
+
+
+def timed(fn, narratives, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for narrative in narratives:
+            fn(narrative)
+    return (time.perf_counter() - start) / (repeat * len(narratives)) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="敘述提取管線基準")
+    parser.add_argument("--repeat", type=int, default=500)
+    args = parser.parse_args()
+
+    rng = random.Random(34)
+    print(f"{'敘述句數':>8} {'舊版 (µs)':>12} {'提取管線 (µs)':>15} {'加速':>7}")
+    for sentences in (3, 10, 50):
+        narratives = [make_narrative(sentences, rng) for _ in range(20)]
+        for narrative in narratives:
+            assert legacy_extract(narrative) == extractor_extract(narrative)
+        legacy_us = timed(legacy_extract, narratives, args.repeat)
+        extractor_us = timed(extractor_extract, narratives, args.repeat)
+        print(f"{sentences:>8} {legacy_us:>12.1f} {extractor_us:>15.1f} {legacy_us / extractor_us:>6.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+"""
+玩家存檔基準
+
+對不同大小的背包，測量一回合典型變化（hp / mp 變動、拾取一件、消耗一件）後的保存耗時：
+- 舊做法：整份狀態 json.dumps 後 UPDATE players.state_json
+- 增量保存：GameStateManager.save_player（只寫變動的欄位與物品行）
+另外列出首次整份寫入（無快照）與 load_player 的耗時。
+
+使用方式：
+    python benchmarks/bench_player_save.py
+    python benchmarks/bench_player_save.py --sizes 100 1000 10000 --rounds 200
+"""
+
+import argparse
+import json
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+import config
+
+
+def mutate(state, rng, turn):
+    """一回合的典型變化"""
+    state["hp"] = max(1, state["hp"] - rng.randint(0, 5))
+    state["mp"] = max(0, state["mp"] - rng.randint(0, 3))
+    state["current_tick"] += 1
+    state["inventory"].append(f"戰利品{turn}")
+    state["inventory"].remove(rng.choice(state["inventory"]))
+
+
+def legacy_save(db_path, player_id, state):
+    """舊版 save_player：整份 JSON 重寫"""
+    conn = sqlite3.connect(db_path)
+    try:
+        conn.execute("""
+            UPDATE players SET location_id = ?, tier = ?, current_tick = ?, state_json = ?,
+                last_save_at = CURRENT_TIMESTAMP WHERE id = ?
+        """, (state["location_id"], state["tier"], state["current_tick"],
+              json.dumps(state, ensure_ascii=False), player_id))
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def timed(samples, fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    samples.append((time.perf_counter() - start) * 1000)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="玩家存檔基準")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000], help="背包物品數")
+    parser.add_argument("--rounds", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    config.DB_PATH = Path(workdir) / "bench_players.db"
+    from game_state import GameStateManager
+
+    db = GameStateManager()
+    print(f"{'背包':>7} | {'舊 JSON 保存':>12} | {'增量保存':>10} | {'首次整份':>9} | {'讀取':>8}  (ms，中位數)")
+    for size in args.sizes:
+        rng = random.Random(args.seed)
+        items = [f"物品{rng.randint(0, size // 4)}" for _ in range(size)]
+
+        legacy = db.create_new_player(f"舊{size}")
+        legacy_state = legacy["state"]
+        legacy_state["inventory"] = list(items)
+        legacy_samples = []
+        for turn in range(args.rounds):
+            mutate(legacy_state, rng, turn)
+            timed(legacy_samples, legacy_save, config.DB_PATH, legacy["player_id"], legacy_state)
+
+        created = db.create_new_player(f"新{size}")
+        state = created["state"]
+        state["inventory"] = list(items)
+        full_samples = []
+        timed(full_samples, db.save_player, created["player_id"], state)
+        samples = []
+        for turn in range(args.rounds):
+            mutate(state, rng, turn)
+            timed(samples, db.save_player, created["player_id"], state)
+
+        load_samples = []
+        for _ in range(20):
+            db._snapshots.clear()
+            loaded = timed(load_samples, db.load_player, f"新{size}")
+        assert loaded["state"]["inventory"] == state["inventory"]
+
+        print(f"{size:>7} | {statistics.median(legacy_samples):12.3f} | {statistics.median(samples):10.3f} | "
+              f"{full_samples[0]:9.3f} | {statistics.median(load_samples):8.3f}")
+
+    os.remove(config.DB_PATH)
+
+
+if __name__ == "__main__":
+    main()
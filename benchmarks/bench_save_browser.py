@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+"""
+存檔瀏覽基準
+
+建立 --players 個存檔（批次寫入 players，最後保存時間分散），比較：
+- 舊做法：list_all_players（整張表轉成 dict）
+- 第一頁 / 深處某一頁：browse_players（keyset 分頁，走 idx_players_last_save）
+- 名稱前綴查詢：browse_players(prefix=...)（走 name 的 UNIQUE 索引）
+
+使用方式：
+    python benchmarks/bench_save_browser.py
+    python benchmarks/bench_save_browser.py --players 100000 --runs 20
+"""
+
+import argparse
+import os
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+import config
+
+
+def median_ms(fn, runs):
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="存檔瀏覽基準")
+    parser.add_argument("--players", type=int, default=50000)
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    config.DB_PATH = Path(workdir) / "bench_browser.db"
+    config.DEBUG = False
+
+    from game_state import GameStateManager
+    from save_browser import browse_players
+
+    db = GameStateManager()
+    conn = sqlite3.connect(config.DB_PATH)
+    conn.executemany("""
+        INSERT INTO players (name, state_json, tier, location_id, location_name, playtime_seconds, last_save_at)
+        VALUES (?, '{}', 1.0, 'qingyun_foot', '青雲山腳', ?, datetime('2026-01-01', ?))
+    """, [(f"修士{i:06d}", i % 7200, f"+{i * 37 % 864000} seconds") for i in range(args.players)])
+    conn.commit()
+    conn.close()
+
+    # 深處的一頁：先翻到中間，記下游標
+    after = None
+    for _ in range(50):
+        after = browse_players(db, limit=config.SAVE_BROWSER_MAX_PAGE_SIZE, after=after).next_after
+
+    results = [
+        ("list_all_players（全部）", median_ms(db.list_all_players, args.runs)),
+        ("browse_players 第一頁", median_ms(lambda: browse_players(db), args.runs)),
+        ("browse_players 第 2500 頁附近", median_ms(lambda: browse_players(db, after=after), args.runs)),
+        ("名稱前綴「修士0123」", median_ms(lambda: browse_players(db, prefix="修士0123"), args.runs)),
+    ]
+    print(f"存檔數: {args.players}")
+    for label, ms in results:
+        print(f"  {label:<28} 中位數 {ms:8.2f} ms")
+
+    os.remove(config.DB_PATH)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+"""
+遊戲過程存檔次數統計
+
+以腳本輸入驅動 DaoGame.game_loop（方向移動、休息、修煉、突破、查看背包 / 狀態、手動存檔、
+AI 回合），統計 SaveScheduler 的標記次數、擷取的副本數、被合併的副本數與實際寫入次數。
+AI 回合不呼叫模型：以隨機的 state_update 代替（約四成沒有狀態變化，如交談、觀察），
+照常經過 apply_state_update（死亡立即存檔）與時間推進。
+
+每個指令之間暫停 --think 秒模擬玩家思考；合併視窗為 --window 秒。
+預設比例（視窗約為 4 個指令）近似 SAVE_COALESCE_WINDOW=10、每回合約 2.5 秒。
+
+使用方式：
+    python benchmarks/bench_session_saves.py
+    python benchmarks/bench_session_saves.py --turns 500 --sessions 5 --window 0.05
+"""
+
+import argparse
+import builtins
+import contextlib
+import io
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-bench")
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+import config
+
+
+def fake_update(rng):
+    """AI 回合的狀態變化（近似實際分佈）"""
+    roll = rng.random()
+    if roll < 0.4:
+        return {}
+    update = {}
+    if rng.random() < 0.4:
+        update["hp_change"] = -rng.randint(1, 30)
+    if rng.random() < 0.3:
+        update["mp_change"] = -rng.randint(1, 10)
+    if rng.random() < 0.2:
+        update["karma_change"] = rng.choice([-2, -1, 1, 2])
+    if rng.random() < 0.15:
+        update["items_gained"] = [rng.choice(["靈草", "下品靈石", "丹藥", "殘破劍譜"])]
+    return update
+
+
+def commands(game, rng, turns, think):
+    """逐條產生輸入（移動只選當前地點存在的出口）"""
+    from world_data import get_location_data
+
+    for _ in range(turns):
+        time.sleep(think)
+        roll = rng.random()
+        if roll < 0.35:
+            exits = (get_location_data(game.player_state["location_id"]) or {}).get("exits") or {"north": None}
+            yield rng.choice(sorted(exits))
+        elif roll < 0.45:
+            yield "r"
+        elif roll < 0.55:
+            yield "c"
+        elif roll < 0.58:
+            yield "b"
+        elif roll < 0.63:
+            yield rng.choice(["i", "s"])
+        elif roll < 0.65:
+            yield "save"
+        else:
+            yield "觀察四周"
+    yield "quit"
+
+
+def run_session(seed, turns, window, think):
+    import main
+    from game_state import GameStateManager
+    from save_scheduler import SaveScheduler
+
+    db = GameStateManager()
+    main.game_db = db
+    rng = random.Random(seed)
+    game = main.DaoGame()
+    game.saver = SaveScheduler(lambda: db, window=window)
+    created = db.create_new_player(f"行者{seed}")
+    game.player_id, game.player_state = created["player_id"], created["state"]
+
+    def process_action(_text):
+        game.apply_state_update(fake_update(rng))
+        game.player_state["current_tick"] += 1
+        db.log_event(game.player_id, game.player_state["location"], "INSPECT", "觀察四周")
+
+    game.process_action = process_action
+    inputs = commands(game, rng, turns, think)
+    original_input = builtins.input
+    builtins.input = lambda prompt="": next(inputs)
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            game.game_loop()
+    finally:
+        builtins.input = original_input
+    return {**game.saver.stats, "db_writes": db.save_stats["written"]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="遊戲過程存檔次數統計")
+    parser.add_argument("--turns", type=int, default=300, help="每局輸入的指令數")
+    parser.add_argument("--sessions", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--window", type=float, default=0.02, help="合併視窗秒數")
+    parser.add_argument("--think", type=float, default=0.005, help="每個指令之間的暫停秒數")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    config.DB_PATH = Path(workdir) / "bench_sessions.db"
+    config.DEBUG = False
+
+    keys = ("marked", "captured", "coalesced", "immediate", "db_writes")
+    totals = dict.fromkeys(keys, 0)
+    start = time.perf_counter()
+    for session in range(args.sessions):
+        stats = run_session(args.seed + session, args.turns, args.window, args.think)
+        print(f"第 {session + 1} 局: 標記 {stats['marked']:4d} 次，擷取 {stats['captured']:4d}，"
+              f"合併 {stats['coalesced']:4d}，立即寫入 {stats['immediate']:3d}，實際寫入 {stats['db_writes']:4d}")
+        for key in keys:
+            totals[key] += stats[key]
+    print(f"合計: 標記 {totals['marked']} 次 → 寫入 {totals['db_writes']} 次"
+          f"（{totals['db_writes'] / max(totals['marked'], 1):.0%}），"
+          f"其中立即寫入 {totals['immediate']} 次；耗時 {time.perf_counter() - start:.1f} 秒")
+
+    os.remove(config.DB_PATH)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+"""
+狀態日誌重播基準
+
+以一回合的典型變化（hp / mp / 氣運變動、拾取、消耗、時間推進）產生 --deltas 個 delta
+（PlayerState.diff → encode_delta，與遊戲中相同），寫入 state_deltas 後測量：
+- 追加：GameStateManager.append_delta 的單筆耗時（每個指令一次，含 commit）
+- 重播：state_journal.replay 套用全部 delta（解析 JSON + 套用）
+- 讀檔：load_player 讀快照並重播全部 delta（含查詢與重播後寫入新快照）
+
+使用方式：
+    python benchmarks/bench_state_journal.py
+    python benchmarks/bench_state_journal.py --deltas 200000 --inventory 1000
+"""
+
+import argparse
+import copy
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+import config
+
+
+def mutate(state, rng, turn):
+    """一回合的典型變化"""
+    state["hp"] = max(1, state["hp"] - rng.randint(0, 5))
+    if rng.random() < 0.5:
+        state["mp"] = max(0, state["mp"] - rng.randint(0, 3))
+    if rng.random() < 0.1:
+        state["karma"] += rng.choice([-1, 1])
+    state["current_tick"] += 1
+    if rng.random() < 0.3:
+        state["inventory"].append(f"戰利品{turn % 50}")
+    if rng.random() < 0.2 and state["inventory"]:
+        state["inventory"].remove(rng.choice(state["inventory"]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="狀態日誌重播基準")
+    parser.add_argument("--deltas", type=int, default=100000)
+    parser.add_argument("--inventory", type=int, default=100, help="初始背包大小")
+    parser.add_argument("--appends", type=int, default=200, help="測量 append_delta 的次數")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    config.DB_PATH = Path(workdir) / "bench_journal.db"
+    config.DEBUG = False
+
+    import state_journal
+    from game_state import GameStateManager
+
+    rng = random.Random(args.seed)
+    db = GameStateManager()
+    created = db.create_new_player("日誌")
+    player_id, state = created["player_id"], created["state"]
+    state["inventory"] = [f"物品{i}" for i in range(args.inventory)]
+    db.save_player(player_id, state)
+    base = copy.deepcopy(state.to_dict())
+
+    # 追加（真實路徑，每筆一個交易）
+    samples = []
+    for turn in range(args.appends):
+        mutate(state, rng, turn)
+        start = time.perf_counter()
+        db.append_delta(player_id, state.baseline, state.diff())
+        samples.append((time.perf_counter() - start) * 1000)
+        state.mark_clean()
+
+    # 其餘 delta 以同樣方式編碼後批次寫入（節省準備時間）
+    rows = []
+    for turn in range(args.appends, args.deltas):
+        mutate(state, rng, turn)
+        rows.append((player_id, state["current_tick"], 0,
+                     state_journal.dumps(state_journal.encode_delta(state.baseline, state.diff()))))
+        state.mark_clean()
+    conn = sqlite3.connect(config.DB_PATH)
+    conn.executemany("INSERT INTO state_deltas (player_id, tick, event_id, delta) VALUES (?, ?, ?, ?)", rows)
+    conn.commit()
+    all_rows = conn.execute("SELECT id, event_id, delta FROM state_deltas WHERE player_id = ? ORDER BY id",
+                            (player_id,)).fetchall()
+    conn.close()
+    size = os.path.getsize(config.DB_PATH)
+
+    replayed = copy.deepcopy(base)
+    start = time.perf_counter()
+    count, _, _ = state_journal.replay(replayed, all_rows)
+    replay_seconds = time.perf_counter() - start
+    assert replayed == state.to_dict(), "重播結果與實際狀態不一致"
+
+    start = time.perf_counter()
+    loaded = GameStateManager().load_player("日誌")
+    load_seconds = time.perf_counter() - start
+    assert loaded["recovered_deltas"] == count and loaded["state"] == state
+
+    print(f"delta 數: {count}，平均 {sum(len(row[2].encode()) for row in all_rows) / count:.0f} 位元組，"
+          f"資料庫 {size / 1e6:.1f} MB")
+    print(f"追加:   中位數 {statistics.median(samples):.3f} ms / 筆")
+    print(f"重播:   {replay_seconds:.3f} 秒（{count / replay_seconds:,.0f} delta/秒）")
+    print(f"讀檔:   {load_seconds:.3f} 秒（{count / load_seconds:,.0f} delta/秒，含查詢與寫入新快照）")
+
+    os.remove(config.DB_PATH)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+"""
+世界路網基準
+
+在隨機稀疏地圖（每個地點 1-4 個出口、3 種境界要求）上測量：
+- 建圖時間（建鄰接表與名稱索引）
+- 全點對預算時間（每個境界層 × 每個起點一次 Dijkstra）
+- 按需模式下首次查詢（需跑 Dijkstra）與快取命中查詢的耗時
+
+使用方式：
+    python benchmarks/bench_world_graph.py
+    python benchmarks/bench_world_graph.py --sizes 100 1000 5000 --queries 500
+"""
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from world_graph import WorldGraph
+
+
+def random_world(size: int, seed: int):
+    rng = random.Random(seed)
+    ids = [f"loc_{i}" for i in range(size)]
+    locations = {
+        loc_id: {
+            "id": loc_id,
+            "name": loc_id,
+            "exits": {f"d{k}": rng.choice(ids) for k in range(rng.randint(1, 4))},
+            "tier_requirement": rng.choice([1.0, 1.0, 2.0, 3.0]),
+        }
+        for loc_id in ids
+    }
+    return locations, lambda from_id, to_id: (3, 5)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="世界路網基準")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 3000])
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--precompute-limit", type=int, default=3000,
+                        help="超過此地點數不測全點對預算（太慢）")
+    args = parser.parse_args()
+
+    print(f"{'地點數':>7} {'建圖 (ms)':>10} {'全點對預算 (s)':>15} {'首次查詢 (ms)':>14} {'快取查詢 (µs)':>14}")
+    for size in args.sizes:
+        locations, edge_cost = random_world(size, size)
+        rng = random.Random(size)
+        pairs = [(rng.choice(list(locations)), rng.choice(list(locations))) for _ in range(args.queries)]
+
+        start = time.perf_counter()
+        graph = WorldGraph(locations, edge_cost=edge_cost, precompute=False, cache_size=size * 3)
+        build_ms = (time.perf_counter() - start) * 1000
+
+        precompute_s = float("nan")
+        if size <= args.precompute_limit:
+            start = time.perf_counter()
+            WorldGraph(locations, edge_cost=edge_cost, precompute=True)
+            precompute_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for source, target in pairs:
+            graph.route(source, target, 2.0)
+        first_ms = (time.perf_counter() - start) / len(pairs) * 1000
+
+        start = time.perf_counter()
+        for source, target in pairs:
+            graph.route(source, target, 2.0)
+        cached_us = (time.perf_counter() - start) / len(pairs) * 1e6
+
+        print(f"{size:>7} {build_ms:>10.1f} {precompute_s:>15.2f} {first_ms:>14.2f} {cached_us:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+"""
+世界資料啟動基準
+
+比較解析 data/*.json（含驗證與建索引）與載入編譯快照（world_snapshot.bin）的耗時：
+1. 進程內：WorldRegistry 建立時間（暖快取，重複多次取中位數）
+2. 冷啟動：新進程導入 world_data / event_pools / npc_manager 的總耗時
+
+快照寫在暫存目錄，不會動到 data/。
+
+使用方式：
+    python benchmarks/bench_world_startup.py
+    python benchmarks/bench_world_startup.py --repeat 200 --cold 20
+"""
+
+import argparse
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+SRC = Path(__file__).parent.parent / "src"
+sys.path.insert(0, str(SRC))
+
+import config
+from world_registry import WORLD_FILES, WorldRegistry, compile_world
+
+
+COLD_IMPORT = """
+import sys, time
+sys.path.insert(0, {src!r})
+start = time.perf_counter()
+import config
+config.DATA_PATH = __import__("pathlib").Path({data!r})
+config.WORLD_SNAPSHOT_ENABLED = {compiled!r}
+import world_data, event_pools, npc_manager
+assert world_data.world_registry.snapshot.source == {source!r}
+print(time.perf_counter() - start)
+"""
+
+
+def warm_ms(data_path: Path, use_compiled: bool, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        WorldRegistry(data_path, use_compiled=use_compiled)
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000
+
+
+def cold_ms(data_path: Path, use_compiled: bool, repeat: int) -> float:
+    code = COLD_IMPORT.format(src=str(SRC), data=str(data_path), compiled=use_compiled,
+                              source="compiled" if use_compiled else "json")
+    samples = []
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+        samples.append(float(output.stdout.strip().splitlines()[-1]))
+    return statistics.median(samples) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="世界資料啟動基準")
+    parser.add_argument("--repeat", type=int, default=100, help="進程內重複次數")
+    parser.add_argument("--cold", type=int, default=10, help="冷啟動進程數")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        data_path = Path(temp_dir)
+        for filename in WORLD_FILES:
+            if (config.DATA_PATH / filename).exists():
+                shutil.copy(config.DATA_PATH / filename, data_path / filename)
+        output = compile_world(data_path)
+        print(f"快照大小: {output.stat().st_size} bytes")
+
+        print(f"{'':>10} {'解析 JSON (ms)':>15} {'編譯快照 (ms)':>15} {'加速':>7}")
+        json_ms = warm_ms(data_path, False, args.repeat)
+        compiled_ms = warm_ms(data_path, True, args.repeat)
+        print(f"{'進程內':>10} {json_ms:>15.2f} {compiled_ms:>15.2f} {json_ms / compiled_ms:>6.2f}x")
+
+        if args.cold:
+            json_ms = cold_ms(data_path, False, args.cold)
+            compiled_ms = cold_ms(data_path, True, args.cold)
+            print(f"{'冷啟動':>10} {json_ms:>15.2f} {compiled_ms:>15.2f} {json_ms / compiled_ms:>6.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,78 +2,215 @@
 # 道·衍 - 四個 Agent 的實現
 
 import json
-import re
-from typing import Dict, Any, Optional, Tuple
-from openai import OpenAI
+from typing import Callable, Dict, Any, Optional, Tuple
 import config
 from prompts import (
     SYSTEM_OBSERVER, SYSTEM_LOGIC, SYSTEM_DRAMA, 
-    SYSTEM_DIRECTOR, SYSTEM_OPENING_SCENE
+    SYSTEM_DIRECTOR, SYSTEM_DIRECTOR_REPAIR, SYSTEM_OPENING_SCENE
 )
 from npc_manager import npc_manager
+from npc_relations import affinity_cache
+from llm_resilience import (
+    latency_tracker, get_circuit_breaker, hedged_call, llm_metrics
+)
+from single_flight import single_flight, request_fingerprint
+from json_stream import extract_first_json_object
+from schemas import INTENT, INTENT_FALLBACK, DECISION, REPAIR_PATCH, parse_structured
+from json_patch import apply_json_patch
+from lazy_init import LazyProxy
+
+
+def create_client():
+    """建立 OpenAI 客戶端（導入 openai 套件較慢，延遲到第一次調用 API 時）"""
+    from openai import OpenAI
+
+    # 重試由 call_gpt 統一處理，關閉 SDK 內建重試以免重試次數相乘
+    return OpenAI(api_key=config.OPENAI_API_KEY, max_retries=0)
 
-client = OpenAI(api_key=config.OPENAI_API_KEY)
+
+client = LazyProxy(create_client)
 
 
 def extract_json_from_text(text: str) -> Optional[Dict[str, Any]]:
     """
-    從文本中提取 JSON 對象（更強大的版本）
-    嘗試多種策略提取 JSON
+    從文本中提取 JSON 對象
+    單趟掃描，字串感知，容忍代碼塊、說明文字與尾隨逗號（見 json_stream.py）
     """
-    # 檢查 text 是否為 None 或空
-    if not text:
-        return None
-
-    # 策略 1: 直接解析
+    return extract_first_json_object(text)
+
+
+def _request_completion(model: str, messages: list, temperature: float,
+                        timeout: float, response_format: Optional[dict] = None) -> Optional[str]:
+    """發出單次 Chat Completion 請求，返回回應文本"""
+    kwargs = {"response_format": response_format} if response_format else {}
+    response = client.chat.completions.create(
+        model=model,
+        messages=messages,
+        temperature=temperature,
+        timeout=timeout,
+        **kwargs
+    )
+    return response.choices[0].message.content
+
+
+def _stream_completion(model: str, messages: list, temperature: float,
+                       timeout: float, response_format: Optional[dict] = None):
+    """發出串流 Chat Completion 請求，逐段產出回應文字"""
+    kwargs = {"response_format": response_format} if response_format else {}
+    stream = client.chat.completions.create(
+        model=model,
+        messages=messages,
+        temperature=temperature,
+        timeout=timeout,
+        stream=True,
+        **kwargs
+    )
     try:
-        return json.loads(text.strip())
-    except json.JSONDecodeError:
-        pass
+        for event in stream:
+            if not event.choices:
+                continue
+            delta = event.choices[0].delta.content
+            if delta:
+                yield delta
+    finally:
+        # 提前結束時關閉連線，不再接收剩餘的 token
+        close = getattr(stream, "close", None)
+        if close:
+            close()
+
+
+def _backoff(delay: float, budget_deadline: float):
+    """退避等待（不超過剩餘的時間預算）"""
+    import time
 
-    # 策略 2: 查找 ```json 代碼塊
-    json_code_match = re.search(r'```json\s*(\{.*?\})\s*```', text, re.DOTALL)
-    if json_code_match:
-        try:
-            return json.loads(json_code_match.group(1))
-        except json.JSONDecodeError:
-            pass
-
-    # 策略 3: 查找第一個完整的 {} 對象
-    brace_count = 0
-    start_idx = -1
-
-    for i, char in enumerate(text):
-        if char == '{':
-            if brace_count == 0:
-                start_idx = i
-            brace_count += 1
-        elif char == '}':
-            brace_count -= 1
-            if brace_count == 0 and start_idx != -1:
-                try:
-                    return json.loads(text[start_idx:i+1])
-                except json.JSONDecodeError:
-                    pass
-
-    return None
+    remaining = budget_deadline - time.monotonic()
+    if remaining > 0:
+        time.sleep(min(delay, remaining))
 
 
 def call_gpt(system_prompt: str, user_message: str, model: str = None,
-             temperature: float = 0.7) -> str:
+             temperature: float = 0.7, agent_name: str = "default",
+             response_format: Optional[dict] = None) -> str:
     """
-    通用 GPT 調用函數（帶重試機制）
+    通用 GPT 調用函數（相同的在途請求合併 + 延遲感知）
 
     Args:
         system_prompt: 系統提示
         user_message: 用戶消息
         model: 模型名稱，預設使用 config.DEFAULT_MODEL
         temperature: 創意度
+        agent_name: 調用方 Agent 名稱（延遲統計按 agent/model 分組）
+        response_format: 結構化輸出格式（見 schemas.py）；模型拒絕時自動降級為一般文本
 
     Returns:
-        API 回應文本
+        API 回應文本；熔斷、認證失敗或重試耗盡時返回空字串（由上層走降級邏輯）
+    """
+    model = model or config.DEFAULT_MODEL
 
-    Raises:
-        RuntimeError: 重試耗盡後仍失敗
+    def upstream() -> str:
+        return _call_gpt_resilient(system_prompt, user_message, model, temperature, agent_name,
+                                   response_format)
+
+    if not config.API_COALESCE_ENABLED:
+        return upstream()
+
+    # 同一指紋的並發調用只打一次上游，其餘共享結果
+    key = request_fingerprint(model, temperature, system_prompt, user_message,
+                              response_format=response_format)
+    result, shared = single_flight.do(key, upstream)
+
+    if shared:
+        llm_metrics["coalesced"] += 1
+        if config.VERBOSE_API_CALLS:
+            print(f"[API] 合併相同的在途請求（{agent_name}），共享上游結果")
+
+    return result
+
+
+# 拒絕過 response_format 的模型（之後直接以一般文本調用，由本地掃描器解析）
+_structured_output_unsupported = set()
+
+
+def call_gpt_stream(system_prompt: str, user_message: str, model: str = None,
+                    temperature: float = 0.7, agent_name: str = "default",
+                    response_format: Optional[dict] = None,
+                    on_chunk: Optional[Callable[[str], bool]] = None) -> str:
+    """
+    串流版 call_gpt：邊收邊把文字交給 on_chunk，on_chunk 返回 True 時提前結束串流
+
+    串流只嘗試一次（不合併、不對沖）；熔斷中、串流失敗或沒有收到任何內容時，
+    退回 call_gpt 走完整的重試/降級邏輯。退回時 on_chunk 不會收到退回的結果，
+    呼叫方應以返回值為準（見 StreamingValidator.finish）。
+
+    Returns:
+        回應文本（提前結束時為已收到的部分）；失敗時同 call_gpt
+    """
+    import time
+    from openai import APIStatusError
+
+    model = model or config.DEFAULT_MODEL
+
+    def fallback() -> str:
+        # 串流若是半開狀態的探測請求、又沒有記錄成敗（如不支援結構化輸出），先歸還名額，
+        # 否則 call_gpt 的 allow_request 會被自己擋下
+        breaker.release_probe()
+        llm_metrics["stream_fallbacks"] += 1
+        return call_gpt(system_prompt, user_message, model=model, temperature=temperature,
+                        agent_name=agent_name, response_format=response_format)
+
+    if not config.API_STREAMING_ENABLED:
+        return call_gpt(system_prompt, user_message, model=model, temperature=temperature,
+                        agent_name=agent_name, response_format=response_format)
+
+    breaker = get_circuit_breaker(model)
+    if not breaker.allow_request():
+        return fallback()
+
+    stream_format = None if model in _structured_output_unsupported else response_format
+    messages = [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": user_message}
+    ]
+    timeout = latency_tracker.adaptive_timeout((agent_name, model))
+    parts = []
+
+    try:
+        if config.VERBOSE_API_CALLS:
+            print(f"\n[API] 串流調用: {model} ({agent_name})，超時 {timeout:.1f} 秒")
+        started = time.monotonic()
+        for delta in _stream_completion(model, messages, temperature, timeout, stream_format):
+            parts.append(delta)
+            if on_chunk is not None and on_chunk(delta):
+                llm_metrics["stream_early_stops"] += 1
+                break
+            if time.monotonic() - started > timeout:
+                raise TimeoutError(f"串流超過 {timeout:.1f} 秒")
+    except Exception as e:
+        if isinstance(e, APIStatusError) and e.status_code == 400 and stream_format is not None:
+            _structured_output_unsupported.add(model)
+        else:
+            breaker.record_failure()
+        print(f"[WARNING] 串流調用失敗，改用一般調用: {type(e).__name__}: {e}")
+        return fallback()
+
+    breaker.record_success()
+    if not parts:
+        return fallback()
+
+    result = "".join(parts)
+    if config.VERBOSE_API_CALLS:
+        print(f"[API] 串流回應長度: {len(result)} 字")
+    return result
+
+
+def _call_gpt_resilient(system_prompt: str, user_message: str, model: str,
+                        temperature: float, agent_name: str,
+                        response_format: Optional[dict] = None) -> str:
+    """
+    實際的上游調用（延遲感知：自適應超時 + 對沖請求 + 熔斷）
+
+    Returns:
+        API 回應文本；熔斷、認證失敗或重試耗盡時返回空字串
     """
     import time
     from openai import (
@@ -83,29 +220,49 @@ def call_gpt(system_prompt: str, user_message: str, model: str = None,
         AuthenticationError,
     )
 
-    model = model or config.DEFAULT_MODEL
-    last_error = None
+    latency_key = (agent_name, model)
+    breaker = get_circuit_breaker(model)
+    messages = [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": user_message}
+    ]
+    budget_deadline = time.monotonic() + config.API_CALL_BUDGET
+    if model in _structured_output_unsupported:
+        response_format = None
 
     for attempt in range(config.API_MAX_RETRIES):
+        # 熔斷中：不再打上游，直接降級
+        if not breaker.allow_request():
+            llm_metrics["short_circuited"] += 1
+            print(f"[WARNING] API 熔斷中（{model}），跳過調用並使用降級回應")
+            return ""
+
+        remaining = budget_deadline - time.monotonic()
+        if remaining <= 0:
+            print(f"[ERROR] API 調用超出時間預算 ({config.API_CALL_BUDGET:.0f} 秒)")
+            break
+
+        timeout = min(latency_tracker.adaptive_timeout(latency_key), remaining)
+        hedge_delay = latency_tracker.hedge_delay(latency_key)
+
         try:
             if config.VERBOSE_API_CALLS:
-                print(f"\n[API] 使用模型: {model}")
+                print(f"\n[API] 使用模型: {model} ({agent_name})")
                 print(f"[API] 系統提示長度: {len(system_prompt)} 字")
                 print(f"[API] 用戶消息長度: {len(user_message)} 字")
+                print(f"[API] 超時: {timeout:.1f} 秒" +
+                      (f"，對沖觸發: {hedge_delay:.2f} 秒" if hedge_delay else ""))
                 if attempt > 0:
                     print(f"[API] 重試第 {attempt + 1} 次")
 
-            response = client.chat.completions.create(
-                model=model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_message}
-                ],
-                temperature=temperature,
-                timeout=config.API_TIMEOUT
+            started = time.monotonic()
+            result, hedged = hedged_call(
+                lambda t: _request_completion(model, messages, temperature, t, response_format),
+                timeout,
+                hedge_delay
             )
-
-            result = response.choices[0].message.content
+            latency_tracker.record(latency_key, time.monotonic() - started)
+            breaker.record_success()
 
             # 檢查 API 返回的內容是否為 None
             if result is None:
@@ -113,7 +270,7 @@ def call_gpt(system_prompt: str, user_message: str, model: str = None,
                 return ""
 
             if config.VERBOSE_API_CALLS:
-                print(f"[API] 回應長度: {len(result)} 字")
+                print(f"[API] 回應長度: {len(result)} 字" + ("（對沖請求勝出）" if hedged else ""))
 
             return result
 
@@ -125,47 +282,58 @@ def call_gpt(system_prompt: str, user_message: str, model: str = None,
 
         except RateLimitError as e:
             # 速率限制：使用更長的退避時間
-            last_error = e
+            breaker.record_failure()
             if attempt < config.API_MAX_RETRIES - 1:
                 delay = config.API_RETRY_BASE_DELAY * (3 ** attempt)  # 更激進的退避
                 print(f"[WARNING] API 速率限制 (嘗試 {attempt + 1}/{config.API_MAX_RETRIES}): {e}")
                 print(f"[INFO] {delay:.1f} 秒後重試...")
-                time.sleep(delay)
+                _backoff(delay, budget_deadline)
             else:
                 print(f"[ERROR] API 速率限制，已耗盡所有重試次數")
 
-        except APIConnectionError as e:
-            # 網絡連接錯誤：可以重試
-            last_error = e
+        except (APIConnectionError, TimeoutError) as e:
+            # 網絡連接錯誤 / 超時：可以重試（APITimeoutError 是 APIConnectionError 的子類）
+            breaker.record_failure()
             if attempt < config.API_MAX_RETRIES - 1:
                 delay = config.API_RETRY_BASE_DELAY * (2 ** attempt)
                 print(f"[WARNING] API 連接失敗 (嘗試 {attempt + 1}/{config.API_MAX_RETRIES}): {e}")
                 print(f"[INFO] {delay:.1f} 秒後重試...")
-                time.sleep(delay)
+                _backoff(delay, budget_deadline)
             else:
                 print(f"[ERROR] API 連接失敗，已耗盡所有重試次數")
 
         except APIStatusError as e:
+            # 模型不支援結構化輸出（400）：記住並立即改用一般文本重試，不計入熔斷
+            if e.status_code == 400 and response_format is not None:
+                print(f"[WARNING] 模型 {model} 不接受結構化輸出，改用一般文本: {e}")
+                _structured_output_unsupported.add(model)
+                response_format = None
+                continue
+
             # API 狀態錯誤（500 等）：可以重試
-            last_error = e
+            breaker.record_failure()
             if attempt < config.API_MAX_RETRIES - 1:
                 delay = config.API_RETRY_BASE_DELAY * (2 ** attempt)
                 print(f"[WARNING] API 狀態錯誤 {e.status_code} (嘗試 {attempt + 1}/{config.API_MAX_RETRIES}): {e}")
                 print(f"[INFO] {delay:.1f} 秒後重試...")
-                time.sleep(delay)
+                _backoff(delay, budget_deadline)
             else:
                 print(f"[ERROR] API 狀態錯誤，已耗盡所有重試次數: {e}")
 
         except Exception as e:
             # 未預期的錯誤：記錄並嘗試重試
-            last_error = e
+            breaker.record_failure()
             if attempt < config.API_MAX_RETRIES - 1:
                 delay = config.API_RETRY_BASE_DELAY * (2 ** attempt)
                 print(f"[WARNING] 未預期錯誤 (嘗試 {attempt + 1}/{config.API_MAX_RETRIES}): {type(e).__name__}: {e}")
                 print(f"[INFO] {delay:.1f} 秒後重試...")
-                time.sleep(delay)
+                _backoff(delay, budget_deadline)
             else:
                 print(f"[ERROR] 未預期錯誤，已耗盡所有重試次數: {type(e).__name__}: {e}")
+        finally:
+            # 半開狀態的探測請求若沒有記錄成敗（認證錯誤、改用一般文本重試），歸還名額，
+            # 下一次嘗試（如改用一般文本）可重新取得
+            breaker.release_probe()
 
     # 所有重試都失敗，返回空字串（保持向後兼容）
     # 注意：上層代碼需要處理空字串的情況
@@ -204,19 +372,24 @@ def agent_observer(player_input: str, recent_events: list = None) -> Dict[str, A
         system_prompt=SYSTEM_OBSERVER,
         user_message=user_message,
         model=config.MODEL_OBSERVER,
-        temperature=0.5
+        agent_name="observer",
+        temperature=0.5,
+        response_format=INTENT.response_format() if config.STRUCTURED_OUTPUT_ENABLED else None
     )
-    
-    # 提取 JSON
-    intent_dict = extract_json_from_text(response)
+
+    # 解析 + Schema 驗證（降級為一般文本時模型不受 enum 約束：未知意圖視為 UNKNOWN，多餘欄位丟棄）
+    structured = config.STRUCTURED_OUTPUT_ENABLED and config.MODEL_OBSERVER not in _structured_output_unsupported
+    intent_dict, schema_errors = parse_structured(response, INTENT if structured else INTENT_FALLBACK)
 
     if intent_dict:
         if config.DEBUG:
             print(f"[觀察者] 意圖: {intent_dict.get('intent')}")
+            if schema_errors:
+                print(f"[觀察者] Schema 修正: {schema_errors}")
         return intent_dict
     else:
         if config.DEBUG:
-            print(f"[觀察者] JSON 解析失敗，返回默認值")
+            print(f"[觀察者] JSON 解析失敗，返回默認值: {schema_errors}")
             print(f"[觀察者] 原始回應: {response[:200]}")
         return {"intent": "UNKNOWN", "target": None, "confidence": 0.0}
 
@@ -277,6 +450,7 @@ def agent_logic(player_state: Dict[str, Any], intent: Dict[str, Any],
         system_prompt=SYSTEM_LOGIC,
         user_message=context,
         model=config.MODEL_LOGIC,
+        agent_name="logic",
         temperature=0.5
     )
     
@@ -325,17 +499,32 @@ def agent_drama(player_state: Dict[str, Any], intent: Dict[str, Any],
     time_engine = get_time_engine()
     time_context = time_engine.get_detailed_time_context()
 
+    # 優先使用離線預生成的場景素材，省去模型重新描寫環境
+    from flavour_corpus import get_flavour_corpus
+    flavour_snippet = get_flavour_corpus().lookup(
+        location_id, time_context['period'], time_context['season'],
+        npc.get('id') if npc else None
+    )
+
+    if flavour_snippet:
+        atmosphere_text = f"""【環境氛圍（已備妥）】
+- 時間: 第 {time_context['day']} 天 {time_context['period']}（{time_context['hour']}:00 左右）
+- 場景描寫: {flavour_snippet}
+⚠️ 場景描寫已備妥，請直接沿用，不要重新描寫環境，專注於劇情提案！"""
+    else:
+        atmosphere_text = f"""【環境氛圍】
+- 時間: 第 {time_context['day']} 天 {time_context['period']}（{time_context['hour']}:00 左右）
+- 季節: {time_context['season']}季
+- 天氣氛圍: {time_context['weather_hint']}
+⚠️ 請在場景描述中融入時間和季節的氛圍！"""
+
     context = f"""
 場景背景：
 - 玩家: {player_state.get('name')} (修為 {player_state.get('tier')})
 - 位置: {player_state.get('location')}
 - 目標行動: {intent.get('intent')}
 
-【環境氛圍】
-- 時間: 第 {time_context['day']} 天 {time_context['period']}（{time_context['hour']}:00 左右）
-- 季節: {time_context['season']}季
-- 天氣氛圍: {time_context['weather_hint']}
-⚠️ 請在場景描述中融入時間和季節的氛圍！
+{atmosphere_text}
 
 玩家背景：
 - 氣運值: {player_state.get('karma')}
@@ -351,8 +540,8 @@ def agent_drama(player_state: Dict[str, Any], intent: Dict[str, Any],
 """
 
     if npc:
-        # 計算好感度等級
-        affinity = npc.get('affinity', 0)
+        # 計算好感度等級（本次遊戲的好感度快取；沒有記錄時為 NPC 的初始好感度）
+        affinity = affinity_cache.get(npc.get('id'), npc.get('affinity'))
         if affinity < 20:
             affinity_level = "陌生（0-19）"
             relation_tips = "對話應客氣但疏離、公式化"
@@ -405,6 +594,7 @@ def agent_drama(player_state: Dict[str, Any], intent: Dict[str, Any],
         system_prompt=SYSTEM_DRAMA,
         user_message=context,
         model=config.MODEL_DRAMA,
+        agent_name="drama",
         temperature=config.API_TEMPERATURE
     )
     
@@ -418,7 +608,8 @@ def agent_director(player_state: Dict[str, Any], logic_report: str,
                   drama_proposal: str, intent: Dict[str, Any],
                   npc: Optional[Dict[str, Any]] = None,
                   recent_events: list = None,
-                  error_feedback: str = None) -> Dict[str, Any]:
+                  error_feedback: str = None,
+                  stream_validator=None) -> Dict[str, Any]:
     """
     決策者 Agent - 最終決策（帶上下文記憶 + 錯誤修正）
 
@@ -430,6 +621,8 @@ def agent_director(player_state: Dict[str, Any], logic_report: str,
         npc: 目標 NPC
         recent_events: 最近事件記錄
         error_feedback: 上一次輸出的錯誤反饋（用於重試）
+        stream_validator: StreamingValidator（見 validators.py）；提供時以串流調用，
+            決策 JSON 一閉合就在串流中完成驗證並停止接收
 
     輸出：JSON 格式的故事 + 狀態更新
     """
@@ -461,7 +654,7 @@ def agent_director(player_state: Dict[str, Any], logic_report: str,
 【目標 NPC】
 - ID: {npc.get('id')}（⚠️ 更新 npc_relations_change 時必須使用此 ID）
 - 名稱: {npc.get('name')} ({npc.get('title')})
-- 好感度: {npc.get('affinity', 0)}
+- 好感度: {affinity_cache.get(npc.get('id'), npc.get('affinity'))}
 """
 
     # 添加上下文摘要（用於保持劇情連貫）
@@ -477,22 +670,43 @@ def agent_director(player_state: Dict[str, Any], logic_report: str,
 
     context += "\n請綜合上述信息，輸出最終決策 JSON。"
     
-    response = call_gpt(
-        system_prompt=SYSTEM_DIRECTOR,
-        user_message=context,
-        model=config.MODEL_DIRECTOR,
-        temperature=0.7
-    )
-    
-    # 提取 JSON
-    decision = extract_json_from_text(response)
+    response_format = DECISION.response_format() if config.STRUCTURED_OUTPUT_ENABLED else None
+
+    if stream_validator is not None:
+        response = call_gpt_stream(
+            system_prompt=SYSTEM_DIRECTOR,
+            user_message=context,
+            model=config.MODEL_DIRECTOR,
+            agent_name="director",
+            temperature=0.7,
+            response_format=response_format,
+            on_chunk=stream_validator.feed
+        )
+        stream_validator.finish(response)
+    else:
+        response = call_gpt(
+            system_prompt=SYSTEM_DIRECTOR,
+            user_message=context,
+            model=config.MODEL_DIRECTOR,
+            agent_name="director",
+            temperature=0.7,
+            response_format=response_format
+        )
+
+    # 解析 + Schema 驗證（型別錯誤的欄位在這裡修正，不必再請 Director 重來）
+    if stream_validator is not None and stream_validator.done:
+        decision, schema_errors = stream_validator.decision, stream_validator.schema_errors
+    else:
+        decision, schema_errors = parse_structured(response, DECISION)
 
     if decision:
         if config.DEBUG:
             print(f"[天道] 決策完成")
+            if schema_errors:
+                print(f"[天道] Schema 修正: {schema_errors}")
         return decision
     else:
-        print(f"[ERROR] 決策 JSON 解析失敗")
+        print(f"[ERROR] 決策 JSON 解析失敗: {schema_errors}")
         if config.DEBUG:
             print(f"[天道] 原始回應: {response[:300]}")
         return {
@@ -501,6 +715,84 @@ def agent_director(player_state: Dict[str, Any], logic_report: str,
         }
 
 
+# 修復模式允許修改的路徑
+REPAIR_ALLOWED_PATHS = ("/state_update/", "/narrative")
+
+
+def agent_director_repair(narrative: str, state_update: Dict[str, Any],
+                          validation: Dict[str, Any],
+                          player_state: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+    """
+    決策者 Agent - 修復模式（Level 2 的輕量重試）
+
+    不重新生成整段決策：只把出錯的欄位與錯誤訊息交給 Director，
+    由它返回 JSON Patch，本地套用到原決策上。輸入與輸出都只有幾十個 token。
+
+    Args:
+        narrative: 原敘述
+        state_update: 原狀態更新
+        validation: ConsistencyValidator.validate 的結果（需要 errors / error_fields）
+        player_state: 玩家狀態（提供 HP/MP 現值，讓數值修正有依據）
+
+    Returns:
+        修復後的決策 {"narrative", "state_update"}；無法修復時返回 None（由上層改走完整重試）
+    """
+    if config.DEBUG:
+        print(f"\n【天道】修復模式：只修正出錯的欄位...")
+
+    fields = validation.get('error_fields') or []
+    faulty = {field: state_update.get(field) for field in fields}
+
+    context = f"""【敘述】
+{narrative}
+
+【出錯的欄位（目前的值）】
+{json.dumps(faulty, ensure_ascii=False)}
+
+【錯誤】
+{chr(10).join(validation.get('errors', []))}
+"""
+    if player_state:
+        context += f"""
+【玩家當前狀態】
+- HP: {player_state.get('hp')}/{player_state.get('max_hp')}
+- MP: {player_state.get('mp')}/{player_state.get('max_mp')}
+"""
+    context += "\n請輸出修正用的 JSON Patch。"
+
+    response = call_gpt(
+        system_prompt=SYSTEM_DIRECTOR_REPAIR,
+        user_message=context,
+        model=config.MODEL_DIRECTOR,
+        agent_name="director_repair",
+        temperature=0.2,
+        response_format=REPAIR_PATCH.response_format() if config.STRUCTURED_OUTPUT_ENABLED else None
+    )
+
+    repair, schema_errors = parse_structured(response, REPAIR_PATCH)
+    if not repair or not repair['patch']:
+        if config.DEBUG:
+            print(f"[天道] 修復模式未返回可用的補丁: {schema_errors}")
+        return None
+
+    patched, patch_errors = apply_json_patch(
+        {"narrative": narrative, "state_update": state_update},
+        repair['patch'],
+        allowed_prefixes=REPAIR_ALLOWED_PATHS
+    )
+    decision, decision_errors = DECISION.validate(patched)
+    if decision is None:
+        print(f"[WARNING] 修復補丁套用後決策無效: {decision_errors}")
+        return None
+
+    if config.DEBUG:
+        print(f"[天道] 修復補丁: {repair['patch']}")
+        if patch_errors:
+            print(f"[天道] 略過的補丁操作: {patch_errors}")
+    llm_metrics["repairs"] += 1
+    return decision
+
+
 def generate_opening_scene(player_name: str) -> str:
     """
     生成開局劇情（使用固定文本，避免 AI 生成幻覺 NPC）
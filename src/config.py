@@ -81,14 +81,99 @@ BASE_ENCOUNTER_CHANCE = 0.1         # 基礎 10% 奇遇機率
 KARMA_MULTIPLIER = 0.01             # 每點氣運 +1% 奇遇機率
 
 # ============ API 超參數 ============
-API_TIMEOUT = 30
+API_TIMEOUT = 30                    # 單次請求超時上限（秒）
 API_MAX_RETRIES = 3
 API_RETRY_BASE_DELAY = 1.0          # 重試基礎延遲（秒），使用指數退避
+API_CALL_BUDGET = 45.0              # 單次 call_gpt（含重試與退避）的總時間預算（秒）
+
+# 自適應超時：timeout = 觀測 p95 × 倍數，限制在 [API_TIMEOUT_MIN, API_TIMEOUT]
+API_TIMEOUT_MIN = 5.0
+API_TIMEOUT_P95_MULTIPLIER = 2.0
+LATENCY_WINDOW_SIZE = 100           # 每個 (agent, model) 保留的延遲樣本數
+LATENCY_MIN_SAMPLES = 5             # 樣本數不足時使用固定 API_TIMEOUT
+
+# 對沖請求：超過觀測延遲的 p90 仍未返回時，補發一個重複請求
+API_HEDGE_ENABLED = True
+API_HEDGE_PERCENTILE = 0.9
+API_HEDGE_MAX_WORKERS = 8
+
+# 請求合併：指紋相同的並發請求只打一次上游，共享結果
+API_COALESCE_ENABLED = True
+
+# 結構化輸出：Observer/Director 以 JSON Schema 作為 response_format（見 schemas.py）
+STRUCTURED_OUTPUT_ENABLED = True
+
+# 串流：Director 以串流輸出，決策 JSON 一閉合就在串流中完成驗證（見 StreamingValidator）
+API_STREAMING_ENABLED = True
+
+# 修復模式：Level 2 先只請 Director 修正出錯的欄位（JSON Patch），失敗才完整重新生成
+DIRECTOR_REPAIR_ENABLED = True
+
+# 熔斷器：連續失敗 N 次後熔斷，冷卻期內直接返回降級回應
+CIRCUIT_BREAKER_THRESHOLD = 5
+CIRCUIT_BREAKER_COOLDOWN = 30.0     # 秒
 API_TEMPERATURE = 0.8               # Drama 創意度
 
+# ============ 場景素材庫（離線預生成）============
+# 以 python src/flavour_corpus.py 建置（需調用模型，不隨原始碼提供；不存在時 agent_drama 照舊請模型描寫環境）
+FLAVOUR_CORPUS_PATH = DATA_PATH / "flavour_corpus.db"
+FLAVOUR_BATCH_CONCURRENCY = 4       # 批次生成的最大並發請求數
+
+# ============ 世界資料熱重載 ============
+# 啟用後背景輪詢 data/*.json 的 mtime，驗證通過即替換世界資料（見 world_registry.py）
+WORLD_HOT_RELOAD_ENABLED = os.getenv("WORLD_HOT_RELOAD", "false").lower() == "true"
+WORLD_RELOAD_INTERVAL = 2.0         # 輪詢間隔（秒）
+
+# 編譯快照：python src/world_registry.py 產生；來源檔雜湊相符時啟動直接載入，跳過 JSON 解析與驗證
+WORLD_SNAPSHOT_ENABLED = True
+WORLD_SNAPSHOT_FILENAME = "world_snapshot.bin"
+
+# ============ 世界路網（goto 快速旅行）============
+WORLD_GRAPH_PRECOMPUTE_LIMIT = 200  # 地點數不超過此值時建圖即預算全點對最短路徑
+WORLD_GRAPH_CACHE_SIZE = 512        # 更大的地圖按需計算，保留的最短路徑樹數量
+
+# ============ 長期事件記憶（見 memory.py）============
+MEMORY_RECALL_LIMIT = 5             # 每回合餵給 Agent 的記憶條數
+MEMORY_RECENT_SIZE = 32             # 候選：最近 N 條
+MEMORY_IMPORTANT_SIZE = 64          # 候選：重要度前 K 條
+MEMORY_BUCKET_SIZE = 16             # 候選：每個地點 / NPC 最近 M 條
+MEMORY_MAX_PLAYERS = 8              # 常駐記憶體的玩家數（LRU）
+MEMORY_RECENCY_HALF_LIFE = 25.0     # 新近度半衰期（事件條數）
+MEMORY_RECENCY_FLOOR = 0.05         # 新近度下限（重大事件不會被完全遺忘）
+MEMORY_RECENCY_HORIZON = 500        # 相隔超過此事件數視為同樣久遠（衰減已到下限；冷啟動只需數這個範圍）
+EVENT_SEARCH_SCAN_LIMIT = 200000    # 全文檢索只有短詞（< 3 字）時，LIKE 掃描的最近事件數上限
+
+# ============ 資料庫維護（見 db_maintenance.py）============
+# 背景定期把舊事件彙總成日摘要、壓縮歸檔，並增量 VACUUM
+DB_MAINTENANCE_ENABLED = os.getenv("DB_MAINTENANCE", "true").lower() == "true"
+DB_MAINTENANCE_INTERVAL = 1800.0    # 執行間隔（秒）
+DB_MAINTENANCE_INITIAL_DELAY = 60.0 # 啟動後首次執行的延遲（秒）
+DB_MAINTENANCE_BATCH = 500          # 每個交易歸檔的事件數
+DB_MAINTENANCE_PAUSE = 0.01         # 批次之間讓出寫鎖的時間（秒）
+DB_VACUUM_PAGES_PER_STEP = 256      # 每步增量 VACUUM 釋放的頁數
+# 舊資料庫啟動時（進入遊戲迴圈前）轉換為增量 VACUUM；關閉時需離線執行 python src/db_maintenance.py
+DB_VACUUM_CONVERT_ON_STARTUP = os.getenv("DB_VACUUM_CONVERT_ON_STARTUP", "true").lower() == "true"
+EVENT_RETENTION_KEEP_RECENT = 2000  # 每個玩家保留在 event_logs 的最近事件數
+EVENT_RETENTION_KEEP_IMPORTANCE = 5.0  # 重要度不低於此值的事件永遠保留（長期記憶）
+
+# ============ 資料庫備份（見 db_backup.py）============
+DB_BACKUP_ENABLED = os.getenv("DB_BACKUP", "true").lower() == "true"
+DB_BACKUP_PATH = DATA_PATH / "backups"
+DB_BACKUP_INTERVAL = 3600.0         # 備份間隔（秒）
+DB_BACKUP_PAGES_PER_STEP = 256      # backup API 每步複製的頁數
+DB_BACKUP_STEP_PAUSE = 0.005        # 步與步之間讓出鎖的時間（秒）
+DB_BACKUP_MAX_RESTARTS = 20         # 來源頻繁修改導致重來超過此次數時，改為一步複製完
+DB_BACKUP_COMPRESS = True           # gzip 壓縮備份
+DB_BACKUP_KEEP_LAST = 24            # 保留最近幾份
+DB_BACKUP_KEEP_DAILY = 7            # 另外每天保留一份，共幾天
+
+# ============ 存檔瀏覽（見 save_browser.py）============
+SAVE_BROWSER_PAGE_SIZE = 10         # 主選單存檔列表每頁筆數
+SAVE_BROWSER_MAX_PAGE_SIZE = 500    # 單次查詢上限（管理列表 --all 以此分頁逐批讀取）
+
 # ============ 遊戲機制參數 ============
 REST_MP_RECOVERY = 20               # 休息恢復的法力值
-AUTO_SAVE_INTERVAL = 3              # 自動存檔間隔（回合數）
+SAVE_COALESCE_WINDOW = float(os.getenv("SAVE_COALESCE_WINDOW", "10"))  # 合併存檔視窗（秒）：標記變動後最晚多久寫入（見 save_scheduler.py）
 
 # ============ 調試模式 ============
 # 從環境變數讀取，預設為 False
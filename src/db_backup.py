@@ -0,0 +1,248 @@
+# db_backup.py
+# 道·衍 - 線上增量備份（SQLite backup API）
+
+"""
+資料庫備份
+
+原本的 _backup_database 只在 schema 升級時以 shutil.copy2 整檔複製，
+複製期間若有連線正在寫入，得到的檔案可能不一致。這裡改用 sqlite3 的 backup API：
+
+- 分批複製：每步 config.DB_BACKUP_PAGES_PER_STEP 頁，步與步之間暫停
+  config.DB_BACKUP_STEP_PAUSE 秒。每步只短暫持有讀鎖，寫入者不會被長時間擋住。
+- 一致性：遊戲資料庫使用 WAL（GameStateManager.init_database 設定），
+  備份連線先開一個讀交易，整個備份都複製同一個快照：不會因寫入而重來，也不擋寫入者。
+  非 WAL 的資料庫做不到（讀交易會擋住寫入），只能讓 SQLite 在來源被修改時從頭重新複製；
+  重來超過 config.DB_BACKUP_MAX_RESTARTS 次就改為一步複製完，保證結束。
+- 驗證：對副本執行 PRAGMA integrity_check，不通過就丟棄。
+- 壓縮：可選 gzip（config.DB_BACKUP_COMPRESS）。
+- 輪替：保留最近 config.DB_BACKUP_KEEP_LAST 份，另外每天保留最新一份共
+  config.DB_BACKUP_KEEP_DAILY 天。
+
+寫出過程使用暫存檔，完成後以 os.replace 換名，中途失敗不會留下半個備份。
+
+使用方式：
+    python src/db_backup.py                 # 立即備份一次並輪替
+    backup_scheduler.start()                # main.run 啟動時開啟（config.DB_BACKUP_ENABLED）
+"""
+
+import gzip
+import os
+import re
+import shutil
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import List, NamedTuple, Optional
+
+import config
+from periodic_task import PeriodicTask
+
+
+BACKUP_NAME = re.compile(r"^(?P<stem>.+)_(?P<stamp>\d{8}_\d{6})\.db(?P<gz>\.gz)?$")
+
+
+class BackupResult(NamedTuple):
+    """一次備份的結果"""
+    path: Path
+    bytes: int
+    pages: int
+    steps: int
+    restarts: int
+    seconds: float
+
+
+class _TooManyRestarts(Exception):
+    pass
+
+
+def _stepped_backup(source: sqlite3.Connection, target: sqlite3.Connection,
+                    pages_per_step: int, pause: float, max_restarts: int) -> dict:
+    """分批執行 backup，返回 {"pages", "steps", "restarts"}"""
+    stats = {"pages": 0, "steps": 0, "restarts": 0}
+    last_remaining = [None]
+
+    def progress(status, remaining, total):
+        stats["steps"] += 1
+        stats["pages"] = total
+        if last_remaining[0] is not None and remaining > last_remaining[0]:
+            stats["restarts"] += 1  # 來源被修改，從頭重來
+            if stats["restarts"] > max_restarts:
+                raise _TooManyRestarts()
+        last_remaining[0] = remaining
+        if remaining and pause:
+            time.sleep(pause)  # 讓出鎖給寫入者
+
+    try:
+        source.backup(target, pages=pages_per_step, progress=progress)
+    except _TooManyRestarts:
+        source.backup(target, pages=-1)  # 一步複製完（短暫持鎖，但保證結束）
+        stats["steps"] += 1
+    return stats
+
+
+def verify_backup(path: Path) -> bool:
+    """對備份檔（未壓縮）執行 integrity_check"""
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute("PRAGMA integrity_check").fetchone()[0] == "ok"
+    except sqlite3.DatabaseError:
+        return False
+    finally:
+        conn.close()
+
+
+def backup_to(db_path: Path, target_path: Path, pages_per_step: Optional[int] = None,
+              pause: Optional[float] = None, verify: bool = True) -> dict:
+    """
+    以 backup API 把 db_path 線上複製到 target_path（先寫暫存檔，驗證後換名）
+
+    Raises:
+        RuntimeError: 副本未通過 integrity_check
+    """
+    pages_per_step = pages_per_step or config.DB_BACKUP_PAGES_PER_STEP
+    pause = config.DB_BACKUP_STEP_PAUSE if pause is None else pause
+    target_path = Path(target_path)
+    tmp_path = target_path.with_name(target_path.name + ".tmp")
+
+    source = sqlite3.connect(db_path, timeout=30)
+    source.isolation_level = None
+    target = sqlite3.connect(tmp_path)
+    try:
+        snapshot = source.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        if snapshot:
+            # 固定讀快照（WAL 下讀者不擋寫者）
+            source.execute("BEGIN")
+            source.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()
+        stats = _stepped_backup(source, target, pages_per_step, pause, config.DB_BACKUP_MAX_RESTARTS)
+        if snapshot:
+            source.execute("COMMIT")
+    finally:
+        target.close()
+        source.close()
+
+    if verify and not verify_backup(tmp_path):
+        tmp_path.unlink(missing_ok=True)
+        raise RuntimeError(f"備份未通過 integrity_check: {target_path}")
+    os.replace(tmp_path, target_path)
+    return stats
+
+
+def create_backup(db_path: Optional[Path] = None, backup_dir: Optional[Path] = None,
+                  compress: Optional[bool] = None, pages_per_step: Optional[int] = None,
+                  pause: Optional[float] = None) -> BackupResult:
+    """
+    建立一份帶時間戳的備份：<backup_dir>/<資料庫名>_YYYYmmdd_HHMMSS.db[.gz]
+    """
+    db_path = Path(db_path or config.DB_PATH)
+    backup_dir = Path(backup_dir or config.DB_BACKUP_PATH)
+    compress = config.DB_BACKUP_COMPRESS if compress is None else compress
+    backup_dir.mkdir(parents=True, exist_ok=True)
+
+    start = time.perf_counter()
+    stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    db_file = backup_dir / f"{db_path.stem}_{stamp}.db"
+    stats = backup_to(db_path, db_file, pages_per_step, pause)
+
+    final_path = db_file
+    if compress:
+        final_path = db_file.with_name(db_file.name + ".gz")
+        tmp_path = final_path.with_name(final_path.name + ".tmp")
+        with open(db_file, "rb") as src, gzip.open(tmp_path, "wb", compresslevel=6) as dst:
+            shutil.copyfileobj(src, dst, 1024 * 1024)
+        os.replace(tmp_path, final_path)
+        db_file.unlink()
+
+    return BackupResult(final_path, final_path.stat().st_size, stats["pages"], stats["steps"],
+                        stats["restarts"], time.perf_counter() - start)
+
+
+def list_backups(backup_dir: Optional[Path] = None, stem: Optional[str] = None) -> List[Path]:
+    """列出備份檔（由新到舊）"""
+    backup_dir = Path(backup_dir or config.DB_BACKUP_PATH)
+    if not backup_dir.exists():
+        return []
+    found = []
+    for path in backup_dir.iterdir():
+        match = BACKUP_NAME.match(path.name)
+        if match and (stem is None or match["stem"] == stem):
+            found.append((match["stamp"], path))
+    return [path for _, path in sorted(found, reverse=True)]
+
+
+def rotate_backups(backup_dir: Optional[Path] = None, keep_last: Optional[int] = None,
+                   keep_daily: Optional[int] = None, stem: Optional[str] = None) -> List[Path]:
+    """
+    輪替：保留最近 keep_last 份，以及最近 keep_daily 天裡每天最新的一份
+
+    Returns:
+        被刪除的檔案
+    """
+    keep_last = config.DB_BACKUP_KEEP_LAST if keep_last is None else keep_last
+    keep_daily = config.DB_BACKUP_KEEP_DAILY if keep_daily is None else keep_daily
+
+    backups = list_backups(backup_dir, stem)
+    keep = set(backups[:keep_last])
+    days_kept = []
+    for path in backups:
+        day = BACKUP_NAME.match(path.name)["stamp"][:8]
+        if day not in days_kept:
+            if len(days_kept) >= keep_daily:
+                break
+            days_kept.append(day)
+            keep.add(path)
+
+    removed = [path for path in backups if path not in keep]
+    for path in removed:
+        path.unlink(missing_ok=True)
+    return removed
+
+
+def restore_backup(backup_path: Path, db_path: Path):
+    """把備份（.db 或 .db.gz）還原成 db_path（離線操作；同樣經 backup API 寫入，再驗證）"""
+    backup_path = Path(backup_path)
+    source_path = backup_path
+    if backup_path.suffix == ".gz":
+        source_path = Path(db_path).with_name(Path(db_path).name + ".restore")
+        with gzip.open(backup_path, "rb") as src, open(source_path, "wb") as dst:
+            shutil.copyfileobj(src, dst, 1024 * 1024)
+    try:
+        backup_to(source_path, Path(db_path), pause=0)
+    finally:
+        if source_path != backup_path:
+            source_path.unlink(missing_ok=True)
+
+
+class BackupScheduler(PeriodicTask):
+    """背景定期備份並輪替"""
+
+    name = "db-backup"
+
+    def default_interval(self) -> float:
+        return config.DB_BACKUP_INTERVAL
+
+    def default_initial_delay(self) -> float:
+        return config.DB_BACKUP_INTERVAL
+
+    def run_once(self, stop: threading.Event) -> BackupResult:
+        result = create_backup()
+        removed = rotate_backups(stem=Path(config.DB_PATH).stem)
+        if config.DEBUG:
+            print(f"[DB] 備份完成: {result.path.name}（{result.bytes / 1e6:.2f} MB，"
+                  f"{result.steps} 步，重來 {result.restarts} 次，{result.seconds:.2f} 秒），輪替刪除 {len(removed)} 份")
+        return result
+
+
+# 全局實例
+backup_scheduler = BackupScheduler()
+
+
+if __name__ == "__main__":
+    result = create_backup()
+    removed = rotate_backups(stem=Path(config.DB_PATH).stem)
+    print(f"✅ 備份完成: {result.path}")
+    print(f"   {result.bytes / 1e6:.2f} MB，{result.pages} 頁，{result.steps} 步，"
+          f"重來 {result.restarts} 次，耗時 {result.seconds:.2f} 秒")
+    if removed:
+        print(f"   輪替刪除 {len(removed)} 份舊備份")
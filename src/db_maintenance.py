@@ -0,0 +1,391 @@
+# db_maintenance.py
+# 道·衍 - 事件日誌保留、壓縮歸檔與增量 VACUUM
+
+"""
+資料庫維護
+
+event_logs 對每個玩家無限增長：所有事件查詢越來越慢，
+_backup_database（整檔 shutil.copy2）的備份也越來越大。維護工作：
+
+1. 保留：每個玩家最近 config.EVENT_RETENTION_KEEP_RECENT 條事件，以及重要度
+   ≥ config.EVENT_RETENTION_KEEP_IMPORTANCE 的事件（長期記憶檢索仍需要）留在 event_logs。
+2. 摘要：其餘舊事件按日彙總進 event_summaries（事件數、各類型次數、最重要的幾條描述）。
+3. 歸檔：原始行以 zlib 壓縮的 JSON 存入 event_archive，之後從 event_logs 刪除
+   （刪除觸發器同步 event_search；load_archived_events 可還原查看）。
+4. 增量 VACUUM：每步釋放 config.DB_VACUUM_PAGES_PER_STEP 頁，把空間還給檔案系統。
+   舊資料庫（auto_vacuum 未啟用）須先以完整 VACUUM 轉換一次，整個過程持有寫鎖，
+   只在離線命令列或 main.run 進入遊戲迴圈前執行；背景排程遇到未轉換的資料庫時跳過並提示。
+
+每批最多 config.DB_MAINTENANCE_BATCH 行、一個短交易，批與批之間讓出寫鎖，
+遊戲本身的寫入最多等一批的時間。MaintenanceScheduler 在背景線程定期執行，不阻塞遊戲。
+
+使用方式：
+    python src/db_maintenance.py            # 立即整理一次（必要時轉換 auto_vacuum），輸出前後的容量與查詢延遲
+    maintenance_scheduler.start()           # main.run 啟動時開啟（config.DB_MAINTENANCE_ENABLED）
+"""
+
+import json
+import sqlite3
+import statistics
+import threading
+import time
+import zlib
+from collections import Counter, defaultdict
+from typing import Any, Dict, List, NamedTuple, Optional
+
+import config
+from periodic_task import PeriodicTask
+
+
+HIGHLIGHTS_PER_DAY = 3
+_ARCHIVE_COLUMNS = ("id", "timestamp", "location", "event_type", "description", "npc_involved", "importance")
+
+
+class StorageStats(NamedTuple):
+    """資料庫容量與查詢延遲快照"""
+    db_bytes: int
+    free_bytes: int
+    event_rows: int
+    archived_rows: int
+    summary_days: int
+    recent_query_ms: float
+    memory_query_ms: float
+
+
+class MaintenanceReport(NamedTuple):
+    """一次維護的結果"""
+    before: StorageStats
+    after: StorageStats
+    archived_rows: int
+    summarized_days: int
+    players: int
+    vacuumed_pages: int
+    seconds: float
+
+    def lines(self) -> List[str]:
+        b, a = self.before, self.after
+        return [
+            f"歸檔 {self.archived_rows} 條事件（{self.players} 位玩家，{self.summarized_days} 個日摘要），"
+            f"釋放 {self.vacuumed_pages} 頁，耗時 {self.seconds:.2f} 秒",
+            f"資料庫大小: {b.db_bytes / 1e6:.2f} MB → {a.db_bytes / 1e6:.2f} MB"
+            f"（空閒 {b.free_bytes / 1e6:.2f} → {a.free_bytes / 1e6:.2f} MB）",
+            f"event_logs: {b.event_rows} → {a.event_rows} 行；歸檔 {a.archived_rows} 行；日摘要 {a.summary_days} 天",
+            f"最近事件查詢: {b.recent_query_ms:.3f} → {a.recent_query_ms:.3f} ms；"
+            f"記憶候選查詢: {b.memory_query_ms:.3f} → {a.memory_query_ms:.3f} ms",
+        ]
+
+
+def _connect(db) -> sqlite3.Connection:
+    conn = sqlite3.connect(db.db_path, timeout=30)
+    conn.isolation_level = None  # 交易由這裡顯式控制
+    return conn
+
+
+def _timed_ms(fn, runs: int) -> float:
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def measure(db, runs: int = 5) -> StorageStats:
+    """量測容量與最活躍玩家的事件查詢延遲（get_recent_events / 記憶候選冷載入）"""
+    conn = _connect(db)
+    try:
+        page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+        page_count = conn.execute("PRAGMA page_count").fetchone()[0]
+        free_pages = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        event_rows = conn.execute("SELECT COUNT(*) FROM event_logs").fetchone()[0]
+        archived_rows = conn.execute("SELECT COALESCE(SUM(row_count), 0) FROM event_archive").fetchone()[0]
+        summary_days = conn.execute("SELECT COUNT(*) FROM event_summaries").fetchone()[0]
+        row = conn.execute("""
+            SELECT player_id FROM event_logs GROUP BY player_id ORDER BY COUNT(*) DESC LIMIT 1
+        """).fetchone()
+    finally:
+        conn.close()
+
+    recent_ms = memory_ms = 0.0
+    if row is not None:
+        player_id = row[0]
+        recent_ms = _timed_ms(lambda: db.get_recent_events(player_id, limit=5), runs)
+        memory_ms = _timed_ms(
+            lambda: db.fetch_memories(player_id, "important", None, config.MEMORY_IMPORTANT_SIZE), runs
+        )
+    return StorageStats(page_size * page_count, page_size * free_pages, event_rows,
+                        archived_rows, summary_days, recent_ms, memory_ms)
+
+
+def _merge_summary(conn: sqlite3.Connection, player_id: int, day: str, rows: List[tuple]):
+    """把一批同一天的事件併入 event_summaries"""
+    existing = conn.execute("""
+        SELECT event_count, type_counts, highlights, max_importance, first_id, last_id
+        FROM event_summaries WHERE player_id = ? AND day = ?
+    """, (player_id, day)).fetchone()
+
+    type_counts = Counter(row[3] for row in rows)
+    highlights = [(row[6], row[0], row[4] or "") for row in rows]
+    count = len(rows)
+    max_importance = max(row[6] for row in rows)
+    first_id, last_id = rows[0][0], rows[-1][0]
+
+    if existing:
+        count += existing[0]
+        type_counts.update(json.loads(existing[1]))
+        highlights += [tuple(item) for item in json.loads(existing[2])]
+        max_importance = max(max_importance, existing[3])
+        first_id, last_id = min(first_id, existing[4]), max(last_id, existing[5])
+
+    highlights = sorted(highlights, reverse=True)[:HIGHLIGHTS_PER_DAY]
+    conn.execute("""
+        INSERT OR REPLACE INTO event_summaries
+            (player_id, day, event_count, type_counts, highlights, max_importance, first_id, last_id)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    """, (player_id, day, count, json.dumps(dict(type_counts), ensure_ascii=False),
+          json.dumps(highlights, ensure_ascii=False), max_importance, first_id, last_id))
+
+
+def compact_player_events(db, player_id: int, keep_recent: Optional[int] = None,
+                          keep_importance: Optional[float] = None, batch_size: Optional[int] = None,
+                          stop: Optional[threading.Event] = None) -> Dict[str, int]:
+    """
+    把單一玩家超出保留範圍的事件彙總並歸檔
+
+    Returns:
+        {"archived": 歸檔行數, "days": 涉及的日數}
+    """
+    keep_recent = config.EVENT_RETENTION_KEEP_RECENT if keep_recent is None else keep_recent
+    keep_importance = config.EVENT_RETENTION_KEEP_IMPORTANCE if keep_importance is None else keep_importance
+    batch_size = batch_size or config.DB_MAINTENANCE_BATCH
+
+    conn = _connect(db)
+    archived, days = 0, set()
+    try:
+        row = conn.execute("""
+            SELECT id FROM event_logs WHERE player_id = ? ORDER BY id DESC LIMIT 1 OFFSET ?
+        """, (player_id, keep_recent)).fetchone()
+        if row is None:
+            return {"archived": 0, "days": 0}
+        cutoff_id = row[0]  # 此 id 及更舊的事件才考慮歸檔
+
+        while stop is None or not stop.is_set():
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = conn.execute(f"""
+                    SELECT {', '.join(_ARCHIVE_COLUMNS)} FROM event_logs
+                    WHERE player_id = ? AND id <= ? AND importance < ?
+                    ORDER BY id
+                    LIMIT ?
+                """, (player_id, cutoff_id, keep_importance, batch_size)).fetchall()
+                if not rows:
+                    conn.execute("COMMIT")
+                    break
+
+                by_day: Dict[str, List[tuple]] = defaultdict(list)
+                for event in rows:
+                    by_day[str(event[1] or "")[:10] or "unknown"].append(event)
+                for day, day_rows in by_day.items():
+                    _merge_summary(conn, player_id, day, day_rows)
+                    payload = zlib.compress(json.dumps(
+                        [dict(zip(_ARCHIVE_COLUMNS, event)) for event in day_rows], ensure_ascii=False
+                    ).encode("utf-8"), 9)
+                    conn.execute("""
+                        INSERT INTO event_archive (player_id, day, first_id, last_id, row_count, payload)
+                        VALUES (?, ?, ?, ?, ?, ?)
+                    """, (player_id, day, day_rows[0][0], day_rows[-1][0], len(day_rows), payload))
+                    days.add(day)
+                conn.executemany("DELETE FROM event_logs WHERE id = ?", [(event[0],) for event in rows])
+                conn.execute("COMMIT")
+            except sqlite3.Error:
+                conn.execute("ROLLBACK")
+                raise
+            archived += len(rows)
+            time.sleep(config.DB_MAINTENANCE_PAUSE)  # 讓出寫鎖給遊戲
+    finally:
+        conn.close()
+
+    if archived:
+        db.memory.forget(player_id)  # 候選結構可能引用已歸檔的事件
+    return {"archived": archived, "days": len(days)}
+
+
+_conversion_hint_shown = False
+
+
+def needs_vacuum_conversion(db) -> bool:
+    """資料庫是否尚未啟用增量 VACUUM（auto_vacuum != INCREMENTAL）"""
+    conn = _connect(db)
+    try:
+        return conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2
+    finally:
+        conn.close()
+
+
+def convert_to_incremental_vacuum(db) -> int:
+    """
+    把舊資料庫轉換為增量 VACUUM（完整 VACUUM，期間阻塞所有寫入）
+
+    只在離線命令列或進入遊戲迴圈前呼叫，不要從背景排程呼叫。
+
+    Returns:
+        釋放的頁數（已轉換時為 0）
+    """
+    conn = _connect(db)
+    try:
+        if conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2:
+            return 0
+        before = conn.execute("PRAGMA page_count").fetchone()[0]
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        conn.execute("VACUUM")
+        return max(0, before - conn.execute("PRAGMA page_count").fetchone()[0])
+    finally:
+        conn.close()
+
+
+def incremental_vacuum(db, pages_per_step: Optional[int] = None,
+                       stop: Optional[threading.Event] = None) -> int:
+    """
+    分步釋放空閒頁；舊資料庫（auto_vacuum 未啟用）不做完整 VACUUM，只提示一次後跳過
+
+    Returns:
+        釋放的頁數
+    """
+    global _conversion_hint_shown
+    pages_per_step = pages_per_step or config.DB_VACUUM_PAGES_PER_STEP
+    conn = _connect(db)
+    released = 0
+    try:
+        if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+            if not _conversion_hint_shown:
+                _conversion_hint_shown = True
+                print("[WARNING] 資料庫未啟用增量 VACUUM，維護時跳過釋放空間；"
+                      "請離線執行 python src/db_maintenance.py 轉換一次")
+            return 0
+
+        while stop is None or not stop.is_set():
+            free_pages = conn.execute("PRAGMA freelist_count").fetchone()[0]
+            if free_pages == 0:
+                break
+            # execute() 只 step 一次（只釋放一頁）；executescript 會把 pragma 跑完
+            conn.executescript(f"PRAGMA incremental_vacuum({pages_per_step});")
+            released += free_pages - conn.execute("PRAGMA freelist_count").fetchone()[0]
+            time.sleep(config.DB_MAINTENANCE_PAUSE)
+    finally:
+        conn.close()
+    return released
+
+
+def run_maintenance(db=None, stop: Optional[threading.Event] = None,
+                    measure_runs: int = 5, convert: bool = False) -> MaintenanceReport:
+    """
+    對所有玩家執行一次保留/歸檔，接著增量 VACUUM；返回前後對比報告
+
+    Args:
+        convert: 舊資料庫是否以完整 VACUUM 轉換（只限離線執行；背景排程不轉換）
+    """
+    if db is None:
+        from game_state import game_db
+        db = game_db.instance()
+
+    start = time.perf_counter()
+    before = measure(db, measure_runs)
+
+    conn = _connect(db)
+    try:
+        player_ids = [row[0] for row in conn.execute("SELECT DISTINCT player_id FROM event_logs")]
+    finally:
+        conn.close()
+
+    archived, days, players = 0, 0, 0
+    for player_id in player_ids:
+        if stop is not None and stop.is_set():
+            break
+        result = compact_player_events(db, player_id, stop=stop)
+        if result["archived"]:
+            archived += result["archived"]
+            days += result["days"]
+            players += 1
+
+    if archived and db.search_enabled:
+        conn = _connect(db)
+        try:
+            conn.execute("INSERT INTO event_search(event_search) VALUES ('optimize')")
+        finally:
+            conn.close()
+
+    if convert and needs_vacuum_conversion(db):
+        vacuumed = convert_to_incremental_vacuum(db)
+    else:
+        vacuumed = incremental_vacuum(db, stop=stop)
+    after = measure(db, measure_runs)
+    return MaintenanceReport(before, after, archived, days, players, vacuumed,
+                             time.perf_counter() - start)
+
+
+def load_archived_events(db, player_id: int, day: Optional[str] = None) -> List[Dict[str, Any]]:
+    """還原已歸檔的原始事件（依 id 排序）"""
+    conn = _connect(db)
+    try:
+        if day is None:
+            rows = conn.execute("SELECT payload FROM event_archive WHERE player_id = ? ORDER BY first_id",
+                                (player_id,)).fetchall()
+        else:
+            rows = conn.execute("""
+                SELECT payload FROM event_archive WHERE player_id = ? AND day = ? ORDER BY first_id
+            """, (player_id, day)).fetchall()
+    finally:
+        conn.close()
+
+    events = []
+    for (payload,) in rows:
+        events.extend(json.loads(zlib.decompress(payload).decode("utf-8")))
+    return sorted(events, key=lambda event: event["id"])
+
+
+def get_event_summaries(db, player_id: int, limit: int = 30) -> List[Dict[str, Any]]:
+    """最近幾天的事件摘要（由新到舊）"""
+    conn = _connect(db)
+    try:
+        rows = conn.execute("""
+            SELECT day, event_count, type_counts, highlights, max_importance
+            FROM event_summaries WHERE player_id = ? ORDER BY day DESC LIMIT ?
+        """, (player_id, limit)).fetchall()
+    finally:
+        conn.close()
+    return [{
+        "day": day,
+        "event_count": count,
+        "type_counts": json.loads(type_counts),
+        "highlights": [description for _, _, description in json.loads(highlights)],
+        "max_importance": max_importance,
+    } for day, count, type_counts, highlights, max_importance in rows]
+
+
+class MaintenanceScheduler(PeriodicTask):
+    """背景定期執行 run_maintenance（stop() 會在當前批次結束後停止）"""
+
+    name = "db-maintenance"
+
+    def default_interval(self) -> float:
+        return config.DB_MAINTENANCE_INTERVAL
+
+    def default_initial_delay(self) -> float:
+        return config.DB_MAINTENANCE_INITIAL_DELAY
+
+    def run_once(self, stop: threading.Event) -> Optional[MaintenanceReport]:
+        report = run_maintenance(stop=stop)
+        if config.DEBUG and report is not None and report.archived_rows:
+            for line in report.lines():
+                print(f"[DB] {line}")
+        return report
+
+
+# 全局實例
+maintenance_scheduler = MaintenanceScheduler()
+
+
+if __name__ == "__main__":
+    report = run_maintenance(convert=True)
+    for line in report.lines():
+        print(line)
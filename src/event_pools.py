@@ -13,7 +13,7 @@ AI 只能從池中選擇，不能憑空創造
 
 from typing import Dict, List, Any
 
-from world_loader import WorldSettings
+from world_registry import world_registry
 
 
 # 每個地點的事件池定義
@@ -111,21 +111,9 @@ EVENT_POOLS = {
     }
 }
 
-# 若有 JSON 定義則覆蓋內建事件池
-try:  # pragma: no cover
-    _world_settings = WorldSettings()
-    if _world_settings.events_by_location:
-        EVENT_POOLS = {
-            loc_id: {
-                "npcs": data.get("npcs", []),
-                "random_encounters": data.get("random_encounters", []),
-                "treasures": data.get("treasures", []),
-                "events": data.get("events", []),
-            }
-            for loc_id, data in _world_settings.events_by_location.items()
-        }
-except Exception as exc:
-    print(f"[event_pools] ⚠️  無法從 JSON 載入事件池，使用內建版本: {exc}")
+# 以 data/events.json 為準（由 world_registry 載入，熱重載後自動指向新資料）；
+# JSON 不存在或載入失敗時使用上面的內建事件池
+EVENT_POOLS = world_registry.view("event_pools", fallback=EVENT_POOLS)
 
 
 def get_event_pool(location_id: str) -> Dict[str, Any]:
@@ -0,0 +1,322 @@
+# flavour_corpus.py
+# 道·衍 - 地點/NPC 場景素材庫（離線批次生成）
+
+"""
+場景素材庫
+
+Drama Agent 的大部分工作是在不同時段、季節下重新描寫同一批地點與 NPC。
+這裡把每個 (地點, 時段, 季節, NPC) 組合的環境描寫離線預生成，
+存成 data/flavour_corpus.db，遊戲時 agent_drama 直接取用，不再請模型重寫環境。
+
+檔案格式（SQLite 單表，以鍵為主鍵的 WITHOUT ROWID 表）：
+    flavour(key TEXT PRIMARY KEY, text TEXT)    -- key 如 "qingyun_plaza|上午|春|-"
+- 查詢：每次一個主鍵查找，不用把整個素材庫讀進記憶體，也不必在檔案更新後整份重新解析
+- 續跑：每完成一條就寫入一行（自動提交），中斷後重跑只生成表裡還沒有的鍵
+
+素材需要調用模型生成，不隨原始碼提供；沒有素材庫時 agent_drama 照舊請模型描寫環境。
+建置（需要 OPENAI_API_KEY）：
+    python src/flavour_corpus.py                 # 生成所有缺少的片段
+    python src/flavour_corpus.py --concurrency 8 # 調整並發上限
+    python src/flavour_corpus.py --limit 20      # 只生成前 20 條（試跑）
+"""
+
+import os
+import sqlite3
+import threading
+import concurrent.futures
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional
+
+import config
+
+
+PERIODS = ["上午", "下午", "晚上", "深夜"]
+SEASONS = ["春", "夏", "秋", "冬"]
+
+# 時段 → locations.json 中 atmosphere_hints 的鍵
+PERIOD_HINT_KEYS = {
+    "上午": "morning",
+    "下午": "afternoon",
+    "晚上": "evening",
+    "深夜": "night",
+}
+
+NO_NPC = "-"
+
+
+class FlavourJob(NamedTuple):
+    """一個待生成的素材組合"""
+    location_id: str
+    period: str
+    season: str
+    npc_id: Optional[str] = None
+
+    @property
+    def key(self) -> str:
+        return corpus_key(self.location_id, self.period, self.season, self.npc_id)
+
+
+def corpus_key(location_id: str, period: str, season: str, npc_id: Optional[str] = None) -> str:
+    """素材索引鍵"""
+    return f"{location_id}|{period}|{season}|{npc_id or NO_NPC}"
+
+
+def npcs_for_location(location_id: str) -> List[str]:
+    """地點可能出現的 NPC（事件池 + 常駐 NPC，去重且保持順序）"""
+    from event_pools import get_available_npcs
+    from npc_manager import npc_manager
+
+    npc_ids = list(get_available_npcs(location_id))
+    npc_ids += [npc["id"] for npc in npc_manager.get_npcs_by_location(location_id)]
+    return [npc_id for npc_id in dict.fromkeys(npc_ids) if npc_manager.get_npc(npc_id)]
+
+
+def iter_jobs(location_ids: Optional[Iterable[str]] = None) -> List[FlavourJob]:
+    """
+    列出所有 (地點, 時段, 季節, NPC) 組合
+
+    每個地點固定包含「無 NPC」的純環境片段，外加每個可能在場 NPC 各一組。
+    """
+    from world_data import get_all_locations
+
+    jobs = []
+    for location_id in location_ids or get_all_locations():
+        npc_options = [None] + npcs_for_location(location_id)
+        for period in PERIODS:
+            for season in SEASONS:
+                for npc_id in npc_options:
+                    jobs.append(FlavourJob(location_id, period, season, npc_id))
+    return jobs
+
+
+def build_flavour_prompt(job: FlavourJob) -> str:
+    """構建單條素材的生成提示"""
+    from world_data import get_location_data
+    from npc_manager import npc_manager
+
+    location = get_location_data(job.location_id) or {}
+    hints = location.get("atmosphere_hints", {})
+    hint = hints.get(PERIOD_HINT_KEYS.get(job.period, ""), "")
+
+    prompt = f"""地點: {location.get('name', job.location_id)}
+地點描述: {location.get('description', '')}
+時段: {job.period}
+季節: {job.season}季
+"""
+    if hint:
+        prompt += f"此時段的氛圍提示: {hint}\n"
+
+    if job.npc_id:
+        npc = npc_manager.get_npc(job.npc_id) or {}
+        prompt += f"""
+在場 NPC: {npc.get('name')}（{npc.get('title', '')}）
+性格: {npc.get('personality', '')}
+"""
+    return prompt
+
+
+def generate_with_llm(job: FlavourJob) -> str:
+    """預設的生成函數：調用 Drama 模型"""
+    from agent import call_gpt
+    from prompts import SYSTEM_FLAVOUR
+
+    return call_gpt(
+        system_prompt=SYSTEM_FLAVOUR,
+        user_message=build_flavour_prompt(job),
+        model=config.MODEL_DRAMA,
+        agent_name="flavour",
+        temperature=config.API_TEMPERATURE
+    ).strip()
+
+
+def connect_corpus(path: Path) -> sqlite3.Connection:
+    """開啟（必要時建立）素材庫；連線為自動提交，供批次寫入"""
+    conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS flavour (
+            key TEXT PRIMARY KEY,
+            text TEXT NOT NULL
+        ) WITHOUT ROWID
+    """)
+    return conn
+
+
+class FlavourCorpus:
+    """
+    素材庫讀取器
+
+    以唯讀連線按主鍵查詢；批次任務寫入的新片段下一次查詢就看得到，不需要重新載入。
+    檔案尚不存在時查詢返回 None，之後檔案出現再開啟。
+    """
+
+    def __init__(self, path: Optional[Path] = None):
+        self.path = Path(path) if path else Path(config.FLAVOUR_CORPUS_PATH)
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _query(self, sql: str, params: tuple = ()) -> Optional[tuple]:
+        with self._lock:
+            if self._conn is None:
+                if not os.path.exists(self.path):
+                    return None
+                self._conn = sqlite3.connect(f"{self.path.resolve().as_uri()}?mode=ro", uri=True,
+                                             check_same_thread=False)
+            try:
+                return self._conn.execute(sql, params).fetchone()
+            except sqlite3.Error as e:
+                print(f"[WARNING] 場景素材庫讀取失敗: {type(e).__name__}: {e}")
+                return None
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def __len__(self) -> int:
+        row = self._query("SELECT COUNT(*) FROM flavour")
+        return row[0] if row else 0
+
+    def get(self, location_id: str, period: str, season: str,
+            npc_id: Optional[str] = None) -> Optional[str]:
+        """精確查詢某個組合"""
+        row = self._query("SELECT text FROM flavour WHERE key = ?",
+                          (corpus_key(location_id, period, season, npc_id),))
+        return row[0] if row else None
+
+    def lookup(self, location_id: str, period: str, season: str,
+               npc_id: Optional[str] = None) -> Optional[str]:
+        """查詢素材；NPC 專屬片段不存在時退回該地點的純環境片段"""
+        snippet = None
+        if npc_id:
+            snippet = self.get(location_id, period, season, npc_id)
+        return snippet or self.get(location_id, period, season)
+
+
+def read_corpus_file(path: Path) -> Dict[str, str]:
+    """讀出整個素材庫 {key: 文字}（檔案不存在時為空；管理與測試用，遊戲中以 FlavourCorpus 按鍵查詢）"""
+    if not os.path.exists(path):
+        return {}
+    conn = sqlite3.connect(path)
+    try:
+        return dict(conn.execute("SELECT key, text FROM flavour"))
+    except sqlite3.Error:
+        return {}
+    finally:
+        conn.close()
+
+
+class FlavourBatchRunner:
+    """
+    可續跑的批次生成器
+
+    - 啟動時讀取已完成的 key，只生成缺少的組合（中斷後重跑即可續跑）
+    - 最多 max_concurrency 個請求同時在途
+    - 每完成一條立即寫入素材庫（自動提交）；生成失敗（空字串/異常）不寫入，下次重跑
+    """
+
+    def __init__(self, generate_fn: Callable[[FlavourJob], str] = generate_with_llm,
+                 path: Optional[Path] = None, max_concurrency: Optional[int] = None):
+        self.generate_fn = generate_fn
+        self.path = Path(path) if path else Path(config.FLAVOUR_CORPUS_PATH)
+        self.max_concurrency = max_concurrency or config.FLAVOUR_BATCH_CONCURRENCY
+        self._write_lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def pending_jobs(self, jobs: Iterable[FlavourJob]) -> List[FlavourJob]:
+        """過濾掉已完成的組合"""
+        done = read_corpus_file(self.path)
+        return [job for job in jobs if job.key not in done]
+
+    def _append(self, job: FlavourJob, text: str):
+        with self._write_lock:
+            self._conn.execute("INSERT OR REPLACE INTO flavour (key, text) VALUES (?, ?)", (job.key, text))
+
+    def _run_one(self, job: FlavourJob) -> bool:
+        try:
+            text = self.generate_fn(job)
+        except Exception as e:
+            print(f"[flavour] ⚠️  生成失敗 {job.key}: {type(e).__name__}: {e}")
+            return False
+
+        if not text:
+            print(f"[flavour] ⚠️  生成結果為空 {job.key}")
+            return False
+
+        self._append(job, text)
+        return True
+
+    def run(self, jobs: Optional[Iterable[FlavourJob]] = None,
+            limit: Optional[int] = None) -> Dict[str, int]:
+        """
+        執行批次生成
+
+        Args:
+            jobs: 要生成的組合，預設為 iter_jobs() 的全部組合
+            limit: 本次最多生成幾條
+
+        Returns:
+            {"total", "skipped", "generated", "failed"}
+        """
+        all_jobs = list(jobs if jobs is not None else iter_jobs())
+        todo = self.pending_jobs(all_jobs)
+        skipped = len(all_jobs) - len(todo)
+        if limit is not None:
+            todo = todo[:limit]
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+        generated = failed = 0
+        self._conn = connect_corpus(self.path)
+        try:
+            with concurrent.futures.ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+                for ok in executor.map(self._run_one, todo):
+                    if ok:
+                        generated += 1
+                    else:
+                        failed += 1
+        finally:
+            self._conn.close()
+            self._conn = None
+
+        report = {
+            "total": len(all_jobs),
+            "skipped": skipped,
+            "generated": generated,
+            "failed": failed,
+        }
+
+        if config.DEBUG:
+            print(f"[flavour] 批次完成: {report}")
+
+        return report
+
+
+# 全局實例（延遲載入，檔案不存在時為空）
+_flavour_corpus: Optional[FlavourCorpus] = None
+
+
+def get_flavour_corpus() -> FlavourCorpus:
+    """獲取全局素材庫"""
+    global _flavour_corpus
+    if _flavour_corpus is None:
+        _flavour_corpus = FlavourCorpus()
+    return _flavour_corpus
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="離線預生成地點/NPC 場景素材")
+    parser.add_argument("--concurrency", type=int, default=config.FLAVOUR_BATCH_CONCURRENCY,
+                        help="最大並發請求數")
+    parser.add_argument("--limit", type=int, default=None, help="本次最多生成幾條")
+    parser.add_argument("--output", type=Path, default=config.FLAVOUR_CORPUS_PATH,
+                        help="輸出檔案路徑")
+    args = parser.parse_args()
+
+    config.validate_api_key()
+    runner = FlavourBatchRunner(path=args.output, max_concurrency=args.concurrency)
+    result = runner.run(limit=args.limit)
+    print(f"共 {result['total']} 個組合：已存在 {result['skipped']}，"
+          f"本次生成 {result['generated']}，失敗 {result['failed']}")
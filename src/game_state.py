@@ -1,23 +1,88 @@
 # game_state.py
 # 道·衍 - 玩家狀態管理 & 存檔系統
 
+import bisect
 import sqlite3
 import json
+import re
 import copy
-import shutil
 import os
+import threading
+import time
+import weakref
 from datetime import datetime
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
 import config
+from lazy_init import LazyProxy
+from memory import MemoryIndex, MemoryRecord, score_importance
+import player_store
+import state_journal
+from player_state import PlayerState
 
 # 資料庫 schema 版本（每次修改表結構時遞增）
 # v3: 新增 cultivation_progress, breakthrough_attempts 欄位
-DB_SCHEMA_VERSION = 3
+# v4: event_logs 新增 importance 欄位與檢索索引（從 v3 增量遷移，保留存檔）
+# v5: 新增 event_search 全文檢索表（FTS5 trigram，由觸發器同步 event_logs.description）
+# v6: 新增 event_summaries / event_archive（舊事件的每日摘要與壓縮歸檔，見 db_maintenance.py）
+# v7: 玩家狀態拆成獨立欄位 + player_inventory / player_skills（見 player_store.py；舊 state_json 存檔就地轉換）
+# v8: players.last_event_id（存檔涵蓋到的最後一個事件，之後的事件即未反映在存檔中，見 save_scheduler.py）
+# v9: state_deltas（每個指令的狀態變動日誌）+ players.last_delta_id（快照包含到的 delta，見 state_journal.py）
+# v10: players(last_save_at) 索引（存檔瀏覽的 keyset 分頁，見 save_browser.py）；playtime_seconds 開始累計
+# v11: npc_relations.affinity_score 改為絕對值（舊存檔是相對 0 的累計變動，遷移時加上 NPC 的初始好感度，見 npc_relations.py）
+DB_SCHEMA_VERSION = 11
+
+# 長期記憶檢索用的索引（rowid 隱含在索引尾端，WHERE player_id = ? ORDER BY id DESC 可直接走索引）
+EVENT_LOG_INDEXES = {
+    "idx_event_logs_player": "event_logs(player_id)",
+    "idx_event_logs_player_importance": "event_logs(player_id, importance)",
+    "idx_event_logs_player_location": "event_logs(player_id, location)",
+    "idx_event_logs_player_npc": "event_logs(player_id, npc_involved)",
+}
+
+# 事件全文檢索：外部內容 FTS5 表 + 觸發器（任何連線寫入 event_logs 都會同步）
+# trigram 分詞不依賴空白斷詞，適合中文；但只能檢索 ≥ 3 字的詞，較短的詞改用 LIKE
+EVENT_SEARCH_DDL = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS event_search USING fts5(
+        description, content='event_logs', content_rowid='id', tokenize='trigram'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS event_logs_search_insert AFTER INSERT ON event_logs BEGIN
+        INSERT INTO event_search(rowid, description) VALUES (new.id, new.description);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS event_logs_search_delete AFTER DELETE ON event_logs BEGIN
+        INSERT INTO event_search(event_search, rowid, description) VALUES ('delete', old.id, old.description);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS event_logs_search_update AFTER UPDATE OF description ON event_logs BEGIN
+        INSERT INTO event_search(event_search, rowid, description) VALUES ('delete', old.id, old.description);
+        INSERT INTO event_search(rowid, description) VALUES (new.id, new.description);
+    END""",
+]
+TRIGRAM_MIN_LENGTH = 3
+_SEARCH_TERM_SPLIT = re.compile(r"[\s，。、！？,.!?；;：:「」『』（）()\"']+")
+
+# fetch_memories 的查詢條件與排序
+_MEMORY_QUERIES = {
+    "recent": ("", "id DESC"),
+    "important": ("", "importance DESC, id DESC"),
+    "location": ("AND location = ?", "id DESC"),
+    "npc": ("AND npc_involved = ?", "id DESC"),
+}
 
 
 class GameStateManager:
     def __init__(self):
         self.db_path = config.DB_PATH
+        self.memory = MemoryIndex()
+        self.search_enabled = False  # init_database 建立 event_search 成功後為 True
+        self._snapshots: Dict[int, player_store.PlayerSnapshot] = {}  # 各玩家上次寫入的狀態（增量保存用）
+        self._save_lock = threading.Lock()
+        # 各玩家目前與資料庫內容一致的 PlayerState（沒有變動時 save_player 直接略過）
+        self._clean_states: Dict[int, weakref.ref] = {}
+        self.save_stats = {"requested": 0, "written": 0, "skipped": 0}
+        self._last_event_ids: Dict[int, int] = {}   # 各玩家最新的 event_logs.id
+        self._saved_event_ids: Dict[int, int] = {}  # 各玩家存檔中的 last_event_id
+        self._last_delta_ids: Dict[int, int] = {}   # 各玩家最新的 state_deltas.id
+        self._saved_delta_ids: Dict[int, int] = {}  # 各玩家快照中的 last_delta_id
+        self._playtime_marks: Dict[int, float] = {}  # 各玩家遊戲時間已累計到的時刻（time.monotonic）
         self.init_database()
 
     def _get_schema_version(self, cursor: sqlite3.Cursor) -> int:
@@ -44,23 +109,98 @@ class GameStateManager:
         cursor.execute("INSERT INTO schema_version (version) VALUES (?)", (version,))
 
     def _backup_database(self) -> str:
-        """備份資料庫，返回備份檔案路徑"""
+        """備份資料庫（schema 升級前），返回備份檔案路徑"""
         if not os.path.exists(self.db_path):
             return ""
 
+        from db_backup import backup_to
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         backup_path = f"{self.db_path}.backup_{timestamp}"
-        shutil.copy2(self.db_path, backup_path)
+        backup_to(self.db_path, backup_path, pause=0)
 
         if config.DEBUG:
             print(f"[DB] 資料庫已備份至: {backup_path}")
 
         return backup_path
 
+    def _migrate_v3_to_v4(self, cursor: sqlite3.Cursor):
+        """v3 → v4：event_logs 加 importance 欄位，並依事件類型 / NPC 回填"""
+        cursor.execute("ALTER TABLE event_logs ADD COLUMN importance REAL NOT NULL DEFAULT 1.0")
+        cursor.execute("SELECT DISTINCT event_type, npc_involved IS NOT NULL FROM event_logs")
+        for event_type, has_npc in cursor.fetchall():
+            cursor.execute(f"""
+                UPDATE event_logs SET importance = ?
+                WHERE event_type = ? AND npc_involved IS {'NOT ' if has_npc else ''}NULL
+            """, (score_importance(event_type, "npc" if has_npc else None), event_type))
+
+    def _migrate_v6_to_v7(self, cursor: sqlite3.Cursor):
+        """v6 → v7：players 加上狀態欄位（內容由 _normalize_legacy_players 從 state_json 轉入）"""
+        existing = {row[1] for row in cursor.execute("PRAGMA table_info(players)")}
+        for column, definition in player_store.ADDED_COLUMNS.items():
+            if column not in existing:
+                cursor.execute(f"ALTER TABLE players ADD COLUMN {column} {definition}")
+
+    def _migrate_v7_to_v8(self, cursor: sqlite3.Cursor):
+        """v7 → v8：players 加 last_event_id，既有存檔視為已涵蓋所有事件"""
+        existing = {row[1] for row in cursor.execute("PRAGMA table_info(players)")}
+        if "last_event_id" not in existing:
+            cursor.execute("ALTER TABLE players ADD COLUMN last_event_id INTEGER NOT NULL DEFAULT 0")
+        cursor.execute("""
+            UPDATE players SET last_event_id =
+                COALESCE((SELECT MAX(id) FROM event_logs WHERE player_id = players.id), 0)
+        """)
+
+    def _migrate_v8_to_v9(self, cursor: sqlite3.Cursor):
+        """v8 → v9：players 加 last_delta_id（state_deltas 由 init_database 建立，舊存檔沒有 delta）"""
+        existing = {row[1] for row in cursor.execute("PRAGMA table_info(players)")}
+        if "last_delta_id" not in existing:
+            cursor.execute("ALTER TABLE players ADD COLUMN last_delta_id INTEGER NOT NULL DEFAULT 0")
+
+    def _migrate_v10_to_v11(self, cursor: sqlite3.Cursor):
+        """v10 → v11：舊的 affinity_score 是相對 0 的累計變動，加上各 NPC 的初始好感度成為絕對值"""
+        from npc_relations import default_affinity
+
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'npc_relations'")
+        if cursor.fetchone() is None:
+            return
+        cursor.execute("SELECT DISTINCT npc_id FROM npc_relations")
+        offsets = [(default_affinity(npc_id), npc_id) for (npc_id,) in cursor.fetchall()]
+        cursor.executemany("UPDATE npc_relations SET affinity_score = affinity_score + ? WHERE npc_id = ?",
+                           [(offset, npc_id) for offset, npc_id in offsets if offset])
+
+    def _normalize_legacy_players(self, cursor: sqlite3.Cursor):
+        """把舊格式存檔（整份狀態在 state_json）轉成欄位 + 物品表"""
+        cursor.execute("SELECT id, state_json FROM players WHERE state_layout = ?", (player_store.LAYOUT_JSON,))
+        for player_id, state_json in cursor.fetchall():
+            try:
+                state = json.loads(state_json)
+            except ValueError as e:
+                print(f"[WARNING] 玩家 ID {player_id} 的存檔無法解析（{e}），保留舊格式")
+                continue
+            player_store.write_plan(cursor, player_id, player_store.plan_save(None, state))
+
+    def _ensure_event_search(self, cursor: sqlite3.Cursor):
+        """建立全文檢索表與觸發器；新建時從 event_logs 重建索引（SQLite 未編譯 FTS5 時退回 LIKE）"""
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'event_search'")
+        existed = cursor.fetchone() is not None
+        try:
+            for statement in EVENT_SEARCH_DDL:
+                cursor.execute(statement)
+            if not existed:
+                cursor.execute("INSERT INTO event_search(event_search) VALUES ('rebuild')")
+            self.search_enabled = True
+        except sqlite3.OperationalError as e:
+            self.search_enabled = False
+            print(f"[WARNING] 無法建立事件全文檢索（{e}），search_events 將使用 LIKE 掃描")
+
     def init_database(self):
         """初始化 SQLite 數據庫（帶版本控制和備份）"""
         conn = sqlite3.connect(self.db_path)
         cursor = conn.cursor()
+        # 新資料庫啟用增量 VACUUM（已有表的舊資料庫由 db_maintenance 首次整理時轉換）
+        cursor.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        # WAL：讀者不擋寫者（線上備份、背景維護期間遊戲照常寫入，見 db_backup.py）
+        cursor.execute("PRAGMA journal_mode = WAL")
 
         current_version = self._get_schema_version(cursor)
 
@@ -75,10 +215,27 @@ class GameStateManager:
                 if config.DEBUG:
                     print(f"[DB] 從版本 {current_version} 升級到 {DB_SCHEMA_VERSION}")
 
-            # 重建所有表（開發階段採用重建策略）
-            cursor.execute("DROP TABLE IF EXISTS players")
-            cursor.execute("DROP TABLE IF EXISTS event_logs")
-            cursor.execute("DROP TABLE IF EXISTS npc_relations")
+            if current_version >= 3:
+                # 增量遷移（保留玩家存檔與事件；v4 → v5 由 _ensure_event_search 建表重建，v6 只新增表）
+                if current_version < 4:
+                    self._migrate_v3_to_v4(cursor)
+                if current_version < 7:
+                    self._migrate_v6_to_v7(cursor)
+                if current_version < 8:
+                    self._migrate_v7_to_v8(cursor)
+                if current_version < 9:
+                    self._migrate_v8_to_v9(cursor)
+                if current_version < 11:
+                    self._migrate_v10_to_v11(cursor)
+            else:
+                # 重建所有表（開發階段採用重建策略）
+                cursor.execute("DROP TABLE IF EXISTS players")
+                cursor.execute("DROP TABLE IF EXISTS player_inventory")
+                cursor.execute("DROP TABLE IF EXISTS player_skills")
+                cursor.execute("DROP TABLE IF EXISTS state_deltas")
+                cursor.execute("DROP TABLE IF EXISTS event_logs")
+                cursor.execute("DROP TABLE IF EXISTS event_search")
+                cursor.execute("DROP TABLE IF EXISTS npc_relations")
 
         # 玩家表（新版）
         cursor.execute("""
@@ -91,10 +248,51 @@ class GameStateManager:
                 state_json TEXT NOT NULL,
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                 last_save_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                playtime_seconds INTEGER DEFAULT 0
+                playtime_seconds INTEGER DEFAULT 0,
+                location_name TEXT,
+                hp INTEGER,
+                max_hp INTEGER,
+                mp INTEGER,
+                max_mp INTEGER,
+                karma INTEGER,
+                cultivation_progress INTEGER,
+                breakthrough_attempts INTEGER,
+                state_layout INTEGER NOT NULL DEFAULT 0,
+                last_event_id INTEGER NOT NULL DEFAULT 0,
+                last_delta_id INTEGER NOT NULL DEFAULT 0
             )
         """)
-        
+
+        # 背包與技能（每項一行，slot 保留順序）
+        for table in player_store.LIST_TABLES.values():
+            cursor.execute(f"""
+                CREATE TABLE IF NOT EXISTS {table} (
+                    player_id INTEGER NOT NULL,
+                    slot INTEGER NOT NULL,
+                    item TEXT NOT NULL,
+                    PRIMARY KEY(player_id, slot),
+                    FOREIGN KEY(player_id) REFERENCES players(id)
+                ) WITHOUT ROWID
+            """)
+            cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_item ON {table}(item)")
+        # 存檔瀏覽：依最後保存時間 keyset 分頁（rowid 隱含在索引尾端）；名稱前綴查詢走 name 的 UNIQUE 索引
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_players_last_save ON players(last_save_at)")
+        self._normalize_legacy_players(cursor)
+
+        # 狀態變動日誌（只追加；players 為快照，讀檔時重播 id > last_delta_id 的部分）
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS state_deltas (
+                id INTEGER PRIMARY KEY,
+                player_id INTEGER NOT NULL,
+                tick INTEGER,
+                event_id INTEGER NOT NULL DEFAULT 0,
+                delta TEXT NOT NULL,
+                FOREIGN KEY(player_id) REFERENCES players(id)
+            )
+        """)
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_state_deltas_player ON state_deltas(player_id)")
+
+
         # 遊戲事件日誌（用於後續的多人互動）
         cursor.execute("""
             CREATE TABLE IF NOT EXISTS event_logs (
@@ -105,10 +303,41 @@ class GameStateManager:
                 event_type TEXT NOT NULL,
                 description TEXT,
                 npc_involved TEXT,
+                importance REAL NOT NULL DEFAULT 1.0,
                 FOREIGN KEY(player_id) REFERENCES players(id)
             )
         """)
-        
+        for index_name, columns in EVENT_LOG_INDEXES.items():
+            cursor.execute(f"CREATE INDEX IF NOT EXISTS {index_name} ON {columns}")
+        self._ensure_event_search(cursor)
+
+        # 舊事件的每日摘要與壓縮歸檔（由 db_maintenance 從 event_logs 搬入）
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS event_summaries (
+                player_id INTEGER NOT NULL,
+                day TEXT NOT NULL,
+                event_count INTEGER NOT NULL,
+                type_counts TEXT NOT NULL,
+                highlights TEXT NOT NULL,
+                max_importance REAL NOT NULL,
+                first_id INTEGER NOT NULL,
+                last_id INTEGER NOT NULL,
+                PRIMARY KEY(player_id, day)
+            )
+        """)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS event_archive (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                player_id INTEGER NOT NULL,
+                day TEXT NOT NULL,
+                first_id INTEGER NOT NULL,
+                last_id INTEGER NOT NULL,
+                row_count INTEGER NOT NULL,
+                payload BLOB NOT NULL
+            )
+        """)
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_event_archive_player_day ON event_archive(player_id, day)")
+
         # NPC 關係記錄
         cursor.execute("""
             CREATE TABLE IF NOT EXISTS npc_relations (
@@ -135,7 +364,7 @@ class GameStateManager:
         cursor = conn.cursor()
 
         # 深拷貝初始狀態（確保 list/dict 獨立）
-        player_state = copy.deepcopy(config.INITIAL_PLAYER_STATE)
+        player_state = PlayerState(copy.deepcopy(config.INITIAL_PLAYER_STATE))
         player_state["name"] = player_name
 
         # 確保初始位置使用 location_id
@@ -145,18 +374,18 @@ class GameStateManager:
         player_state["current_tick"] = 0
 
         try:
-            cursor.execute("""
-                INSERT INTO players (name, location_id, tier, current_tick, state_json)
-                VALUES (?, ?, ?, ?, ?)
-            """, (
-                player_name,
-                initial_location_id,
-                player_state.get("tier", 1.0),
-                0,
-                json.dumps(player_state, ensure_ascii=False)
-            ))
-            conn.commit()
+            cursor.execute("INSERT INTO players (name, state_json) VALUES (?, '{}')", (player_name,))
             player_id = cursor.lastrowid
+            plan = player_store.plan_save(None, player_state)
+            player_store.write_plan(cursor, player_id, plan)
+            conn.commit()
+            player_state.mark_clean()
+            with self._save_lock:
+                self._snapshots[player_id] = plan.snapshot
+                self._clean_states[player_id] = weakref.ref(player_state)
+                self._saved_event_ids[player_id] = 0
+                self._saved_delta_ids[player_id] = self._last_delta_ids[player_id] = 0
+                self._playtime_marks[player_id] = time.monotonic()
 
             if config.DEBUG:
                 print(f"[DB] 創建新玩家: {player_name} (ID: {player_id})")
@@ -168,49 +397,125 @@ class GameStateManager:
             conn.close()
     
     def load_player(self, player_name: str) -> Optional[Dict[str, Any]]:
-        """讀取現有玩家"""
+        """
+        讀取現有玩家
+
+        先讀 players 的快照，再重播快照之後的 state_deltas；有重播時立即寫入新的快照。
+
+        Returns:
+            {"player_id", "state", "recovered_deltas", "unsaved_events"}
+            recovered_deltas：從狀態日誌重播的指令數（上次遊戲在存檔前異常結束時 > 0）
+            unsaved_events：連狀態日誌也沒有涵蓋的事件數（指令處理到一半中斷）
+        """
         conn = sqlite3.connect(self.db_path)
         conn.row_factory = sqlite3.Row
         cursor = conn.cursor()
         
-        cursor.execute("SELECT id, state_json FROM players WHERE name = ?", (player_name,))
+        cursor.execute("SELECT * FROM players WHERE name = ?", (player_name,))
         row = cursor.fetchone()
-        conn.close()
-        
-        if row:
-            player_state = json.loads(row["state_json"])
-            return {"player_id": row["id"], "state": player_state}
-        return None
+
+        try:
+            if row:
+                data, snapshot = player_store.read_player(conn, row)
+                replayed, last_delta_id, delta_event_id = state_journal.replay(data, conn.execute(
+                    "SELECT id, event_id, delta FROM state_deltas WHERE player_id = ? AND id > ? ORDER BY id",
+                    (row["id"], row["last_delta_id"])
+                ))
+                player_state = PlayerState(data)
+                covered_event_id = max(row["last_event_id"], delta_event_id)
+                cursor.execute("SELECT COUNT(*), MAX(id) FROM event_logs WHERE player_id = ? AND id > ?",
+                               (row["id"], covered_event_id))
+                unsaved_events, newest_id = cursor.fetchone()
+                with self._save_lock:
+                    self._saved_event_ids[row["id"]] = row["last_event_id"]
+                    self._last_event_ids[row["id"]] = newest_id or covered_event_id
+                    self._saved_delta_ids[row["id"]] = row["last_delta_id"]
+                    self._last_delta_ids[row["id"]] = last_delta_id or row["last_delta_id"]
+                    self._playtime_marks[row["id"]] = time.monotonic()
+                    if snapshot is None:
+                        self._snapshots.pop(row["id"], None)  # 舊格式：下次保存整份重寫
+                        self._clean_states.pop(row["id"], None)
+                    else:
+                        self._snapshots[row["id"]] = snapshot
+                        self._clean_states[row["id"]] = weakref.ref(player_state)
+                if replayed:
+                    # 重播出的狀態比快照新：寫入新快照（只寫與快照不同的部分）
+                    self.save_player(row["id"], player_state, last_event_id=covered_event_id,
+                                     last_delta_id=last_delta_id)
+                    if config.DEBUG:
+                        print(f"[DB] 玩家 ID {row['id']} 從狀態日誌重播 {replayed} 個變動")
+                return {"player_id": row["id"], "state": player_state, "recovered_deltas": replayed,
+                        "unsaved_events": unsaved_events}
+            return None
+        finally:
+            conn.close()
     
-    def save_player(self, player_id: int, state: Dict[str, Any]) -> bool:
-        """保存玩家狀態（同步更新 location_id, tier, current_tick）"""
+    def save_player(self, player_id: int, state: Dict[str, Any],
+                    last_event_id: Optional[int] = None, last_delta_id: Optional[int] = None) -> bool:
+        """
+        保存玩家狀態（增量：只寫入與上次保存 / 讀取相比有變動的欄位與物品行）
+
+        state 是與資料庫一致、且 diff() 為空的 PlayerState 時直接略過（不開連線）；
+        沒有快照（未經本實例讀取或創建）時整份重寫。
+
+        Args:
+            last_event_id: 此狀態已反映到的最後一個事件 ID（與狀態在同一交易寫入）
+            last_delta_id: 此狀態已包含到的最後一個 delta（預設為目前最新的一個，即 state 是當下的狀態）
+        """
+        with self._save_lock:
+            self.save_stats["requested"] += 1
+            if last_delta_id is None:
+                last_delta_id = self._last_delta_ids.get(player_id)
+            tracked = isinstance(state, PlayerState)
+            clean_ref = self._clean_states.get(player_id)
+            if (tracked and clean_ref is not None and clean_ref() is state and not state.dirty
+                    and last_event_id in (None, self._saved_event_ids.get(player_id))
+                    and last_delta_id in (None, self._saved_delta_ids.get(player_id))):
+                self.save_stats["skipped"] += 1
+                return True
+
+            if not self._save_player_locked(player_id, state, last_event_id, last_delta_id):
+                self._clean_states.pop(player_id, None)
+                return False
+            self.save_stats["written"] += 1
+            if tracked:
+                state.mark_clean()
+                self._clean_states[player_id] = weakref.ref(state)
+            else:
+                self._clean_states.pop(player_id, None)
+            return True
+
+    def _save_player_locked(self, player_id: int, state: Dict[str, Any],
+                            last_event_id: Optional[int], last_delta_id: Optional[int]) -> bool:
         conn = sqlite3.connect(self.db_path)
         cursor = conn.cursor()
 
         try:
-            # 同步獨立欄位
-            location_id = state.get("location_id", "qingyun_foot")
-            tier = state.get("tier", 1.0)
-            current_tick = state.get("current_tick", 0)
-
-            cursor.execute("""
-                UPDATE players
-                SET location_id = ?,
-                    tier = ?,
-                    current_tick = ?,
-                    state_json = ?,
-                    last_save_at = CURRENT_TIMESTAMP
-                WHERE id = ?
-            """, (
-                location_id,
-                tier,
-                current_tick,
-                json.dumps(state, ensure_ascii=False),
-                player_id
-            ))
+            plan = player_store.plan_save(self._snapshots.get(player_id), state)
+            if plan.writes:
+                player_store.write_plan(cursor, player_id, plan)
+            marks = {}
+            if last_event_id is not None and last_event_id != self._saved_event_ids.get(player_id):
+                marks["last_event_id = ?"] = last_event_id
+            if last_delta_id is not None and last_delta_id != self._saved_delta_ids.get(player_id):
+                marks["last_delta_id = ?"] = last_delta_id
+            # 遊戲時間：從讀檔 / 創角起，每次寫入時累計經過的整數秒
+            playtime_mark = self._playtime_marks.get(player_id)
+            played = int(time.monotonic() - playtime_mark) if playtime_mark is not None else 0
+            if played > 0:
+                marks["playtime_seconds = COALESCE(playtime_seconds, 0) + ?"] = played
+            if marks:
+                cursor.execute(f"UPDATE players SET {', '.join(marks)} WHERE id = ?", (*marks.values(), player_id))
             conn.commit()
+            if played > 0:
+                self._playtime_marks[player_id] = playtime_mark + played
+            self._snapshots[player_id] = plan.snapshot
+            if last_event_id is not None:
+                self._saved_event_ids[player_id] = last_event_id
+            if last_delta_id is not None:
+                self._saved_delta_ids[player_id] = last_delta_id
             if config.DEBUG:
-                print(f"[DB] 玩家 ID {player_id} 已保存")
+                print(f"[DB] 玩家 ID {player_id} 已保存（寫入 {plan.writes} 項）")
             return True
         except (sqlite3.Error, TypeError, ValueError) as e:
             print(f"[ERROR] 保存失敗: {type(e).__name__}: {e}")
@@ -219,17 +524,28 @@ class GameStateManager:
             conn.close()
 
     def log_event(self, player_id: int, location: str, event_type: str,
-                  description: str, npc_involved: Optional[str] = None) -> bool:
-        """記錄遊戲事件"""
+                  description: str, npc_involved: Optional[str] = None,
+                  state_changes: Optional[Dict[str, Any]] = None) -> bool:
+        """
+        記錄遊戲事件
+
+        Args:
+            state_changes: 該事件的狀態變化（state_update 格式），用於計算重要度
+        """
+        importance = score_importance(event_type, npc_involved, state_changes)
         conn = sqlite3.connect(self.db_path)
         cursor = conn.cursor()
 
         try:
             cursor.execute("""
-                INSERT INTO event_logs (player_id, location, event_type, description, npc_involved)
-                VALUES (?, ?, ?, ?, ?)
-            """, (player_id, location, event_type, description, npc_involved))
+                INSERT INTO event_logs (player_id, location, event_type, description, npc_involved, importance)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, (player_id, location, event_type, description, npc_involved, importance))
             conn.commit()
+            self._last_event_ids[player_id] = cursor.lastrowid
+            self.memory.observe(player_id, MemoryRecord(
+                cursor.lastrowid, event_type, description, location, npc_involved, importance
+            ))
             return True
         except sqlite3.Error as e:
             print(f"[ERROR] 事件記錄失敗: {type(e).__name__}: {e}")
@@ -237,6 +553,66 @@ class GameStateManager:
         finally:
             conn.close()
     
+    def last_event_id(self, player_id: int) -> int:
+        """玩家最新的事件 ID（沒有事件時為 0）"""
+        cached = self._last_event_ids.get(player_id)
+        if cached is not None:
+            return cached
+        conn = sqlite3.connect(self.db_path)
+        try:
+            row = conn.execute("SELECT MAX(id) FROM event_logs WHERE player_id = ?", (player_id,)).fetchone()
+        finally:
+            conn.close()
+        return self._last_event_ids.setdefault(player_id, row[0] or 0)
+
+    def saved_event_id(self, player_id: int) -> Optional[int]:
+        """存檔中記錄的 last_event_id（本次執行尚未讀取 / 建立該玩家時為 None）"""
+        return self._saved_event_ids.get(player_id)
+
+    def append_delta(self, player_id: int, baseline: Dict[str, Any], changes: Dict[str, Any],
+                     event_id: int = 0) -> Optional[int]:
+        """
+        把一個指令的狀態變動追加到 state_deltas
+
+        Args:
+            baseline: 變動前的內容（PlayerState.baseline）
+            changes: PlayerState.diff()
+            event_id: 此時最新的事件 ID
+
+        Returns:
+            新 delta 的 id；沒有變動或寫入失敗時為 None
+        """
+        delta = state_journal.encode_delta(baseline, changes)
+        if not delta:
+            return None
+        tick = changes.get("current_tick", baseline.get("current_tick"))
+        conn = sqlite3.connect(self.db_path)
+        try:
+            cursor = conn.execute(
+                "INSERT INTO state_deltas (player_id, tick, event_id, delta) VALUES (?, ?, ?, ?)",
+                (player_id, tick, event_id, state_journal.dumps(delta))
+            )
+            conn.commit()
+            self._last_delta_ids[player_id] = cursor.lastrowid
+            return cursor.lastrowid
+        except (sqlite3.Error, TypeError, ValueError) as e:
+            print(f"[ERROR] 狀態日誌寫入失敗: {type(e).__name__}: {e}")
+            return None
+        finally:
+            conn.close()
+
+    def last_delta_id(self, player_id: int) -> int:
+        """玩家最新的 delta id（沒有 delta 時為 0）"""
+        cached = self._last_delta_ids.get(player_id)
+        if cached is not None:
+            return cached
+        conn = sqlite3.connect(self.db_path)
+        try:
+            row = conn.execute("SELECT MAX(id) FROM state_deltas WHERE player_id = ?", (player_id,)).fetchone()
+        finally:
+            conn.close()
+        return self._last_delta_ids.setdefault(player_id, row[0] or 0)
+
     def get_location_history(self, player_id: int, location: str, limit: int = 5) -> list:
         """獲取某個地點的事件歷史"""
         conn = sqlite3.connect(self.db_path)
@@ -247,7 +623,7 @@ class GameStateManager:
             SELECT event_type, description, npc_involved, timestamp
             FROM event_logs
             WHERE player_id = ? AND location = ?
-            ORDER BY timestamp DESC
+            ORDER BY id DESC
             LIMIT ?
         """, (player_id, location, limit))
         
@@ -266,7 +642,7 @@ class GameStateManager:
             SELECT event_type, description, location, timestamp
             FROM event_logs
             WHERE player_id = ?
-            ORDER BY timestamp DESC
+            ORDER BY id DESC
             LIMIT ?
         """, (player_id, limit))
 
@@ -275,8 +651,113 @@ class GameStateManager:
 
         return [dict(row) for row in rows]
 
+    def fetch_memories(self, player_id: int, kind: str, key: Optional[str],
+                       limit: int) -> List[MemoryRecord]:
+        """
+        讀取記憶候選（MemoryIndex 冷啟動用，每種查詢都走 EVENT_LOG_INDEXES）
+
+        Args:
+            kind: recent / important / location / npc
+            key: location 或 npc 的值
+        """
+        condition, order = _MEMORY_QUERIES[kind]
+        params = [player_id] + ([key] if condition else []) + [limit]
+        conn = sqlite3.connect(self.db_path)
+        try:
+            rows = conn.execute(f"""
+                SELECT id, event_type, description, location, npc_involved, importance, timestamp
+                FROM event_logs
+                WHERE player_id = ? {condition}
+                ORDER BY {order}
+                LIMIT ?
+            """, params).fetchall()
+            # 每條記錄之後該玩家又有幾個事件（MemoryRecord.seq；新近度不受其他玩家的事件影響），
+            # 最多數到 config.MEMORY_RECENCY_HORIZON 條，更舊的記錄一律視為在視界之外
+            horizon = config.MEMORY_RECENCY_HORIZON
+            newer_ids = [row[0] for row in conn.execute(
+                "SELECT id FROM event_logs WHERE player_id = ? AND id > ? ORDER BY id DESC LIMIT ?",
+                (player_id, min(row[0] for row in rows), horizon),
+            )][::-1] if rows else []
+        except sqlite3.Error as e:
+            print(f"[ERROR] 記憶讀取失敗: {type(e).__name__}: {e}")
+            return []
+        finally:
+            conn.close()
+        return [MemoryRecord(*row, seq=bisect.bisect_right(newer_ids, row[0]) - len(newer_ids)) for row in rows]
+
+    def search_events(self, player_id: int, query: str, limit: int = 5) -> list:
+        """
+        全文檢索玩家的事件歷史（如「長老給的靈草」）
+
+        查詢按空白與標點拆成多個詞，所有詞都須出現（AND）。
+        ≥ 3 字的詞走 event_search 索引；較短的詞在索引結果上以 LIKE 過濾，
+        若查詢只有短詞，則由新到舊掃描最近 config.EVENT_SEARCH_SCAN_LIMIT 條事件（以 id 計）。
+
+        Returns:
+            事件 dict 列表（由新到舊，格式同 recall_memories）
+        """
+        terms = [term for term in _SEARCH_TERM_SPLIT.split(query or "") if term]
+        if not terms:
+            return []
+        long_terms = [t for t in terms if len(t) >= TRIGRAM_MIN_LENGTH] if self.search_enabled else []
+        short_terms = [t for t in terms if t not in long_terms]
+
+        like_sql = "".join(" AND e.description LIKE ? ESCAPE '\\'" for _ in short_terms)
+        like_params = ["%" + re.sub(r"([\\%_])", r"\\\1", term) + "%" for term in short_terms]
+        columns = "e.id, e.event_type, e.description, e.location, e.npc_involved, e.importance, e.timestamp"
+
+        if long_terms:
+            match = " AND ".join('"' + term.replace('"', '""') + '"' for term in long_terms)
+            sql = f"""
+                SELECT {columns}
+                FROM event_search JOIN event_logs e ON e.id = event_search.rowid
+                WHERE event_search MATCH ? AND e.player_id = ?{like_sql}
+                ORDER BY event_search.rowid DESC
+                LIMIT ?
+            """
+            params = [match, player_id] + like_params + [limit]
+        else:
+            # 沿 idx_event_logs_player 由新到舊掃描，湊滿 limit 即停；只看全表最近 N 個 id（MAX(id) 是 O(1)）
+            sql = f"""
+                SELECT {columns}
+                FROM event_logs e
+                WHERE e.player_id = ?{like_sql}
+                  AND e.id > (SELECT MAX(id) FROM event_logs) - ?
+                ORDER BY e.id DESC
+                LIMIT ?
+            """
+            params = [player_id] + like_params + [config.EVENT_SEARCH_SCAN_LIMIT, limit]
+
+        conn = sqlite3.connect(self.db_path)
+        try:
+            rows = conn.execute(sql, params).fetchall()
+        except sqlite3.Error as e:
+            print(f"[ERROR] 事件檢索失敗: {type(e).__name__}: {e}")
+            return []
+        finally:
+            conn.close()
+        return [MemoryRecord(*row).to_event() for row in rows]
+
+    def recall_memories(self, player_id: int, location: Optional[str] = None,
+                        npc_id: Optional[str] = None, intent: Optional[str] = None,
+                        keywords: Optional[List[str]] = None,
+                        limit: Optional[int] = None) -> list:
+        """
+        長期記憶檢索：按 新近度 × 重要度 × 相關度 取出最佳幾條事件（見 memory.py）
+
+        Returns:
+            事件 dict 列表，由新到舊，格式與 get_recent_events 相同（另含 id、npc_involved、importance）
+        """
+        records = self.memory.recall(
+            player_id, self, location=location, npc_id=npc_id, intent=intent,
+            keywords=keywords or (), limit=limit or config.MEMORY_RECALL_LIMIT,
+        )
+        return [record.to_event() for record in records]
+
     def get_npc_relation(self, player_id: int, npc_id: str) -> int:
-        """獲取與 NPC 的親密度"""
+        """獲取與 NPC 的親密度（沒有記錄時為 NPC 的初始好感度）"""
+        from npc_relations import default_affinity
+
         conn = sqlite3.connect(self.db_path)
         cursor = conn.cursor()
         
@@ -287,33 +768,18 @@ class GameStateManager:
         row = cursor.fetchone()
         conn.close()
         
-        return row[0] if row else 0
+        return row[0] if row else default_affinity(npc_id)
     
     def update_npc_relation(self, player_id: int, npc_id: str, delta: int) -> bool:
-        """更新與 NPC 的親密度"""
+        """更新與 NPC 的親密度（單筆；遊戲中經 npc_relations.affinity_cache 批次寫回；首次記錄從初始好感度起算）"""
+        from npc_relations import default_affinity
+
         conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
         try:
-            # 先嘗試插入，如果已存在則更新
-            cursor.execute(
-                "SELECT affinity_score FROM npc_relations WHERE player_id = ? AND npc_id = ?",
-                (player_id, npc_id)
-            )
-            
-            if cursor.fetchone():
-                # 已存在，更新
-                cursor.execute(
-                    "UPDATE npc_relations SET affinity_score = affinity_score + ? WHERE player_id = ? AND npc_id = ?",
-                    (delta, player_id, npc_id)
-                )
-            else:
-                # 不存在，插入
-                cursor.execute(
-                    "INSERT INTO npc_relations (player_id, npc_id, affinity_score) VALUES (?, ?, ?)",
-                    (player_id, npc_id, delta)
-                )
-            
+            conn.execute("""
+                INSERT INTO npc_relations (player_id, npc_id, affinity_score) VALUES (?, ?, ? + ?)
+                ON CONFLICT(player_id, npc_id) DO UPDATE SET affinity_score = affinity_score + ?
+            """, (player_id, npc_id, default_affinity(npc_id), delta, delta))
             conn.commit()
             return True
         except sqlite3.Error as e:
@@ -322,8 +788,36 @@ class GameStateManager:
         finally:
             conn.close()
 
+    def load_npc_relations(self, player_id: int) -> Dict[str, int]:
+        """一次讀出玩家與所有 NPC 的親密度"""
+        conn = sqlite3.connect(self.db_path)
+        try:
+            return dict(conn.execute(
+                "SELECT npc_id, affinity_score FROM npc_relations WHERE player_id = ?", (player_id,)
+            ))
+        finally:
+            conn.close()
+
+    def upsert_npc_relations(self, player_id: int, scores: Dict[str, int]) -> bool:
+        """以一個交易、一批 UPSERT 寫入多個 NPC 的親密度（絕對值）"""
+        if not scores:
+            return True
+        conn = sqlite3.connect(self.db_path)
+        try:
+            with conn:
+                conn.executemany("""
+                    INSERT INTO npc_relations (player_id, npc_id, affinity_score) VALUES (?, ?, ?)
+                    ON CONFLICT(player_id, npc_id) DO UPDATE SET affinity_score = excluded.affinity_score
+                """, [(player_id, npc_id, score) for npc_id, score in scores.items()])
+            return True
+        except sqlite3.Error as e:
+            print(f"[ERROR] 親密度更新失敗: {type(e).__name__}: {e}")
+            return False
+        finally:
+            conn.close()
+
     def list_all_players(self) -> list:
-        """列出所有玩家"""
+        """列出所有玩家（不分頁；存檔選單與管理列表請用 save_browser.browse_players）"""
         conn = sqlite3.connect(self.db_path)
         conn.row_factory = sqlite3.Row
         cursor = conn.cursor()
@@ -335,5 +829,5 @@ class GameStateManager:
         return [dict(row) for row in rows]
 
 
-# 全局實例
-game_db = GameStateManager()
+# 全局實例（第一次使用時才連接資料庫並建表/遷移）
+game_db = LazyProxy(GameStateManager)
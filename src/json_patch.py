@@ -0,0 +1,146 @@
+# json_patch.py
+# 道·衍 - JSON Patch（RFC 6902 子集）
+
+"""
+Director 修復模式的補丁套用
+
+Level 2 修正時不再請 Director 重寫整段決策，而是只把出錯的欄位交給它，
+由它返回一份 JSON Patch，本地套用到原決策上。
+
+支援的操作：add / replace / remove（路徑格式為 JSON Pointer，如 "/state_update/hp_change"）。
+test / move / copy 在這裡用不到，不支援。
+
+使用方式：
+    patched, errors = apply_json_patch(decision, [
+        {"op": "replace", "path": "/state_update/hp_change", "value": -10},
+    ], allowed_prefixes=("/state_update/", "/narrative"))
+"""
+
+import copy
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+
+SUPPORTED_OPS = ("add", "replace", "remove")
+
+
+def parse_pointer(path: str) -> Optional[List[str]]:
+    """
+    解析 JSON Pointer
+
+    Returns:
+        路徑分段列表；格式錯誤時返回 None
+    """
+    if path == "":
+        return []
+    if not isinstance(path, str) or not path.startswith("/"):
+        return None
+    return [part.replace("~1", "/").replace("~0", "~") for part in path[1:].split("/")]
+
+
+def _resolve_parent(document: Any, parts: List[str]) -> Tuple[Any, Optional[str]]:
+    """找到路徑最後一段的父容器，返回 (父容器, 錯誤訊息)"""
+    node = document
+    for part in parts[:-1]:
+        if isinstance(node, dict):
+            if part not in node:
+                return None, f"路徑不存在: {part}"
+            node = node[part]
+        elif isinstance(node, list):
+            if not part.isdigit() or int(part) >= len(node):
+                return None, f"陣列索引無效: {part}"
+            node = node[int(part)]
+        else:
+            return None, f"無法進入非容器節點: {part}"
+    return node, None
+
+
+def _apply_operation(document: Any, operation: Dict[str, Any]) -> Optional[str]:
+    """對 document 原地套用單一操作，返回錯誤訊息（成功則 None）"""
+    op = operation.get("op")
+    parts = parse_pointer(operation.get("path"))
+    if op not in SUPPORTED_OPS:
+        return f"不支援的操作: {op}"
+    if not parts:
+        return f"無效的路徑: {operation.get('path')!r}"
+    if op != "remove" and "value" not in operation:
+        return f"{op} 缺少 value"
+
+    parent, error = _resolve_parent(document, parts)
+    if error:
+        return error
+    key = parts[-1]
+    value = copy.deepcopy(operation.get("value"))
+
+    if isinstance(parent, dict):
+        if op == "add":
+            parent[key] = value
+        elif key not in parent:
+            return f"{op} 的目標不存在: {operation['path']}"
+        elif op == "replace":
+            parent[key] = value
+        else:
+            del parent[key]
+        return None
+
+    if isinstance(parent, list):
+        if op == "add" and key == "-":
+            parent.append(value)
+            return None
+        if not key.isdigit():
+            return f"陣列索引無效: {key}"
+        index = int(key)
+        if op == "add":
+            if index > len(parent):
+                return f"陣列索引越界: {index}"
+            parent.insert(index, value)
+        elif index >= len(parent):
+            return f"陣列索引越界: {index}"
+        elif op == "replace":
+            parent[index] = value
+        else:
+            del parent[index]
+        return None
+
+    return f"無法修改非容器節點: {operation['path']}"
+
+
+def _is_allowed(path: Any, allowed_prefixes: Sequence[str]) -> bool:
+    """路徑是否在允許範圍內（"/a/" 允許 /a 之下的所有路徑，"/b" 只允許 /b 本身）"""
+    if not isinstance(path, str):
+        return False
+    return any(path.startswith(prefix) if prefix.endswith("/") else path == prefix
+               for prefix in allowed_prefixes)
+
+
+def apply_json_patch(document: Dict[str, Any], patch: Sequence[Dict[str, Any]],
+                     allowed_prefixes: Optional[Sequence[str]] = None
+                     ) -> Tuple[Dict[str, Any], List[str]]:
+    """
+    套用 JSON Patch（不修改原對象）
+
+    無效或不在允許範圍內的操作會被跳過並記錄，其餘操作照常套用。
+
+    Args:
+        document: 原對象
+        patch: 操作列表
+        allowed_prefixes: 允許修改的路徑前綴（None 表示不限制）
+
+    Returns:
+        (套用後的新對象, 錯誤列表)
+    """
+    result = copy.deepcopy(document)
+    errors: List[str] = []
+
+    for operation in patch:
+        if not isinstance(operation, dict):
+            errors.append(f"操作格式錯誤: {operation!r}")
+            continue
+        path = operation.get("path")
+        if allowed_prefixes is not None and not _is_allowed(path, allowed_prefixes):
+            errors.append(f"不允許修改的路徑: {path!r}")
+            continue
+        error = _apply_operation(result, operation)
+        if error:
+            errors.append(error)
+
+    return result, errors
@@ -0,0 +1,238 @@
+# json_stream.py
+# 道·衍 - 單趟、字串感知的 JSON 對象掃描器
+
+"""
+從 LLM 回應中提取 JSON 對象
+
+舊的 extract_json_from_text 對每個「括號平衡」的片段都嘗試一次 json.loads，
+而且不理會字串內的括號：Director 的敘事裡出現 {、} 時會切錯片段，長輸出時接近平方複雜度。
+
+JSONObjectScanner 只掃描一次：
+- 字串感知：字串內（含跳脫字元）的括號、逗號不影響深度
+- 只在遇到 "{}[]," 與字串邊界時停下（正則跳躍，不逐字元迴圈）
+- 每個完整的頂層對象只 json.loads 一次
+- 容忍常見的 LLM 缺陷：```json 代碼塊、前後說明文字、尾隨逗號、字串內的原始換行
+- 可增量餵入（串流模式），跨 chunk 的字串/跳脫字元都能正確接續
+
+使用方式：
+    obj = extract_first_json_object(text)
+
+    scanner = JSONObjectScanner()
+    for chunk in stream:
+        for obj in scanner.feed(chunk):
+            ...
+"""
+
+import json
+import re
+from typing import Any, Dict, List, Optional
+
+
+# 對象內需要停下處理的結構字元
+_STRUCTURAL = re.compile(r'[{}\[\]",]')
+# 字串內需要停下處理的字元
+_STRING_SPECIAL = re.compile(r'["\\]')
+
+
+class JSONObjectScanner:
+    """
+    增量 JSON 對象掃描器
+
+    只產出頂層的 dict；無法解析的片段（如說明文字裡的 {佔位符}）會被略過並計入 stats["failed"]。
+
+    串流模式下，每次 feed 結束時把已掃描的候選文本移入 _pieces，
+    緩衝區只保留未掃描的尾巴，因此每個 chunk 只被掃描與複製一次。
+    尾隨逗號的位置以「候選對象內的偏移」記錄，跨 chunk 也能正確刪除。
+    """
+
+    def __init__(self):
+        self._buf = ""
+        self._pos = 0              # 下一個要掃描的位置
+        self._start = -1           # 目前候選對象在 _buf 中的起點（-1 表示不在對象內）
+        self._pieces: List[str] = []  # 候選對象已掃描、移出緩衝區的部分
+        self._flushed = 0          # _pieces 的總長度
+        self._stack: List[str] = []
+        self._in_string = False
+        self._last_comma = -1      # 最近一個逗號（候選對象內偏移）
+        self._trailing: List[int] = []  # 需要刪除的尾隨逗號（候選對象內偏移）
+        self.stats = {"candidates": 0, "parsed": 0, "failed": 0, "repaired": 0}
+
+    @property
+    def pending(self) -> bool:
+        """是否有尚未閉合的對象（串流尚未結束）"""
+        return self._start >= 0
+
+    def reset(self):
+        """丟棄緩衝區與掃描狀態（保留統計）"""
+        self._buf = ""
+        self._pos = 0
+        self._start = -1
+        self._pieces = []
+        self._flushed = 0
+        self._stack = []
+        self._in_string = False
+        self._last_comma = -1
+        self._trailing = []
+
+    def feed(self, chunk: str, max_objects: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        餵入一段文本，返回這段文本中新完成的對象
+
+        Args:
+            chunk: 新到達的文本
+            max_objects: 找到幾個對象後就停止（其餘文本保留到下次 feed）
+
+        Returns:
+            新完成且成功解析的 dict 列表
+        """
+        if chunk:
+            self._buf += chunk
+        results = self._scan(max_objects)
+        self._compact()
+        return results
+
+    def _scan(self, max_objects: Optional[int]) -> List[Dict[str, Any]]:
+        results = []
+        buf = self._buf
+        n = len(buf)
+        pos = self._pos
+        stack = self._stack
+
+        while pos < n:
+            if self._start < 0:
+                start = buf.find("{", pos)
+                if start < 0:
+                    pos = n
+                    break
+                self._start = start
+                stack.append("{")
+                pos = start + 1
+                continue
+
+            if self._in_string:
+                m = _STRING_SPECIAL.search(buf, pos)
+                if m is None:
+                    pos = n
+                    break
+                i = m.start()
+                if buf[i] == "\\":
+                    if i + 1 >= n:
+                        # 跳脫字元被切在 chunk 邊界，等下一段
+                        pos = i
+                        break
+                    pos = i + 2
+                    continue
+                self._in_string = False
+                pos = i + 1
+                continue
+
+            m = _STRUCTURAL.search(buf, pos)
+            if m is None:
+                pos = n
+                break
+            i = m.start()
+            char = buf[i]
+            pos = i + 1
+
+            if char == '"':
+                self._in_string = True
+            elif char == ",":
+                self._last_comma = self._flushed + i - self._start
+            elif char == "{" or char == "[":
+                stack.append(char)
+            else:
+                # } 或 ]：上一個有意義的字元若是逗號，就是尾隨逗號
+                if self._last_comma >= 0:
+                    local = self._last_comma - self._flushed + self._start
+                    if not buf[max(local + 1, self._start):i].strip():
+                        self._trailing.append(self._last_comma)
+                    self._last_comma = -1
+                stack.pop()
+                if not stack:
+                    obj = self._decode(buf[self._start:pos])
+                    self._start = -1
+                    self._pieces = []
+                    self._flushed = 0
+                    self._trailing = []
+                    if obj is not None:
+                        results.append(obj)
+                        if max_objects is not None and len(results) >= max_objects:
+                            break
+
+        self._pos = pos
+        return results
+
+    def _decode(self, tail: str) -> Optional[Dict[str, Any]]:
+        """解析一個完整的候選對象（每個候選只解析一次）"""
+        self.stats["candidates"] += 1
+
+        text = "".join(self._pieces) + tail if self._pieces else tail
+        if self._trailing:
+            pieces = []
+            prev = 0
+            for comma in self._trailing:
+                pieces.append(text[prev:comma])
+                prev = comma + 1
+            pieces.append(text[prev:])
+            text = "".join(pieces)
+            self.stats["repaired"] += 1
+
+        try:
+            obj = json.loads(text, strict=False)
+        except json.JSONDecodeError:
+            self.stats["failed"] += 1
+            return None
+
+        if not isinstance(obj, dict):
+            self.stats["failed"] += 1
+            return None
+
+        self.stats["parsed"] += 1
+        return obj
+
+    def _compact(self):
+        """把已掃描的文本移出緩衝區（候選對象的部分移入 _pieces）"""
+        pos = self._pos
+        if self._start >= 0:
+            if pos > self._start:
+                scanned = self._buf[self._start:pos]
+                # 逗號之後若已出現其他內容，就不可能是尾隨逗號
+                if self._last_comma >= 0:
+                    local = self._last_comma - self._flushed
+                    if scanned[max(local + 1, 0):].strip():
+                        self._last_comma = -1
+                self._pieces.append(scanned)
+                self._flushed += len(scanned)
+            self._start = 0
+        if pos > 0:
+            self._buf = self._buf[pos:]
+            self._pos = 0
+
+
+def iter_json_objects(text: str) -> List[Dict[str, Any]]:
+    """提取文本中所有可解析的頂層 JSON 對象"""
+    if not text:
+        return []
+    return JSONObjectScanner().feed(text)
+
+
+def extract_first_json_object(text: str) -> Optional[Dict[str, Any]]:
+    """
+    提取文本中第一個可解析的 JSON 對象
+
+    整段文本本身就是合法 JSON 對象時直接解析（最常見的情況，不走掃描）。
+    """
+    if not text:
+        return None
+
+    stripped = text.strip()
+    if stripped.startswith("{") and stripped.endswith("}"):
+        try:
+            obj = json.loads(stripped)
+            if isinstance(obj, dict):
+                return obj
+        except json.JSONDecodeError:
+            pass
+
+    objects = JSONObjectScanner().feed(text, max_objects=1)
+    return objects[0] if objects else None
@@ -0,0 +1,240 @@
+# keyword_automaton.py
+# 道·衍 - 多關鍵詞自動機（Aho-Corasick）
+
+"""
+多關鍵詞單趟匹配
+
+ConsistencyValidator 原本對每個詞表逐詞 `in` / text.find，
+每個輔助判斷（否定、主語、意圖）又各自 text.find 一次關鍵詞位置，
+耗時隨「詞數 × 敘述長度」增長。
+這裡把行為詞表編譯成一個 Aho-Corasick 自動機，一次掃描找出所有關鍵詞的所有出現位置，
+驗證邏輯只查詢匹配結果（KeywordHits）。
+
+- 建構：trie + BFS 失敗連結，展開成 DFA 轉移表（掃描時不需要沿失敗連結回溯）
+- 掃描：在根狀態時用正則跳到下一個「可能開頭」的字元（大部分漢字不在任何關鍵詞裡）
+- 重疊匹配全部回報（「你」與「你的」、「受損」與「損傷」）
+
+使用方式：
+    automaton = KeywordAutomaton(['獲得', '沒有', '你'])
+    hits = automaton.scan(narrative)
+    hits.first('獲得')                   # 第一次出現的位置，沒有則 -1
+    hits.any_within(['沒有'], 0, 10)     # [0, 10) 內是否完整出現其中任一詞
+"""
+
+import bisect
+import re
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+
+class KeywordMatch(NamedTuple):
+    """一次關鍵詞出現"""
+    start: int
+    keyword: str
+
+    @property
+    def end(self) -> int:
+        return self.start + len(self.keyword)
+
+
+class KeywordHits:
+    """
+    一段文本的匹配結果（按關鍵詞建立位置索引）
+
+    所有 *_within 查詢都以「關鍵詞完整落在 [lo, hi) 內」為準，
+    與對切片做 `keyword in text[lo:hi]` 的語義相同。
+    """
+
+    __slots__ = ("text", "_positions")
+
+    def __init__(self, text: str, positions: Dict[str, List[int]]):
+        self.text = text
+        self._positions = positions
+
+    @property
+    def matches(self) -> List[KeywordMatch]:
+        """所有匹配，按起點排序（同一起點長的在前）"""
+        return sorted(
+            (KeywordMatch(start, keyword)
+             for keyword, starts in self._positions.items() for start in starts),
+            key=lambda m: (m.start, -len(m.keyword))
+        )
+
+    def keywords(self) -> List[str]:
+        """出現過的關鍵詞"""
+        return list(self._positions)
+
+    def has(self, keyword: str) -> bool:
+        return keyword in self._positions
+
+    def positions(self, keyword: str) -> List[int]:
+        """關鍵詞所有出現的起點（遞增）"""
+        return self._positions.get(keyword, [])
+
+    def first(self, keyword: str) -> int:
+        """第一次出現的起點，沒有則 -1（等同 text.find）"""
+        positions = self._positions.get(keyword)
+        return positions[0] if positions else -1
+
+    def first_within(self, keyword: str, lo: int, hi: int) -> int:
+        """[lo, hi) 內第一次完整出現的起點，沒有則 -1"""
+        positions = self._positions.get(keyword)
+        if not positions:
+            return -1
+        index = bisect.bisect_left(positions, max(lo, 0))
+        if index < len(positions) and positions[index] + len(keyword) <= hi:
+            return positions[index]
+        return -1
+
+    def last_within(self, keyword: str, lo: int, hi: int) -> int:
+        """[lo, hi) 內最後一次完整出現的起點，沒有則 -1（等同切片上的 rfind）"""
+        positions = self._positions.get(keyword)
+        if not positions:
+            return -1
+        index = bisect.bisect_right(positions, hi - len(keyword)) - 1
+        if index >= 0 and positions[index] >= max(lo, 0):
+            return positions[index]
+        return -1
+
+    def any_within(self, keywords: Iterable[str], lo: int, hi: int) -> bool:
+        """[lo, hi) 內是否完整出現任一關鍵詞"""
+        return any(self.first_within(keyword, lo, hi) >= 0 for keyword in keywords)
+
+
+class KeywordAutomaton:
+    """
+    Aho-Corasick 多關鍵詞自動機
+
+    Args:
+        keywords: 關鍵詞（可重複、可互為前後綴；空字串會被忽略）
+    """
+
+    def __init__(self, keywords: Iterable[str]):
+        self.keywords: Tuple[str, ...] = tuple(dict.fromkeys(k for k in keywords if k))
+
+        goto: List[Dict[str, int]] = [{}]
+        outputs: List[List[str]] = [[]]
+        for keyword in self.keywords:
+            state = 0
+            for char in keyword:
+                next_state = goto[state].get(char)
+                if next_state is None:
+                    next_state = len(goto)
+                    goto[state][char] = next_state
+                    goto.append({})
+                    outputs.append([])
+                state = next_state
+            outputs[state].append(keyword)
+
+        # BFS 建立失敗連結，同時把轉移表展開成 DFA（缺少的轉移 = 失敗狀態的轉移）。
+        # 各狀態只存與根狀態不同的轉移，其餘查根狀態，避免 狀態數 × 字母表 的記憶體。
+        root = goto[0]
+        fail = [0] * len(goto)
+        delta: List[Dict[str, int]] = [{} for _ in goto]
+        queue = list(root.values())
+        head = 0
+        while head < len(queue):
+            state = queue[head]
+            head += 1
+            fail_delta = delta[fail[state]]
+            # 長的關鍵詞在前，同一結束位置的匹配由長到短回報
+            outputs[state] = outputs[state] + outputs[fail[state]]
+            transitions = dict(fail_delta)
+            for char, next_state in goto[state].items():
+                target = fail_delta.get(char)
+                fail[next_state] = target if target is not None else root.get(char, 0)
+                transitions[char] = next_state
+                queue.append(next_state)
+            delta[state] = transitions
+
+        # 根狀態存完整轉移，其他狀態查不到時退回根狀態
+        delta[0] = root
+        self._root = root
+        self._delta = delta
+        self._outputs = [tuple((keyword, len(keyword)) for keyword in out) if out else None
+                         for out in outputs]
+        self._root_jump = re.compile(
+            "[" + "".join(re.escape(char) for char in root) + "]"
+        ) if root else None
+
+    def __len__(self) -> int:
+        return len(self.keywords)
+
+    def scan(self, text: str) -> KeywordHits:
+        """
+        一次掃描找出所有關鍵詞的所有出現（含重疊），直接建立位置索引
+        """
+        positions: Dict[str, List[int]] = {}
+        if not text or self._root_jump is None:
+            return KeywordHits(text or "", positions)
+
+        root = self._root
+        delta = self._delta
+        outputs = self._outputs
+        root_jump = self._root_jump
+        state = 0
+        i = 0
+        n = len(text)
+
+        while i < n:
+            if state == 0:
+                # 根狀態：直接跳到下一個可能是關鍵詞開頭的字元
+                found = root_jump.search(text, i)
+                if found is None:
+                    break
+                i = found.start()
+            char = text[i]
+            next_state = delta[state].get(char)
+            if next_state is None:
+                next_state = root.get(char, 0)
+            state = next_state
+            out = outputs[state]
+            if out is not None:
+                end = i + 1
+                for keyword, length in out:
+                    starts = positions.get(keyword)
+                    if starts is None:
+                        positions[keyword] = [end - length]
+                    else:
+                        starts.append(end - length)
+            i += 1
+
+        return KeywordHits(text, positions)
+
+    def search(self, text: str) -> Optional[KeywordMatch]:
+        """
+        第一個完成的匹配（結束位置最早者；同一結束位置取最長的），沒有則 None
+
+        只需要「有沒有出現任一關鍵詞」時使用，找到即停止掃描。
+        """
+        if not text or self._root_jump is None:
+            return None
+
+        root = self._root
+        delta = self._delta
+        outputs = self._outputs
+        root_jump = self._root_jump
+        state = 0
+        i = 0
+        n = len(text)
+
+        while i < n:
+            if state == 0:
+                found = root_jump.search(text, i)
+                if found is None:
+                    return None
+                i = found.start()
+            next_state = delta[state].get(text[i])
+            if next_state is None:
+                next_state = root.get(text[i], 0)
+            state = next_state
+            out = outputs[state]
+            if out is not None:
+                keyword, length = out[0]
+                return KeywordMatch(i + 1 - length, keyword)
+            i += 1
+
+        return None
+
+    def find_all(self, text: str) -> List[KeywordMatch]:
+        """所有匹配（含重疊），按起點排序"""
+        return self.scan(text).matches
@@ -10,6 +10,8 @@
 - 當 prompt 改變時只需調整詞表
 """
 
+import re
+
 # NPC 指示詞（代詞 + 角色 + 物種）
 NPC_INDICATORS = [
     # 代詞（最重要）
@@ -64,6 +66,24 @@ ITEM_LOSS_KEYWORDS = [
     '遺失', '損失',
 ]
 
+# ============ 上下文判斷詞（用於 ConsistencyValidator 的輔助判斷）============
+
+# 否定詞：關鍵詞前 10 字內出現 → 否定句（「沒有獲得」）
+NEGATIVE_WORDS = ['沒有', '無法', '未能', '不曾', '並未', '從未']
+
+# 意圖詞：關鍵詞前 8 字內出現 → 只是意圖（「打算前往」）
+INTENTION_WORDS = ['想', '想要', '打算', '準備', '計劃', '希望', '試圖']
+
+# 主語判斷：緊鄰受傷詞的 NPC 詞（「靈獸受傷」「受傷的靈獸」）
+SUBJECT_NPC_WORDS = ['靈獸', '妖獸', '魔獸', '野獸', '師兄', '師姐', '弟子', '對手', '敵人', '修士', '道人']
+
+# 主語判斷：代詞（以最接近關鍵詞的代詞為準）
+NPC_PRONOUNS = ['牠', '他', '她', '它']
+PLAYER_PRONOUNS = ['你', '您', '我']
+
+# 子句分隔符
+CLAUSE_SEPARATORS = ['。', '，', '！', '？']
+
 # ============ Regex 模式（用於 auto_fix_state）============
 # 這些模式用於從敘述中自動提取狀態更新
 
@@ -101,3 +121,12 @@ INVALID_ITEM_PATTERNS = [
     r'^更多',      # 「更多的指導」
     r'的$',        # 以「的」結尾（被截斷）
 ]
+
+# ============ 預編譯模式（模組載入時編譯一次，供 NarrativeExtractor 使用）============
+
+ITEM_GAIN_RE = re.compile(REGEX_ITEM_GAIN)
+HP_DAMAGE_RE = re.compile(REGEX_HP_DAMAGE)
+MOVEMENT_RE = re.compile(REGEX_MOVEMENT)
+
+# 所有無效物品模式合併成一個交替式，一次 search 完成
+INVALID_ITEM_RE = re.compile("|".join(f"(?:{pattern})" for pattern in INVALID_ITEM_PATTERNS))
@@ -0,0 +1,75 @@
+# lazy_init.py
+# 道·衍 - 延遲初始化的全局實例
+
+"""
+延遲初始化代理
+
+原本 `import main` 時就會建立 OpenAI 客戶端（導入 openai 套件約 0.6 秒）、
+連接 SQLite 並建表、載入 NPC 與世界資料——在標題畫面出現之前。
+只想用 validators / cultivation 的測試與工具也得付這筆代價。
+
+LazyProxy 讓模組級的全局實例保持原來的名稱與用法（`game_db.save_game(...)`），
+但實例直到第一次存取屬性時才建立：
+
+    game_db = LazyProxy(GameStateManager)
+
+- 建立過程加鎖，並行的首次存取（如 Logic/Drama 並行調用）只會建立一次
+- 屬性的讀取、設置、刪除都轉發給實例（monkeypatch 照常可用）
+- `initialized()` / `peek()` 不會觸發建立，供只在實例已存在時才需要處理的呼叫方使用
+"""
+
+import threading
+from typing import Any, Callable, Generic, Optional, TypeVar
+
+
+T = TypeVar("T")
+
+_OWN_ATTRIBUTES = ("_factory", "_instance", "_lock")
+
+
+class LazyProxy(Generic[T]):
+    """首次存取屬性時才調用 factory 建立實例的代理"""
+
+    def __init__(self, factory: Callable[[], T]):
+        object.__setattr__(self, "_factory", factory)
+        object.__setattr__(self, "_instance", None)
+        object.__setattr__(self, "_lock", threading.Lock())
+
+    def instance(self) -> T:
+        """取得實例（必要時建立）"""
+        instance = object.__getattribute__(self, "_instance")
+        if instance is None:
+            with object.__getattribute__(self, "_lock"):
+                instance = object.__getattribute__(self, "_instance")
+                if instance is None:
+                    instance = object.__getattribute__(self, "_factory")()
+                    object.__setattr__(self, "_instance", instance)
+        return instance
+
+    def initialized(self) -> bool:
+        """實例是否已建立"""
+        return object.__getattribute__(self, "_instance") is not None
+
+    def peek(self) -> Optional[T]:
+        """已建立時返回實例，否則返回 None（不觸發建立）"""
+        return object.__getattribute__(self, "_instance")
+
+    def __getattr__(self, name: str) -> Any:
+        # 只有代理本身沒有的屬性才會進到這裡
+        return getattr(self.instance(), name)
+
+    def __setattr__(self, name: str, value: Any):
+        if name in _OWN_ATTRIBUTES:
+            object.__setattr__(self, name, value)
+        else:
+            setattr(self.instance(), name, value)
+
+    def __delattr__(self, name: str):
+        delattr(self.instance(), name)
+
+    def __repr__(self):
+        instance = object.__getattribute__(self, "_instance")
+        if instance is None:
+            factory = object.__getattribute__(self, "_factory")
+            return f"<LazyProxy {getattr(factory, '__name__', factory)} (未初始化)>"
+        return f"<LazyProxy {instance!r}>"
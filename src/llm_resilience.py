@@ -0,0 +1,322 @@
+# llm_resilience.py
+# 道·衍 - LLM 調用的延遲感知與熔斷機制
+
+"""
+延遲感知的請求處理
+
+- LatencyTracker: 按 (agent, model) 記錄最近的回應延遲，以 p95 推算自適應超時
+- CircuitBreaker: 連續失敗達門檻後熔斷，冷卻期內直接走降級回應
+- hedged_call: 超過百分位截止時間仍未返回時，補發一個重複請求，取最先返回者
+
+所有參數在調用時從 config 讀取，方便測試時動態調整。
+"""
+
+import threading
+import time
+import concurrent.futures
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Optional, Tuple
+
+import config
+
+
+LatencyKey = Tuple[str, str]  # (agent_name, model)
+
+
+class LatencyTracker:
+    """
+    按 (agent, model) 記錄滑動視窗內的延遲樣本
+
+    樣本數不足 LATENCY_MIN_SAMPLES 時不做推算，沿用固定的 API_TIMEOUT。
+    """
+
+    def __init__(self, window_size: Optional[int] = None):
+        self.window_size = window_size or config.LATENCY_WINDOW_SIZE
+        self._samples: Dict[LatencyKey, Deque[float]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, key: LatencyKey, seconds: float):
+        """記錄一次成功請求的延遲（秒）"""
+        with self._lock:
+            samples = self._samples.get(key)
+            if samples is None:
+                samples = deque(maxlen=self.window_size)
+                self._samples[key] = samples
+            samples.append(seconds)
+
+    def percentile(self, key: LatencyKey, pct: float) -> Optional[float]:
+        """
+        計算延遲百分位（nearest-rank）
+
+        Args:
+            key: (agent_name, model)
+            pct: 0.0-1.0 之間的百分位
+
+        Returns:
+            延遲秒數；樣本不足時返回 None
+        """
+        with self._lock:
+            samples = self._samples.get(key)
+            if not samples or len(samples) < config.LATENCY_MIN_SAMPLES:
+                return None
+            ordered = sorted(samples)
+
+        index = min(len(ordered) - 1, max(0, int(round(pct * len(ordered))) - 1))
+        return ordered[index]
+
+    def adaptive_timeout(self, key: LatencyKey) -> float:
+        """
+        自適應超時 = p95 × 倍數，限制在 [API_TIMEOUT_MIN, API_TIMEOUT] 之間
+        """
+        p95 = self.percentile(key, 0.95)
+        if p95 is None:
+            return float(config.API_TIMEOUT)
+
+        timeout = p95 * config.API_TIMEOUT_P95_MULTIPLIER
+        return max(config.API_TIMEOUT_MIN, min(timeout, float(config.API_TIMEOUT)))
+
+    def hedge_delay(self, key: LatencyKey) -> Optional[float]:
+        """對沖請求的觸發時間（觀測延遲的 API_HEDGE_PERCENTILE 百分位）"""
+        if not config.API_HEDGE_ENABLED:
+            return None
+        return self.percentile(key, config.API_HEDGE_PERCENTILE)
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        """獲取各 (agent, model) 的延遲統計"""
+        stats = {}
+        for key in list(self._samples.keys()):
+            agent_name, model = key
+            stats[f"{agent_name}/{model}"] = {
+                "samples": len(self._samples[key]),
+                "p50": self.percentile(key, 0.5),
+                "p95": self.percentile(key, 0.95),
+                "timeout": self.adaptive_timeout(key),
+            }
+        return stats
+
+    def reset(self):
+        """清空所有樣本"""
+        with self._lock:
+            self._samples.clear()
+
+
+class CircuitBreaker:
+    """
+    熔斷器
+
+    狀態轉換：
+    - closed: 正常放行，連續失敗達 CIRCUIT_BREAKER_THRESHOLD 次後轉為 open
+    - open: 拒絕請求，冷卻 CIRCUIT_BREAKER_COOLDOWN 秒後轉為 half_open
+    - half_open: 放行一個探測請求，成功則 closed，失敗則重新 open
+
+    探測請求既不算成功也不算失敗時（認證錯誤、改用一般文本重試等），
+    呼叫方必須 release_probe() 歸還名額，否則熔斷器會一直停在 half_open。
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: Optional[int] = None,
+                 cooldown: Optional[float] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        self._failure_threshold = failure_threshold
+        self._cooldown = cooldown
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._probe_owner: Optional[int] = None  # 持有探測名額的線程
+
+    @property
+    def failure_threshold(self) -> int:
+        return self._failure_threshold or config.CIRCUIT_BREAKER_THRESHOLD
+
+    @property
+    def cooldown(self) -> float:
+        return self._cooldown if self._cooldown is not None else config.CIRCUIT_BREAKER_COOLDOWN
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self) -> str:
+        if self._state == self.OPEN and self._clock() - self._opened_at >= self.cooldown:
+            self._state = self.HALF_OPEN
+            self._probe_in_flight = False
+            self._probe_owner = None
+        return self._state
+
+    def allow_request(self) -> bool:
+        """是否允許發出請求"""
+        with self._lock:
+            state = self._current_state()
+            if state == self.CLOSED:
+                return True
+            if state == self.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                self._probe_owner = threading.get_ident()
+                return True
+            return False
+
+    def release_probe(self):
+        """
+        歸還目前線程持有的探測名額（不改變狀態；已記錄成功 / 失敗或沒有持有名額時不做任何事）
+
+        每次嘗試結束都可以呼叫（try/finally），保證探測名額不會洩漏。
+        """
+        with self._lock:
+            if self._probe_in_flight and self._probe_owner == threading.get_ident():
+                self._probe_in_flight = False
+                self._probe_owner = None
+
+    def record_success(self):
+        """記錄成功（關閉熔斷器）"""
+        with self._lock:
+            self._state = self.CLOSED
+            self._consecutive_failures = 0
+            self._probe_in_flight = False
+            self._probe_owner = None
+
+    def record_failure(self):
+        """記錄失敗（達門檻或探測失敗時打開熔斷器）"""
+        with self._lock:
+            self._consecutive_failures += 1
+            if (self._current_state() == self.HALF_OPEN
+                    or self._consecutive_failures >= self.failure_threshold):
+                self._state = self.OPEN
+                self._opened_at = self._clock()
+                self._probe_in_flight = False
+                self._probe_owner = None
+
+
+class HedgeTimeoutError(TimeoutError):
+    """所有請求（含對沖請求）都未在超時內返回"""
+
+
+_executor: Optional[concurrent.futures.ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> concurrent.futures.ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = concurrent.futures.ThreadPoolExecutor(
+                max_workers=config.API_HEDGE_MAX_WORKERS,
+                thread_name_prefix="llm-hedge"
+            )
+        return _executor
+
+
+def hedged_call(request_fn: Callable[[float], Any], timeout: float,
+                hedge_delay: Optional[float] = None) -> Tuple[Any, bool]:
+    """
+    發出請求；若 hedge_delay 秒後仍未返回，補發一個重複請求，取最先成功者
+
+    Args:
+        request_fn: 接受「剩餘超時秒數」的請求函數
+        timeout: 總超時（秒）
+        hedge_delay: 對沖觸發時間（秒），None 表示不對沖
+
+    Returns:
+        (結果, 是否觸發了對沖)
+
+    Raises:
+        HedgeTimeoutError: 超時前沒有任何請求返回
+        Exception: 所有請求都失敗時，拋出第一個請求的異常
+    """
+    if hedge_delay is None or hedge_delay >= timeout:
+        return request_fn(timeout), False
+
+    executor = _get_executor()
+    start = time.monotonic()
+    deadline = start + timeout
+    pending = {executor.submit(request_fn, timeout)}
+    errors = []
+    hedged = False
+
+    while pending:
+        now = time.monotonic()
+        if now >= deadline:
+            break
+
+        wait_until = deadline
+        if not hedged:
+            wait_until = min(deadline, start + hedge_delay)
+
+        done, pending = concurrent.futures.wait(
+            pending, timeout=max(0.0, wait_until - now),
+            return_when=concurrent.futures.FIRST_COMPLETED
+        )
+
+        for future in done:
+            error = future.exception()
+            if error is None:
+                if hedged:
+                    llm_metrics["hedge_wins"] += 1
+                return future.result(), hedged
+            errors.append(error)
+
+        if not done and not hedged and time.monotonic() < deadline:
+            # 主請求超過百分位截止時間：補發對沖請求
+            hedged = True
+            llm_metrics["hedged"] += 1
+            remaining = deadline - time.monotonic()
+            pending.add(executor.submit(request_fn, remaining))
+
+    if errors and not pending:
+        raise errors[0]
+
+    llm_metrics["timeouts"] += 1
+    raise HedgeTimeoutError(f"請求在 {timeout:.1f} 秒內未返回")
+
+
+# ============ 全局實例 ============
+latency_tracker = LatencyTracker()
+
+_circuit_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+# 調用統計（供 DEBUG 與測試觀察）
+llm_metrics: Dict[str, int] = {
+    "hedged": 0,           # 觸發對沖的次數
+    "hedge_wins": 0,       # 對沖後成功返回的次數
+    "timeouts": 0,         # 對沖後仍超時的次數
+    "short_circuited": 0,  # 熔斷期間被直接拒絕的次數
+    "coalesced": 0,        # 與相同的在途請求合併、共享結果的次數
+    "stream_early_stops": 0,  # 串流中途已得到完整結果、提前結束的次數
+    "stream_fallbacks": 0,    # 串流失敗、退回一般調用的次數
+    "repairs": 0,             # Director 修復模式成功套用補丁的次數
+}
+
+
+def get_circuit_breaker(model: str) -> CircuitBreaker:
+    """獲取指定模型的熔斷器（每個上游模型一個）"""
+    with _breakers_lock:
+        breaker = _circuit_breakers.get(model)
+        if breaker is None:
+            breaker = CircuitBreaker()
+            _circuit_breakers[model] = breaker
+        return breaker
+
+
+def get_llm_metrics() -> Dict[str, Any]:
+    """獲取 LLM 調用統計"""
+    return {
+        **llm_metrics,
+        "latency": latency_tracker.get_stats(),
+        "breakers": {model: b.state for model, b in _circuit_breakers.items()},
+    }
+
+
+def reset_resilience_state():
+    """重置延遲樣本、熔斷器與統計（用於測試）"""
+    latency_tracker.reset()
+    with _breakers_lock:
+        _circuit_breakers.clear()
+    for key in llm_metrics:
+        llm_metrics[key] = 0
@@ -11,7 +11,7 @@ from npc_manager import npc_manager
 from action_cache import action_cache, NON_CACHEABLE_INTENTS
 from agent import (
     agent_observer, agent_logic, agent_drama,
-    agent_director, generate_opening_scene,
+    agent_director, agent_director_repair, generate_opening_scene,
     call_logic_and_drama_parallel
 )
 from world_map import (
@@ -21,12 +21,16 @@ from world_map import (
 )
 from world_data import get_location_name, normalize_direction
 from time_engine import advance_game_time, load_game_time
+from save_scheduler import SaveScheduler
+from npc_relations import affinity_cache
 
 class DaoGame:
     def __init__(self):
         self.player_id: Optional[int] = None
         self.player_state: Optional[Dict[str, Any]] = None
         self.is_new_game = False
+        self.saver = SaveScheduler(lambda: game_db)
+        self._critical_save = False  # 本回合有關鍵變化（突破、死亡），結束時立即存檔
     
     def print_banner(self):
         """顯示標題"""
@@ -191,9 +195,6 @@ class DaoGame:
             f"在{get_location_name(current_loc_id)}休息，恢復了{actual_recovery}點法力"
         )
 
-        # 存檔
-        self.save_game()
-
     def _handle_cultivate(self):
         """處理修煉指令（累積修煉進度）"""
         from cultivation import cultivate, get_cultivation_status
@@ -236,9 +237,6 @@ class DaoGame:
             f"修煉獲得 {result['progress_gained']} 點進度"
         )
 
-        # 存檔
-        self.save_game()
-
     def _handle_breakthrough(self):
         """處理突破指令（嘗試境界突破）"""
         from cultivation import can_breakthrough, attempt_breakthrough, get_tier_display_name
@@ -297,11 +295,12 @@ class DaoGame:
             self.player_id,
             self.player_state.get('location', '未知'),
             event_type,
-            result['narrative_hint']
+            result['narrative_hint'],
+            state_changes=state_changes
         )
 
-        # 存檔
-        self.save_game()
+        # 突破屬關鍵事件：本回合結束時立即存檔（事件已先寫入日誌）
+        self._critical_save = True
 
     def show_thinking_tip(self):
         """顯示隨機提示（在 AI 處理期間減少等待感）"""
@@ -362,6 +361,9 @@ class DaoGame:
         self.player_id = result['player_id']
         self.player_state = result['state']
         self.is_new_game = True
+        if not affinity_cache.load(self.player_id):
+            print("[ERROR] 上一個角色的 NPC 好感度尚未寫回，請稍後再讀取此角色")
+            return False
         
         print(f"\n✓ 角色創建成功！歡迎, {player_name}!")
         return True
@@ -379,6 +381,13 @@ class DaoGame:
         self.player_id = result['player_id']
         self.player_state = result['state']
         self.is_new_game = False
+        if not affinity_cache.load(self.player_id):
+            print("[ERROR] 上一個角色的 NPC 好感度尚未寫回，請稍後再試")
+            return False
+        if result.get('recovered_deltas'):
+            print(f"[INFO] 上次遊戲在存檔前中斷，已從狀態日誌恢復 {result['recovered_deltas']} 個指令的進度")
+        if result.get('unsaved_events'):
+            print(f"[WARNING] 最後 {result['unsaved_events']} 個事件發生在指令中途，未反映在存檔中")
 
         # 載入時間系統
         current_tick = self.player_state.get('current_tick', 0)
@@ -388,17 +397,32 @@ class DaoGame:
         return True
     
     def list_saves(self):
-        """列出所有存檔"""
+        """列出存檔（依最後保存時間分頁；輸入文字以名稱前綴搜尋）"""
+        from save_browser import browse_players, format_summary
+
         print("\n【存檔列表】")
-        players = game_db.list_all_players()
-        
-        if not players:
-            print("(沒有存檔)")
-            return
-        
-        for i, p in enumerate(players, 1):
-            print(f"{i}. {p['name']} - 創建於 {p['created_at']} | 最後保存 {p['last_save_at']}")
-    
+        prefix, after, number = None, None, 0
+        while True:
+            page = browse_players(game_db, after=after, prefix=prefix)
+            if not page.saves and number == 0:
+                if not prefix:
+                    print("(沒有存檔)")
+                    return
+                print(f"(沒有名稱以「{prefix}」開頭的存檔)")
+            for save in page.saves:
+                number += 1
+                print(f"{number}. {format_summary(save)}")
+
+            hint = "n 下一頁 / " if page.next_after else ""
+            choice = input(f"\n[{hint}輸入名稱前綴搜尋 / Enter 返回] ").strip()
+            if not choice:
+                return
+            if choice.lower() == "n" and page.next_after:
+                after = page.next_after
+                continue
+            prefix, after, number = choice, None, 0
+            print(f"\n【名稱以「{prefix}」開頭的存檔】")
+
     def generate_opening(self):
         """開局劇情"""
         print("\n╔═ 【開局劇情】 ═╗\n")
@@ -415,8 +439,6 @@ class DaoGame:
         print(f"\n歡迎來到 {config.GAME_TITLE}")
         print("輸入 'help' 查看命令，輸入 'quit' 退出遊戲\n")
         
-        turn_count = 0
-        
         while True:
             self.print_status()
             self.show_quick_commands()  # 顯示快捷命令
@@ -427,7 +449,12 @@ class DaoGame:
                 continue
             
             if user_input.lower() == "quit":
-                self.save_game()
+                affinity_cache.flush()
+                self.saver.close(self.player_id, self.player_state)
+                if config.DEBUG:
+                    stats = self.saver.stats
+                    print(f"[DB] 本次標記存檔 {stats['marked']} 次：實際寫入 {stats['written']} 次，"
+                          f"合併 {stats['coalesced']} 次，立即寫入 {stats['immediate']} 次")
                 print("\n遊戲已保存，再見！")
                 break
             
@@ -439,8 +466,15 @@ class DaoGame:
                 self.save_game()
                 continue
 
+            # 快速旅行：goto <地點>（自動規劃路線，一回合抵達，不經過 AI）
+            if user_input.lower() == 'goto' or user_input.lower().startswith('goto '):
+                self.handle_travel_command(user_input[4:].strip())
+                self.end_turn()
+                continue
+
             # 優先檢查即時行動（不需要 AI 處理）
             if self.handle_instant_action(user_input):
+                self.end_turn()
                 continue  # 已處理完成，跳過 AI 流程
 
             # 處理快捷命令
@@ -453,23 +487,13 @@ class DaoGame:
             # 🎯 核心修復：檢查是否為方向輸入
             # 方向輸入直接處理，不需要經過 Observer（繞過 AI）
             if self.is_direction_input(processed_input):
-                if self.handle_direction_movement(processed_input):
-                    turn_count += 1
-                    # 定期自動存檔
-                    if turn_count % config.AUTO_SAVE_INTERVAL == 0:
-                        self.save_game()
-                        print(f"[系統] 自動存檔完成（回合 {turn_count}）")
+                self.handle_direction_movement(processed_input)
+                self.end_turn()
                 continue  # 方向移動已處理完成，跳過 AI 流程
 
             # 遊戲主流程（需要 AI 推理）
             self.process_action(processed_input)
-
-            turn_count += 1
-
-            # 定期自動存檔（降低丟失進度的風險）
-            if turn_count % config.AUTO_SAVE_INTERVAL == 0:
-                self.save_game()
-                print(f"[系統] 自動存檔完成（回合 {turn_count}）")
+            self.end_turn()
     
     def process_action(self, user_input: str):
         """處理玩家行動（帶上下文記憶 + 智能快取）"""
@@ -502,7 +526,8 @@ class DaoGame:
                     game_db.log_event(
                         self.player_id, self.player_state['location'],
                         cached_result.get('event_type', 'ACTION'),
-                        cached_result['narrative'][:150]
+                        cached_result['narrative'][:150],
+                        state_changes=cached_result['state_update']
                     )
                     print(f"\n{cached_result['narrative']}")
 
@@ -581,6 +606,22 @@ class DaoGame:
                 target_npc = npc_manager.get_npc(intent['target']) or \
                             npc_manager.get_npc_by_name(intent['target'])
 
+            # 長期記憶：按地點 / 目標 NPC / 意圖挑出最相關的事件（見 memory.py）
+            memories = game_db.recall_memories(
+                self.player_id,
+                location=self.player_state.get('location'),
+                npc_id=target_npc.get('id') if target_npc else None,
+                intent=intent_type,
+                keywords=[intent.get('target') or ''],
+            )
+
+            # 目標不是 NPC 時（如「長老給的那株靈草」），全文檢索提到它的舊事件，補進記憶
+            if intent.get('target') and not target_npc and intent_type != 'MOVE':
+                known_ids = {memory.get('id') for memory in memories}
+                found = [event for event in game_db.search_events(self.player_id, intent['target'], limit=3)
+                         if event['id'] not in known_ids]
+                memories = sorted(memories + found, key=lambda event: event['id'], reverse=True)
+
             # 構建地圖上下文
             current_location_id = self.player_state.get('location_id', 'qingyun_foot')
             world_map_context = get_location_context(current_location_id)
@@ -590,29 +631,32 @@ class DaoGame:
                 print("\n⏳ 平行調用邏輯派和戲劇派...")
 
             logic_report, drama_proposal = call_logic_and_drama_parallel(
-                self.player_state, intent, target_npc, recent_events, world_map_context
+                self.player_state, intent, target_npc, memories, world_map_context
             )
 
             if config.DEBUG:
                 self.display_agent_debate(logic_report, drama_proposal)
 
-            # 第 3 步：決策（帶上下文）
+            from validators import (
+                validator, auto_fix_state, validate_npc_existence,
+                validate_location_rules, StreamingValidator
+            )
+
+            # 第 3 步：決策（帶上下文；串流時決策 JSON 一閉合就完成驗證）
+            stream_validator = StreamingValidator(self.player_state, intent_type) \
+                if config.API_STREAMING_ENABLED else None
             decision = agent_director(
                 self.player_state, logic_report, drama_proposal,
-                intent, target_npc, recent_events
+                intent, target_npc, memories,
+                stream_validator=stream_validator
             )
 
             # 第 3.5 步：數據一致性驗證（三層策略）
             narrative = decision.get('narrative', '發生了某件奇異的事情。')
             state_update = decision.get('state_update', {})
 
-            from validators import (
-                validator, auto_fix_state, validate_npc_existence,
-                validate_location_rules
-            )
-
             # NPC 白名單驗證
-            is_npc_valid, invalid_npcs = validate_npc_existence(decision, recent_events)
+            is_npc_valid, invalid_npcs = validate_npc_existence(decision, memories)
             if not is_npc_valid:
                 if config.DEBUG:
                     print(f"  ⚠️  檢測到未註冊 NPC: {invalid_npcs}")
@@ -631,7 +675,11 @@ class DaoGame:
                 decision['narrative'] = narrative
                 decision['state_update'] = state_update
 
-            validation = validator.validate(narrative, state_update, self.player_state, intent_type)
+            # 串流中已驗證過的結果可直接沿用（NPC 白名單修改過決策時重新驗證）
+            if stream_validator is not None and stream_validator.matches(narrative, state_update):
+                validation = stream_validator.result
+            else:
+                validation = validator.validate(narrative, state_update, self.player_state, intent_type)
 
             # 顯示警告（Level 1 - 不阻止）
             if config.DEBUG and validation['warnings']:
@@ -655,20 +703,42 @@ class DaoGame:
                     print("\n⚠️  檢測到數據不一致，正在修正...")
                     for error in validation['errors']:
                         print(f"  {error}")
-                    print("\n  🔄 Level 2: 重新調用 Director...")
 
-                error_feedback = "\n".join(validation['errors'])
+                # Level 2a: 修復模式（只修正出錯的欄位）
+                repaired = None
+                if config.DIRECTOR_REPAIR_ENABLED and validation.get('error_fields'):
+                    if config.DEBUG:
+                        print("\n  🩹 Level 2: 請 Director 修正出錯的欄位...")
+                    repaired = agent_director_repair(narrative, state_update, validation, self.player_state)
+                    if repaired:
+                        repaired_validation = validator.validate(
+                            repaired['narrative'], repaired['state_update'],
+                            self.player_state, intent_type
+                        )
+                        if repaired_validation['valid']:
+                            narrative = repaired['narrative']
+                            state_update = repaired['state_update']
+                            validation = repaired_validation
+                        else:
+                            repaired = None
+
+                # Level 2b: 修復失敗時，完整重新調用 Director
+                if not repaired:
+                    if config.DEBUG:
+                        print("\n  🔄 Level 2: 重新調用 Director...")
 
-                decision = agent_director(
-                    self.player_state, logic_report, drama_proposal,
-                    intent, target_npc, recent_events,
-                    error_feedback=error_feedback
-                )
+                    error_feedback = "\n".join(validation['errors'])
 
-                narrative = decision.get('narrative', '發生了某件奇異的事情。')
-                state_update = decision.get('state_update', {})
+                    decision = agent_director(
+                        self.player_state, logic_report, drama_proposal,
+                        intent, target_npc, memories,
+                        error_feedback=error_feedback
+                    )
 
-                validation = validator.validate(narrative, state_update, self.player_state, intent_type)
+                    narrative = decision.get('narrative', '發生了某件奇異的事情。')
+                    state_update = decision.get('state_update', {})
+
+                    validation = validator.validate(narrative, state_update, self.player_state, intent_type)
 
                 if not validation['valid']:
                     if config.DEBUG:
@@ -700,7 +770,8 @@ class DaoGame:
                 self.player_state['location'],
                 intent.get('intent', 'UNKNOWN'),
                 narrative,
-                target_npc.get('id') if target_npc else None
+                target_npc.get('id') if target_npc else None,
+                state_changes=state_update
             )
 
             # 快取結果
@@ -717,6 +788,11 @@ class DaoGame:
         finally:
             duration = time.perf_counter() - start_time
             print(f"\n⌚ 指令處理耗時 {duration:.2f} 秒")
+            if config.DEBUG:
+                from schemas import get_schema_stats
+                for name, stats in get_schema_stats().items():
+                    print(f"  [{name}] 解析 {stats['avg_parse_ms']:.3f} ms / 驗證 {stats['avg_validate_ms']:.3f} ms"
+                          f"（{stats['calls']} 次，失敗 {stats['parse_failures']}，修正欄位 {stats['fixed_fields']}）")
     
     def apply_state_update(self, update: Dict[str, Any]):
         """應用狀態更新"""
@@ -762,7 +838,7 @@ class DaoGame:
         # NPC 關係變更
         if isinstance(update.get('npc_relations_change'), dict):
             for npc_id, delta in update['npc_relations_change'].items():
-                game_db.update_npc_relation(self.player_id, npc_id, delta)
+                affinity_cache.adjust(npc_id, delta)  # 回合結束時批次寫回
         
         # 獲得技能
         if 'skills_gained' in update:
@@ -786,20 +862,9 @@ class DaoGame:
         if 'max_mp_change' in update:
             self.player_state['max_mp'] = max(10, self.player_state['max_mp'] + update['max_mp_change'])
 
-        # 智能存檔：狀態重大變化時立即存檔
-        should_save = any([
-            update.get('hp_change', 0) < -20,  # 受到重傷
-            update.get('items_gained'),  # 獲得物品
-            update.get('location_id'),  # 移動位置
-            update.get('skills_gained'),  # 獲得技能
-            update.get('tier_change'),  # 境界變化
-            update.get('cultivation_progress_change', 0) >= 20  # 獲得大量修煉進度
-        ])
-
-        if should_save:
-            self.save_game()
-            if config.DEBUG:
-                print("[系統] 狀態重大變化，自動存檔")
+        # 關鍵變化（境界變化、死亡）：本回合結束、事件寫入日誌後立即存檔；其餘由存檔排程合併寫入
+        if update.get('tier_change') or self.player_state.get('hp', 1) <= 0:
+            self._critical_save = True
 
     def show_quick_commands(self):
         """顯示快捷命令"""
@@ -848,7 +913,7 @@ class DaoGame:
             for i, npc in enumerate(npcs_here[:3], 1):  # 最多顯示 3 個
                 print(f"  t{i} - 與 {npc['name']} 對話")
 
-        print("\n  💡 或輸入完整命令（如：\"我要去靈草堂\"）")
+        print("\n  💡 或輸入完整命令（如：\"我要去靈草堂\"），遠處地點可用 goto <地點> 快速前往")
 
     def is_direction_input(self, user_input: str) -> bool:
         """
@@ -947,6 +1012,89 @@ class DaoGame:
         # 注意：不在這裡調用 print_status()，主迴圈會統一顯示
         return True
 
+    def handle_travel_command(self, target: str) -> bool:
+        """
+        快速旅行：沿最短路線一次走到目的地（繞過 Observer，見 world_graph.py）
+
+        路線只走玩家境界可進入的地點；消耗為沿途每一步的法力與時間總和。
+
+        Args:
+            target: 目的地（ID、完整名稱或短名，如「靈草堂」）；空字串時列出可前往的地點
+
+        Returns:
+            True 如果成功抵達
+            False 如果無法前往
+        """
+        from world_graph import get_world_graph
+        from cultivation import get_tier_display_name
+
+        if not self._is_action_allowed('MOVE'):
+            print("\n[提示] 此地無法移動。")
+            return False
+
+        graph = get_world_graph()
+        current_location_id = self.player_state.get('location_id', 'qingyun_foot')
+        player_tier = self.player_state.get('tier', 1.0)
+
+        if not target:
+            destinations = graph.reachable(current_location_id, player_tier)
+            if not destinations:
+                print("\n[提示] 這裡沒有可前往的地點。")
+                return False
+            print("\n【可前往的地點】（goto <地點>）")
+            for loc_id in destinations:
+                route = graph.route(current_location_id, loc_id, player_tier)
+                print(f"  {graph.name_of(loc_id)}：{len(route)} 段路，法力 {route.mp_cost}，時間 {route.time_cost} tick")
+            return False
+
+        destination_id = graph.resolve(target)
+        if not destination_id:
+            print(f"\n❌ 找不到地點 '{target}'")
+            return False
+        destination_name = graph.name_of(destination_id)
+        if destination_id == current_location_id:
+            print(f"\n[提示] 你已經在{destination_name}。")
+            return False
+
+        route = graph.route(current_location_id, destination_id, player_tier)
+        if route is None:
+            required = graph.required_tier(current_location_id, destination_id)
+            if required is None:
+                print(f"\n❌ 從{graph.name_of(current_location_id)}無法抵達{destination_name}。")
+            else:
+                print(f"\n❌ 境界不足。前往{destination_name}的路線需要{get_tier_display_name(required)}，"
+                      f"你當前是{get_tier_display_name(player_tier)}。")
+            return False
+
+        current_mp = self.player_state.get('mp', 0)
+        if current_mp < route.mp_cost:
+            print(f"\n❌ 法力不足。全程需要 {route.mp_cost} 點，當前 {current_mp} 點。")
+            return False
+
+        waypoints = [graph.name_of(loc_id) for loc_id in route.path[1:-1]]
+        narrative = f"你從{graph.name_of(current_location_id)}啟程，"
+        if waypoints:
+            narrative += f"途經{'、'.join(waypoints)}，"
+        narrative += f"一路不停，抵達了{destination_name}。"
+        print(f"\n{narrative}")
+
+        self.apply_state_update({
+            'location_id': destination_id,
+            'mp_change': -route.mp_cost
+        })
+
+        time_result = advance_game_time('MOVE', ticks=route.time_cost)
+        self.player_state['current_tick'] = time_result['new_tick']
+        print(f"⏱️  {time_result['time_description']}")
+
+        game_db.log_event(
+            player_id=self.player_id,
+            location=destination_name,
+            event_type='MOVE',
+            description=narrative
+        )
+        return True
+
     def handle_shortcut(self, user_input: str) -> Optional[str]:
         """
         處理快捷命令，轉換為完整指令
@@ -1067,10 +1215,21 @@ class DaoGame:
         print("\n⚖️  天道正在整合雙方意見，做出最終決策...")
         print("═" * 70)
 
-    def save_game(self):
-        """保存遊戲"""
+    def end_turn(self):
+        """指令處理完畢：寫回 NPC 好感度；有關鍵變化時立即存檔，否則交給存檔排程合併寫入"""
+        affinity_cache.flush()
+        if self._critical_save:
+            self._critical_save = False
+            self.save_game()
+        else:
+            self.saver.mark_dirty(self.player_id, self.player_state)
+
+    def save_game(self) -> bool:
+        """立即保存（連同存檔排程中尚未寫入的變動）"""
         if self.player_id:
-            game_db.save_player(self.player_id, self.player_state)
+            affinity_cache.flush()
+            return self.saver.flush(self.player_id, self.player_state)
+        return False
     
     def print_help(self):
         """顯示幫助"""
@@ -1093,6 +1252,7 @@ class DaoGame:
   r - 休息（安全區域且地點允許時可用）
   i - 查看背包
   l - 查看周圍環境
+  goto <地點> - 快速旅行（自動規劃路線，一回合抵達；只輸入 goto 列出可前往的地點）
 
 【情境快捷】（當有 NPC 在附近時）
   t1 - 與第 1 個 NPC 對話
@@ -1119,6 +1279,29 @@ class DaoGame:
 
         self.print_banner()
 
+        # OpenAI 客戶端延遲建立（導入 openai 約需 1 秒）；在玩家瀏覽選單時於背景預熱
+        import threading
+        from agent import client
+        threading.Thread(target=client.instance, name="openai-client-warmup", daemon=True).start()
+
+        if config.WORLD_HOT_RELOAD_ENABLED:
+            from world_registry import world_registry
+            world_registry.start_watching()
+            print(f"[INFO] 世界資料熱重載已啟用（每 {config.WORLD_RELOAD_INTERVAL:g} 秒檢查 data/*.json）")
+
+        if config.DB_MAINTENANCE_ENABLED:
+            from db_maintenance import convert_to_incremental_vacuum, maintenance_scheduler, needs_vacuum_conversion
+            from game_state import game_db
+            # 舊資料庫的 auto_vacuum 轉換是完整 VACUUM：只在進入遊戲迴圈前做，不交給背景排程
+            if config.DB_VACUUM_CONVERT_ON_STARTUP and needs_vacuum_conversion(game_db.instance()):
+                print("[INFO] 正在轉換資料庫為增量 VACUUM（僅此一次）...")
+                convert_to_incremental_vacuum(game_db.instance())
+            maintenance_scheduler.start()
+
+        if config.DB_BACKUP_ENABLED:
+            from db_backup import backup_scheduler
+            backup_scheduler.start()
+
         while True:
             choice = self.main_menu()
             
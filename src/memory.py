@@ -0,0 +1,302 @@
+# memory.py
+# 道·衍 - 長期事件記憶（重要度評分與檢索）
+
+"""
+長期事件記憶
+
+原本餵給 Agent 的上下文是 get_recent_events(limit=5)：只看最近 5 條，
+十回合前的突破、結仇、奇遇一概忘記。這裡在 event_logs 之上加一層檢索：
+
+1. 重要度：記錄事件時由事件類型、狀態變化幅度、是否牽涉 NPC 算出
+   （score_importance），存入 event_logs.importance。
+2. 檢索分數 = 新近度 × 重要度 × 相關度
+   - 新近度：以該玩家自己的事件序距離做指數衰減（半衰期 config.MEMORY_RECENCY_HALF_LIFE 條），
+     保留下限 config.MEMORY_RECENCY_FLOOR，重大事件不會被完全遺忘
+   - 相關度：與當前地點、目標 NPC、意圖類型、關鍵字相符時加權
+3. 候選集：每個玩家在記憶體中維護有界的候選結構（PlayerMemory）——
+   最近 N 條、重要度前 K 條（最小堆）、每個地點/NPC 最近 M 條。
+   檢索只對這一百多條候選打分，與玩家累積的事件總數無關；
+   冷啟動時以 event_logs 上的索引各取一次（見 GameStateManager.fetch_memories）。
+
+使用方式：
+    memories = game_db.recall_memories(player_id, location=..., npc_id=..., intent=...)
+"""
+
+import heapq
+import threading
+from collections import OrderedDict, deque
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Protocol
+
+import config
+
+
+# 事件類型的基礎重要度（Observer 意圖 + 系統事件）
+EVENT_TYPE_IMPORTANCE = {
+    "BREAKTHROUGH_SUCCESS": 8.0,
+    "BREAKTHROUGH_FAIL": 5.0,
+    "ATTACK": 4.0,
+    "SKILL_USE": 3.0,
+    "TALK": 2.5,
+    "TRADE": 2.0,
+    "USE_ITEM": 1.5,
+    "INSPECT": 1.2,
+    "CULTIVATE": 0.8,
+    "MOVE": 0.5,
+    "REST": 0.3,
+}
+DEFAULT_IMPORTANCE = 1.0
+MAX_IMPORTANCE = 10.0
+
+
+def score_importance(event_type: str, npc_involved: Optional[str] = None,
+                     state_changes: Optional[Dict[str, Any]] = None) -> float:
+    """
+    計算事件重要度（0.1 ~ MAX_IMPORTANCE）
+
+    Args:
+        event_type: 事件類型（意圖或 REST/CULTIVATE/BREAKTHROUGH_* 等）
+        npc_involved: 牽涉的 NPC ID
+        state_changes: 該事件的狀態變化（state_update 格式）
+
+    Returns:
+        重要度
+    """
+    score = EVENT_TYPE_IMPORTANCE.get(event_type, DEFAULT_IMPORTANCE)
+    if npc_involved:
+        score += 1.5
+
+    changes = state_changes if isinstance(state_changes, dict) else {}
+
+    def magnitude(key: str) -> float:
+        value = changes.get(key, 0)
+        return abs(value) if isinstance(value, (int, float)) else 0
+
+    score += min(magnitude("hp_change") / 20, 2.0)
+    score += min(magnitude("karma_change") / 10, 2.0)
+    score += min(magnitude("mp_change") / 40, 1.0)
+    if magnitude("tier_change"):
+        score += 3.0
+    for key in ("items_gained", "items_lost", "skills_gained"):
+        if changes.get(key):
+            score += 1.0
+    relations = changes.get("npc_relations_change")
+    if isinstance(relations, dict):
+        score += min(sum(abs(v) for v in relations.values() if isinstance(v, (int, float))) / 10, 2.0)
+
+    return round(min(max(score, 0.1), MAX_IMPORTANCE), 2)
+
+
+class MemoryRecord(NamedTuple):
+    """一條事件記憶（event_logs 的一行）"""
+    id: int
+    event_type: str
+    description: str
+    location: str
+    npc_involved: Optional[str]
+    importance: float
+    timestamp: Optional[str] = None
+    # 該玩家自己的事件序號（PlayerMemory 內由舊到新遞增；fetch_memories 讀出時為相對
+    # 該玩家最新事件的偏移：0 為最新、-1 為前一條），新近度以此計算，不用全局 id
+    seq: int = 0
+
+    def to_event(self) -> Dict[str, Any]:
+        """轉成與 get_recent_events 相同格式的 dict（另含 id、npc_involved、importance）"""
+        return {
+            "id": self.id,
+            "event_type": self.event_type,
+            "description": self.description or "",
+            "location": self.location,
+            "npc_involved": self.npc_involved,
+            "importance": self.importance,
+            "timestamp": self.timestamp,
+        }
+
+
+class MemorySource(Protocol):
+    """冷啟動時提供候選記憶的資料來源（GameStateManager）"""
+
+    def fetch_memories(self, player_id: int, kind: str, key: Optional[str],
+                       limit: int) -> List[MemoryRecord]:
+        """kind: recent / important / location / npc"""
+
+
+class PlayerMemory:
+    """單一玩家的候選記憶（所有結構皆有界）"""
+
+    __slots__ = ("recent", "important", "by_location", "by_npc",
+                 "loaded_locations", "loaded_npcs", "newest_seq",
+                 "important_size", "bucket_size")
+
+    def __init__(self, recent: Iterable[MemoryRecord], important: Iterable[MemoryRecord],
+                 recent_size: int, important_size: int, bucket_size: int):
+        self.recent: deque = deque(maxlen=recent_size)
+        self.important: List[tuple] = []  # 最小堆 (importance, id, record)
+        self.important_size = important_size
+        self.bucket_size = bucket_size
+        self.by_location: Dict[str, deque] = {}
+        self.by_npc: Dict[str, deque] = {}
+        self.loaded_locations = set()
+        self.loaded_npcs = set()
+        self.newest_seq = 0  # 載入時最新事件的序號；之後每個新事件 +1
+
+        for record in sorted(recent, key=lambda r: r.id):
+            self.recent.append(record)
+        for record in important:
+            self._push_important(record)
+
+    def _push_important(self, record: MemoryRecord):
+        item = (record.importance, record.id, record)
+        if len(self.important) < self.important_size:
+            heapq.heappush(self.important, item)
+        elif item > self.important[0]:
+            heapq.heapreplace(self.important, item)
+
+    @staticmethod
+    def _bucket(buckets: Dict[str, deque], key: str, size: int) -> deque:
+        bucket = buckets.get(key)
+        if bucket is None:
+            bucket = buckets[key] = deque(maxlen=size)
+        return bucket
+
+    def add(self, record: MemoryRecord):
+        """新事件寫入後更新候選結構"""
+        self.newest_seq += 1
+        record = record._replace(seq=self.newest_seq)
+        self.recent.append(record)
+        self._push_important(record)
+        # 尚未從資料庫載入的地點/NPC 不建桶，等檢索時整桶載入（避免只有新事件的殘缺桶）
+        if record.location in self.loaded_locations:
+            self._bucket(self.by_location, record.location, self.bucket_size).append(record)
+        if record.npc_involved and record.npc_involved in self.loaded_npcs:
+            self._bucket(self.by_npc, record.npc_involved, self.bucket_size).append(record)
+
+    def fill_bucket(self, kind: str, key: str, records: Iterable[MemoryRecord]):
+        buckets, loaded = ((self.by_location, self.loaded_locations) if kind == "location"
+                           else (self.by_npc, self.loaded_npcs))
+        # 讀出的 seq 相對讀取當下的最新事件，換算成本結構的序號
+        records = [record._replace(seq=self.newest_seq + record.seq) for record in records]
+        bucket = deque(sorted(records, key=lambda r: r.id), maxlen=self.bucket_size)
+        buckets[key] = bucket
+        loaded.add(key)
+
+    def candidates(self, location: Optional[str], npc_id: Optional[str]) -> Dict[int, MemoryRecord]:
+        pool = {record.id: record for record in self.recent}
+        for _, record_id, record in self.important:
+            pool[record_id] = record
+        if location:
+            for record in self.by_location.get(location, ()):
+                pool[record.id] = record
+        if npc_id:
+            for record in self.by_npc.get(npc_id, ()):
+                pool[record.id] = record
+        return pool
+
+
+class MemoryIndex:
+    """
+    各玩家的記憶候選索引（LRU 保留 config.MEMORY_MAX_PLAYERS 個玩家）
+
+    事件 id 全局遞增、各玩家的事件互相穿插，新近度改以該玩家自己的事件序（MemoryRecord.seq）
+    計算，其他玩家寫入再多事件也不會讓這個玩家的記憶衰減。
+    """
+
+    def __init__(self, recent_size: Optional[int] = None, important_size: Optional[int] = None,
+                 bucket_size: Optional[int] = None, max_players: Optional[int] = None):
+        self.recent_size = recent_size or config.MEMORY_RECENT_SIZE
+        self.important_size = important_size or config.MEMORY_IMPORTANT_SIZE
+        self.bucket_size = bucket_size or config.MEMORY_BUCKET_SIZE
+        self.max_players = max_players or config.MEMORY_MAX_PLAYERS
+        self._players: "OrderedDict[int, PlayerMemory]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __contains__(self, player_id: int) -> bool:
+        return player_id in self._players
+
+    def observe(self, player_id: int, record: MemoryRecord):
+        """記錄新事件（玩家尚未載入時略過，之後冷啟動會從資料庫讀到）"""
+        with self._lock:
+            memory = self._players.get(player_id)
+            if memory is not None:
+                memory.add(record)
+
+    def forget(self, player_id: Optional[int] = None):
+        """丟棄某玩家（或全部）的候選結構"""
+        with self._lock:
+            if player_id is None:
+                self._players.clear()
+            else:
+                self._players.pop(player_id, None)
+
+    def _memory_for(self, player_id: int, source: MemorySource,
+                    location: Optional[str], npc_id: Optional[str]) -> PlayerMemory:
+        with self._lock:
+            memory = self._players.get(player_id)
+            if memory is not None:
+                self._players.move_to_end(player_id)
+
+        if memory is None:
+            memory = PlayerMemory(
+                source.fetch_memories(player_id, "recent", None, self.recent_size),
+                source.fetch_memories(player_id, "important", None, self.important_size),
+                self.recent_size, self.important_size, self.bucket_size,
+            )
+            with self._lock:
+                memory = self._players.setdefault(player_id, memory)
+                while len(self._players) > self.max_players:
+                    self._players.popitem(last=False)
+
+        if location and location not in memory.loaded_locations:
+            records = source.fetch_memories(player_id, "location", location, self.bucket_size)
+            with self._lock:
+                memory.fill_bucket("location", location, records)
+        if npc_id and npc_id not in memory.loaded_npcs:
+            records = source.fetch_memories(player_id, "npc", npc_id, self.bucket_size)
+            with self._lock:
+                memory.fill_bucket("npc", npc_id, records)
+        return memory
+
+    def recall(self, player_id: int, source: MemorySource, location: Optional[str] = None,
+               npc_id: Optional[str] = None, intent: Optional[str] = None,
+               keywords: Iterable[str] = (), limit: int = 5) -> List[MemoryRecord]:
+        """
+        取出分數最高的記憶
+
+        Args:
+            player_id: 玩家 ID
+            source: 冷啟動資料來源
+            location: 當前地點名稱（event_logs.location）
+            npc_id: 目標 NPC ID
+            intent: 當前意圖類型
+            keywords: 意圖目標等關鍵字（出現在描述中即加權）
+            limit: 返回數量
+
+        Returns:
+            MemoryRecord 列表，由新到舊（與 get_recent_events 相同順序）
+        """
+        memory = self._memory_for(player_id, source, location, npc_id)
+        keywords = [keyword for keyword in keywords if keyword]
+
+        half_life = config.MEMORY_RECENCY_HALF_LIFE
+        floor = config.MEMORY_RECENCY_FLOOR
+        horizon = config.MEMORY_RECENCY_HORIZON
+
+        with self._lock:
+            newest_seq = memory.newest_seq
+            pool = memory.candidates(location, npc_id)
+
+        def score(record: MemoryRecord) -> float:
+            recency = floor + (1 - floor) * 0.5 ** (min(newest_seq - record.seq, horizon) / half_life)
+            relevance = 1.0
+            if location and record.location == location:
+                relevance += 1.0
+            if npc_id and record.npc_involved == npc_id:
+                relevance += 3.0
+            if intent and record.event_type == intent:
+                relevance += 0.3
+            if keywords and record.description and any(k in record.description for k in keywords):
+                relevance += 1.0
+            return recency * record.importance * relevance
+
+        # 同分（如都在新近度視界之外）時取較新的，結果與候選結構的載入順序無關
+        best = heapq.nlargest(limit, pool.values(), key=lambda record: (score(record), record.id))
+        return sorted(best, key=lambda record: record.id, reverse=True)
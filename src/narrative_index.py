@@ -0,0 +1,223 @@
+# narrative_index.py
+# 道·衍 - 敘述的子句/出現位置索引（供 ConsistencyValidator 使用）
+
+"""
+敘述分析索引
+
+舊的輔助判斷（否定、主語、意圖）都用 text.find(keyword)，只看關鍵詞第一次出現：
+「你沒有獲得靈石…後來獲得了靈草」會因第一個「獲得」是否定句而整體判定為否定，
+導致不必要的 Level 2 重新調用。
+
+這裡把敘述切成子句一次，對每個關鍵詞的「每一次出現」標記：
+- negated：否定句（「沒有獲得」）
+- intention：只是意圖（「打算前往」）
+- player_subject：主語是玩家（「你受傷」 vs 「靈獸受傷」）
+
+判斷規則：
+- 否定詞/意圖詞只作用於同一子句內、其後的第一個行為關鍵詞
+  （「沒有獲得…後來獲得了」中，第二個「獲得」不受「沒有」影響）
+- 主語沿用原有規則，但以每次出現的位置為準，「受傷的XXX」只在同一子句內找
+
+使用方式：
+    index = NarrativeIndex(narrative, automaton.scan(narrative))
+    for occurrence in index.occurrences('獲得'):
+        if not occurrence.negated: ...
+"""
+
+import bisect
+import re
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from keyword_automaton import KeywordHits, KeywordMatch
+from keyword_tables import (
+    NPC_INDICATORS, PLAYER_INDICATORS,
+    NEGATIVE_WORDS, INTENTION_WORDS, SUBJECT_NPC_WORDS,
+    NPC_PRONOUNS, PLAYER_PRONOUNS, CLAUSE_SEPARATORS
+)
+
+
+# 否定詞、意圖詞的作用範圍（關鍵詞前 N 字，且不跨子句）
+NEGATION_WINDOW = 10
+INTENTION_WINDOW = 8
+# 主語判斷的前文/後文範圍
+SUBJECT_WINDOW_BEFORE = 30
+SUBJECT_WINDOW_AFTER = 10
+
+_CLAUSE_BREAK = re.compile("[" + re.escape("".join(CLAUSE_SEPARATORS)) + "]")
+
+
+class Clause(NamedTuple):
+    """一個子句（[start, end)，不含分隔符）及其上下文旗標"""
+    start: int
+    end: int
+    has_negation: bool
+    has_intention: bool
+    has_npc_word: bool
+
+
+class Occurrence(NamedTuple):
+    """關鍵詞的一次出現"""
+    keyword: str
+    start: int
+    clause: int
+    negated: bool
+    intention: bool
+    player_subject: bool
+
+
+def _last_word_end(text: str, words: List[str], lo: int, hi: int) -> int:
+    """[lo, hi) 內最後出現的詞的結束位置，沒有則 -1"""
+    last_end = -1
+    for word in words:
+        pos = text.rfind(word, lo, hi)
+        if pos != -1 and pos + len(word) > last_end:
+            last_end = pos + len(word)
+    return last_end
+
+
+class NarrativeIndex:
+    """
+    一段敘述的子句與關鍵詞出現索引
+
+    子句切分在建構時完成一次；子句旗標與每個關鍵詞的出現分析按需計算並快取，
+    所以敘述很長但觸發詞很少時，成本只落在有觸發詞的子句上。
+
+    Args:
+        text: 敘述
+        hits: 同一段敘述的關鍵詞掃描結果（KeywordAutomaton.scan）
+    """
+
+    def __init__(self, text: str, hits: KeywordHits):
+        self.text = text
+        self.hits = hits
+        # 各子句的結束位置（分隔符位置；最後一個子句到文末）
+        self._clause_ends = [m.start() for m in _CLAUSE_BREAK.finditer(text)]
+        self._clause_ends.append(len(text))
+        self._clauses: Dict[int, Clause] = {}
+        self._occurrences: Dict[Tuple[str, int], Occurrence] = {}
+        # 所有觸發詞的位置（否定詞/意圖詞只作用到其後第一個觸發詞；首次需要時才排序）
+        self._triggers: Optional[List[KeywordMatch]] = None
+        self._trigger_starts: List[int] = []
+
+    def clause_of(self, pos: int) -> int:
+        """位置所在子句的編號"""
+        return min(bisect.bisect_right(self._clause_ends, pos), len(self._clause_ends) - 1)
+
+    def clause(self, number: int) -> Clause:
+        """子句（含上下文旗標，首次查詢時計算）"""
+        cached = self._clauses.get(number)
+        if cached is not None:
+            return cached
+        start = self._clause_ends[number - 1] + 1 if number > 0 else 0
+        end = self._clause_ends[number]
+        body = self.text[start:end]
+        clause = Clause(
+            start, end,
+            any(word in body for word in NEGATIVE_WORDS),
+            any(word in body for word in INTENTION_WORDS),
+            any(word in body for word in SUBJECT_NPC_WORDS),
+        )
+        self._clauses[number] = clause
+        return clause
+
+    def occurrence(self, keyword: str, start: int) -> Occurrence:
+        """關鍵詞在 start 處這一次出現的分析結果（首次查詢時計算）"""
+        key = (keyword, start)
+        cached = self._occurrences.get(key)
+        if cached is not None:
+            return cached
+        number = self.clause_of(start)
+        clause = self.clause(number)
+        occurrence = Occurrence(
+            keyword, start, number,
+            clause.has_negation and self._is_scoped(NEGATIVE_WORDS, start, clause, NEGATION_WINDOW),
+            clause.has_intention and self._is_scoped(INTENTION_WORDS, start, clause, INTENTION_WINDOW),
+            self._is_player_subject(start, clause),
+        )
+        self._occurrences[key] = occurrence
+        return occurrence
+
+    def occurrences(self, keyword: str) -> List[Occurrence]:
+        """關鍵詞每一次出現的分析結果（按位置排序）"""
+        return [self.occurrence(keyword, start) for start in self.hits.positions(keyword)]
+
+    def first_affirmed(self, keyword: str) -> Optional[Occurrence]:
+        """第一次非否定的出現"""
+        for start in self.hits.positions(keyword):
+            occurrence = self.occurrence(keyword, start)
+            if not occurrence.negated:
+                return occurrence
+        return None
+
+    def first_actual(self, keyword: str) -> Optional[Occurrence]:
+        """第一次非意圖的出現"""
+        for start in self.hits.positions(keyword):
+            occurrence = self.occurrence(keyword, start)
+            if not occurrence.intention:
+                return occurrence
+        return None
+
+    def _is_scoped(self, words: List[str], start: int, clause: Clause, window: int) -> bool:
+        """
+        同一子句、關鍵詞前 window 字內有修飾詞，且修飾詞與關鍵詞之間沒有別的完整觸發詞
+        """
+        word_end = _last_word_end(self.text, words, max(clause.start, start - window), start)
+        if word_end == -1:
+            return False
+        if self._triggers is None:
+            self._triggers = self.hits.matches
+            self._trigger_starts = [match.start for match in self._triggers]
+        index = bisect.bisect_left(self._trigger_starts, word_end)
+        while index < len(self._triggers) and self._triggers[index].start < start:
+            if self._triggers[index].end <= start:
+                return False
+            index += 1
+        return True
+
+    def _is_player_subject(self, start: int, clause: Clause) -> bool:
+        """
+        這次出現的主語是否為玩家
+
+        - "你受了重傷" → True
+        - "霜焰獅受了重傷" → False
+        - "你一劍刺中霜焰獅，牠痛苦地吼叫" → False（以最近的主語為準）
+        """
+        text = self.text
+        before_start = max(0, start - SUBJECT_WINDOW_BEFORE)
+
+        if clause.has_npc_word:
+            # 同一子句內，關鍵詞前有 NPC 詞（「靈獸受傷」）
+            clause_before = text[max(before_start, clause.start):start]
+            if any(word in clause_before for word in SUBJECT_NPC_WORDS):
+                return False
+
+            # 同一子句內「受傷的靈獸」
+            context_after = text[start:min(start + SUBJECT_WINDOW_AFTER, clause.end)]
+            for npc_word in SUBJECT_NPC_WORDS:
+                npc_pos = context_after.find(npc_word)
+                if npc_pos != -1 and '的' in context_after[:npc_pos]:
+                    return False
+
+        context_before = text[before_start:start]
+
+        # 最接近關鍵詞的代詞
+        closest_pronoun = None
+        closest_pos = -1
+        for pronoun in NPC_PRONOUNS + PLAYER_PRONOUNS:
+            pos = context_before.rfind(pronoun)
+            if pos > closest_pos:
+                closest_pos = pos
+                closest_pronoun = pronoun
+
+        if closest_pronoun in NPC_PRONOUNS:
+            return False
+        if closest_pronoun in PLAYER_PRONOUNS:
+            return True
+
+        if any(indicator in context_before for indicator in NPC_INDICATORS):
+            return False
+        if any(indicator in context_before for indicator in PLAYER_INDICATORS):
+            return True
+
+        # 無法判斷時保守判定為玩家（觸發驗證，由 Director 修正）
+        return True
@@ -1,48 +1,166 @@
 # npc_manager.py
 # 道·衍 - NPC 管理系統
 
-import json
 import os
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Iterable
 import config
+from world_registry import world_registry
+from lazy_init import LazyProxy
 
 class NPCManager:
+    """
+    NPC 註冊表
+
+    除了 id → NPC 的主表外，載入時建立名稱、別名/稱號、地點三個索引，
+    所有查詢都是字典查找（每回合的快捷命令、NPC 白名單驗證、Drama 上下文都會頻繁查詢）。
+    新增/更新/移除 NPC 請使用 add_npc / update_npc / remove_npc，索引會同步維護；
+    直接修改 self.npcs 後需調用 rebuild_indexes()。
+    """
+
     def __init__(self):
         self.npcs: Dict[str, Dict[str, Any]] = {}
+        self._by_name: Dict[str, str] = {}
+        self._by_alias: Dict[str, str] = {}
+        self._by_location: Dict[str, List[str]] = {}
         self.load_npcs()
     
-    def load_npcs(self):
-        """從 JSON 文件加載 NPC 數據"""
-        npc_file = config.DATA_PATH / "npcs.json"
-
-        if not npc_file.exists():
-            print(f"[WARNING] NPC 文件不存在: {npc_file}")
-            print("[INFO] 請確保 data/npcs.json 檔案存在")
-            return
-
-        try:
-            with open(npc_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                self.npcs = {npc['id']: npc for npc in data.get('npcs', [])}
-
-            if config.DEBUG:
-                print(f"[NPC] 成功加載 {len(self.npcs)} 個 NPC")
-        except json.JSONDecodeError as e:
-            print(f"[ERROR] NPC JSON 格式錯誤: {e}")
-        except (IOError, OSError) as e:
-            print(f"[ERROR] NPC 檔案讀取失敗: {type(e).__name__}: {e}")
+    def load_npcs(self, snapshot=None):
+        """
+        從世界資料快照加載 NPC 數據（npcs.json 由 world_registry 統一載入）
+
+        熱重載替換快照時會再次調用，以新資料重建主表與索引；
+        執行期間以 add_npc / update_npc 做的修改不會保留。
+        """
+        snapshot = snapshot or world_registry.snapshot
+
+        if not snapshot.npcs:
+            npc_file = world_registry.data_path / "npcs.json"
+            if not npc_file.exists():
+                print(f"[WARNING] NPC 文件不存在: {npc_file}")
+                print("[INFO] 請確保 data/npcs.json 檔案存在")
+                return
+
+        # 複製條目：update_npc 會原地修改，快照內容必須保持不變
+        self.npcs = {npc['id']: dict(npc) for npc in snapshot.npcs if 'id' in npc}
+        self.rebuild_indexes()
+
+        if config.DEBUG:
+            print(f"[NPC] 成功加載 {len(self.npcs)} 個 NPC")
     
+    # ============ 索引維護 ============
+
+    def rebuild_indexes(self):
+        """從主表重建所有索引"""
+        self._by_name = {}
+        self._by_alias = {}
+        self._by_location = {}
+        for npc in self.npcs.values():
+            self._index_npc(npc)
+
+    def _index_npc(self, npc: Dict[str, Any]):
+        npc_id = npc['id']
+        # 重名時以先載入者為準（與原本線性掃描的結果一致）
+        if npc.get('name'):
+            self._by_name.setdefault(npc['name'], npc_id)
+        for alias in [npc.get('title')] + list(npc.get('aliases', [])):
+            if alias:
+                self._by_alias.setdefault(alias, npc_id)
+        location_id = npc.get('location_id')
+        if location_id:
+            self._by_location.setdefault(location_id, []).append(npc_id)
+
+    def _unindex_npc(self, npc: Dict[str, Any]):
+        npc_id = npc['id']
+        if self._by_name.get(npc.get('name')) == npc_id:
+            del self._by_name[npc['name']]
+        for alias in [npc.get('title')] + list(npc.get('aliases', [])):
+            if alias and self._by_alias.get(alias) == npc_id:
+                del self._by_alias[alias]
+        location_ids = self._by_location.get(npc.get('location_id'))
+        if location_ids and npc_id in location_ids:
+            location_ids.remove(npc_id)
+
+    def _restore_shadowed(self, npc: Dict[str, Any]):
+        """移除後，讓被遮蔽的同名/同別名 NPC 重新進入索引"""
+        keys = {npc.get('name')} | {npc.get('title')} | set(npc.get('aliases', []))
+        for other in self.npcs.values():
+            if other['id'] == npc['id']:
+                continue
+            if other.get('name') in keys:
+                self._by_name.setdefault(other['name'], other['id'])
+            for alias in [other.get('title')] + list(other.get('aliases', [])):
+                if alias in keys:
+                    self._by_alias.setdefault(alias, other['id'])
+
+    def add_npc(self, npc: Dict[str, Any]):
+        """新增（或覆蓋）一個 NPC"""
+        if npc['id'] in self.npcs:
+            self.remove_npc(npc['id'])
+        self.npcs[npc['id']] = npc
+        self._index_npc(npc)
+
+    def update_npc(self, npc_id: str, **changes) -> Optional[Dict[str, Any]]:
+        """
+        更新 NPC 欄位（如 location_id、name），索引同步更新
+
+        Returns:
+            更新後的 NPC；不存在時返回 None
+        """
+        npc = self.npcs.get(npc_id)
+        if npc is None:
+            return None
+        self._unindex_npc(npc)
+        self._restore_shadowed(npc)
+        npc.update(changes)
+        self._index_npc(npc)
+        location_ids = self._by_location.get(npc.get('location_id'))
+        if location_ids:
+            # 保持地點內的順序與主表一致（t1/t2 快捷命令依賴此順序）
+            order = {other_id: index for index, other_id in enumerate(self.npcs)}
+            location_ids.sort(key=order.__getitem__)
+        return npc
+
+    def remove_npc(self, npc_id: str) -> Optional[Dict[str, Any]]:
+        """移除 NPC，返回被移除的 NPC"""
+        npc = self.npcs.pop(npc_id, None)
+        if npc is not None:
+            self._unindex_npc(npc)
+            self._restore_shadowed(npc)
+        return npc
+
+    # ============ 查詢 ============
+
     def get_npc(self, npc_id: str) -> Optional[Dict[str, Any]]:
         """獲取單個 NPC"""
         return self.npcs.get(npc_id)
     
     def get_npc_by_name(self, npc_name: str) -> Optional[Dict[str, Any]]:
-        """通過名稱查詢 NPC"""
-        for npc in self.npcs.values():
-            if npc_name in [npc.get('name'), npc.get('id')]:
-                return npc
-        return None
-    
+        """通過名稱查詢 NPC（名稱或 ID；都不符時再查稱號/別名）"""
+        npc_id = self.resolve_name(npc_name)
+        return self.npcs.get(npc_id) if npc_id else None
+
+    def resolve_name(self, name: str) -> Optional[str]:
+        """
+        把名稱、ID、稱號或別名解析成 NPC ID
+
+        優先順序：名稱 > ID > 稱號/別名
+        """
+        npc_id = self._by_name.get(name)
+        if npc_id is not None:
+            return npc_id
+        if name in self.npcs:
+            return name
+        return self._by_alias.get(name)
+
+    def resolve_names(self, names: Iterable[str]) -> Dict[str, Optional[str]]:
+        """
+        批次解析名稱（見 resolve_name）
+
+        Returns:
+            {名稱: NPC ID 或 None}
+        """
+        return {name: self.resolve_name(name) for name in names}
+
     def get_npcs_by_location(self, location_id: str) -> List[Dict[str, Any]]:
         """
         獲取某地點的所有 NPC（只使用 location_id）
@@ -51,12 +169,9 @@ class NPCManager:
             location_id: 地點 ID（如 "qingyun_foot"）
 
         Returns:
-            該地點的所有 NPC 列表
+            該地點的所有 NPC 列表（按載入順序）
         """
-        return [
-            npc for npc in self.npcs.values()
-            if npc.get('location_id') == location_id
-        ]
+        return [self.npcs[npc_id] for npc_id in self._by_location.get(location_id, ())]
     
     def get_all_npcs(self) -> List[Dict[str, Any]]:
         """獲取所有 NPC"""
@@ -64,18 +179,15 @@ class NPCManager:
 
     def get_npc_id_by_name(self, name: str) -> Optional[str]:
         """
-        根據 NPC 名稱查找 ID
+        根據 NPC 名稱查找 ID（只比對名稱；要同時比對稱號/別名請用 resolve_name）
 
         Args:
-            name: NPC 名稱（如 "青雲門掌門"）
+            name: NPC 名稱（如 "玄靈子"）
 
         Returns:
             NPC ID（如 "npc_001_master_qingyun"），如果沒找到則返回 None
         """
-        for npc_id, npc_data in self.npcs.items():
-            if npc_data.get('name') == name:
-                return npc_id
-        return None
+        return self._by_name.get(name)
     
     def format_npc_info(self, npc: Dict[str, Any]) -> str:
         """格式化 NPC 信息用於 AI 提示（顯示時轉換為中文）"""
@@ -93,5 +205,15 @@ ID: {npc.get('id')}
 """
 
 
-# 全局實例
-npc_manager = NPCManager()
+# 全局實例（第一次使用時才從世界資料建立）
+npc_manager = LazyProxy(NPCManager)
+
+
+def _reload_npcs(snapshot):
+    """世界資料熱重載後同步更新（尚未建立時不需處理，建立時自然讀到最新快照）"""
+    manager = npc_manager.peek()
+    if manager is not None:
+        manager.load_npcs(snapshot)
+
+
+world_registry.subscribe(_reload_npcs)
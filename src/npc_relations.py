@@ -0,0 +1,116 @@
+# npc_relations.py
+# 道·衍 - NPC 好感度快取（讀檔時批次載入，每回合批次寫回）
+
+"""
+NPC 好感度
+
+原本 apply_state_update 對 npc_relations_change 的每個 NPC 各呼叫一次 update_npc_relation
+（各開一次連線，先 SELECT 再 UPDATE / INSERT）；而 agent_drama / agent_director 讀的是
+靜態 NPC 資料的 npc.get('affinity', 0)，資料庫裡的好感度從未被 AI 看到。
+
+AffinityCache 保存目前玩家與各 NPC 的好感度：
+- load：讀檔 / 創角時一次查出該玩家所有的 npc_relations
+- get：資料庫沒有記錄的 NPC 以 npcs.json 的 relations.player_default_affinity 為初始值
+- adjust：只改快取並記下變動的 NPC
+- flush：回合結束時，把變動的 NPC 以一個交易、一批 UPSERT 寫回（沒有變動時不開連線）
+
+npc_relations.affinity_score 存絕對值（schema v11 起）；之前的存檔是相對 0 的累計變動，
+升級時由 GameStateManager._migrate_v10_to_v11 加上各 NPC 的初始好感度。
+
+使用方式：
+    affinity_cache.load(player_id)             # main.load_game / character_creation
+    affinity_cache.get(npc_id)                 # agent 構建上下文
+    affinity_cache.adjust(npc_id, delta)       # apply_state_update
+    affinity_cache.flush()                     # DaoGame.end_turn
+"""
+
+import threading
+from typing import Any, Callable, Dict, Optional, Set
+
+from npc_manager import npc_manager
+
+
+def default_affinity(npc_id: str) -> int:
+    """NPC 對玩家的初始好感度（npcs.json 的 relations.player_default_affinity，未設定為 0）"""
+    npc = npc_manager.get_npc(npc_id) or {}
+    return (npc.get("relations") or {}).get("player_default_affinity", 0)
+
+
+class AffinityCache:
+    """目前玩家的 NPC 好感度（記憶體快取 + 批次寫回）"""
+
+    def __init__(self, db_provider: Optional[Callable[[], Any]] = None):
+        """
+        Args:
+            db_provider: 返回 GameStateManager 的函數（預設 game_state.game_db）
+        """
+        self._db_provider = db_provider
+        self._lock = threading.Lock()
+        self.player_id: Optional[int] = None
+        self._scores: Dict[str, int] = {}
+        self._dirty: Set[str] = set()
+
+    def _db(self):
+        if self._db_provider is not None:
+            return self._db_provider()
+        from game_state import game_db
+        return game_db
+
+    def load(self, player_id: int) -> bool:
+        """
+        載入玩家的全部好感度（載入前先寫回尚未保存的變動）
+
+        Returns:
+            寫回失敗（重試一次仍失敗）時不切換、保留原玩家的變動並返回 False
+        """
+        if self.player_id is not None and not (self.flush() or self.flush()):
+            print(f"[ERROR] 無法寫回玩家 {self.player_id} 的 NPC 好感度，暫不載入玩家 {player_id}")
+            return False
+        scores = self._db().load_npc_relations(player_id)
+        with self._lock:
+            self.player_id = player_id
+            self._scores = scores
+            self._dirty.clear()
+        return True
+
+    def get(self, npc_id: Optional[str], default: Optional[int] = None) -> int:
+        """目前的好感度（沒有記錄時為 default，未指定則為 NPC 的初始好感度）"""
+        if not npc_id:
+            return default or 0
+        score = self._scores.get(npc_id)
+        if score is not None:
+            return score
+        return default_affinity(npc_id) if default is None else default
+
+    def adjust(self, npc_id: str, delta: int) -> int:
+        """增減好感度（只改快取，flush 時寫回），返回新的值"""
+        with self._lock:
+            score = self.get(npc_id) + delta
+            self._scores[npc_id] = score
+            self._dirty.add(npc_id)
+            return score
+
+    @property
+    def dirty(self) -> bool:
+        return bool(self._dirty)
+
+    def flush(self) -> bool:
+        """把變動的好感度以一批 UPSERT 寫回；失敗時保留變動，下回合再試"""
+        with self._lock:
+            if not self._dirty or self.player_id is None:
+                return True
+            changes = {npc_id: self._scores[npc_id] for npc_id in self._dirty}
+            self._dirty.clear()
+        if self._db().upsert_npc_relations(self.player_id, changes):
+            return True
+        with self._lock:
+            self._dirty.update(changes)
+        return False
+
+    def snapshot(self) -> Dict[str, int]:
+        """目前快取的全部好感度（副本）"""
+        return dict(self._scores)
+
+
+# 全局實例（單人遊戲：一次只有一個玩家）
+affinity_cache = AffinityCache()
@@ -0,0 +1,63 @@
+# periodic_task.py
+# 道·衍 - 背景定期任務
+
+"""
+背景定期任務（資料庫維護、備份共用）
+
+子類實作 run_once(stop)；start() 開一條 daemon 線程，等 initial_delay 後執行一次，
+之後每 interval 秒執行一次。單次失敗只印警告，不讓線程退出；
+stop() 設置 stop 事件，長任務應在批次之間檢查它以便及時結束。
+"""
+
+import threading
+from typing import Any, Optional
+
+
+class PeriodicTask:
+    """背景定期任務基類"""
+
+    name = "periodic-task"
+
+    def __init__(self):
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self.last_result: Any = None
+
+    def default_interval(self) -> float:
+        raise NotImplementedError
+
+    def default_initial_delay(self) -> float:
+        return 0.0
+
+    def run_once(self, stop: threading.Event) -> Any:
+        raise NotImplementedError
+
+    def start(self, interval: Optional[float] = None, initial_delay: Optional[float] = None):
+        if self.running:
+            return
+        interval = self.default_interval() if interval is None else interval
+        initial_delay = self.default_initial_delay() if initial_delay is None else initial_delay
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._loop, args=(interval, initial_delay), name=self.name, daemon=True
+        )
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def _loop(self, interval: float, initial_delay: float):
+        delay = initial_delay
+        while not self._stop.wait(delay):
+            delay = interval
+            try:
+                self.last_result = self.run_once(self._stop)
+            except Exception as exc:  # pragma: no cover - 背景線程不能因單次失敗退出
+                print(f"[{self.name}] ⚠️  執行失敗: {type(exc).__name__}: {exc}")
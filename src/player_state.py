@@ -0,0 +1,188 @@
+# player_state.py
+# 道·衍 - 玩家狀態物件（欄位型別、變動追蹤與 diff）
+
+"""
+玩家狀態
+
+原本玩家狀態是一個普通 dict，在 main.py 各處直接修改；存檔無從得知是否有變動，
+只能在休息、修煉、重大變化、定期自動存檔時一律呼叫 save_game。
+
+PlayerState 以 __slots__ 存放已知欄位（FIELDS），仍提供 dict 介面
+（state['hp']、state.get(...)、{**state}），現有程式碼不需修改；未知的鍵放在額外欄位中。
+
+變動追蹤：
+- 任何賦值 / 刪除都記下鍵名
+- 可變的值（背包、技能、關係等 list / dict）可能被就地修改（append、remove），
+  diff() 時與基準副本比較
+- diff() 返回自上次 mark_clean() 以來有變動的鍵 → 新值（被刪除的鍵為 REMOVED）
+
+GameStateManager.save_player 收到沒有變動的 PlayerState 時直接略過。
+"""
+
+import copy
+from collections.abc import MutableMapping
+from typing import Any, Dict, Iterator, List, Optional
+
+
+class _Removed:
+    __slots__ = ()
+
+    def __repr__(self) -> str:
+        return "REMOVED"
+
+
+REMOVED = _Removed()  # diff() 中表示鍵被刪除
+
+# 已知欄位（與 config.INITIAL_PLAYER_STATE 一致，另加 current_tick）
+FIELDS = (
+    "name", "tier", "hp", "max_hp", "mp", "max_mp", "inventory", "location_id", "location",
+    "karma", "relations", "skills", "cultivation_progress", "breakthrough_attempts", "current_tick",
+)
+_FIELD_SET = frozenset(FIELDS)
+_MUTABLE = (list, dict, set)
+
+
+def _copy_value(value: Any) -> Any:
+    """基準副本：純量直接引用，字串 / 數字列表淺拷貝，其餘可變值深拷貝"""
+    if isinstance(value, list) and set(map(type, value)) <= {str, int, float}:
+        return list(value)
+    if isinstance(value, _MUTABLE):
+        return copy.deepcopy(value)
+    return value
+
+
+class PlayerState(MutableMapping):
+    """帶變動追蹤的玩家狀態（dict 介面 + 屬性存取）"""
+
+    __slots__ = FIELDS + ("_extra", "_assigned", "_baseline", "__weakref__")
+
+    name: Optional[str]
+    tier: float
+    hp: int
+    max_hp: int
+    mp: int
+    max_mp: int
+    inventory: List[str]
+    location_id: str
+    location: str
+    karma: int
+    relations: Dict[str, int]
+    skills: List[str]
+    cultivation_progress: int
+    breakthrough_attempts: int
+    current_tick: int
+
+    def __init__(self, data: Optional[Dict[str, Any]] = None):
+        object.__setattr__(self, "_extra", {})
+        object.__setattr__(self, "_assigned", set())
+        object.__setattr__(self, "_baseline", {})
+        if data:
+            for key, value in data.items():
+                self[key] = value
+        self.mark_clean()
+
+    # ---- 屬性存取（賦值即記錄） ----
+
+    def __setattr__(self, key: str, value: Any):
+        object.__setattr__(self, key, value)
+        if key in _FIELD_SET:
+            self._assigned.add(key)
+
+    def __delattr__(self, key: str):
+        object.__delattr__(self, key)
+        if key in _FIELD_SET:
+            self._assigned.add(key)
+
+    # ---- dict 介面 ----
+
+    def __getitem__(self, key: str) -> Any:
+        if key in _FIELD_SET:
+            try:
+                return object.__getattribute__(self, key)
+            except AttributeError:
+                raise KeyError(key) from None
+        return self._extra[key]
+
+    def get(self, key: str, default: Any = None) -> Any:
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __setitem__(self, key: str, value: Any):
+        if key in _FIELD_SET:
+            setattr(self, key, value)
+        else:
+            self._extra[key] = value
+            self._assigned.add(key)
+
+    def __delitem__(self, key: str):
+        if key in _FIELD_SET:
+            try:
+                delattr(self, key)
+            except AttributeError:
+                raise KeyError(key) from None
+        else:
+            del self._extra[key]
+            self._assigned.add(key)
+
+    def __contains__(self, key: object) -> bool:
+        if key in _FIELD_SET:
+            return hasattr(self, key)
+        return key in self._extra
+
+    def __iter__(self) -> Iterator[str]:
+        for key in FIELDS:
+            if hasattr(self, key):
+                yield key
+        yield from self._extra
+
+    def __len__(self) -> int:
+        return sum(1 for key in FIELDS if hasattr(self, key)) + len(self._extra)
+
+    def __repr__(self) -> str:
+        return f"PlayerState({self.to_dict()!r})"
+
+    def to_dict(self) -> Dict[str, Any]:
+        """淺拷貝成普通 dict（json.dumps 用）"""
+        return dict(self.items())
+
+    # ---- 變動追蹤 ----
+
+    def mark_clean(self):
+        """以目前內容為基準（存檔 / 讀檔成功後呼叫）"""
+        object.__setattr__(self, "_baseline", {key: _copy_value(value) for key, value in self.items()})
+        self._assigned.clear()
+
+    def checkpoint(self) -> Dict[str, Any]:
+        """
+        mark_clean() 並返回目前內容的副本（即新的基準）
+
+        副本之後不會再被修改（下次 mark_clean 換成新的 dict），可交給背景線程寫入。
+        """
+        self.mark_clean()
+        return self._baseline
+
+    @property
+    def baseline(self) -> Dict[str, Any]:
+        """上次 mark_clean() 時的內容（唯讀；diff() 的比較基準）"""
+        return self._baseline
+
+    def diff(self) -> Dict[str, Any]:
+        """自上次 mark_clean() 以來有變動的鍵 → 新值（被刪除的鍵為 REMOVED）"""
+        baseline = self._baseline
+        changes = {}
+        for key in self._assigned:
+            value = self.get(key, REMOVED)
+            if baseline.get(key, REMOVED) != value:
+                changes[key] = value
+        # 就地修改的可變值（inventory.append 等）不經過賦值，逐一比較
+        for key, value in self.items():
+            if key not in self._assigned and isinstance(value, _MUTABLE) and baseline.get(key, REMOVED) != value:
+                changes[key] = value
+        return changes
+
+    @property
+    def dirty(self) -> bool:
+        """是否有尚未保存的變動"""
+        return bool(self.diff())
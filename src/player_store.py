@@ -0,0 +1,306 @@
+# player_store.py
+# 道·衍 - 玩家存檔的正規化欄位與增量保存
+
+"""
+玩家存檔（schema v7）
+
+原本整份玩家 dict 以 json.dumps 存進 players.state_json，每次保存都重寫整塊，
+也無法以 hp、氣運或背包內容查詢玩家。現在拆成：
+
+- players 的獨立欄位：PLAYER_COLUMNS（hp、mp、karma、境界、位置等純量）
+- player_inventory / player_skills：每個物品 / 技能一行，(player_id, slot) 為主鍵，
+  slot 遞增保留原本的順序（背包可重複，以 slot 區分）
+- players.state_json：只放其餘欄位（relations 等），內容不變就不重寫
+
+增量保存：GameStateManager 為每個玩家保留上次寫入的快照（PlayerSnapshot），
+plan_save 與快照比對，只產生變動的欄位與物品行（SavePlan）：
+- 純量欄位逐一比較
+- 物品列表逐項對齊（diff_slots），只刪除 / 寫入不同的行；
+  遊戲中的拾取（append）與消耗（remove）各只動一行
+
+舊存檔（state_layout = 0，整份狀態在 state_json）照樣可讀；
+init_database 升級時會一次轉成新格式，沒轉到的也會在下一次保存時整份重寫。
+"""
+
+import json
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+# players.state_layout
+LAYOUT_JSON = 0        # 舊格式：整份狀態在 state_json
+LAYOUT_NORMALIZED = 1  # 新格式：欄位 + 物品表 + state_json（其餘欄位）
+
+# 狀態鍵 → players 欄位
+PLAYER_COLUMNS = {
+    "location_id": "location_id",
+    "location": "location_name",
+    "tier": "tier",
+    "current_tick": "current_tick",
+    "hp": "hp",
+    "max_hp": "max_hp",
+    "mp": "mp",
+    "max_mp": "max_mp",
+    "karma": "karma",
+    "cultivation_progress": "cultivation_progress",
+    "breakthrough_attempts": "breakthrough_attempts",
+}
+# 舊表就有的 NOT NULL 欄位（狀態缺少時沿用原本 save_player 的預設值）
+COLUMN_DEFAULTS = {"location_id": "qingyun_foot", "tier": 1.0, "current_tick": 0}
+# v7 新增的欄位（可為 NULL：NULL 表示狀態中沒有這個鍵）
+ADDED_COLUMNS = {
+    "location_name": "TEXT",
+    "hp": "INTEGER",
+    "max_hp": "INTEGER",
+    "mp": "INTEGER",
+    "max_mp": "INTEGER",
+    "karma": "INTEGER",
+    "cultivation_progress": "INTEGER",
+    "breakthrough_attempts": "INTEGER",
+    "state_layout": "INTEGER NOT NULL DEFAULT 0",
+}
+
+# 狀態鍵 → 列表表
+LIST_TABLES = {
+    "inventory": "player_inventory",
+    "skills": "player_skills",
+}
+
+_SCALAR = (int, float, str)
+
+# diff_slots 中間段對齊時往前看的範圍
+DIFF_WINDOW = 8
+
+
+class PlayerSnapshot:
+    """上次寫入資料庫的玩家狀態（比對用）"""
+
+    __slots__ = ("columns", "extras_json", "lists")
+
+    def __init__(self, columns: Dict[str, Any], extras_json: str,
+                 lists: Dict[str, Tuple[List[int], List[str]]]):
+        self.columns = columns          # 欄位 → 值
+        self.extras_json = extras_json  # state_json 內容
+        self.lists = lists              # 狀態鍵 → (slot 列表, 物品列表)，依 slot 排序
+
+
+class SavePlan(NamedTuple):
+    """一次保存需要寫入的內容"""
+    columns: Dict[str, Any]                        # 變動的欄位
+    extras_json: Optional[str]                     # 新的 state_json（None 表示未變）
+    deletes: Dict[str, List[int]]                  # 列表表 → 要刪除的 slot
+    upserts: Dict[str, List[Tuple[int, str]]]      # 列表表 → 要寫入的 (slot, item)
+    full: bool                                     # 無快照：整份重寫
+    snapshot: PlayerSnapshot                       # 寫入成功後的新快照
+
+    @property
+    def writes(self) -> int:
+        """寫入的欄位 + 行數（0 表示不需要保存）"""
+        return (len(self.columns) + (self.extras_json is not None)
+                + sum(map(len, self.deletes.values())) + sum(map(len, self.upserts.values())))
+
+
+def split_state(state: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, List[str]], Dict[str, Any]]:
+    """
+    把狀態拆成 (欄位, 列表, 其餘)
+
+    非純量的值（或 None）不放進欄位，列表中有非字串元素時整個列表不拆，都留在「其餘」中，
+    讀回時原樣還原。
+    """
+    columns = {column: None for column in PLAYER_COLUMNS.values()}
+    columns.update((PLAYER_COLUMNS[key], value) for key, value in COLUMN_DEFAULTS.items())
+    lists: Dict[str, List[str]] = {}
+    extras: Dict[str, Any] = {}
+    for key, value in state.items():
+        if key in PLAYER_COLUMNS and isinstance(value, _SCALAR):
+            columns[PLAYER_COLUMNS[key]] = value
+        elif key in LIST_TABLES and isinstance(value, list) and set(map(type, value)) <= {str}:
+            lists[key] = value
+        else:
+            extras[key] = value
+    for key in LIST_TABLES:
+        lists.setdefault(key, [])
+    return columns, lists, extras
+
+
+def _match_run(a: List[str], i: int, b: List[str], j: int, limit: int) -> int:
+    """a[i:]、b[j:] 相同開頭的長度（不超過 limit；以切片比較二分，比逐項迴圈快得多）"""
+    low, high = 0, limit
+    while low < high:
+        mid = (low + high + 1) // 2
+        if a[i + low:i + mid] == b[j + low:j + mid]:
+            low = mid
+        else:
+            high = mid - 1
+    return low
+
+
+def _common_suffix(a: List[str], b: List[str], limit: int) -> int:
+    """a、b 相同結尾的長度（不超過 limit）"""
+    low, high = 0, limit
+    while low < high:
+        mid = (low + high + 1) // 2
+        if a[len(a) - mid:len(a) - low] == b[len(b) - mid:len(b) - low]:
+            low = mid
+        else:
+            high = mid - 1
+    return low
+
+
+def diff_slots(old_slots: List[int], old_items: List[str],
+               new: List[str]) -> Tuple[List[int], List[Tuple[int, str]], List[int]]:
+    """
+    比對物品列表
+
+    先去掉相同的前綴與後綴；中間一段以有界視窗（DIFF_WINDOW）對齊：
+    相同的連續段整段保留；目前物品在舊列表稍後出現就刪除其間的舊行，
+    舊物品在新列表稍後出現就插入其間的新物品，都不是則視為替換。
+    新物品接在前一個保留行之後編號，撞到後面保留行的 slot 時順延重編。
+
+    Args:
+        old_slots: 上次寫入的 slot（遞增）
+        old_items: 對應的物品
+        new: 目前的物品列表
+
+    Returns:
+        (要刪除的 slot, 要寫入的 (slot, item), new 各項的 slot)
+    """
+    prefix = _match_run(old_items, 0, new, 0, min(len(old_items), len(new)))
+    suffix = _common_suffix(old_items, new, min(len(old_items), len(new)) - prefix)
+    old_end, new_end = len(old_items) - suffix, len(new) - suffix
+
+    # 對齊中間段：[(舊列表起點, 長度)] 為保留段，[(None, 新物品)] 為插入
+    aligned: List[Tuple[Optional[int], Any]] = []
+    deletes: List[int] = []
+    i, j = prefix, prefix
+    while i < old_end and j < new_end:
+        run = _match_run(old_items, i, new, j, min(old_end - i, new_end - j))
+        if run:
+            aligned.append((i, run))
+            i += run
+            j += run
+            continue
+        skip_old = next((d for d in range(1, DIFF_WINDOW)
+                         if i + d < old_end and old_items[i + d] == new[j]), None)
+        if skip_old is not None:
+            deletes += old_slots[i:i + skip_old]
+            i += skip_old
+            continue
+        skip_new = next((d for d in range(1, DIFF_WINDOW)
+                         if j + d < new_end and new[j + d] == old_items[i]), None)
+        if skip_new is not None:
+            aligned += [(None, item) for item in new[j:j + skip_new]]
+            j += skip_new
+            continue
+        deletes.append(old_slots[i])
+        aligned.append((None, new[j]))
+        i += 1
+        j += 1
+    deletes += old_slots[i:old_end]
+    aligned += [(None, item) for item in new[j:new_end]]
+    if suffix:
+        aligned.append((old_end, suffix))
+
+    # 編號：保留段維持原 slot，除非被前面的新物品擠到（此時刪舊 slot、以新 slot 重寫）
+    last = old_slots[prefix - 1] if prefix else -1
+    upserts: List[Tuple[int, str]] = []
+    slots = old_slots[:prefix]
+    for start, value in aligned:
+        if start is None:
+            last += 1
+            upserts.append((last, value))
+            slots.append(last)
+            continue
+        end = start + value
+        while start < end and old_slots[start] <= last:  # 保留段的 slot 遞增，只需處理被擠到的開頭幾行
+            deletes.append(old_slots[start])
+            last += 1
+            upserts.append((last, old_items[start]))
+            slots.append(last)
+            start += 1
+        if start < end:
+            slots += old_slots[start:end]
+            last = old_slots[end - 1]
+
+    reused = {slot for slot, _ in upserts}
+    deletes = [slot for slot in deletes if slot not in reused]
+    return deletes, upserts, slots
+
+
+def plan_save(previous: Optional[PlayerSnapshot], state: Dict[str, Any]) -> SavePlan:
+    """與上次的快照比對，算出需要寫入的內容（previous 為 None 時整份重寫）"""
+    columns, lists, extras = split_state(state)
+    extras_json = json.dumps(extras, ensure_ascii=False, sort_keys=True)
+
+    if previous is None:
+        return SavePlan(
+            columns=columns, extras_json=extras_json,
+            deletes={table: [] for table in LIST_TABLES.values()},
+            upserts={LIST_TABLES[key]: list(enumerate(items)) for key, items in lists.items()},
+            full=True,
+            snapshot=PlayerSnapshot(columns, extras_json,
+                                    {key: (list(range(len(items))), list(items)) for key, items in lists.items()}),
+        )
+
+    changed = {column: value for column, value in columns.items() if previous.columns.get(column) != value}
+    deletes, upserts, snapshot_lists = {}, {}, {}
+    for key, table in LIST_TABLES.items():
+        old_slots, old_items = previous.lists.get(key, ([], []))
+        deletes[table], upserts[table], slots = diff_slots(old_slots, old_items, lists[key])
+        snapshot_lists[key] = (slots, list(lists[key]))
+    return SavePlan(
+        columns=changed,
+        extras_json=None if extras_json == previous.extras_json else extras_json,
+        deletes=deletes, upserts=upserts, full=False,
+        snapshot=PlayerSnapshot(columns, extras_json, snapshot_lists),
+    )
+
+
+def write_plan(cursor, player_id: int, plan: SavePlan):
+    """在呼叫者的交易中執行 SavePlan"""
+    assignments = dict(plan.columns)
+    if plan.extras_json is not None:
+        assignments["state_json"] = plan.extras_json
+    if plan.full:
+        assignments["state_layout"] = LAYOUT_NORMALIZED
+    sets = "".join(f"{column} = ?, " for column in assignments)
+    cursor.execute(f"UPDATE players SET {sets}last_save_at = CURRENT_TIMESTAMP WHERE id = ?",
+                   (*assignments.values(), player_id))
+
+    for table in LIST_TABLES.values():
+        if plan.full:
+            cursor.execute(f"DELETE FROM {table} WHERE player_id = ?", (player_id,))
+        elif plan.deletes[table]:
+            cursor.executemany(f"DELETE FROM {table} WHERE player_id = ? AND slot = ?",
+                               [(player_id, slot) for slot in plan.deletes[table]])
+        if plan.upserts[table]:
+            cursor.executemany(f"""
+                INSERT INTO {table} (player_id, slot, item) VALUES (?, ?, ?)
+                ON CONFLICT(player_id, slot) DO UPDATE SET item = excluded.item
+            """, [(player_id, slot, item) for slot, item in plan.upserts[table]])
+
+
+def read_player(conn, row) -> Tuple[Dict[str, Any], Optional[PlayerSnapshot]]:
+    """
+    把 players 的一行（sqlite3.Row）還原成狀態 dict
+
+    Returns:
+        (狀態, 快照)；舊格式存檔沒有快照（下次保存整份重寫）
+    """
+    if row["state_layout"] == LAYOUT_JSON:
+        return json.loads(row["state_json"]), None
+
+    state = json.loads(row["state_json"])
+    columns = {}
+    for key, column in PLAYER_COLUMNS.items():
+        columns[column] = row[column]
+        if row[column] is not None:
+            state[key] = row[column]
+    lists = {}
+    for key, table in LIST_TABLES.items():
+        rows = conn.execute(f"SELECT slot, item FROM {table} WHERE player_id = ? ORDER BY slot",
+                            (row["id"],)).fetchall()
+        slots, items = (list(column) for column in zip(*rows)) if rows else ([], [])
+        lists[key] = (slots, items)
+        if key not in state:  # 非字串列表留在 state_json
+            state[key] = list(items)
+    state["name"] = row["name"]
+    return state, PlayerSnapshot(columns, row["state_json"], lists)
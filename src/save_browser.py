@@ -0,0 +1,181 @@
+# save_browser.py
+# 道·衍 - 存檔瀏覽（keyset 分頁、名稱前綴查詢、摘要欄位）
+
+"""
+存檔瀏覽
+
+list_all_players 沒有 LIMIT 也沒有排序，把每個玩家都轉成 dict；共用伺服器上有上萬個存檔時，
+主選單的「查看存檔列表」要讀完整張表。這裡改為分頁查詢：
+
+- 依最後保存時間（新 → 舊）分頁：keyset 分頁，以上一頁最後一筆的 (last_save_at, id) 為起點，
+  走 idx_players_last_save 索引，翻到第幾頁都只讀一頁的行（不用 OFFSET）
+- 名稱前綴查詢：轉成 name >= 前綴 AND name < 前綴的上界，走 name 的 UNIQUE 索引，結果依名稱排序
+- 只讀摘要欄位（境界、位置、遊戲時間、建立 / 保存時間），不解析 state_json、不讀背包
+
+主選單（main.list_saves）與管理列表（本檔的命令列）共用 browse_players。
+
+使用方式：
+    python src/save_browser.py                     # 最近保存的存檔（第一頁）
+    python src/save_browser.py --prefix 青 --limit 50
+    python src/save_browser.py --all               # 逐頁列出全部存檔（管理用）
+"""
+
+import argparse
+import sqlite3
+from typing import Any, Iterator, List, NamedTuple, Optional, Tuple
+
+import config
+
+
+_SUMMARY_COLUMNS = "id, name, tier, location_id, location_name, playtime_seconds, created_at, last_save_at"
+
+
+class SaveSummary(NamedTuple):
+    """存檔列表的一行（只含摘要欄位）"""
+    id: int
+    name: str
+    tier: float
+    location_id: str
+    location: Optional[str]
+    playtime_seconds: int
+    created_at: str
+    last_save_at: str
+
+
+class SavePage(NamedTuple):
+    """一頁存檔；next_after 傳回 browse_players 取下一頁（沒有下一頁時為 None）"""
+    saves: List[SaveSummary]
+    next_after: Optional[Tuple[Any, ...]]
+
+
+def _default_db(db):
+    if db is None:
+        from game_state import game_db
+        db = game_db.instance()
+    return db
+
+
+def _connect(db) -> sqlite3.Connection:
+    return sqlite3.connect(db.db_path, timeout=30)
+
+
+def prefix_upper_bound(prefix: str) -> Optional[str]:
+    """比所有以 prefix 開頭的字串都大的最小字串（最後一個字元 +1；無法遞增時為 None）"""
+    while prefix:
+        last = ord(prefix[-1])
+        if last < 0x10FFFF:
+            return prefix[:-1] + chr(last + 1)
+        prefix = prefix[:-1]
+    return None
+
+
+def browse_players(db=None, limit: Optional[int] = None, after: Optional[Tuple[Any, ...]] = None,
+                   prefix: Optional[str] = None) -> SavePage:
+    """
+    分頁列出存檔
+
+    Args:
+        limit: 每頁筆數（預設 config.SAVE_BROWSER_PAGE_SIZE，上限 config.SAVE_BROWSER_MAX_PAGE_SIZE）
+        after: 上一頁的 next_after（第一頁為 None）
+        prefix: 名稱前綴；指定時依名稱排序，否則依最後保存時間由新到舊
+    """
+    db = _default_db(db)
+    limit = max(1, min(limit or config.SAVE_BROWSER_PAGE_SIZE, config.SAVE_BROWSER_MAX_PAGE_SIZE))
+
+    if prefix:
+        conditions, params = ["name >= ?"], [prefix]
+        upper = prefix_upper_bound(prefix)
+        if upper is not None:
+            conditions.append("name < ?")
+            params.append(upper)
+        if after is not None:
+            conditions.append("name > ?")
+            params.append(after[0])
+        query = f"SELECT {_SUMMARY_COLUMNS} FROM players WHERE {' AND '.join(conditions)} ORDER BY name LIMIT ?"
+    else:
+        where = "WHERE (last_save_at, id) < (?, ?)" if after is not None else ""
+        params = list(after) if after is not None else []
+        query = f"SELECT {_SUMMARY_COLUMNS} FROM players {where} ORDER BY last_save_at DESC, id DESC LIMIT ?"
+
+    conn = _connect(db)
+    try:
+        rows = conn.execute(query, (*params, limit + 1)).fetchall()  # 多讀一筆判斷是否還有下一頁
+    finally:
+        conn.close()
+
+    saves = [SaveSummary(*row[:5], row[5] or 0, *row[6:]) for row in rows[:limit]]
+    next_after = None
+    if len(rows) > limit:
+        last = saves[-1]
+        next_after = (last.name,) if prefix else (last.last_save_at, last.id)
+    return SavePage(saves, next_after)
+
+
+def iter_players(db=None, prefix: Optional[str] = None,
+                 page_size: Optional[int] = None) -> Iterator[SaveSummary]:
+    """逐頁讀出全部存檔（每次只持有一頁）"""
+    page_size = page_size or config.SAVE_BROWSER_MAX_PAGE_SIZE
+    after = None
+    while True:
+        page = browse_players(db, page_size, after, prefix)
+        yield from page.saves
+        if page.next_after is None:
+            return
+        after = page.next_after
+
+
+def count_players(db=None, prefix: Optional[str] = None) -> int:
+    """存檔總數（有 prefix 時只計算名稱符合的；只掃索引）"""
+    db = _default_db(db)
+    conn = _connect(db)
+    try:
+        if not prefix:
+            return conn.execute("SELECT COUNT(*) FROM players").fetchone()[0]
+        upper = prefix_upper_bound(prefix)
+        if upper is None:
+            return conn.execute("SELECT COUNT(*) FROM players WHERE name >= ?", (prefix,)).fetchone()[0]
+        return conn.execute("SELECT COUNT(*) FROM players WHERE name >= ? AND name < ?",
+                            (prefix, upper)).fetchone()[0]
+    finally:
+        conn.close()
+
+
+def format_playtime(seconds: int) -> str:
+    """遊戲時間：1 小時 5 分 / 12 分 / 不到 1 分"""
+    hours, minutes = divmod(int(seconds or 0) // 60, 60)
+    if hours:
+        return f"{hours} 小時 {minutes} 分"
+    return f"{minutes} 分" if minutes else "不到 1 分"
+
+
+def format_summary(save: SaveSummary) -> str:
+    """存檔列表的一行文字（主選單與管理列表共用）"""
+    from cultivation import get_tier_display_name
+    from world_data import get_location_name
+
+    location = save.location or get_location_name(save.location_id)
+    return (f"{save.name} - {get_tier_display_name(save.tier)} | {location} | "
+            f"遊戲時間 {format_playtime(save.playtime_seconds)} | 最後保存 {save.last_save_at}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="存檔列表（管理用）")
+    parser.add_argument("--prefix", help="名稱前綴")
+    parser.add_argument("--limit", type=int, default=None, help="每頁筆數")
+    parser.add_argument("--all", action="store_true", help="逐頁列出全部存檔")
+    args = parser.parse_args()
+
+    total = count_players(prefix=args.prefix)
+    if args.all:
+        saves = iter_players(prefix=args.prefix, page_size=args.limit)
+    else:
+        saves = browse_players(limit=args.limit, prefix=args.prefix).saves
+    shown = 0
+    for save in saves:
+        shown += 1
+        print(f"{save.id:>6}  {format_summary(save)}")
+    print(f"共 {total} 個存檔，顯示 {shown} 個")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+# save_scheduler.py
+# 道·衍 - 合併存檔（背景寫入，關鍵事件立即寫入）
+
+"""
+存檔排程
+
+原本 save_game 散落各處：休息、修煉、突破後各存一次，AI 回合「重大變化」存一次，
+每 AUTO_SAVE_INTERVAL 回合又存一次，同一回合可能連存兩次。現在：
+
+- 每個指令處理完呼叫 mark_dirty：擷取一份狀態副本（PlayerState.checkpoint，沒有變動則略過），
+  背景線程在第一次標記後 config.SAVE_COALESCE_WINDOW 秒寫入；視窗內的多次標記只寫最後一份
+- 關鍵事件（突破、死亡、手動存檔、退出）呼叫 flush，立即在呼叫者線程寫入
+
+與 event_logs 的先後順序：
+- 狀態副本在該回合的事件都已寫入 event_logs 之後才擷取，並記下當時最新的事件 ID，
+  與狀態在同一交易寫入 players.last_event_id
+- 因此存檔永遠不會領先事件日誌；異常結束時，ID 大於 last_event_id 的事件就是
+  尚未反映在存檔中的部分（load_player 返回其數量）
+- 每份副本帶遞增序號，較舊的副本不會覆蓋已寫入的較新副本
+
+狀態日誌：擷取副本的同時，把自上次擷取以來的變動（PlayerState.diff）立即追加到 state_deltas
+（見 state_journal.py），存檔寫入 players.last_delta_id。視窗內異常結束時，讀檔會重播
+這些 delta，進度只會失去處理到一半的那個指令。
+
+使用方式：
+    saver = SaveScheduler()
+    saver.mark_dirty(player_id, player_state)   # 每個指令結束
+    saver.flush(player_id, player_state)        # 關鍵事件
+    saver.close(player_id, player_state)        # 退出：寫入並停止背景線程（之後可再使用）
+"""
+
+import copy
+import threading
+import time
+from typing import Any, Callable, Dict, NamedTuple, Optional
+
+import config
+from player_state import PlayerState
+
+
+class _Capture(NamedTuple):
+    """待寫入的狀態副本"""
+    seq: int
+    player_id: int
+    state: Dict[str, Any]
+    last_event_id: int
+    last_delta_id: int
+
+
+class SaveScheduler:
+    """合併存檔：標記後於視窗內最多寫一次；關鍵事件立即寫入"""
+
+    name = "save-scheduler"
+
+    def __init__(self, db_provider: Optional[Callable[[], Any]] = None, window: Optional[float] = None):
+        """
+        Args:
+            db_provider: 返回 GameStateManager 的函數（預設 game_state.game_db）
+            window: 合併視窗秒數（預設 config.SAVE_COALESCE_WINDOW）
+        """
+        self._db_provider = db_provider
+        self.window = config.SAVE_COALESCE_WINDOW if window is None else window
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._write_lock = threading.Lock()  # 序列化寫入
+        self._pending: Optional[_Capture] = None
+        self._due: Optional[float] = None
+        self._seq = 0
+        self._written_seq = 0
+        self._captured_event_ids: Dict[int, int] = {}
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+        self.stats = {"marked": 0, "captured": 0, "coalesced": 0, "written": 0, "immediate": 0, "failed": 0}
+
+    def _db(self):
+        if self._db_provider is not None:
+            return self._db_provider()
+        from game_state import game_db
+        return game_db
+
+    def _capture(self, player_id: int, state: Dict[str, Any]) -> Optional[_Capture]:
+        """擷取狀態副本（同時把變動追加到狀態日誌）；狀態與事件都沒有新進展時返回 None"""
+        db = self._db()
+        last_event_id = db.last_event_id(player_id)
+        if isinstance(state, PlayerState):
+            captured = self._captured_event_ids.get(player_id)
+            if captured is None:
+                captured = db.saved_event_id(player_id)
+            changes = state.diff()
+            if not changes and captured == last_event_id:
+                return None
+            if changes:
+                db.append_delta(player_id, state.baseline, changes, last_event_id)
+            data = state.checkpoint()
+        else:
+            data = copy.deepcopy(dict(state))
+        last_delta_id = db.last_delta_id(player_id)
+        with self._lock:
+            self._seq += 1
+            self._captured_event_ids[player_id] = last_event_id
+            self.stats["captured"] += 1
+            return _Capture(self._seq, player_id, data, last_event_id, last_delta_id)
+
+    def mark_dirty(self, player_id: Optional[int], state: Optional[Dict[str, Any]]):
+        """標記有變動：擷取副本，交給背景線程在視窗結束時寫入"""
+        if player_id is None or state is None:
+            return
+        self.stats["marked"] += 1
+        capture = self._capture(player_id, state)
+        if capture is None:
+            return
+        with self._lock:
+            if self._closed:
+                return
+            if self._pending is not None:
+                self.stats["coalesced"] += 1
+            self._pending = capture
+            if self._due is None:
+                self._due = time.monotonic() + self.window
+            self._ensure_thread()
+            self._wakeup.notify()
+
+    def flush(self, player_id: Optional[int] = None, state: Optional[Dict[str, Any]] = None) -> bool:
+        """
+        立即寫入（在呼叫者線程）：先擷取 state（若提供），連同尚未寫入的副本一起寫入最新的一份
+
+        Returns:
+            是否成功（沒有需要寫入的內容也視為成功）
+        """
+        capture = self._capture(player_id, state) if player_id is not None and state is not None else None
+        with self._lock:
+            if capture is None:
+                capture = self._pending
+            self._pending = None
+            self._due = None
+        if capture is None:
+            return True
+        self.stats["immediate"] += 1
+        return self._write(capture)
+
+    def close(self, player_id: Optional[int] = None, state: Optional[Dict[str, Any]] = None) -> bool:
+        """寫入剩餘的變動並停止背景線程"""
+        ok = self.flush(player_id, state)
+        with self._lock:
+            self._closed = True
+            self._wakeup.notify()
+            thread = self._thread
+        if thread is not None:
+            thread.join(timeout=5)
+        with self._lock:
+            self._closed = False  # 之後再 mark_dirty 會重新啟動背景線程
+            self._thread = None
+        return ok
+
+    @property
+    def pending(self) -> bool:
+        """是否有尚未寫入的副本"""
+        return self._pending is not None
+
+    def _write(self, capture: _Capture) -> bool:
+        with self._write_lock:
+            if capture.seq <= self._written_seq:
+                return True  # 已有更新的副本寫入
+            ok = self._db().save_player(capture.player_id, capture.state, last_event_id=capture.last_event_id,
+                                        last_delta_id=capture.last_delta_id)
+            if ok:
+                self._written_seq = capture.seq
+                self.stats["written"] += 1
+                return True
+
+        self.stats["failed"] += 1
+        with self._lock:
+            # 寫入失敗：沒有更新的副本時放回，下個視窗重試
+            if self._pending is None and not self._closed:
+                self._pending = capture
+                self._due = time.monotonic() + self.window
+                self._ensure_thread()
+                self._wakeup.notify()
+        return False
+
+    def _ensure_thread(self):
+        """（持有 _lock）"""
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._lock:
+                while not self._closed and self._due is None:
+                    self._wakeup.wait()
+                if self._closed:
+                    return
+                delay = self._due - time.monotonic()
+                if delay > 0:
+                    self._wakeup.wait(delay)
+                    continue
+                capture, self._pending, self._due = self._pending, None, None
+            if capture is not None:
+                try:
+                    self._write(capture)
+                except Exception as e:  # 背景線程不能因單次失敗而停止
+                    print(f"[{self.name}] ⚠️  背景存檔失敗: {type(e).__name__}: {e}")
@@ -0,0 +1,388 @@
+# schemas.py
+# 道·衍 - Observer / Director 的結構化輸出 Schema
+
+"""
+結構化輸出層
+
+意圖（Observer）與決策（Director）的 JSON Schema 在這裡定義一次：
+- 傳給 API 作為 response_format（json_schema 模式），讓模型直接輸出符合結構的 JSON
+- 本地用預先編譯的驗證器檢查/修正（型別轉換、預設值、丟棄無效欄位），
+  避免 "hp_change": "-10" 這類值在 apply_state_update 裡炸掉
+
+使用方式：
+    response = call_gpt(..., response_format=INTENT.response_format())
+    intent, errors = parse_structured(response, INTENT)
+"""
+
+import copy
+import json
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from json_stream import extract_first_json_object
+
+
+INTENT_TYPES = [
+    "ATTACK", "MOVE", "TALK", "INSPECT", "USE_ITEM",
+    "CULTIVATE", "REST", "SKILL_USE", "TRADE", "UNKNOWN",
+]
+
+# Observer 意圖（strict 模式：所有欄位必填、不允許額外欄位）
+INTENT_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "intent": {"type": "string", "enum": INTENT_TYPES},
+        "target": {"type": ["string", "null"], "default": None},
+        "details": {"type": ["string", "null"], "default": ""},
+        "confidence": {"type": "number", "default": 0.0},
+    },
+    "required": ["intent", "target", "details", "confidence"],
+    "additionalProperties": False,
+}
+
+# 降級為一般文本時的意圖（模型不受 response_format 約束）：
+# 不在 enum 內的意圖改為 UNKNOWN，而不是讓整個對象失效；多餘欄位照常丟棄
+INTENT_FALLBACK_SCHEMA = dict(INTENT_SCHEMA, properties=dict(
+    INTENT_SCHEMA["properties"],
+    intent={"type": "string", "enum": INTENT_TYPES, "default": "UNKNOWN"},
+))
+
+_INT = {"type": "integer"}
+_STR_LIST = {"type": "array", "items": {"type": "string"}}
+
+# Director 決策中的狀態更新（欄位皆為可選，與 apply_state_update 對應）
+STATE_UPDATE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "hp_change": _INT,
+        "mp_change": _INT,
+        "karma_change": _INT,
+        "experience_gained": _INT,
+        "cultivation_progress_change": _INT,
+        "max_hp_change": _INT,
+        "max_mp_change": _INT,
+        "tier_change": {"type": "number"},
+        "items_gained": _STR_LIST,
+        "items_lost": _STR_LIST,
+        "skills_gained": _STR_LIST,
+        "location_new": {"type": ["string", "null"]},
+        "npc_involved": {"type": ["string", "null"]},
+        "npc_action": {"type": ["string", "null"]},
+        "npc_relations_change": {"type": "object", "additionalProperties": _INT},
+    },
+}
+
+# Director 決策（npc_relations_change 是動態鍵，無法用 strict 模式）
+DECISION_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "narrative": {"type": "string"},
+        "state_update": dict(STATE_UPDATE_SCHEMA, default={}),
+    },
+    "required": ["narrative", "state_update"],
+}
+
+# Director 修復模式：只返回針對出錯欄位的 JSON Patch（見 json_patch.py）
+REPAIR_PATCH_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "patch": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "op": {"type": "string", "enum": ["add", "replace", "remove"]},
+                    "path": {"type": "string"},
+                    "value": {},
+                },
+                "required": ["op", "path"],
+            },
+        },
+    },
+    "required": ["patch"],
+}
+
+
+_INVALID = object()
+
+
+def _coerce_integer(value):
+    if isinstance(value, bool):
+        return _INVALID
+    if isinstance(value, int):
+        return value
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if isinstance(value, str):
+        try:
+            return int(value.strip().lstrip("+"))
+        except ValueError:
+            return _INVALID
+    return _INVALID
+
+
+def _coerce_number(value):
+    if isinstance(value, bool):
+        return _INVALID
+    if isinstance(value, (int, float)):
+        return value
+    if isinstance(value, str):
+        try:
+            return float(value.strip())
+        except ValueError:
+            return _INVALID
+    return _INVALID
+
+
+def _coerce_string(value):
+    return value if isinstance(value, str) else _INVALID
+
+
+def _coerce_boolean(value):
+    return value if isinstance(value, bool) else _INVALID
+
+
+def _coerce_null(value):
+    return None if value is None else _INVALID
+
+
+_TYPE_CHECKS: Dict[str, Callable[[Any], Any]] = {
+    "integer": _coerce_integer,
+    "number": _coerce_number,
+    "string": _coerce_string,
+    "boolean": _coerce_boolean,
+    "null": _coerce_null,
+}
+
+
+def _compile(schema: Dict[str, Any]) -> Callable[[Any, str, List[str]], Any]:
+    """
+    把 Schema 編譯成檢查函數 check(value, path, errors) -> 修正後的值 / _INVALID
+
+    編譯一次，之後每次驗證只是函數調用，不再解讀 Schema。
+    """
+    types = schema.get("type")
+    if isinstance(types, list):
+        type_list = types
+    elif types:
+        type_list = [types]
+    else:
+        type_list = []
+
+    enum = frozenset(schema["enum"]) if "enum" in schema else None
+
+    if "object" in type_list:
+        props = {name: (_compile(sub), "default" in sub, sub.get("default"))
+                 for name, sub in schema.get("properties", {}).items()}
+        required = [name for name in schema.get("required", []) if name in props]
+        extra = schema.get("additionalProperties", True)
+        extra_check = _compile(extra) if isinstance(extra, dict) else None
+
+        def check_object(value, path, errors):
+            if not isinstance(value, dict):
+                errors.append(f"{path or '根'}: 應為對象")
+                return _INVALID
+
+            result = {}
+            for key, item in value.items():
+                entry = props.get(key)
+                item_path = f"{path}.{key}" if path else key
+                if entry is not None:
+                    checked = entry[0](item, item_path, errors)
+                elif extra_check is not None:
+                    checked = extra_check(item, item_path, errors)
+                elif extra is False:
+                    errors.append(f"{item_path}: 不允許的欄位")
+                    continue
+                else:
+                    checked = item
+                if checked is _INVALID:
+                    if entry is not None and entry[1]:
+                        result[key] = copy.deepcopy(entry[2])
+                    continue
+                result[key] = checked
+
+            for key in required:
+                if key not in result:
+                    entry = props[key]
+                    if entry[1]:
+                        result[key] = copy.deepcopy(entry[2])
+                    else:
+                        errors.append(f"{path}.{key}: 缺少必填欄位" if path else f"{key}: 缺少必填欄位")
+                        return _INVALID
+            return result
+
+        return check_object
+
+    if "array" in type_list:
+        item_check = _compile(schema.get("items", {}))
+
+        def check_array(value, path, errors):
+            if not isinstance(value, list):
+                errors.append(f"{path}: 應為陣列")
+                return _INVALID
+            result = []
+            for index, item in enumerate(value):
+                checked = item_check(item, f"{path}[{index}]", errors)
+                if checked is not _INVALID:
+                    result.append(checked)
+            return result
+
+        return check_array
+
+    coercers = [_TYPE_CHECKS[t] for t in type_list if t in _TYPE_CHECKS]
+
+    def check_scalar(value, path, errors):
+        if coercers:
+            for coerce in coercers:
+                checked = coerce(value)
+                if checked is not _INVALID:
+                    break
+            else:
+                errors.append(f"{path}: 型別錯誤（{type_list}）")
+                return _INVALID
+        else:
+            checked = value
+        if enum is not None and checked not in enum:
+            errors.append(f"{path}: 不在允許值內")
+            return _INVALID
+        return checked
+
+    return check_scalar
+
+
+def _strip_local_keywords(schema: Any) -> Any:
+    """移除只供本地使用的關鍵字（API 的 strict 模式不接受 default）"""
+    if isinstance(schema, dict):
+        return {k: _strip_local_keywords(v) for k, v in schema.items() if k != "default"}
+    if isinstance(schema, list):
+        return [_strip_local_keywords(v) for v in schema]
+    return schema
+
+
+class ResponseSchema:
+    """
+    一個具名的輸出 Schema
+
+    Args:
+        name: Schema 名稱（傳給 API，也是統計的分組鍵）
+        schema: JSON Schema（可含 default，本地驗證時用於補值）
+        strict: 是否要求 API 嚴格遵守（Schema 須符合 strict 模式的限制）
+    """
+
+    def __init__(self, name: str, schema: Dict[str, Any], strict: bool = False):
+        self.name = name
+        self.schema = schema
+        self.strict = strict
+        self._check = _compile(schema)
+        self._api_format = {
+            "type": "json_schema",
+            "json_schema": {
+                "name": name,
+                "schema": _strip_local_keywords(schema),
+                "strict": strict,
+            },
+        }
+
+    def response_format(self) -> Dict[str, Any]:
+        """API 的 response_format 參數"""
+        return self._api_format
+
+    def validate(self, obj: Any) -> Tuple[Optional[Dict[str, Any]], List[str]]:
+        """
+        驗證並修正
+
+        Returns:
+            (修正後的對象；缺少無預設值的必填欄位時為 None, 錯誤列表)
+        """
+        errors: List[str] = []
+        result = self._check(obj, "", errors)
+        return (None if result is _INVALID else result), errors
+
+
+INTENT = ResponseSchema("observer_intent", INTENT_SCHEMA, strict=True)
+INTENT_FALLBACK = ResponseSchema("observer_intent", INTENT_FALLBACK_SCHEMA, strict=False)
+DECISION = ResponseSchema("director_decision", DECISION_SCHEMA, strict=False)
+REPAIR_PATCH = ResponseSchema("director_repair_patch", REPAIR_PATCH_SCHEMA, strict=False)
+
+
+# ============ 解析統計 ============
+
+_stats_lock = threading.Lock()
+_schema_stats: Dict[str, Dict[str, float]] = {}
+
+
+def _record(name: str, parse_seconds: float, validate_seconds: float,
+            parse_failed: bool, fixed: int, rescued: bool):
+    with _stats_lock:
+        stats = _schema_stats.setdefault(name, {
+            "calls": 0, "parse_failures": 0, "rescued": 0, "fixed_fields": 0,
+            "parse_seconds": 0.0, "validate_seconds": 0.0,
+        })
+        stats["calls"] += 1
+        stats["parse_failures"] += int(parse_failed)
+        stats["rescued"] += int(rescued)
+        stats["fixed_fields"] += fixed
+        stats["parse_seconds"] += parse_seconds
+        stats["validate_seconds"] += validate_seconds
+
+
+def parse_structured(text: str, schema: ResponseSchema) -> Tuple[Optional[Dict[str, Any]], List[str]]:
+    """
+    解析並驗證模型輸出
+
+    結構化輸出時回應就是純 JSON，直接 json.loads；
+    不支援結構化輸出的模型（或被拒絕時的降級）才走 json_stream 掃描。
+
+    Returns:
+        (修正後的對象或 None, 錯誤列表)
+    """
+    started = time.perf_counter()
+    obj = None
+    rescued = False
+    if text:
+        try:
+            obj = json.loads(text)
+        except json.JSONDecodeError:
+            obj = extract_first_json_object(text)
+            rescued = obj is not None
+    parsed_at = time.perf_counter()
+
+    if not isinstance(obj, dict):
+        _record(schema.name, parsed_at - started, 0.0, True, 0, False)
+        return None, ["無法解析 JSON"]
+
+    result, errors = schema.validate(obj)
+    _record(schema.name, parsed_at - started, time.perf_counter() - parsed_at,
+            result is None, len(errors), rescued)
+    return result, errors
+
+
+def get_schema_stats() -> Dict[str, Dict[str, float]]:
+    """
+    獲取解析/驗證統計
+
+    Returns:
+        {schema 名稱: {calls, parse_failures, rescued, fixed_fields,
+                       avg_parse_ms, avg_validate_ms}}
+        rescued 表示回應不是純 JSON、靠掃描器救回的次數
+    """
+    with _stats_lock:
+        report = {}
+        for name, stats in _schema_stats.items():
+            calls = stats["calls"] or 1
+            report[name] = {
+                "calls": stats["calls"],
+                "parse_failures": stats["parse_failures"],
+                "rescued": stats["rescued"],
+                "fixed_fields": stats["fixed_fields"],
+                "avg_parse_ms": stats["parse_seconds"] * 1000 / calls,
+                "avg_validate_ms": stats["validate_seconds"] * 1000 / calls,
+            }
+        return report
+
+
+def reset_schema_stats():
+    with _stats_lock:
+        _schema_stats.clear()
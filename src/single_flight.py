@@ -0,0 +1,126 @@
+# single_flight.py
+# 道·衍 - 相同請求合併（single-flight）
+
+"""
+請求合併
+
+多個 session 同時送出「完全相同」的 LLM 請求時（例如一群玩家在外門廣場同時查看周圍），
+只有第一個調用者（leader）真正打上游，其餘調用者等待並共享同一份結果。
+
+與 ActionCache 不同：這裡只合併「同時在途」的請求，結果不做保存。
+"""
+
+import hashlib
+import json
+import threading
+from typing import Any, Callable, Dict, Optional, Tuple
+
+
+def request_fingerprint(model: str, temperature: float, system_prompt: str,
+                        user_message: str, **extra: Any) -> str:
+    """
+    生成請求指紋（影響回應的所有參數）
+
+    Returns:
+        SHA256 hash（32 字元）
+    """
+    payload = json.dumps(
+        [model, temperature, system_prompt, user_message, extra],
+        ensure_ascii=False, sort_keys=True, default=str
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32]
+
+
+class _InFlightCall:
+    __slots__ = ("done", "result", "error", "waiters")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    同一指紋的在途請求只執行一次
+
+    使用方式：
+        result, shared = single_flight.do(key, lambda: expensive_call())
+    """
+
+    def __init__(self):
+        self._calls: Dict[str, _InFlightCall] = {}
+        self._lock = threading.Lock()
+        self._stats = {"calls": 0, "executed": 0, "coalesced": 0}
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """
+        執行或加入同一指紋的在途請求
+
+        Args:
+            key: 請求指紋
+            fn: 實際執行請求的函數（只有 leader 會調用）
+
+        Returns:
+            (結果, 是否為共享結果)
+
+        Raises:
+            leader 執行時拋出的異常（所有等待者都會收到同一個異常）
+        """
+        with self._lock:
+            self._stats["calls"] += 1
+            call = self._calls.get(key)
+            if call is None:
+                call = _InFlightCall()
+                self._calls[key] = call
+                is_leader = True
+                self._stats["executed"] += 1
+            else:
+                call.waiters += 1
+                is_leader = False
+                self._stats["coalesced"] += 1
+
+        if not is_leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+        return call.result, False
+
+    def in_flight(self) -> int:
+        """目前在途的請求數"""
+        with self._lock:
+            return len(self._calls)
+
+    def get_stats(self) -> Dict[str, int]:
+        """
+        獲取合併統計
+
+        Returns:
+            calls: 總調用次數
+            executed: 實際打上游的次數
+            coalesced: 被合併（共享結果）的次數
+        """
+        with self._lock:
+            return dict(self._stats)
+
+    def reset_stats(self):
+        with self._lock:
+            for key in self._stats:
+                self._stats[key] = 0
+
+
+# 全局實例
+single_flight = SingleFlight()
@@ -0,0 +1,121 @@
+# state_journal.py
+# 道·衍 - 玩家狀態變動日誌（只追加的 delta 與重播）
+
+"""
+狀態日誌（schema v9）
+
+players 只保存最新的狀態；存檔由 SaveScheduler 合併，最多延遲一個視窗才寫入，
+中途異常結束就會失去這段期間的進度，也沒有「狀態怎麼變成這樣」的記錄。
+
+現在每個指令結束時（SaveScheduler 擷取狀態的同時），把該指令造成的變動寫成一行 delta：
+- state_deltas (id, player_id, tick, event_id, delta)：只追加，保留作為審計記錄
+- delta 是精簡的 JSON（encode_delta）：
+    "s": {鍵: 新值}           賦值（純量、關係等）
+    "d": [鍵, ...]            刪除的鍵
+    "r": {鍵: [項目, ...]}    從列表依序移除（各移除第一個相同的項目）
+    "a": {鍵: [項目, ...]}    追加到列表尾端
+  背包、技能的拾取 / 消耗只記錄變動的項目，而不是整個列表
+- players 是定期快照：players.last_delta_id 記錄快照已包含到哪一行 delta
+
+讀檔時先讀快照，再依序重播 id > last_delta_id 的 delta（replay），
+即可還原到最後一個完成的指令；重播後立即寫入新的快照。
+"""
+
+import json
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple
+
+from player_state import REMOVED
+
+
+def _list_edit(old: List[Any], new: List[Any]) -> Optional[Tuple[List[Any], List[Any]]]:
+    """
+    把 old → new 表示成（依序移除的項目, 追加的項目）
+
+    以 new 為子序列貪婪對齊 old：對不上的視為移除，剩下的 new 視為追加。
+    重複項目可能對齊到不同位置，因此實際套用一次確認結果；無法表示時返回 None
+    """
+    removed = []
+    j = 0
+    for item in old:
+        if j < len(new) and item == new[j]:
+            j += 1
+        else:
+            removed.append(item)
+    appended = new[j:]
+
+    check = list(old)
+    for item in removed:
+        check.remove(item)
+    check.extend(appended)
+    return (removed, appended) if check == new else None
+
+
+def encode_delta(baseline: Mapping[str, Any], changes: Mapping[str, Any]) -> Dict[str, Any]:
+    """
+    把 PlayerState.diff() 的結果編碼成 delta
+
+    Args:
+        baseline: 變動前的內容（PlayerState.baseline）
+        changes: 變動的鍵 → 新值（被刪除的鍵為 REMOVED）
+    """
+    delta: Dict[str, Any] = {}
+    for key, value in changes.items():
+        if value is REMOVED:
+            delta.setdefault("d", []).append(key)
+            continue
+        old = baseline.get(key)
+        if isinstance(value, list) and isinstance(old, list):
+            edit = _list_edit(old, value)
+            if edit is not None and len(edit[0]) + len(edit[1]) < len(value):
+                removed, appended = edit
+                if removed:
+                    delta.setdefault("r", {})[key] = removed
+                if appended:
+                    delta.setdefault("a", {})[key] = appended
+                continue
+        delta.setdefault("s", {})[key] = value
+    return delta
+
+
+def dumps(delta: Dict[str, Any]) -> str:
+    return json.dumps(delta, ensure_ascii=False, separators=(",", ":"))
+
+
+def apply_delta(state: Dict[str, Any], delta: Dict[str, Any]):
+    """把一個 delta 套用到 state（就地修改）"""
+    removed = delta.get("r")
+    if removed:
+        for key, items in removed.items():
+            target = state.get(key)
+            if target is None:
+                continue
+            for item in items:
+                if item in target:
+                    target.remove(item)
+    appended = delta.get("a")
+    if appended:
+        for key, items in appended.items():
+            state.setdefault(key, []).extend(items)
+    assigned = delta.get("s")
+    if assigned:
+        state.update(assigned)
+    for key in delta.get("d", ()):
+        state.pop(key, None)
+
+
+def replay(state: Dict[str, Any], rows: Iterable[Tuple[int, int, str]]) -> Tuple[int, int, int]:
+    """
+    依序重播 delta（就地修改 state）
+
+    Args:
+        rows: (delta id, event_id, delta JSON)，依 id 遞增
+
+    Returns:
+        (重播數量, 最後一個 delta id, 最後一個 event_id)；沒有 delta 時 id 皆為 0
+    """
+    loads = json.loads
+    count = last_id = last_event_id = 0
+    for last_id, last_event_id, text in rows:
+        apply_delta(state, loads(text))
+        count += 1
+    return count, last_id, last_event_id
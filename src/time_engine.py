@@ -15,7 +15,7 @@ Tick 換算：
 - 1 遊戲月 = 4320 tick
 """
 
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 
 
 class TimeEngine:
@@ -181,12 +181,13 @@ def get_time_engine() -> TimeEngine:
     return global_time_engine
 
 
-def advance_game_time(action_type: str) -> Dict[str, Any]:
+def advance_game_time(action_type: str, ticks: Optional[int] = None) -> Dict[str, Any]:
     """
     推進遊戲時間（根據行動類型）
 
     Args:
         action_type: 行動類型
+        ticks: 指定消耗的 tick 數（如多段路線的總耗時）；None 時按行動類型計算
 
     Returns:
         {
@@ -196,7 +197,8 @@ def advance_game_time(action_type: str) -> Dict[str, Any]:
         }
     """
     engine = get_time_engine()
-    ticks = engine.calculate_time_cost(action_type)
+    if ticks is None:
+        ticks = engine.calculate_time_cost(action_type)
     new_tick = engine.advance_time(ticks)
 
     return {
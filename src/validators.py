@@ -11,10 +11,24 @@
 from typing import Dict, List, Any, Tuple, Optional
 import re
 
+from keyword_automaton import KeywordAutomaton, KeywordHits
+from keyword_tables import (
+    DAMAGE_KEYWORDS, MOVE_KEYWORDS, ITEM_GAIN_KEYWORDS, ITEM_LOSS_KEYWORDS,
+    INVALID_ITEM_WORDS, ITEM_GAIN_RE, HP_DAMAGE_RE, MOVEMENT_RE, INVALID_ITEM_RE
+)
+from narrative_index import NarrativeIndex
+from json_stream import JSONObjectScanner
+from schemas import DECISION
+
 
 class ConsistencyValidator:
     """
     驗證 Director Agent 生成的敘述 (Narrative) 與 狀態更新 (State Update) 是否一致。
+
+    所有行為詞表編譯成一個關鍵詞自動機（見 keyword_automaton.py），
+    validate 只掃描敘述一次，再建立子句索引（見 narrative_index.py），
+    否定、意圖、主語判斷針對關鍵詞的每一次出現，而不只是第一次。
+    修改詞表後需調用 rebuild_automaton()。
     """
 
     def __init__(self):
@@ -24,6 +38,24 @@ class ConsistencyValidator:
         self.hp_loss_keywords = ['受傷', '疼痛', '吐血', '重創', '震飛', '損傷', '受損', '流血']
         self.move_keywords = ['來到', '抵達', '進入', '前往', '到達', '走進', '踏入']
         self.skill_keywords = ['學會', '領悟', '習得', '掌握', '悟出']
+        self.rebuild_automaton()
+
+    def rebuild_automaton(self):
+        """用目前的詞表（驗證器詞表 + keyword_tables.py 的行為詞表）重建自動機"""
+        self._automaton = KeywordAutomaton(
+            self.gain_keywords + self.lose_keywords + self.hp_loss_keywords +
+            self.move_keywords + self.skill_keywords +
+            DAMAGE_KEYWORDS + MOVE_KEYWORDS + ITEM_GAIN_KEYWORDS + ITEM_LOSS_KEYWORDS
+        )
+
+    def scan(self, text: str) -> KeywordHits:
+        """單趟掃描敘述，返回所有關鍵詞的出現位置"""
+        return self._automaton.scan(text or "")
+
+    def index(self, text: str) -> NarrativeIndex:
+        """掃描敘述並建立子句/出現位置索引"""
+        text = text or ""
+        return NarrativeIndex(text, self._automaton.scan(text))
 
     def validate(self, narrative: str, state_update: Dict[str, Any],
                  player_state: Optional[Dict[str, Any]] = None,
@@ -41,13 +73,16 @@ class ConsistencyValidator:
             {
                 "valid": bool,
                 "errors": List[str],   # 需要重試的嚴重錯誤
+                "error_fields": List[str],  # 出錯的 state_update 欄位（供修復模式使用）
                 "warnings": List[str]  # 僅做記錄的警告
             }
         """
         errors = []
+        error_fields = []
         warnings = []
 
         narrative_text = narrative if narrative else ""
+        index = self.index(narrative_text)
 
         # 1. 檢查物品獲得（TALK 和 INSPECT 意圖跳過此檢查）
         # 因為對話中的「獲得指導」「獲得啟發」不是實際物品
@@ -56,14 +91,12 @@ class ConsistencyValidator:
         gained_items = state_update.get('items_gained', [])
         if not skip_item_check:
             for keyword in self.gain_keywords:
-                if keyword in narrative_text:
-                    # 排除否定句
-                    if self._is_negative_context(narrative_text, keyword):
-                        continue
-
+                # 排除否定句（任一次非否定的出現即算獲得）
+                if index.first_affirmed(keyword):
                     # 如果敘述提到獲得，但列表為空 -> 嚴重錯誤
                     if not gained_items:
                         errors.append(f"❌ 嚴重: 敘述提到「{keyword}」但 items_gained 為空")
+                        error_fields.append('items_gained')
                         break
 
         # 反向檢查：狀態有更新，但敘述沒提 (警告即可)
@@ -74,34 +107,37 @@ class ConsistencyValidator:
         # 2. 檢查物品失去
         lost_items = state_update.get('items_lost', [])
         for keyword in self.lose_keywords:
-            if keyword in narrative_text:
-                # 排除否定句
-                if self._is_negative_context(narrative_text, keyword):
-                    continue
-
+            # 排除否定句
+            if index.first_affirmed(keyword):
                 if not lost_items:
                     warnings.append(f"⚠️  敘述提到「{keyword}」但 items_lost 為空")
                     break
 
         # 3. 檢查 HP 變化 (受傷檢查) - 雙向檢查
+        # 彙總所有非否定的受傷描述：同一段敘述裡玩家與 NPC 都受傷時，以玩家為準
         hp_change = state_update.get('hp_change', 0)
+        player_damage = None
+        npc_damaged = False
         for keyword in self.hp_loss_keywords:
-            if keyword in narrative_text:
-                # 排除否定句
-                if self._is_negative_context(narrative_text, keyword):
+            for occurrence in index.occurrences(keyword):
+                if occurrence.negated:
                     continue
-
-                is_player_damaged = self._is_player_subject(narrative_text, keyword)
-
-                # ✅ 玩家受傷但 HP 未扣減
-                if is_player_damaged and hp_change >= 0:
-                    errors.append(f"❌ 嚴重: 敘述提到玩家「{keyword}」但 HP 未扣減 (hp_change: {hp_change})")
+                if occurrence.player_subject:
+                    player_damage = occurrence
                     break
+                npc_damaged = True
+            if player_damage:
+                break
 
-                # ✅ NPC 受傷但誤扣玩家 HP
-                elif not is_player_damaged and hp_change < 0:
-                    errors.append(f"❌ 嚴重: NPC 受傷但誤扣玩家 HP (hp_change: {hp_change})")
-                    break
+        # ✅ 玩家受傷但 HP 未扣減
+        if player_damage and hp_change >= 0:
+            errors.append(f"❌ 嚴重: 敘述提到玩家「{player_damage.keyword}」但 HP 未扣減 (hp_change: {hp_change})")
+            error_fields.append('hp_change')
+
+        # ✅ NPC 受傷但誤扣玩家 HP
+        elif npc_damaged and not player_damage and hp_change < 0:
+            errors.append(f"❌ 嚴重: NPC 受傷但誤扣玩家 HP (hp_change: {hp_change})")
+            error_fields.append('hp_change')
 
         # 4. 檢查移動（支援新架構：同時檢查 location_new 和 location_id）
         new_loc_name = state_update.get('location_new')
@@ -113,25 +149,21 @@ class ConsistencyValidator:
             new_loc_name = get_location_name(new_loc_id)
 
         for keyword in self.move_keywords:
-            if keyword in narrative_text:
-                # 排除「想要」「打算」等意圖詞
-                if self._is_intention_context(narrative_text, keyword):
-                    continue
-
+            # 排除「想要」「打算」等意圖詞（任一次實際移動即算）
+            if index.first_actual(keyword):
                 # 檢查是否有位置更新（location_new 或 location_id 至少有一個）
                 if not new_loc_name and not new_loc_id:
                     errors.append(f"❌ 嚴重: 敘述提到「{keyword}」但 location_new/location_id 都為空")
+                    error_fields.append('location_new')
                     break
 
         # 5. 檢查技能學習
         skills_gained = state_update.get('skills_gained', [])
         for keyword in self.skill_keywords:
-            if keyword in narrative_text:
-                if self._is_negative_context(narrative_text, keyword):
-                    continue
-
+            if index.first_affirmed(keyword):
                 if not skills_gained:
                     errors.append(f"❌ 嚴重: 敘述提到「{keyword}」技能但 skills_gained 為空")
+                    error_fields.append('skills_gained')
                     break
 
         # 6. 數值合理性檢查 (Sanity Check) - Level 1 警告
@@ -158,6 +190,7 @@ class ConsistencyValidator:
             from world_data import WORLD_MAP
             if state_update['location_id'] not in WORLD_MAP:
                 errors.append(f"❌ 嚴重: location_id 不存在於地圖: {state_update['location_id']}")
+                error_fields.append('location_id')
 
         # 8. 檢查數值範圍（需要 player_state）
         if player_state:
@@ -167,6 +200,7 @@ class ConsistencyValidator:
                 new_mp = current_mp + state_update['mp_change']
                 if new_mp < 0:
                     errors.append(f"❌ 嚴重: 法力扣減過多，會變為負數: {current_mp} + {state_update['mp_change']} = {new_mp}")
+                    error_fields.append('mp_change')
 
             # 檢查 HP 是否會變負數或超過上限
             if 'hp_change' in state_update:
@@ -176,6 +210,7 @@ class ConsistencyValidator:
 
                 if new_hp < 0:
                     errors.append(f"❌ 嚴重: 生命扣減過多，會變為負數: {current_hp} + {state_update['hp_change']} = {new_hp}")
+                    error_fields.append('hp_change')
                 elif new_hp > max_hp:
                     warnings.append(f"⚠️  生命恢復超過上限: {new_hp} > {max_hp}（將被限制為 {max_hp}）")
 
@@ -190,129 +225,90 @@ class ConsistencyValidator:
         return {
             'valid': len(errors) == 0,
             'errors': errors,
+            'error_fields': list(dict.fromkeys(error_fields)),
             'warnings': warnings
         }
 
-    def _is_negative_context(self, text: str, keyword: str) -> bool:
-        """
-        檢查關鍵詞是否在否定句中
-
-        例如：「沒有獲得」「無法獲得」「未能獲得」
-        """
-        negative_words = ['沒有', '無法', '未能', '不曾', '並未', '從未']
 
-        # 查找關鍵詞位置
-        keyword_pos = text.find(keyword)
-        if keyword_pos == -1:
-            return False
+class StreamingValidator:
+    """
+    串流生成時的增量驗證
 
-        # 檢查關鍵詞前 10 個字符內是否有否定詞
-        context_start = max(0, keyword_pos - 10)
-        context = text[context_start:keyword_pos + len(keyword)]
+    Director 以串流輸出時逐塊餵入：決策 JSON 一閉合就立刻做 Schema 驗證與一致性驗證，
+    不必等串流結束（之後的尾隨文字也不再讀取），有錯誤時可以馬上進入修復。
 
-        for neg_word in negative_words:
-            if neg_word in context:
-                return True
-
-        return False
+    使用方式：
+        stream_validator = StreamingValidator(player_state, intent_type)
+        for chunk in stream:
+            if stream_validator.feed(chunk):
+                break                       # 決策已完整，結果在 .decision / .result
+        stream_validator.finish(full_text)  # 串流失敗或沒有完整對象時，用完整文本補做
+    """
 
-    def _is_player_subject(self, text: str, keyword: str) -> bool:
+    def __init__(self, player_state: Optional[Dict[str, Any]] = None,
+                 intent_type: Optional[str] = None,
+                 consistency: Optional[ConsistencyValidator] = None):
+        self.player_state = player_state
+        self.intent_type = intent_type
+        self.consistency = consistency
+        self.scanner = JSONObjectScanner()
+        self.decision: Optional[Dict[str, Any]] = None
+        self.schema_errors: List[str] = []
+        self.result: Optional[Dict[str, Any]] = None
+        self.chars_received = 0
+        self.completed_at: Optional[int] = None  # 決策閉合時已收到的字數
+
+    @property
+    def done(self) -> bool:
+        return self.decision is not None
+
+    def feed(self, chunk: str) -> bool:
         """
-        檢查關鍵詞的主語是否為玩家（而非 NPC）
+        餵入一段串流文字
 
-        例如：
-        - "你受了重傷" → True (玩家)
-        - "霜焰獅受了重傷" → False (NPC)
-        - "牠身上佈滿傷痕" → False (NPC)
-        - "你一劍刺中霜焰獅，牠痛苦地吼叫" → False (NPC，以最近的主語為準)
+        Returns:
+            決策是否已完整（True 時呼叫方可以停止讀取串流）
         """
-        from keyword_tables import NPC_INDICATORS, PLAYER_INDICATORS
-
-        keyword_pos = text.find(keyword)
-        if keyword_pos == -1:
-            return False
-
-        # 向前檢查 30 個字符（擴大以涵蓋更多上下文）
-        context_start = max(0, keyword_pos - 30)
-        context_before = text[context_start:keyword_pos]
-
-        # ✅ 檢查關鍵詞後文（用於「受傷的靈獸」這類形容詞修飾句式）
-        context_after = text[keyword_pos:keyword_pos + 10]
-
-        # ✅ 最優先：檢查是否有「XXX受傷」或「受傷的XXX」句式
-        npc_indicator_words = ['靈獸', '妖獸', '魔獸', '野獸', '師兄', '師姐', '弟子', '對手', '敵人', '修士', '道人']
-
-        # 情況1：檢查前文（如「靈獸受傷」）
-        for npc_word in npc_indicator_words:
-            if npc_word in context_before:
-                npc_pos = context_before.rfind(npc_word)
-                between = context_before[npc_pos + len(npc_word):]
-                # 如果之間沒有明確的分隔符，判定為 NPC 受傷
-                if not any(sep in between for sep in ['。', '，', '！', '？']):
-                    return False  # NPC
-
-        # 情況2：檢查後文（如「受傷的靈獸」）
-        for npc_word in npc_indicator_words:
-            if npc_word in context_after:
-                # 檢查是否是「受傷的XXX」句式
-                if '的' in context_after[:context_after.find(npc_word)]:
-                    return False  # NPC
-
-        # ✅ 次優先：檢查主語代詞
-        primary_npc_pronouns = ['牠', '他', '她', '它']
-        primary_player_pronouns = ['你', '您', '我']
-
-        closest_pronoun = None
-        closest_pos = -1
-
-        for pronoun in primary_npc_pronouns + primary_player_pronouns:
-            pos = context_before.rfind(pronoun)  # 從右往左找（最接近關鍵詞）
-            if pos > closest_pos:
-                closest_pos = pos
-                closest_pronoun = pronoun
-
-        # 根據最近的代詞判斷主語
-        if closest_pronoun in primary_npc_pronouns:
-            return False  # NPC
-        elif closest_pronoun in primary_player_pronouns:
-            return True  # 玩家
-
-        # ✅ 次優先：使用統一的詞表檢查（移除了太寬泛的詞如「人」「獸」）
-        # 如果上下文中有 NPC 指示詞，判定為 NPC 受傷
-        for indicator in NPC_INDICATORS:
-            if indicator in context_before:
-                return False
-
-        # 玩家指示詞（如果出現這些，確認是玩家）
-        for indicator in PLAYER_INDICATORS:
-            if indicator in context_before:
+        if self.done:
+            return True
+        self.chars_received += len(chunk)
+        for obj in self.scanner.feed(chunk):
+            if self._accept(obj):
+                self.completed_at = self.chars_received
                 return True
+        return False
 
-        # 如果既沒有玩家指示詞也沒有 NPC 指示詞，保守起見判定為玩家
-        # （這樣可以觸發驗證，但後續 Director 可以修正）
-        return True
-
-    def _is_intention_context(self, text: str, keyword: str) -> bool:
+    def finish(self, text: Optional[str] = None) -> Optional[Dict[str, Any]]:
         """
-        檢查是否是意圖而非實際行動
+        串流結束後調用：若尚未得到完整決策，改用完整文本重新掃描
 
-        例如：「想要來到」「打算進入」「準備前往」
+        Returns:
+            驗證結果（無法得到決策時為 None）
         """
-        intention_words = ['想', '想要', '打算', '準備', '計劃', '希望', '試圖']
-
-        keyword_pos = text.find(keyword)
-        if keyword_pos == -1:
-            return False
+        if not self.done and text:
+            self.scanner.reset()
+            for obj in self.scanner.feed(text):
+                if self._accept(obj):
+                    break
+        return self.result
 
-        # 檢查關鍵詞前 8 個字符內是否有意圖詞
-        context_start = max(0, keyword_pos - 8)
-        context = text[context_start:keyword_pos]
+    def matches(self, narrative: str, state_update: Dict[str, Any]) -> bool:
+        """驗證結果是否仍對應目前的敘述與狀態更新（呼叫方之後可能修改了決策）"""
+        return (self.done and self.decision.get('narrative') == narrative and
+                self.decision.get('state_update') == state_update)
 
-        for intent_word in intention_words:
-            if intent_word in context:
-                return True
-
-        return False
+    def _accept(self, obj: Dict[str, Any]) -> bool:
+        decision, schema_errors = DECISION.validate(obj)
+        if decision is None:
+            return False
+        self.decision = decision
+        self.schema_errors = schema_errors
+        consistency = self.consistency or validator
+        self.result = consistency.validate(
+            decision.get('narrative', ''), decision.get('state_update', {}),
+            self.player_state, self.intent_type
+        )
+        return True
 
 
 def normalize_location_update(state_update: dict) -> dict:
@@ -351,6 +347,76 @@ def normalize_location_update(state_update: dict) -> dict:
     return state_update
 
 
+class NarrativeExtractor:
+    """
+    從敘述中提取狀態更新的預編譯管線（Level 3 兜底用）
+
+    - 物品 / HP / 移動的正則在 keyword_tables.py 預編譯一次
+    - 無效物品詞（INVALID_ITEM_WORDS）編譯成關鍵詞自動機，每個候選物品只掃描一次
+    - 無效物品模式（INVALID_ITEM_PATTERNS）合併成一個交替式，一次 search 完成
+
+    使用方式：
+        items, rejected = narrative_extractor.extract_items(narrative)
+        damage = narrative_extractor.extract_hp_damage(narrative)
+        destination = narrative_extractor.extract_destination(narrative)
+    """
+
+    def __init__(self, invalid_words: Optional[List[str]] = None,
+                 invalid_patterns: Optional[List[str]] = None):
+        if invalid_words is None:
+            invalid_words = INVALID_ITEM_WORDS
+        self._invalid_words = KeywordAutomaton(invalid_words)
+        if invalid_patterns is None:
+            self._invalid_pattern = INVALID_ITEM_RE
+        elif invalid_patterns:
+            self._invalid_pattern = re.compile("|".join(f"(?:{p})" for p in invalid_patterns))
+        else:
+            self._invalid_pattern = None
+
+    def invalid_item_reason(self, item: str) -> Optional[str]:
+        """
+        檢查候選物品是否無效
+
+        Returns:
+            無效原因（「抽象概念」/「模式匹配」）；有效時返回 None
+        """
+        if self._invalid_words.search(item) is not None:
+            return "抽象概念"
+        if self._invalid_pattern is not None and self._invalid_pattern.search(item):
+            return "模式匹配"
+        return None
+
+    def extract_items(self, narrative: str) -> Tuple[List[str], List[Tuple[str, str]]]:
+        """
+        提取敘述中獲得的物品
+
+        Returns:
+            (有效物品（按出現順序去重）, [(被過濾的物品, 原因)])
+        """
+        valid_items = []
+        rejected = []
+        for item in dict.fromkeys(match.group(2) for match in ITEM_GAIN_RE.finditer(narrative)):
+            reason = self.invalid_item_reason(item)
+            if reason:
+                rejected.append((item, reason))
+            else:
+                valid_items.append(item)
+        return valid_items, rejected
+
+    def extract_hp_damage(self, narrative: str) -> Optional[int]:
+        """提取明確的 HP 損失數值，沒有則 None"""
+        match = HP_DAMAGE_RE.search(narrative)
+        return int(match.group(1)) if match else None
+
+    def extract_destination(self, narrative: str) -> Optional[str]:
+        """提取移動目的地（中文名稱），沒有則 None"""
+        match = MOVEMENT_RE.search(narrative)
+        return match.group(2) if match else None
+
+
+narrative_extractor = NarrativeExtractor()
+
+
 def auto_fix_state(narrative: str, state_update: dict, intent_type: str = None) -> dict:
     """
     Level 3 兜底機制：使用 Regex 自動修復 state_update
@@ -359,6 +425,7 @@ def auto_fix_state(narrative: str, state_update: dict, intent_type: str = None)
     - 使用翻譯層統一處理 location 格式
     - 過濾無效物品（抽象概念、被截斷的詞）
     - TALK/INSPECT 意圖跳過物品修復
+    - 提取邏輯由 NarrativeExtractor（預編譯管線）完成
 
     Args:
         narrative: 劇情敘述
@@ -368,11 +435,6 @@ def auto_fix_state(narrative: str, state_update: dict, intent_type: str = None)
     Returns:
         修復後的狀態更新
     """
-    from keyword_tables import (
-        REGEX_ITEM_GAIN, REGEX_HP_DAMAGE, REGEX_MOVEMENT,
-        INVALID_ITEM_WORDS, INVALID_ITEM_PATTERNS
-    )
-
     fixed_update = state_update.copy()
 
     # TALK 和 INSPECT 意圖跳過物品修復
@@ -380,42 +442,22 @@ def auto_fix_state(narrative: str, state_update: dict, intent_type: str = None)
     skip_item_fix = intent_type in ['TALK', 'INSPECT']
 
     # 修復物品獲得
-    if not skip_item_fix and ('獲得' in narrative or '得到' in narrative or '賜予' in narrative):
-        matches = re.findall(REGEX_ITEM_GAIN, narrative)
-
-        if matches and not fixed_update.get('items_gained'):
-            # 提取第二組（物品名）並過濾無效物品
-            raw_items = list(set([match[1] for match in matches]))  # 去重
-
-            # 過濾無效物品
-            valid_items = []
-            for item in raw_items:
-                # 檢查是否在無效詞彙列表中
-                if any(invalid_word in item for invalid_word in INVALID_ITEM_WORDS):
-                    print(f"  ⚠️  過濾無效物品（抽象概念）: '{item}'")
-                    continue
-
-                # 檢查是否匹配無效模式
-                is_invalid_pattern = False
-                for pattern in INVALID_ITEM_PATTERNS:
-                    if re.search(pattern, item):
-                        print(f"  ⚠️  過濾無效物品（模式匹配）: '{item}'")
-                        is_invalid_pattern = True
-                        break
+    if not skip_item_fix and ('獲得' in narrative or '得到' in narrative or '賜予' in narrative) \
+            and not fixed_update.get('items_gained'):
+        valid_items, rejected = narrative_extractor.extract_items(narrative)
 
-                if not is_invalid_pattern:
-                    valid_items.append(item)
+        for item, reason in rejected:
+            print(f"  ⚠️  過濾無效物品（{reason}）: '{item}'")
 
-            if valid_items:
-                fixed_update['items_gained'] = valid_items
-                print(f"  🔧 自動修復: 添加物品 {valid_items}")
+        if valid_items:
+            fixed_update['items_gained'] = valid_items
+            print(f"  🔧 自動修復: 添加物品 {valid_items}")
 
     # 修復 HP 扣減（只在有明確數值時修復）
     if ('受傷' in narrative or '疼痛' in narrative or '吐血' in narrative or '重傷' in narrative or '失去' in narrative) and fixed_update.get('hp_change', 0) >= 0:
-        damage_match = re.search(REGEX_HP_DAMAGE, narrative)
+        damage = narrative_extractor.extract_hp_damage(narrative)
 
-        if damage_match:
-            damage = int(damage_match.group(1))
+        if damage is not None:
             fixed_update['hp_change'] = -damage
             print(f"  🔧 自動修復: 設置 HP 扣減 -{damage}")
         else:
@@ -423,13 +465,12 @@ def auto_fix_state(narrative: str, state_update: dict, intent_type: str = None)
             print(f"  ⚠️  無法自動修復 HP 扣減（敘述中未找到明確數值，且可能是 NPC 受傷）")
 
     # 修復移動（使用翻譯層）
-    move_match = re.search(REGEX_MOVEMENT, narrative)
-
-    if move_match and not fixed_update.get('location_new') and not fixed_update.get('location_id'):
-        destination = move_match.group(2)
-        # 提取到的是中文名稱，先暫存到 location_new
-        fixed_update['location_new'] = destination
-        print(f"  🔧 自動修復: 從敘述提取位置 '{destination}'")
+    if not fixed_update.get('location_new') and not fixed_update.get('location_id'):
+        destination = narrative_extractor.extract_destination(narrative)
+        if destination:
+            # 提取到的是中文名稱，先暫存到 location_new
+            fixed_update['location_new'] = destination
+            print(f"  🔧 自動修復: 從敘述提取位置 '{destination}'")
 
     # ✅ 最後統一使用翻譯層處理
     fixed_update = normalize_location_update(fixed_update)
@@ -506,10 +547,11 @@ def validate_npc_existence(decision: Dict[str, Any],
                 if npc:
                     recent_npc_names.add(npc['name'])
 
-    # 驗證每個檢測到的 NPC 提及
+    # 驗證每個檢測到的 NPC 提及（批次解析名稱）
+    resolved = npc_manager.resolve_names(detected_npcs)
     for npc_mention in detected_npcs:
-        # 檢查是否為已註冊 NPC（通過名稱查找）
-        if not npc_manager.get_npc_id_by_name(npc_mention):
+        # 檢查是否為已註冊 NPC（名稱、稱號或別名）
+        if not resolved[npc_mention]:
             # 檢查是否在最近事件中出現過
             if npc_mention not in recent_npc_names:
                 invalid_npcs.append(npc_mention)
@@ -16,7 +16,7 @@
 - safe: 是否為安全區域（可選）
 """
 
-from world_loader import WorldSettings
+from world_registry import world_registry
 
 
 WORLD_MAP = {
@@ -244,13 +244,9 @@ WORLD_MAP = {
     },
 }
 
-# 允許從 JSON 覆寫（若存在 data/locations.json）
-try:  # pragma: no cover - 避免載入失敗中斷
-    _world_settings = WorldSettings()
-    if _world_settings.locations_by_id:
-        WORLD_MAP = _world_settings.locations_by_id
-except Exception as exc:  # 靜默降級，保持原本的內建資料
-    print(f"[world_data] ⚠️  無法從 JSON 載入世界資料，使用內建版本: {exc}")
+# 以 data/locations.json 為準（由 world_registry 載入，熱重載後自動指向新資料）；
+# JSON 不存在或載入失敗時使用上面的內建版本
+WORLD_MAP = world_registry.view("locations", fallback=WORLD_MAP)
 
 
 # 方向對照表（用於自然語言解析）
@@ -0,0 +1,291 @@
+# world_graph.py
+# 道·衍 - 世界路網（最短路徑與快速旅行）
+
+"""
+世界路網
+
+以 WORLD_MAP 的 exits 建圖：每個出口是一條有向邊，權重為
+(時間 tick, 法力) = (get_location_time_cost, get_location_mp_cost)，
+按時間優先、法力次之取最短。
+
+境界分層：進入地點需要 tier_requirement，所以邊是否可走取決於玩家境界。
+所有地點的 tier_requirement 只有少數幾種取值（1.0 / 2.0 ...），
+把它們排序成「境界層」，第 b 層只保留目的地要求 ≤ tiers[b] 的邊；
+玩家境界落在哪一層就查哪一層的最短路徑樹。
+
+全點對最短路徑：對每層、每個起點跑一次 Dijkstra（稀疏圖 O(m log n)），
+得到單源最短路徑樹（距離 + 前驅）。地點數 ≤ config.WORLD_GRAPH_PRECOMPUTE_LIMIT
+時建圖即全部預算好；更大的地圖改為按需計算並以 LRU 快取
+（config.WORLD_GRAPH_CACHE_SIZE 棵樹），避免 O(層數 × n × m log n) 的啟動成本。
+
+使用方式：
+    graph = get_world_graph()                   # 世界資料熱重載後自動重建
+    route = graph.route("qingyun_foot", "qingyun_sword_dojo", player_tier)
+    if route:
+        route.path, route.time_cost, route.mp_cost
+"""
+
+import heapq
+import threading
+from bisect import bisect_right
+from collections import OrderedDict
+from typing import Callable, Dict, List, Mapping, NamedTuple, Optional, Tuple
+
+import config
+
+
+# (時間, 法力)
+Cost = Tuple[int, int]
+
+
+class RouteStep(NamedTuple):
+    """路線中的一步"""
+    from_id: str
+    direction: str
+    to_id: str
+    time_cost: int
+    mp_cost: int
+
+
+class Route(NamedTuple):
+    """一條完整路線（起點與終點相同時 steps 為空）"""
+    origin_id: str
+    steps: Tuple[RouteStep, ...]
+
+    @property
+    def path(self) -> List[str]:
+        return [self.origin_id] + [step.to_id for step in self.steps]
+
+    @property
+    def destination_id(self) -> str:
+        return self.steps[-1].to_id if self.steps else self.origin_id
+
+    @property
+    def time_cost(self) -> int:
+        return sum(step.time_cost for step in self.steps)
+
+    @property
+    def mp_cost(self) -> int:
+        return sum(step.mp_cost for step in self.steps)
+
+    def __len__(self) -> int:
+        return len(self.steps)
+
+
+def default_edge_cost(from_id: str, to_id: str) -> Cost:
+    """預設邊權重：與單步移動相同的時間/法力消耗"""
+    from world_map import get_location_mp_cost, get_location_time_cost
+    return get_location_time_cost(from_id, to_id), get_location_mp_cost(from_id, to_id)
+
+
+class _ShortestPathTree(NamedTuple):
+    distance: Dict[int, Cost]
+    previous: Dict[int, Tuple[int, str]]
+
+
+class WorldGraph:
+    """
+    世界路網
+
+    Args:
+        locations: {location_id: 地點資料}（需有 exits、tier_requirement）
+        edge_cost: (from_id, to_id) → (時間, 法力)
+        precompute: 建圖時預算所有最短路徑樹（預設依地點數與 config 決定）
+        cache_size: 按需計算時保留的最短路徑樹數量
+    """
+
+    def __init__(self, locations: Mapping[str, dict],
+                 edge_cost: Callable[[str, str], Cost] = default_edge_cost,
+                 precompute: Optional[bool] = None, cache_size: Optional[int] = None):
+        self.ids: List[str] = list(locations)
+        self.index: Dict[str, int] = {loc_id: i for i, loc_id in enumerate(self.ids)}
+        self.tier_of: List[float] = [
+            float(locations[loc_id].get("tier_requirement", 1.0)) for loc_id in self.ids
+        ]
+        self.tiers: List[float] = sorted(set(self.tier_of))
+
+        # adjacency[u] = [(v, 方向, 時間, 法力)]；指向不存在地點的出口忽略
+        self.adjacency: List[List[Tuple[int, str, int, int]]] = [[] for _ in self.ids]
+        for u, loc_id in enumerate(self.ids):
+            for direction, dest_id in locations[loc_id].get("exits", {}).items():
+                v = self.index.get(dest_id)
+                if v is not None:
+                    time_cost, mp_cost = edge_cost(loc_id, dest_id)
+                    self.adjacency[u].append((v, direction, time_cost, mp_cost))
+
+        # 名稱索引（完整名稱，以及「·」之後的短名）
+        self._by_name: Dict[str, str] = {}
+        self._by_short_name: Dict[str, List[str]] = {}
+        for loc_id in self.ids:
+            name = locations[loc_id].get("name")
+            if not name:
+                continue
+            self._by_name.setdefault(name, loc_id)
+            self._by_short_name.setdefault(name.split("·")[-1], []).append(loc_id)
+        self._names = {loc_id: locations[loc_id].get("name", loc_id) for loc_id in self.ids}
+
+        self._trees: "OrderedDict[Tuple[int, int], _ShortestPathTree]" = OrderedDict()
+        self._lock = threading.Lock()
+        if precompute is None:
+            precompute = len(self.ids) <= config.WORLD_GRAPH_PRECOMPUTE_LIMIT
+        self.cache_size = None if precompute else (cache_size or config.WORLD_GRAPH_CACHE_SIZE)
+        if precompute:
+            self.precompute()
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    # ============ 最短路徑樹 ============
+
+    def band_for(self, tier: float) -> Optional[int]:
+        """玩家境界對應的境界層（低於所有地點要求時為 None）"""
+        band = bisect_right(self.tiers, tier) - 1
+        return band if band >= 0 else None
+
+    def _dijkstra(self, source: int, band: int) -> _ShortestPathTree:
+        limit = self.tiers[band]
+        tier_of = self.tier_of
+        adjacency = self.adjacency
+        distance: Dict[int, Cost] = {source: (0, 0)}
+        previous: Dict[int, Tuple[int, str]] = {}
+        heap = [(0, 0, source)]
+
+        while heap:
+            time_cost, mp_cost, u = heapq.heappop(heap)
+            if (time_cost, mp_cost) > distance[u]:
+                continue  # 過期項目
+            for v, direction, edge_time, edge_mp in adjacency[u]:
+                if tier_of[v] > limit:
+                    continue
+                candidate = (time_cost + edge_time, mp_cost + edge_mp)
+                known = distance.get(v)
+                if known is None or candidate < known:
+                    distance[v] = candidate
+                    previous[v] = (u, direction)
+                    heapq.heappush(heap, (candidate[0], candidate[1], v))
+
+        return _ShortestPathTree(distance, previous)
+
+    def _tree(self, source: int, band: int) -> _ShortestPathTree:
+        key = (band, source)
+        with self._lock:
+            tree = self._trees.get(key)
+            if tree is not None:
+                if self.cache_size is not None:
+                    self._trees.move_to_end(key)
+                return tree
+
+        tree = self._dijkstra(source, band)
+        with self._lock:
+            self._trees[key] = tree
+            if self.cache_size is not None and len(self._trees) > self.cache_size:
+                self._trees.popitem(last=False)
+        return tree
+
+    def precompute(self):
+        """預算每個境界層、每個起點的最短路徑樹（全點對最短路徑）"""
+        trees = OrderedDict(
+            ((band, source), self._dijkstra(source, band))
+            for band in range(len(self.tiers))
+            for source in range(len(self.ids))
+        )
+        with self._lock:
+            self._trees = trees
+
+    # ============ 查詢 ============
+
+    def route(self, from_id: str, to_id: str, tier: float) -> Optional[Route]:
+        """
+        以玩家境界可走的邊，找出耗時最少（其次法力最少）的路線
+
+        Returns:
+            Route；地點不存在或無法抵達時返回 None
+        """
+        source, target = self.index.get(from_id), self.index.get(to_id)
+        if source is None or target is None:
+            return None
+        if source == target:
+            return Route(from_id, ())
+
+        band = self.band_for(tier)
+        if band is None:
+            return None
+        tree = self._tree(source, band)
+        if target not in tree.distance:
+            return None
+
+        steps = []
+        node = target
+        while node != source:
+            parent, direction = tree.previous[node]
+            for v, edge_direction, time_cost, mp_cost in self.adjacency[parent]:
+                if v == node and edge_direction == direction:
+                    steps.append(RouteStep(self.ids[parent], direction, self.ids[node],
+                                           time_cost, mp_cost))
+                    break
+            node = parent
+        return Route(from_id, tuple(reversed(steps)))
+
+    def distance(self, from_id: str, to_id: str, tier: float) -> Optional[Cost]:
+        """最短路線的 (時間, 法力)；無法抵達時返回 None"""
+        route = self.route(from_id, to_id, tier)
+        return (route.time_cost, route.mp_cost) if route is not None else None
+
+    def reachable(self, from_id: str, tier: float) -> List[str]:
+        """以玩家境界可抵達的地點（不含起點，由近到遠）"""
+        source = self.index.get(from_id)
+        band = self.band_for(tier)
+        if source is None or band is None:
+            return []
+        distance = self._tree(source, band).distance
+        return [self.ids[v] for v in sorted(distance, key=distance.__getitem__) if v != source]
+
+    def required_tier(self, from_id: str, to_id: str) -> Optional[float]:
+        """抵達目的地所需的最低境界；任何境界都無法抵達時返回 None"""
+        source, target = self.index.get(from_id), self.index.get(to_id)
+        if source is None or target is None:
+            return None
+        for band, tier in enumerate(self.tiers):
+            if target == source or target in self._tree(source, band).distance:
+                return tier
+        return None
+
+    def resolve(self, query: str) -> Optional[str]:
+        """
+        把地點 ID、完整名稱或短名（「·」之後的部分）解析為地點 ID
+
+        短名或部分名稱必須唯一對應一個地點。
+        """
+        query = query.strip()
+        if query in self.index:
+            return query
+        if query in self._by_name:
+            return self._by_name[query]
+        candidates = self._by_short_name.get(query, [])
+        if len(candidates) == 1:
+            return candidates[0]
+        partial = [loc_id for loc_id, name in self._names.items() if query and query in name]
+        return partial[0] if len(partial) == 1 else None
+
+    def name_of(self, location_id: str) -> str:
+        return self._names.get(location_id, location_id)
+
+
+# 全局實例（依世界資料版本快取，熱重載後重建）
+_graph: Optional[WorldGraph] = None
+_graph_version: Optional[int] = None
+_graph_lock = threading.Lock()
+
+
+def get_world_graph() -> WorldGraph:
+    """獲取當前世界資料的路網"""
+    global _graph, _graph_version
+    from world_data import WORLD_MAP
+    from world_registry import world_registry
+
+    version = world_registry.version
+    with _graph_lock:
+        if _graph is None or _graph_version != version:
+            _graph = WorldGraph(WORLD_MAP)
+            _graph_version = version
+        return _graph
@@ -4,8 +4,9 @@
 from __future__ import annotations
 
 import json
+from collections import deque
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
 
 import config
 
@@ -23,11 +24,183 @@ DEFAULT_ALLOWED_EVENTS = [
 ]
 
 
+def _traverse(start: int, neighbours: List[List[int]], allowed: Optional[List[bool]] = None) -> Set[int]:
+    """BFS（allowed 為 None 時不限制節點）"""
+    seen = {start}
+    queue = deque([start])
+    while queue:
+        u = queue.popleft()
+        for v in neighbours[u]:
+            if v not in seen and (allowed is None or allowed[v]):
+                seen.add(v)
+                queue.append(v)
+    return seen
+
+
+def _strongly_connected_components(adjacency: List[List[int]]) -> List[List[int]]:
+    """Tarjan 強連通分量（迭代版，O(V+E)）"""
+    size = len(adjacency)
+    index = [-1] * size
+    lowlink = [0] * size
+    on_stack = [False] * size
+    stack: List[int] = []
+    components: List[List[int]] = []
+    counter = 0
+
+    for root in range(size):
+        if index[root] != -1:
+            continue
+        work = [(root, 0)]
+        while work:
+            node, edge_i = work.pop()
+            if edge_i == 0:
+                index[node] = lowlink[node] = counter
+                counter += 1
+                stack.append(node)
+                on_stack[node] = True
+            recurse = False
+            neighbours = adjacency[node]
+            while edge_i < len(neighbours):
+                nxt = neighbours[edge_i]
+                edge_i += 1
+                if index[nxt] == -1:
+                    work.append((node, edge_i))
+                    work.append((nxt, 0))
+                    recurse = True
+                    break
+                if on_stack[nxt]:
+                    lowlink[node] = min(lowlink[node], index[nxt])
+            if recurse:
+                continue
+            if lowlink[node] == index[node]:
+                component = []
+                while True:
+                    member = stack.pop()
+                    on_stack[member] = False
+                    component.append(member)
+                    if member == node:
+                        break
+                components.append(component)
+            if work:
+                parent = work[-1][0]
+                lowlink[parent] = min(lowlink[parent], lowlink[node])
+
+    return components
+
+
+def analyze_world_graph(locations_by_id: Dict[str, Dict[str, Any]],
+                        event_location_ids: Iterable[str] = (),
+                        start_id: Optional[str] = None) -> Dict[str, Any]:
+    """
+    地圖連通性分析（O(境界層數 × (V+E))，境界層數即不同 tier_requirement 的數量）
+
+    Args:
+        locations_by_id: {location_id: 地點資料}
+        event_location_ids: 有事件池的地點
+        start_id: 起始地點（預設 config.INITIAL_PLAYER_STATE 的 location_id）
+
+    Returns:
+        {
+            "dangling_exits": [(地點, 方向, 不存在的目的地)],
+            "asymmetric_exits": [(地點, 方向, 目的地)],   # 目的地沒有出口通回來
+            "components": [[地點...]],                     # 強連通分量（只列多於一個分量時）
+            "unreachable": [地點],                         # 從起點任何境界都到不了
+            "one_way_traps": [地點],                       # 到得了但回不到起點
+            "tier_dead_ends": {境界: [地點]},               # 該境界下到得了、回不去（更高境界才能離開）
+            "unreachable_event_pools": [地點],
+        }
+    """
+    ids = list(locations_by_id)
+    index = {loc_id: i for i, loc_id in enumerate(ids)}
+    start_id = start_id or config.INITIAL_PLAYER_STATE.get("location_id")
+
+    adjacency: List[List[int]] = [[] for _ in ids]
+    reverse: List[List[int]] = [[] for _ in ids]
+    edges: Set[Tuple[int, int]] = set()
+    report: Dict[str, Any] = {
+        "dangling_exits": [], "asymmetric_exits": [], "components": [], "unreachable": [],
+        "one_way_traps": [], "tier_dead_ends": {}, "unreachable_event_pools": [],
+    }
+
+    for u, loc_id in enumerate(ids):
+        for direction, dest_id in (locations_by_id[loc_id].get("exits") or {}).items():
+            v = index.get(dest_id)
+            if v is None:
+                report["dangling_exits"].append((loc_id, direction, dest_id))
+                continue
+            adjacency[u].append(v)
+            reverse[v].append(u)
+            edges.add((u, v))
+
+    for u, loc_id in enumerate(ids):
+        for direction, dest_id in (locations_by_id[loc_id].get("exits") or {}).items():
+            v = index.get(dest_id)
+            if v is not None and v != u and (v, u) not in edges:
+                report["asymmetric_exits"].append((loc_id, direction, dest_id))
+
+    components = _strongly_connected_components(adjacency)
+    if len(components) > 1:
+        report["components"] = [sorted(ids[i] for i in component) for component in components]
+
+    start = index.get(start_id)
+    if start is None:
+        return report
+
+    reachable = _traverse(start, adjacency)
+    returnable = _traverse(start, reverse)
+    report["unreachable"] = [ids[i] for i in range(len(ids)) if i not in reachable]
+    report["one_way_traps"] = [ids[i] for i in sorted(reachable - returnable)]
+    traps = set(reachable - returnable)
+
+    # 境界層：只允許進入要求 ≤ tier 的地點；到得了但回不到起點的地點就是境界死路
+    tier_of = [float(locations_by_id[loc_id].get("tier_requirement", 1.0)) for loc_id in ids]
+    for tier in sorted(set(tier_of)):
+        allowed = [t <= tier for t in tier_of]
+        if not allowed[start]:
+            continue
+        band_reachable = _traverse(start, adjacency, allowed)
+        band_returnable = _traverse(start, reverse, allowed)
+        dead_ends = sorted(band_reachable - band_returnable - traps)
+        if dead_ends:
+            report["tier_dead_ends"][tier] = [ids[i] for i in dead_ends]
+
+    unreachable = set(report["unreachable"])
+    report["unreachable_event_pools"] = sorted(
+        {loc_id for loc_id in event_location_ids if loc_id in unreachable}
+    )
+    return report
+
+
+def format_graph_report(report: Dict[str, Any]) -> List[str]:
+    """把 analyze_world_graph 的結果整理成警告訊息（無問題時為空）"""
+    messages = []
+    for loc_id, direction, dest_id in report["asymmetric_exits"]:
+        messages.append(f"單向出口: {loc_id} --{direction}--> {dest_id}（{dest_id} 沒有出口通回）")
+    if report["components"]:
+        messages.append(f"地圖分成 {len(report['components'])} 個強連通分量: "
+                        + " | ".join(", ".join(component) for component in report["components"]))
+    if report["unreachable"]:
+        messages.append(f"從起點無法抵達的地點: {', '.join(report['unreachable'])}")
+    if report["one_way_traps"]:
+        messages.append(f"進入後無法返回起點的地點: {', '.join(report['one_way_traps'])}")
+    for tier, loc_ids in report["tier_dead_ends"].items():
+        messages.append(f"境界 {tier} 的死路（需更高境界才能離開）: {', '.join(loc_ids)}")
+    if report["unreachable_event_pools"]:
+        messages.append(f"事件池位於無法抵達的地點: {', '.join(report['unreachable_event_pools'])}")
+    return messages
+
+
 class WorldSettings:
-    """統一載入 locations/npcs/events/items/skills 的輕量工具。"""
+    """統一載入 locations/npcs/events/items/skills 的輕量工具。
 
-    def __init__(self, data_path: Optional[Path] = None):
+    strict=True 時（熱重載使用），檔案讀取失敗或引用驗證失敗一律 raise，
+    不論 DEBUG 與否，讓呼叫端保留舊版資料。
+    """
+
+    def __init__(self, data_path: Optional[Path] = None, strict: bool = False):
         self.data_path = Path(data_path) if data_path else config.DATA_PATH
+        self.strict = strict
+        self.load_errors: List[str] = []
 
         self.locations: List[Dict[str, Any]] = self._load_locations()
         self.npcs: List[Dict[str, Any]] = self._load_json_file("npcs.json", root_key="npcs")
@@ -53,6 +226,7 @@ class WorldSettings:
                 data = json.load(f)
         except Exception as exc:  # pragma: no cover - defensive
             print(f"[world_loader] 無法讀取 {filename}: {exc}")
+            self.load_errors.append(f"無法讀取 {filename}: {exc}")
             return []
 
         if root_key is None:
@@ -79,7 +253,7 @@ class WorldSettings:
 
     def _validate_references(self):
         """驗證資料引用完整性。DEBUG 模式下致命錯誤會 raise。"""
-        errors = []
+        errors = list(self.load_errors) if self.strict else []
 
         # locations id 唯一性
         if len(self.locations_by_id) != len(self.locations):
@@ -97,6 +271,18 @@ class WorldSettings:
             if loc_id and loc_id not in self.locations_by_id:
                 errors.append(f"事件池 location_id '{loc_id}' 不存在於 locations")
 
+        # 地圖連通性（出口指向不存在的地點是致命錯誤，其餘僅警告；完整報告見 graph_report）
+        self.graph_report = analyze_world_graph(
+            self.locations_by_id,
+            (event.get("location_id") for event in self.events if event.get("location_id")),
+        )
+        for loc_id, direction, dest_id in self.graph_report["dangling_exits"]:
+            errors.append(f"地點 {loc_id} 的出口 {direction} 指向不存在的地點 '{dest_id}'")
+        self.graph_warnings = format_graph_report(self.graph_report)
+        if config.DEBUG:
+            for warning in self.graph_warnings:
+                print(f"[world_loader] ⚠️  {warning}")
+
         # treasures 物品是否存在（僅警告，不視為致命錯誤）
         # 統一使用 item_id，建立 id 集合
         item_ids = {item.get("id") for item in self.items if item.get("id")}
@@ -108,9 +294,18 @@ class WorldSettings:
 
         # DEBUG 模式下直接報錯，否則僅警告
         if errors:
-            if config.DEBUG:
+            if config.DEBUG or self.strict:
                 raise ValueError(f"[world_loader] 設定集驗證失敗:\n" + "\n".join(f"  - {e}" for e in errors))
             else:
                 for err in errors:
                     print(f"[world_loader] ⚠️  {err}")
 
+
+if __name__ == "__main__":
+    # 地圖一致性檢查：python src/world_loader.py
+    settings = WorldSettings()
+    warnings = settings.graph_warnings
+    print(f"地點 {len(settings.locations)} 個，事件池 {len(settings.events_by_location)} 個")
+    for warning in warnings:
+        print(f"⚠️  {warning}")
+    print("✅ 地圖連通性檢查通過" if not warnings else f"共 {len(warnings)} 項警告")
@@ -0,0 +1,384 @@
+# world_registry.py
+# 道·衍 - 世界資料註冊表（單次載入 + 熱重載）
+
+"""
+世界資料註冊表
+
+原本 world_data.py、event_pools.py 各自在導入時建立一次 WorldSettings，
+NPCManager 又再讀一次 npcs.json；改動 data/*.json 必須重啟。
+
+現在所有世界資料只由這裡載入一次，組成不可變的 WorldSnapshot：
+- 頂層映射都是 MappingProxyType（唯讀），條目字典與 JSON 內容共享，請勿原地修改
+- 熱重載時在背景重新載入並以 strict 模式驗證，通過才整體替換快照
+  （單一屬性賦值，讀者永遠看到完整的舊版或新版，不會看到一半）
+- 驗證失敗則保留舊快照，同一組檔案版本不會重複驗證
+
+使用方式：
+    from world_registry import world_registry
+
+    snapshot = world_registry.snapshot          # 一次取用，同一回合內資料一致
+    WORLD_MAP = world_registry.view("locations", fallback=BUILTIN)  # 永遠指向最新快照
+    world_registry.subscribe(lambda snapshot: ...)                  # 替換後回調
+    world_registry.start_watching()             # 背景輪詢 mtime（config.WORLD_RELOAD_INTERVAL）
+
+編譯快照（加速啟動）：
+    python src/world_registry.py                # data/*.json → data/world_snapshot.bin
+
+編譯時以 strict 模式驗證並建好所有索引，連同來源檔內容的 SHA-256 一起 pickle。
+載入時只要雜湊相符就一次讀入，跳過 JSON 解析與驗證；不相符（JSON 已修改）或格式版本不同
+則照常解析 JSON。快照是本地建置產物（已加入 .gitignore），不要載入來路不明的檔案。
+"""
+
+import hashlib
+import os
+import pickle
+import threading
+import time
+from collections.abc import Mapping
+from pathlib import Path
+from types import MappingProxyType
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import config
+from world_loader import WorldSettings
+
+
+WORLD_FILES = ("locations.json", "npcs.json", "events.json", "items.json", "skills.json")
+
+# 編譯快照格式版本（build_tables 的結構改變時遞增，舊快照自動失效）
+SNAPSHOT_FORMAT = 1
+
+
+def _event_pool(data: Dict[str, Any]) -> Dict[str, Any]:
+    """事件池統一格式（與 event_pools.get_event_pool 的返回格式相同）"""
+    return {
+        "npcs": data.get("npcs", []),
+        "random_encounters": data.get("random_encounters", []),
+        "treasures": data.get("treasures", []),
+        "events": data.get("events", []),
+    }
+
+
+def build_tables(settings: WorldSettings) -> Dict[str, Any]:
+    """
+    把 WorldSettings 整理成快照所需的索引表（純 dict/list，可 pickle）
+
+    npcs 與 npcs_by_id 共享同一批條目字典。
+    """
+    return {
+        "locations": dict(settings.locations_by_id),
+        "npcs": list(settings.npcs),
+        "npcs_by_id": dict(settings.npcs_by_id),
+        "event_pools": {
+            loc_id: _event_pool(data) for loc_id, data in settings.events_by_location.items()
+        },
+        "items_by_id": {item["id"]: item for item in settings.items if item.get("id")},
+        "skills_by_id": {skill["id"]: skill for skill in settings.skills if skill.get("id")},
+    }
+
+
+def source_hash(data_path: Path) -> str:
+    """世界資料來源檔內容的雜湊（含快照格式版本）"""
+    digest = hashlib.sha256(f"world-snapshot-v{SNAPSHOT_FORMAT}".encode())
+    for filename in WORLD_FILES:
+        digest.update(filename.encode() + b"\0")
+        try:
+            digest.update((Path(data_path) / filename).read_bytes())
+        except OSError:
+            digest.update(b"<missing>")
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def compile_world(data_path: Optional[Path] = None, output: Optional[Path] = None) -> Path:
+    """
+    把 data/*.json 編譯成預先驗證、預建索引的二進位快照
+
+    Args:
+        data_path: 資料目錄（預設 config.DATA_PATH）
+        output: 輸出路徑（預設 <data_path>/config.WORLD_SNAPSHOT_FILENAME）
+
+    Returns:
+        輸出路徑
+
+    Raises:
+        ValueError: 資料驗證失敗
+        RuntimeError: 編譯期間來源檔被修改
+    """
+    data_path = Path(data_path) if data_path else config.DATA_PATH
+    output = Path(output) if output else data_path / config.WORLD_SNAPSHOT_FILENAME
+
+    digest = source_hash(data_path)
+    tables = build_tables(WorldSettings(data_path, strict=True))
+    if source_hash(data_path) != digest:
+        raise RuntimeError("編譯期間世界資料被修改，請重新編譯")
+
+    payload = {"format": SNAPSHOT_FORMAT, "hash": digest, "tables": tables}
+    temp_path = output.with_name(output.name + ".tmp")
+    temp_path.write_bytes(pickle.dumps(payload, protocol=pickle.HIGHEST_PROTOCOL))
+    os.replace(temp_path, output)
+    return output
+
+
+def load_compiled(path: Path, expected_hash: str) -> Optional[Dict[str, Any]]:
+    """
+    讀取編譯快照
+
+    Returns:
+        索引表；檔案不存在、格式版本不同或雜湊不符時返回 None
+    """
+    try:
+        raw = Path(path).read_bytes()
+    except OSError:
+        return None
+
+    try:
+        payload = pickle.loads(raw)
+    except Exception as exc:
+        print(f"[world_registry] ⚠️  編譯快照損壞，改為解析 JSON: {type(exc).__name__}: {exc}")
+        return None
+
+    if not isinstance(payload, dict) or payload.get("format") != SNAPSHOT_FORMAT:
+        return None
+    if payload.get("hash") != expected_hash:
+        if config.DEBUG:
+            print("[world_registry] 編譯快照已過期，改為解析 JSON（可執行 python src/world_registry.py 重新編譯）")
+        return None
+    return payload.get("tables")
+
+
+class WorldSnapshot:
+    """某一時刻的完整世界資料（建立後不再改變）"""
+
+    __slots__ = ("version", "loaded_at", "mtimes", "source", "locations", "npcs", "npcs_by_id",
+                 "event_pools", "items_by_id", "skills_by_id")
+
+    def __init__(self, tables: Optional[Dict[str, Any]] = None, version: int = 0,
+                 mtimes: Optional[Dict[str, Optional[int]]] = None, source: str = "json"):
+        self.version = version
+        self.loaded_at = time.time()
+        self.mtimes = dict(mtimes or {})
+        self.source = source
+
+        tables = tables or {}
+        self.locations = MappingProxyType(tables.get("locations", {}))
+        self.npcs: Tuple[Dict[str, Any], ...] = tuple(tables.get("npcs", ()))
+        self.npcs_by_id = MappingProxyType(tables.get("npcs_by_id", {}))
+        self.event_pools = MappingProxyType(tables.get("event_pools", {}))
+        self.items_by_id = MappingProxyType(tables.get("items_by_id", {}))
+        self.skills_by_id = MappingProxyType(tables.get("skills_by_id", {}))
+
+    def __repr__(self):
+        return (f"WorldSnapshot(version={self.version}, source={self.source}, "
+                f"locations={len(self.locations)}, npcs={len(self.npcs)}, "
+                f"event_pools={len(self.event_pools)})")
+
+
+class LiveView(Mapping):
+    """
+    指向註冊表「當前快照」某個映射的唯讀視圖
+
+    讓 `from world_data import WORLD_MAP` 這類模組級名稱在熱重載後也能看到新資料。
+    快照中的映射為空時（例如 JSON 不存在）改用 fallback（內建資料）。
+    """
+
+    def __init__(self, registry: "WorldRegistry", attr: str, fallback: Optional[Mapping] = None):
+        self._registry = registry
+        self._attr = attr
+        self._fallback = fallback
+
+    def _current(self) -> Mapping:
+        data = getattr(self._registry.snapshot, self._attr)
+        if not data and self._fallback is not None:
+            return self._fallback
+        return data
+
+    def __getitem__(self, key):
+        return self._current()[key]
+
+    def get(self, key, default=None):
+        return self._current().get(key, default)
+
+    def __contains__(self, key):
+        return key in self._current()
+
+    def __iter__(self) -> Iterator:
+        return iter(self._current())
+
+    def __len__(self) -> int:
+        return len(self._current())
+
+    def __repr__(self):
+        return f"LiveView({self._attr}, {len(self)} entries)"
+
+
+class WorldRegistry:
+    """
+    世界資料註冊表
+
+    Args:
+        data_path: 資料目錄（預設 config.DATA_PATH）
+        autoload: 建立時立即載入（否則延遲到第一次存取 snapshot）
+        use_compiled: 雜湊相符時使用編譯快照（預設 config.WORLD_SNAPSHOT_ENABLED）
+    """
+
+    def __init__(self, data_path: Optional[Path] = None, autoload: bool = True,
+                 use_compiled: Optional[bool] = None):
+        self.data_path = Path(data_path) if data_path else config.DATA_PATH
+        self.snapshot_path = self.data_path / config.WORLD_SNAPSHOT_FILENAME
+        self.use_compiled = config.WORLD_SNAPSHOT_ENABLED if use_compiled is None else use_compiled
+        self._snapshot = WorldSnapshot()
+        self._reload_lock = threading.RLock()
+        self._loaded = False
+        self._rejected_mtimes: Optional[Dict[str, Optional[int]]] = None
+        self._subscribers: List[Callable[[WorldSnapshot], None]] = []
+        self._watcher: Optional[threading.Thread] = None
+        self._stop_watching = threading.Event()
+        if autoload:
+            self._ensure_loaded()
+
+    def _ensure_loaded(self):
+        if self._loaded:
+            return
+        with self._reload_lock:
+            if not self._loaded:
+                self.reload(force=True)
+
+    @property
+    def snapshot(self) -> WorldSnapshot:
+        """當前快照（需要跨多次查詢保持一致時，先取出再使用；首次存取時載入）"""
+        if not self._loaded:
+            self._ensure_loaded()
+        return self._snapshot
+
+    @property
+    def version(self) -> int:
+        return self.snapshot.version
+
+    def view(self, attr: str, fallback: Optional[Mapping] = None) -> LiveView:
+        """建立指向當前快照某個映射的視圖（見 LiveView）"""
+        return LiveView(self, attr, fallback)
+
+    def subscribe(self, callback: Callable[[WorldSnapshot], None]):
+        """註冊快照替換後的回調（在執行重載的線程中調用）"""
+        self._subscribers.append(callback)
+
+    # ============ 重載 ============
+
+    def file_mtimes(self) -> Dict[str, Optional[int]]:
+        """各資料檔的修改時間（ns；檔案不存在為 None）"""
+        mtimes = {}
+        for filename in WORLD_FILES:
+            try:
+                mtimes[filename] = (self.data_path / filename).stat().st_mtime_ns
+            except OSError:
+                mtimes[filename] = None
+        return mtimes
+
+    def changed_files(self) -> List[str]:
+        """與當前快照相比有變動的檔案"""
+        current = self.snapshot.mtimes
+        return [name for name, mtime in self.file_mtimes().items() if current.get(name) != mtime]
+
+    def reload(self, force: bool = False) -> bool:
+        """
+        重新載入世界資料
+
+        編譯快照與來源檔雜湊相符時直接使用（編譯時已驗證）；否則解析 JSON。
+        首次解析沿用 WorldSettings 原本的寬鬆行為（只有 DEBUG 下驗證失敗才 raise，
+        raise 時各模組退回內建資料）；之後的重載一律 strict，驗證失敗保留舊快照。
+
+        Args:
+            force: 即使檔案未變動也重新載入
+
+        Returns:
+            是否替換了快照
+        """
+        with self._reload_lock:
+            self._loaded = True
+            mtimes = self.file_mtimes()
+            current = self._snapshot
+            if not force and (mtimes == current.mtimes or mtimes == self._rejected_mtimes):
+                return False
+
+            first_load = current.version == 0
+            tables, source = None, "compiled"
+            if self.use_compiled:
+                tables = load_compiled(self.snapshot_path, source_hash(self.data_path))
+
+            if tables is None:
+                source = "json"
+                try:
+                    tables = build_tables(WorldSettings(self.data_path, strict=not first_load))
+                except Exception as exc:
+                    self._rejected_mtimes = mtimes
+                    if first_load:
+                        print(f"[world_registry] ⚠️  無法載入世界資料，使用內建版本: {exc}")
+                    else:
+                        print(f"[world_registry] ⚠️  世界資料驗證失敗，保留版本 {current.version}: {exc}")
+                    return False
+
+            snapshot = WorldSnapshot(tables, current.version + 1, mtimes, source)
+            self._snapshot = snapshot
+            self._rejected_mtimes = None
+
+        if config.DEBUG and not first_load:
+            print(f"[world_registry] 已重載世界資料 → 版本 {snapshot.version}")
+        for callback in list(self._subscribers):
+            try:
+                callback(snapshot)
+            except Exception as exc:
+                print(f"[world_registry] ⚠️  重載回調失敗: {type(exc).__name__}: {exc}")
+        return True
+
+    # ============ 檔案監看 ============
+
+    def start_watching(self, interval: Optional[float] = None):
+        """啟動背景線程，定期檢查 mtime 並自動重載"""
+        if self._watcher is not None and self._watcher.is_alive():
+            return
+        interval = config.WORLD_RELOAD_INTERVAL if interval is None else interval
+        self._stop_watching.clear()
+        self._watcher = threading.Thread(
+            target=self._watch_loop, args=(interval,), name="world-registry-watcher", daemon=True
+        )
+        self._watcher.start()
+
+    def stop_watching(self, timeout: Optional[float] = None):
+        """停止背景監看"""
+        self._stop_watching.set()
+        if self._watcher is not None:
+            self._watcher.join(timeout)
+            self._watcher = None
+
+    @property
+    def watching(self) -> bool:
+        return self._watcher is not None and self._watcher.is_alive()
+
+    def _watch_loop(self, interval: float):
+        while not self._stop_watching.wait(interval):
+            try:
+                self.reload()
+            except Exception as exc:  # pragma: no cover - 監看線程不能因單次失敗退出
+                print(f"[world_registry] ⚠️  重載失敗: {type(exc).__name__}: {exc}")
+
+
+# 全局實例（第一次存取 snapshot 時才載入）
+world_registry = WorldRegistry(autoload=False)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="把 data/*.json 編譯成世界資料快照")
+    parser.add_argument("--data", type=Path, default=config.DATA_PATH, help="資料目錄")
+    parser.add_argument("--output", type=Path, default=None,
+                        help=f"輸出路徑（預設 <資料目錄>/{config.WORLD_SNAPSHOT_FILENAME}）")
+    args = parser.parse_args()
+
+    try:
+        output = compile_world(args.data, args.output)
+    except (ValueError, RuntimeError) as exc:
+        print(f"[ERROR] 編譯失敗: {exc}")
+        raise SystemExit(1)
+    print(f"已編譯世界資料快照: {output}（{output.stat().st_size} bytes）")
@@ -61,3 +61,13 @@ def test_db_path(tmp_path):
     db_path = tmp_path / "test_game_data.db"
     yield str(db_path)
     # pytest 會自動清理 tmp_path
+
+
+@pytest.fixture
+def db(test_db_path, monkeypatch):
+    """使用臨時資料庫的 GameStateManager（config.DB_PATH 指向 test_db_path）"""
+    import config
+    from game_state import GameStateManager
+
+    monkeypatch.setattr(config, "DB_PATH", Path(test_db_path))
+    return GameStateManager()
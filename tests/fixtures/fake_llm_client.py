@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+"""
+FakeChatClient - 行程內的假 OpenAI 客戶端
+模擬 client.chat.completions.create，用於並發、批次與串流測試（不需要網路）
+"""
+
+import threading
+import time
+from types import SimpleNamespace
+from typing import Callable, List, Optional, Union
+
+
+class FakeChatClient:
+    """
+    替換 agent.client 使用
+
+    Args:
+        responder: 回應內容，可以是固定字串或 (messages, kwargs) -> str 的函數
+        delay: 每次調用的延遲（秒），用於製造「在途」窗口
+        stream_chunk_size: stream=True 時每個串流事件的字數
+
+    屬性：
+        calls: 實際被調用的次數
+        max_concurrency: 觀測到的最大同時在途調用數
+        requests: 每次調用的參數
+        streamed_chunks: 串流調用中實際被讀取的事件數（用於驗證提前結束）
+    """
+
+    def __init__(self, responder: Union[str, Callable[[list, dict], str]] = "測試回應",
+                 delay: float = 0.0, stream_chunk_size: int = 8):
+        self.responder = responder
+        self.delay = delay
+        self.stream_chunk_size = stream_chunk_size
+        self.streamed_chunks = 0
+        self.calls = 0
+        self.max_concurrency = 0
+        self.requests: List[dict] = []
+        self._active = 0
+        self._lock = threading.Lock()
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, model: str, messages: list, temperature: Optional[float] = None,
+                timeout: Optional[float] = None, **kwargs):
+        with self._lock:
+            self.calls += 1
+            self._active += 1
+            self.max_concurrency = max(self.max_concurrency, self._active)
+            self.requests.append({"model": model, "messages": messages,
+                                  "temperature": temperature, **kwargs})
+        try:
+            if self.delay:
+                time.sleep(self.delay)
+            if callable(self.responder):
+                content = self.responder(messages, kwargs)
+            else:
+                content = self.responder
+        finally:
+            with self._lock:
+                self._active -= 1
+
+        if kwargs.get("stream"):
+            return self._stream(content or "")
+
+        message = SimpleNamespace(role="assistant", content=content)
+        return SimpleNamespace(choices=[SimpleNamespace(index=0, message=message,
+                                                        finish_reason="stop")])
+
+    def _stream(self, content: str):
+        size = self.stream_chunk_size
+        for start in range(0, len(content), size):
+            with self._lock:
+                self.streamed_chunks += 1
+            delta = SimpleNamespace(content=content[start:start + size])
+            yield SimpleNamespace(choices=[SimpleNamespace(index=0, delta=delta,
+                                                           finish_reason=None)])
@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+"""
+FakeLLMServer - 本地假 OpenAI 相容伺服器
+用於在不連網的情況下測試 call_gpt 的超時、對沖與熔斷行為
+"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Optional, Union
+
+
+class FakeLLMServer:
+    """
+    模擬 /v1/chat/completions 端點，可按請求順序注入延遲與錯誤
+
+    使用方式：
+        with FakeLLMServer(delays=[2.0, 0.05]) as server:
+            client = OpenAI(base_url=server.base_url, api_key="test", max_retries=0)
+            ...
+            assert server.request_count == 2
+
+    Args:
+        delays: 每個請求的延遲（秒），按到達順序取用；用完後使用 default_delay
+        default_delay: 預設延遲
+        statuses: 每個請求的 HTTP 狀態碼，按到達順序取用；用完後回 200
+        default_status: 預設狀態碼（例如 500 模擬上游持續故障）
+        content: 回應內容
+    """
+
+    def __init__(self, delays: Optional[List[float]] = None, default_delay: float = 0.0,
+                 statuses: Optional[List[int]] = None, default_status: int = 200,
+                 content: Union[str, dict] = "測試回應"):
+        self.delays = list(delays or [])
+        self.default_delay = default_delay
+        self.statuses = list(statuses or [])
+        self.default_status = default_status
+        self.content = content if isinstance(content, str) else json.dumps(content, ensure_ascii=False)
+
+        self.request_count = 0
+        self.requests: List[dict] = []
+        self._lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def _next_behaviour(self, body: dict):
+        with self._lock:
+            self.request_count += 1
+            self.requests.append(body)
+            delay = self.delays.pop(0) if self.delays else self.default_delay
+            status = self.statuses.pop(0) if self.statuses else self.default_status
+        return delay, status
+
+    def start(self) -> "FakeLLMServer":
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                body = json.loads(self.rfile.read(length) or b"{}")
+                delay, status = fake._next_behaviour(body)
+                time.sleep(delay)
+
+                if status == 200:
+                    payload = {
+                        "id": f"chatcmpl-fake-{fake.request_count}",
+                        "object": "chat.completion",
+                        "created": int(time.time()),
+                        "model": body.get("model", "fake-model"),
+                        "choices": [{
+                            "index": 0,
+                            "message": {"role": "assistant", "content": fake.content},
+                            "finish_reason": "stop",
+                        }],
+                        "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+                    }
+                else:
+                    payload = {"error": {"message": f"fake error {status}", "type": "server_error"}}
+
+                data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+                try:
+                    self.send_response(status)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(data)))
+                    self.end_headers()
+                    self.wfile.write(data)
+                except (BrokenPipeError, ConnectionResetError):
+                    # 客戶端已因超時斷開
+                    pass
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self) -> "FakeLLMServer":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+"""
+JSON 提取模糊測試語料
+收集 LLM 實際會產生的輸出形態，外加隨機生成的變體（固定種子，可重現）
+"""
+
+import json
+import random
+from typing import Any, Dict, List, Optional, Tuple
+
+
+DIRECTOR_DECISION = {
+    "narrative": "你踏入藥園，張長老抬頭看了你一眼：「{靈草}不是你能碰的。」",
+    "state_update": {"hp_change": 0, "mp_change": -5, "location_new": None},
+    "npc_relations": [{"npc_id": "npc_002_elder_herb", "affinity_change": -2}],
+}
+
+OBSERVER_INTENT = {"intent": "MOVE", "target": "north", "confidence": 0.9}
+
+
+# (名稱, 原始文本, 預期提取結果)
+CORPUS: List[Tuple[str, str, Optional[Dict[str, Any]]]] = [
+    ("plain", json.dumps(OBSERVER_INTENT), OBSERVER_INTENT),
+    ("pretty", json.dumps(DIRECTOR_DECISION, ensure_ascii=False, indent=2), DIRECTOR_DECISION),
+    ("code_fence",
+     "```json\n" + json.dumps(OBSERVER_INTENT) + "\n```", OBSERVER_INTENT),
+    ("code_fence_no_lang",
+     "```\n" + json.dumps(OBSERVER_INTENT) + "\n```", OBSERVER_INTENT),
+    ("prose_before_after",
+     "好的，以下是決策：\n" + json.dumps(DIRECTOR_DECISION, ensure_ascii=False) + "\n希望有幫助。",
+     DIRECTOR_DECISION),
+    ("braces_in_string",
+     '{"narrative": "石碑上刻著 {{道}} 與 } 和 { 的符號", "state_update": {}}',
+     {"narrative": "石碑上刻著 {{道}} 與 } 和 { 的符號", "state_update": {}}),
+    ("escaped_quote_in_string",
+     '{"narrative": "他說：\\"往北走 {快}\\"", "ok": true}',
+     {"narrative": '他說："往北走 {快}"', "ok": True}),
+    ("escaped_backslash_before_quote",
+     '{"path": "C:\\\\", "next": "{x}"}',
+     {"path": "C:\\", "next": "{x}"}),
+    ("trailing_comma_object",
+     '{"intent": "MOVE", "target": "north",}',
+     {"intent": "MOVE", "target": "north"}),
+    ("trailing_comma_nested",
+     '{"a": [1, 2, 3, ], "b": {"c": 1,\n  },\n}',
+     {"a": [1, 2, 3], "b": {"c": 1}}),
+    ("comma_inside_string_not_removed",
+     '{"text": "等等,}", "n": 1}',
+     {"text": "等等,}", "n": 1}),
+    ("placeholder_before_real",
+     '格式範例 {intent} 如下：{"intent": "TALK", "target": "張長老"}',
+     {"intent": "TALK", "target": "張長老"}),
+    ("stray_closing_brace_in_prose",
+     '} 前面有多餘的括號 {"intent": "REST"}',
+     {"intent": "REST"}),
+    ("raw_newline_in_string",
+     '{"narrative": "第一行\n第二行"}',
+     {"narrative": "第一行\n第二行"}),
+    ("unicode_escapes",
+     '{"narrative": "\\u4f60\\u597d"}',
+     {"narrative": "你好"}),
+    ("array_top_level_ignored",
+     '[1, 2, 3] 然後 {"intent": "INSPECT"}',
+     {"intent": "INSPECT"}),
+    ("two_objects_first_wins",
+     '{"intent": "MOVE"} {"intent": "TALK"}',
+     {"intent": "MOVE"}),
+    ("truncated", '{"narrative": "說到一半', None),
+    ("no_json", "抱歉，我無法理解這個請求。", None),
+    ("empty", "", None),
+    ("only_broken_braces", "{這不是 JSON} {也不是}", None),
+]
+
+
+_NOISE = [
+    "好的，", "以下是結果：", "```json\n", "\n```", "說明：{佔位符}", "}",
+    "注意 [這裡] 不是 JSON。", "\n\n", "「引號」", "\\", "#",
+]
+
+_WORDS = ["青雲", "靈石", "{", "}", "[", "]", ",", "\\", '"', "道", "劍", "\n", " ", "：", "北"]
+
+
+def _random_string(rng: random.Random) -> str:
+    return "".join(rng.choice(_WORDS) for _ in range(rng.randint(0, 12)))
+
+
+def _random_value(rng: random.Random, depth: int = 0) -> Any:
+    kind = rng.randint(0, 6 if depth < 3 else 3)
+    if kind == 0:
+        return rng.randint(-1000, 1000)
+    if kind == 1:
+        return rng.choice([True, False, None])
+    if kind in (2, 3):
+        return _random_string(rng)
+    if kind == 4:
+        return rng.random()
+    if kind == 5:
+        return [_random_value(rng, depth + 1) for _ in range(rng.randint(0, 4))]
+    return random_object(rng, depth + 1)
+
+
+def random_object(rng: random.Random, depth: int = 0) -> Dict[str, Any]:
+    """隨機生成一個（可能巢狀、字串含括號與跳脫字元的）對象"""
+    return {_random_string(rng) or "k": _random_value(rng, depth) for _ in range(rng.randint(1, 5))}
+
+
+def _add_trailing_commas(text: str, rng: random.Random) -> str:
+    """在部分 } / ] 前插入尾隨逗號（只改字串外的位置）"""
+    out = []
+    in_string = escape = False
+    prev_significant = ""
+    for char in text:
+        if in_string:
+            if escape:
+                escape = False
+            elif char == "\\":
+                escape = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in "}]" and prev_significant not in ("{", "[", "") and rng.random() < 0.5:
+            out.append(",")
+        out.append(char)
+        if not char.isspace():
+            prev_significant = char
+    return "".join(out)
+
+
+def generate_fuzz_cases(seed: int = 2024, count: int = 200) -> List[Tuple[str, Dict[str, Any]]]:
+    """
+    生成 (文本, 預期對象) 變體
+
+    每個變體：隨機對象 → 隨機縮排 → 部分尾隨逗號 → 前後加不含合法 JSON 的雜訊
+    """
+    rng = random.Random(seed)
+    cases = []
+    for _ in range(count):
+        obj = random_object(rng)
+        text = json.dumps(obj, ensure_ascii=rng.random() < 0.5,
+                          indent=rng.choice([None, 2]))
+        if rng.random() < 0.5:
+            text = _add_trailing_commas(text, rng)
+        prefix = "".join(rng.choice(_NOISE) for _ in range(rng.randint(0, 3)))
+        suffix = "".join(rng.choice(_NOISE) for _ in range(rng.randint(0, 3)))
+        cases.append((prefix + text + suffix, obj))
+    return cases
+
+
+def split_into_chunks(text: str, rng: random.Random, max_size: int = 7) -> List[str]:
+    """把文本切成隨機大小的 chunk，模擬串流 delta"""
+    chunks = []
+    i = 0
+    while i < len(text):
+        size = rng.randint(1, max_size)
+        chunks.append(text[i:i + size])
+        i += size
+    return chunks
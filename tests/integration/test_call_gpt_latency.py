@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+"""
+整合測試 - call_gpt 的延遲感知行為
+透過本地假伺服器注入延遲與錯誤，驗證自適應超時、對沖請求與熔斷降級
+"""
+
+import sys
+import time
+import pytest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "src"))
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from openai import OpenAI
+
+import agent
+import config
+from fixtures.fake_llm_server import FakeLLMServer
+from llm_resilience import (
+    latency_tracker, get_circuit_breaker, llm_metrics, reset_resilience_state
+)
+
+
+@pytest.fixture
+def fast_config(monkeypatch):
+    """縮短所有時間參數，讓測試在秒級內完成"""
+    monkeypatch.setattr(config, "API_TIMEOUT", 2.0)
+    monkeypatch.setattr(config, "API_TIMEOUT_MIN", 0.2)
+    monkeypatch.setattr(config, "API_RETRY_BASE_DELAY", 0.01)
+    monkeypatch.setattr(config, "API_CALL_BUDGET", 5.0)
+    monkeypatch.setattr(config, "CIRCUIT_BREAKER_THRESHOLD", 3)
+    monkeypatch.setattr(config, "CIRCUIT_BREAKER_COOLDOWN", 60.0)
+    reset_resilience_state()
+    yield
+    reset_resilience_state()
+
+
+def use_server(monkeypatch, server: FakeLLMServer):
+    monkeypatch.setattr(
+        agent, "client",
+        OpenAI(base_url=server.base_url, api_key="test", max_retries=0)
+    )
+
+
+def seed_latency(agent_name: str, seconds: float, count: int = 10):
+    for _ in range(count):
+        latency_tracker.record((agent_name, config.DEFAULT_MODEL), seconds)
+
+
+class TestCallGptLatency:
+    """測試 call_gpt 對慢速上游的處理"""
+
+    def test_basic_call_records_latency(self, monkeypatch, fast_config):
+        with FakeLLMServer(content="你好") as server:
+            use_server(monkeypatch, server)
+            result = agent.call_gpt("sys", "user", agent_name="observer")
+
+        assert result == "你好"
+        assert server.request_count == 1
+        stats = latency_tracker.get_stats()
+        assert stats[f"observer/{config.DEFAULT_MODEL}"]["samples"] == 1
+
+    def test_hedged_request_returns_first_response(self, monkeypatch, fast_config):
+        """主請求卡住時，對沖請求應在 p90 截止時間後發出並勝出"""
+        seed_latency("drama", 0.05)
+
+        with FakeLLMServer(delays=[1.5, 0.0], content="對沖結果") as server:
+            use_server(monkeypatch, server)
+            start = time.monotonic()
+            result = agent.call_gpt("sys", "user", agent_name="drama")
+            elapsed = time.monotonic() - start
+
+        assert result == "對沖結果"
+        assert server.request_count == 2
+        assert elapsed < 1.0, f"對沖未生效，耗時 {elapsed:.2f} 秒"
+        assert llm_metrics["hedged"] == 1
+
+    def test_adaptive_timeout_cuts_slow_response(self, monkeypatch, fast_config):
+        """p95 很低時，慢速回應應在自適應超時後放棄並重試，而非等待 API_TIMEOUT"""
+        monkeypatch.setattr(config, "API_HEDGE_ENABLED", False)
+        seed_latency("logic", 0.05)
+
+        with FakeLLMServer(delays=[1.5], content="重試成功") as server:
+            use_server(monkeypatch, server)
+            start = time.monotonic()
+            result = agent.call_gpt("sys", "user", agent_name="logic")
+            elapsed = time.monotonic() - start
+
+        assert result == "重試成功"
+        assert server.request_count == 2
+        assert elapsed < 1.2, f"自適應超時未生效，耗時 {elapsed:.2f} 秒"
+
+    def test_circuit_breaker_short_circuits(self, monkeypatch, fast_config):
+        """連續失敗達門檻後熔斷，後續調用不再打上游，直接返回降級回應"""
+        with FakeLLMServer(default_status=500) as server:
+            use_server(monkeypatch, server)
+            assert agent.call_gpt("sys", "user", agent_name="director") == ""
+            assert server.request_count == config.API_MAX_RETRIES
+            assert get_circuit_breaker(config.DEFAULT_MODEL).state == "open"
+
+            requests_before = server.request_count
+            assert agent.call_gpt("sys", "user", agent_name="director") == ""
+            assert server.request_count == requests_before
+            assert llm_metrics["short_circuited"] == 1
+
+    def test_observer_falls_back_when_breaker_open(self, monkeypatch, fast_config):
+        """熔斷時 Observer 應返回既有的降級意圖"""
+        with FakeLLMServer(default_status=500) as server:
+            use_server(monkeypatch, server)
+            for _ in range(config.CIRCUIT_BREAKER_THRESHOLD):
+                get_circuit_breaker(config.DEFAULT_MODEL).record_failure()
+
+            intent = agent.agent_observer("看看四周")
+
+        assert intent["intent"] == "UNKNOWN"
+        assert server.request_count == 0
@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+"""
+資料庫備份單元測試
+測試 backup API 分批複製、並行寫入下的一致性、壓縮、驗證、輪替與還原
+"""
+
+import sys
+import sqlite3
+import threading
+import pytest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "src"))
+
+import config
+from db_backup import (
+    backup_to, create_backup, list_backups, restore_backup, rotate_backups, verify_backup,
+)
+
+
+@pytest.fixture
+def source_db(tmp_path):
+    path = tmp_path / "game_data.db"
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE events (id INTEGER PRIMARY KEY, body TEXT)")
+    conn.executemany("INSERT INTO events (body) VALUES (?)", [("修煉心得 " * 50,)] * 2000)
+    conn.commit()
+    conn.close()
+    return path
+
+
+def count_rows(path):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute("SELECT COUNT(*) FROM events").fetchone()[0]
+    finally:
+        conn.close()
+
+
+class TestBackup:
+
+    def test_stepped_copy_is_complete_and_verified(self, source_db, tmp_path):
+        stats = backup_to(source_db, tmp_path / "copy.db", pages_per_step=16, pause=0)
+        assert stats["steps"] > 1
+        assert count_rows(tmp_path / "copy.db") == 2000
+        assert verify_backup(tmp_path / "copy.db")
+        assert not (tmp_path / "copy.db.tmp").exists()
+
+    def test_compressed_backup_restores(self, source_db, tmp_path):
+        result = create_backup(source_db, tmp_path / "backups", compress=True, pause=0)
+        assert result.path.name.endswith(".db.gz")
+        assert result.bytes < source_db.stat().st_size
+
+        restored = tmp_path / "restored.db"
+        restore_backup(result.path, restored)
+        assert count_rows(restored) == 2000
+        assert not restored.with_name("restored.db.restore").exists()
+
+    def start_writer(self, path, stop, written):
+        def writer():
+            conn = sqlite3.connect(path, timeout=5)
+            while not stop.is_set():
+                conn.execute("INSERT INTO events (body) VALUES ('新事件')")
+                conn.commit()
+                written.append(1)
+                stop.wait(0.001)
+            conn.close()
+
+        thread = threading.Thread(target=writer)
+        thread.start()
+        return thread
+
+    def test_wal_snapshot_never_restarts(self, source_db, tmp_path):
+        conn = sqlite3.connect(source_db)
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.close()
+        stop, written = threading.Event(), []
+        thread = self.start_writer(source_db, stop, written)
+        try:
+            stats = backup_to(source_db, tmp_path / "wal.db", pages_per_step=8, pause=0.002)
+        finally:
+            stop.set()
+            thread.join()
+
+        assert written
+        assert stats["restarts"] == 0
+        assert verify_backup(tmp_path / "wal.db")
+        assert 2000 <= count_rows(tmp_path / "wal.db") <= 2000 + len(written)
+
+    def test_rollback_journal_falls_back_after_restarts(self, source_db, tmp_path, monkeypatch):
+        monkeypatch.setattr(config, "DB_BACKUP_MAX_RESTARTS", 3)
+        stop, written = threading.Event(), []
+        thread = self.start_writer(source_db, stop, written)
+        try:
+            stats = backup_to(source_db, tmp_path / "busy.db", pages_per_step=8, pause=0.001)
+        finally:
+            stop.set()
+            thread.join()
+
+        assert written  # 備份期間寫入者持續前進
+        assert verify_backup(tmp_path / "busy.db")
+        assert 2000 <= count_rows(tmp_path / "busy.db") <= 2000 + len(written)
+        assert stats["restarts"] <= 4
+
+    def test_corrupt_file_fails_verification(self, tmp_path):
+        bad = tmp_path / "bad.db"
+        bad.write_bytes(b"not a database" * 100)
+        assert not verify_backup(bad)
+
+
+class TestRotation:
+
+    def make_backups(self, directory, stamps):
+        directory.mkdir(exist_ok=True)
+        for stamp in stamps:
+            (directory / f"game_data_{stamp}.db.gz").write_bytes(b"x")
+        (directory / "unrelated.txt").write_text("keep me")
+
+    def test_keep_last_and_daily(self, tmp_path):
+        directory = tmp_path / "backups"
+        stamps = [f"202501{day:02d}_{hour:02d}0000" for day in range(1, 6) for hour in (1, 12, 23)]
+        self.make_backups(directory, stamps)
+
+        removed = rotate_backups(directory, keep_last=4, keep_daily=3)
+
+        remaining = sorted(p.name for p in list_backups(directory))
+        assert remaining == sorted([
+            "game_data_20250105_230000.db.gz", "game_data_20250105_120000.db.gz",
+            "game_data_20250105_010000.db.gz", "game_data_20250104_230000.db.gz",
+            "game_data_20250103_230000.db.gz",
+        ])
+        assert len(removed) == len(stamps) - 5
+        assert (directory / "unrelated.txt").exists()
+
+    def test_stem_filter(self, tmp_path):
+        directory = tmp_path / "backups"
+        self.make_backups(directory, ["20250101_000000", "20250102_000000"])
+        (directory / "other_20250101_000000.db").write_bytes(b"x")
+
+        rotate_backups(directory, keep_last=1, keep_daily=0, stem="game_data")
+        assert (directory / "other_20250101_000000.db").exists()
+        assert [p.name for p in list_backups(directory, "game_data")] == ["game_data_20250102_000000.db.gz"]
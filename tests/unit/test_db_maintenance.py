@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+"""
+資料庫維護單元測試
+測試事件保留規則、日摘要、壓縮歸檔還原、增量 VACUUM 與背景排程
+"""
+
+import sys
+import time
+import sqlite3
+import pytest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "src"))
+
+import config
+import db_maintenance
+from db_maintenance import (
+    MaintenanceScheduler, compact_player_events, get_event_summaries,
+    convert_to_incremental_vacuum, incremental_vacuum, load_archived_events, needs_vacuum_conversion,
+    run_maintenance,
+)
+
+
+@pytest.fixture
+def db(db, monkeypatch):
+    monkeypatch.setattr(config, "DB_MAINTENANCE_PAUSE", 0)
+    return db
+
+
+def insert_events(db, rows):
+    """rows: [(player_id, day, event_type, description, importance)]"""
+    conn = sqlite3.connect(db.db_path)
+    conn.executemany("""
+        INSERT INTO event_logs (player_id, timestamp, location, event_type, description, importance)
+        VALUES (?, ? || ' 12:00:00', '青雲門·廣場', ?, ?, ?)
+    """, rows)
+    conn.commit()
+    conn.close()
+
+
+def make_legacy(db):
+    """把資料庫改回未啟用增量 VACUUM 的舊格式"""
+    conn = sqlite3.connect(db.db_path)
+    conn.execute("PRAGMA auto_vacuum = NONE")
+    conn.execute("VACUUM")
+    conn.close()
+
+
+def event_ids(db, player_id):
+    conn = sqlite3.connect(db.db_path)
+    ids = [row[0] for row in conn.execute("SELECT id FROM event_logs WHERE player_id = ? ORDER BY id", (player_id,))]
+    conn.close()
+    return ids
+
+
+class TestCompaction:
+
+    def test_keeps_recent_and_important(self, db):
+        rows = [(1, "2025-01-01", "MOVE", f"趕路 {i}", 0.5) for i in range(30)]
+        rows[3] = (1, "2025-01-01", "BREAKTHROUGH_SUCCESS", "突破至練氣二層", 8.0)
+        insert_events(db, rows)
+        all_ids = event_ids(db, 1)
+
+        result = compact_player_events(db, 1, keep_recent=10, keep_importance=5.0, batch_size=4)
+
+        assert result == {"archived": 19, "days": 1}
+        remaining = event_ids(db, 1)
+        assert remaining == [all_ids[3]] + all_ids[-10:]
+        assert "突破至練氣二層" in [e["description"] for e in db.recall_memories(1, limit=10)]
+
+    def test_archive_round_trip_and_search_sync(self, db):
+        insert_events(db, [(1, "2025-01-0%d" % (1 + i // 10), "TALK", f"與長老長談第 {i} 回", 1.0)
+                           for i in range(30)])
+        original = event_ids(db, 1)[:25]
+
+        compact_player_events(db, 1, keep_recent=5, batch_size=7)
+
+        archived = load_archived_events(db, 1)
+        assert [event["id"] for event in archived] == original
+        assert archived[0]["description"] == "與長老長談第 0 回"
+        assert [e["id"] for e in load_archived_events(db, 1, "2025-01-02")] == original[10:20]
+        # 已歸檔的事件不再出現在全文檢索
+        assert db.search_events(1, "長談第 0 回") == []
+        assert len(db.search_events(1, "與長老長談", limit=50)) == 5
+
+    def test_daily_summaries_merge_across_batches(self, db):
+        rows = [(1, "2025-03-01", "ATTACK" if i % 2 else "MOVE", f"事件 {i}", 1.0 + i / 10) for i in range(12)]
+        rows += [(1, "2025-03-02", "REST", "休息", 0.3)] * 3
+        insert_events(db, rows)
+
+        compact_player_events(db, 1, keep_recent=0, batch_size=5)
+
+        summaries = get_event_summaries(db, 1)
+        assert [s["day"] for s in summaries] == ["2025-03-02", "2025-03-01"]
+        day = summaries[1]
+        assert day["event_count"] == 12
+        assert day["type_counts"] == {"ATTACK": 6, "MOVE": 6}
+        assert day["highlights"] == ["事件 11", "事件 10", "事件 9"]
+        assert day["max_importance"] == pytest.approx(2.1)
+
+    def test_other_players_untouched(self, db):
+        insert_events(db, [(1, "2025-01-01", "MOVE", "甲", 0.5)] * 20 + [(2, "2025-01-01", "MOVE", "乙", 0.5)] * 5)
+        compact_player_events(db, 1, keep_recent=5)
+        assert len(event_ids(db, 1)) == 5
+        assert len(event_ids(db, 2)) == 5
+
+    def test_nothing_to_do(self, db):
+        insert_events(db, [(1, "2025-01-01", "MOVE", "甲", 0.5)] * 3)
+        assert compact_player_events(db, 1, keep_recent=10) == {"archived": 0, "days": 0}
+
+
+class TestRunMaintenance:
+
+    def test_report_shows_shrink(self, db, monkeypatch):
+        monkeypatch.setattr(config, "EVENT_RETENTION_KEEP_RECENT", 100)
+        insert_events(db, [(1, "2025-01-%02d" % (1 + i // 500), "TALK", f"長篇對話內容 {i} " * 10, 1.0)
+                           for i in range(3000)])
+
+        report = run_maintenance(db, measure_runs=1)
+
+        assert report.archived_rows == 2900
+        assert report.before.event_rows == 3000 and report.after.event_rows == 100
+        assert report.after.archived_rows == 2900
+        assert report.after.db_bytes < report.before.db_bytes
+        assert report.after.free_bytes == 0
+        assert len(report.lines()) == 4
+
+    def test_legacy_database_converted_to_incremental_vacuum(self, db):
+        make_legacy(db)
+        assert needs_vacuum_conversion(db)
+
+        convert_to_incremental_vacuum(db)
+
+        assert not needs_vacuum_conversion(db)
+        assert convert_to_incremental_vacuum(db) == 0
+
+    def test_background_pass_skips_full_vacuum(self, db, monkeypatch, capsys):
+        """背景排程（convert=False）不做完整 VACUUM，只提示一次"""
+        make_legacy(db)
+        monkeypatch.setattr(db_maintenance, "_conversion_hint_shown", False)
+
+        assert incremental_vacuum(db) == 0
+        assert incremental_vacuum(db) == 0
+        run_maintenance(db, measure_runs=1)
+
+        assert needs_vacuum_conversion(db)
+        assert capsys.readouterr().out.count("python src/db_maintenance.py") == 1
+
+    def test_offline_run_converts(self, db):
+        make_legacy(db)
+        run_maintenance(db, measure_runs=1, convert=True)
+        assert not needs_vacuum_conversion(db)
+
+
+class TestScheduler:
+
+    def test_runs_in_background_and_stops(self, db, monkeypatch):
+        calls = []
+
+        def fake_run(stop=None):
+            calls.append(stop)
+            return None
+
+        monkeypatch.setattr(db_maintenance, "run_maintenance", fake_run)
+        scheduler = MaintenanceScheduler()
+        scheduler.start(interval=0.01, initial_delay=0)
+        try:
+            for _ in range(200):
+                if len(calls) >= 2:
+                    break
+                time.sleep(0.01)
+        finally:
+            scheduler.stop(timeout=2)
+
+        assert len(calls) >= 2
+        assert not scheduler.running
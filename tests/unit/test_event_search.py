@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+"""
+事件全文檢索單元測試
+測試 event_search（FTS5 trigram）的觸發器同步、長短詞查詢、玩家隔離與 v4 → v5 遷移
+"""
+
+import sys
+import sqlite3
+import pytest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "src"))
+
+import config
+from game_state import DB_SCHEMA_VERSION, GameStateManager
+
+
+@pytest.fixture
+def db(db):
+    assert db.search_enabled
+    return db
+
+
+def descriptions(events):
+    return [event["description"] for event in events]
+
+
+class TestSearchEvents:
+
+    @pytest.fixture
+    def history(self, db):
+        db.log_event(1, "青雲門·藏經閣", "TALK", "守閣長老贈你一株九葉靈草，叮囑你好生保管", "elder_library")
+        for i in range(200):
+            db.log_event(1, "青雲門·練武場", "ATTACK", f"與師兄切磋第 {i} 回")
+        db.log_event(1, "青雲門·廣場", "INSPECT", "廣場上的石碑刻著 100% 的字樣")
+        db.log_event(2, "青雲鎮·酒館", "TALK", "另一位玩家也拿到九葉靈草")
+        return db
+
+    def test_long_term_uses_index(self, history):
+        assert descriptions(history.search_events(1, "九葉靈草")) == \
+            ["守閣長老贈你一株九葉靈草，叮囑你好生保管"]
+
+    def test_short_terms_fall_back_to_like(self, history):
+        assert descriptions(history.search_events(1, "靈草")) == \
+            ["守閣長老贈你一株九葉靈草，叮囑你好生保管"]
+        assert descriptions(history.search_events(1, "長老 靈草")) == \
+            ["守閣長老贈你一株九葉靈草，叮囑你好生保管"]
+
+    def test_mixed_terms_are_anded(self, history):
+        assert history.search_events(1, "九葉靈草 師兄") == []
+        assert len(history.search_events(1, "守閣長老，靈草")) == 1
+
+    def test_newest_first_and_limit(self, history):
+        found = history.search_events(1, "與師兄切磋", limit=3)
+        assert descriptions(found) == ["與師兄切磋第 199 回", "與師兄切磋第 198 回", "與師兄切磋第 197 回"]
+        assert found[0]["id"] > found[1]["id"]
+
+    def test_like_wildcards_are_literal(self, history):
+        assert descriptions(history.search_events(1, "0%")) == ["廣場上的石碑刻著 100% 的字樣"]
+        assert history.search_events(1, "_") == []
+
+    def test_player_isolation_and_empty_query(self, history):
+        assert len(history.search_events(2, "九葉靈草")) == 1
+        assert history.search_events(1, "  ，。 ") == []
+
+    def test_index_follows_update_and_delete(self, history):
+        conn = sqlite3.connect(history.db_path)
+        conn.execute("UPDATE event_logs SET description = '靈草已被服下' WHERE description LIKE '守閣長老%'")
+        conn.commit()
+        assert history.search_events(1, "九葉靈草") == []
+        assert descriptions(history.search_events(1, "被服下")) == ["靈草已被服下"]
+
+        conn.execute("DELETE FROM event_logs WHERE description = '靈草已被服下'")
+        conn.commit()
+        conn.close()
+        assert history.search_events(1, "被服下") == []
+
+
+class TestSearchMigration:
+
+    def test_v4_database_gets_index_rebuilt(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(config, "DB_PATH", tmp_path / "v4.db")
+        GameStateManager().log_event(1, "青雲門·山腳", "INSPECT", "山腳下有一塊無字石碑")
+
+        # 模擬 v4：拿掉全文檢索表與觸發器
+        conn = sqlite3.connect(tmp_path / "v4.db")
+        for trigger in ("insert", "delete", "update"):
+            conn.execute(f"DROP TRIGGER event_logs_search_{trigger}")
+        conn.execute("DROP TABLE event_search")
+        conn.execute("UPDATE schema_version SET version = 4")
+        conn.commit()
+        conn.close()
+
+        db = GameStateManager()
+        assert descriptions(db.search_events(1, "無字石碑")) == ["山腳下有一塊無字石碑"]
+        conn = sqlite3.connect(tmp_path / "v4.db")
+        assert conn.execute("SELECT version FROM schema_version").fetchone()[0] == DB_SCHEMA_VERSION
+        conn.close()
@@ -0,0 +1,196 @@
+# -*- coding: utf-8 -*-
+"""
+場景素材庫單元測試
+測試 flavour_corpus.py 的組合列舉、可續跑批次生成、按鍵查詢與 agent_drama 取用
+"""
+
+import sys
+import pytest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "src"))
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import agent
+import config
+import flavour_corpus
+from fixtures.fake_llm_client import FakeChatClient
+from flavour_corpus import (
+    FlavourBatchRunner, FlavourCorpus, FlavourJob, PERIODS, SEASONS,
+    connect_corpus, corpus_key, generate_with_llm, iter_jobs, read_corpus_file,
+)
+from llm_resilience import reset_resilience_state
+from world_data import get_all_locations
+
+
+@pytest.fixture
+def corpus_path(tmp_path):
+    return tmp_path / "flavour_corpus.db"
+
+
+def write_corpus(path, entries):
+    conn = connect_corpus(path)
+    conn.executemany("INSERT OR REPLACE INTO flavour (key, text) VALUES (?, ?)", entries.items())
+    conn.close()
+
+
+@pytest.fixture
+def fake_client(monkeypatch):
+    """假後端：依提示內容回傳可辨識的描寫（關閉對沖，讓調用次數可精確比對）"""
+    reset_resilience_state()
+    monkeypatch.setattr(config, "API_HEDGE_ENABLED", False)
+
+    def responder(messages, kwargs):
+        first_line = messages[-1]["content"].splitlines()[0]
+        return f"描寫：{first_line}"
+
+    client = FakeChatClient(responder=responder, delay=0.02)
+    monkeypatch.setattr(agent, "client", client)
+    yield client
+    reset_resilience_state()
+
+
+class TestJobEnumeration:
+    """測試組合列舉"""
+
+    def test_every_location_period_season_has_base_job(self):
+        jobs = iter_jobs()
+        base_keys = {job.key for job in jobs if job.npc_id is None}
+        expected = len(get_all_locations()) * len(PERIODS) * len(SEASONS)
+        assert len(base_keys) == expected
+
+    def test_npc_jobs_use_registered_npcs(self):
+        from npc_manager import npc_manager
+
+        jobs = iter_jobs(["qingyun_herb"])
+        npc_ids = {job.npc_id for job in jobs if job.npc_id}
+        assert "npc_002_elder_herb" in npc_ids
+        assert all(npc_manager.get_npc(npc_id) for npc_id in npc_ids)
+
+    def test_keys_are_unique(self):
+        jobs = iter_jobs()
+        assert len({job.key for job in jobs}) == len(jobs)
+
+
+class TestBatchRunner:
+    """測試可續跑批次生成"""
+
+    def test_generates_with_fake_backend_and_concurrency_limit(self, corpus_path, fake_client):
+        jobs = iter_jobs(["qingyun_foot", "qingyun_herb"])
+        runner = FlavourBatchRunner(generate_fn=generate_with_llm, path=corpus_path,
+                                    max_concurrency=3)
+        report = runner.run(jobs)
+
+        assert report == {"total": len(jobs), "skipped": 0, "generated": len(jobs), "failed": 0}
+        assert fake_client.calls == len(jobs)
+        assert fake_client.max_concurrency <= 3
+
+        entries = read_corpus_file(corpus_path)
+        assert set(entries) == {job.key for job in jobs}
+        assert entries[corpus_key("qingyun_foot", "上午", "春")].startswith("描寫：地點: 青雲門·山腳")
+
+    def test_resume_only_generates_missing(self, corpus_path):
+        jobs = iter_jobs(["qingyun_foot"])
+        failing = {jobs[1].key, jobs[5].key}
+
+        def flaky(job: FlavourJob) -> str:
+            if job.key in failing:
+                raise RuntimeError("upstream down")
+            return f"片段 {job.key}"
+
+        first = FlavourBatchRunner(generate_fn=flaky, path=corpus_path, max_concurrency=2).run(jobs)
+        assert first["generated"] == len(jobs) - 2
+        assert first["failed"] == 2
+
+        seen = []
+
+        def recording(job: FlavourJob) -> str:
+            seen.append(job.key)
+            return f"片段 {job.key}"
+
+        second = FlavourBatchRunner(generate_fn=recording, path=corpus_path, max_concurrency=2).run(jobs)
+        assert sorted(seen) == sorted(failing)
+        assert second == {"total": len(jobs), "skipped": len(jobs) - 2, "generated": 2, "failed": 0}
+
+        assert len(FlavourCorpus(corpus_path)) == len(jobs)  # 沒有重複寫入
+
+    def test_empty_result_is_not_written(self, corpus_path):
+        jobs = iter_jobs(["qingyun_foot"])[:3]
+        report = FlavourBatchRunner(generate_fn=lambda job: "", path=corpus_path).run(jobs)
+        assert report["failed"] == 3
+        assert read_corpus_file(corpus_path) == {}
+
+    def test_limit(self, corpus_path):
+        jobs = iter_jobs(["qingyun_foot"])
+        report = FlavourBatchRunner(generate_fn=lambda job: "x", path=corpus_path).run(jobs, limit=4)
+        assert report["generated"] == 4
+
+
+class TestFlavourCorpus:
+    """測試素材庫讀取"""
+
+    def test_missing_file_is_empty(self, corpus_path):
+        corpus = FlavourCorpus(corpus_path)
+        assert len(corpus) == 0
+        assert corpus.lookup("qingyun_foot", "上午", "春") is None
+
+    def test_lookup_falls_back_to_location_snippet(self, corpus_path):
+        write_corpus(corpus_path, {corpus_key("qingyun_herb", "上午", "春"): "藥香四溢"})
+        corpus = FlavourCorpus(corpus_path)
+        assert corpus.lookup("qingyun_herb", "上午", "春", "npc_002_elder_herb") == "藥香四溢"
+
+    def test_npc_snippet_preferred(self, corpus_path):
+        write_corpus(corpus_path, {
+            corpus_key("qingyun_herb", "上午", "春"): "藥香四溢",
+            corpus_key("qingyun_herb", "上午", "春", "npc_002_elder_herb"): "長老在丹爐前",
+        })
+        corpus = FlavourCorpus(corpus_path)
+        assert corpus.lookup("qingyun_herb", "上午", "春", "npc_002_elder_herb") == "長老在丹爐前"
+
+    def test_sees_batch_writes_without_reload(self, corpus_path):
+        corpus = FlavourCorpus(corpus_path)
+        assert corpus.get("qingyun_foot", "上午", "春") is None  # 檔案尚未建立
+
+        write_corpus(corpus_path, {corpus_key("qingyun_foot", "上午", "春"): "霧氣"})
+        assert corpus.get("qingyun_foot", "上午", "春") == "霧氣"
+        write_corpus(corpus_path, {corpus_key("qingyun_foot", "下午", "春"): "日影"})
+        assert corpus.get("qingyun_foot", "下午", "春") == "日影"
+        assert len(corpus) == 2
+        corpus.close()
+
+    def test_lookup_is_primary_key_search(self, corpus_path):
+        conn = connect_corpus(corpus_path)
+        plan = " ".join(row[-1] for row in conn.execute(
+            "EXPLAIN QUERY PLAN SELECT text FROM flavour WHERE key = ?", ("x",)))
+        conn.close()
+        assert "PRIMARY KEY" in plan and "SCAN" not in plan
+
+
+class TestDramaUsesCorpus:
+    """測試 agent_drama 的上下文取用素材"""
+
+    def test_drama_context_includes_snippet(self, corpus_path, fake_client, monkeypatch):
+        from time_engine import get_time_engine
+
+        time_context = get_time_engine().get_detailed_time_context()
+        key = corpus_key("qingyun_foot", time_context["period"], time_context["season"])
+        write_corpus(corpus_path, {key: "預生成的山腳晨霧"})
+        monkeypatch.setattr(flavour_corpus, "_flavour_corpus", FlavourCorpus(corpus_path))
+
+        player_state = {"name": "測試", "tier": 1.0, "location_id": "qingyun_foot",
+                        "location": "青雲門·山腳", "karma": 0}
+        agent.agent_drama(player_state, {"intent": "INSPECT"})
+
+        user_message = fake_client.requests[-1]["messages"][-1]["content"]
+        assert "預生成的山腳晨霧" in user_message
+        assert "不要重新描寫環境" in user_message
+
+    def test_drama_context_without_corpus(self, corpus_path, fake_client, monkeypatch):
+        monkeypatch.setattr(flavour_corpus, "_flavour_corpus", FlavourCorpus(corpus_path))
+
+        player_state = {"name": "測試", "tier": 1.0, "location_id": "qingyun_foot",
+                        "location": "青雲門·山腳", "karma": 0}
+        agent.agent_drama(player_state, {"intent": "INSPECT"})
+
+        user_message = fake_client.requests[-1]["messages"][-1]["content"]
+        assert "請在場景描述中融入時間和季節的氛圍" in user_message
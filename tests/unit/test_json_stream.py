@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+"""
+JSON 提取單元測試
+測試 json_stream.py 的單趟掃描、串流模式與模糊語料
+"""
+
+import sys
+import random
+import pytest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "src"))
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from fixtures.json_fuzz_corpus import CORPUS, generate_fuzz_cases, split_into_chunks
+from json_stream import JSONObjectScanner, extract_first_json_object, iter_json_objects
+
+
+def feed_in_chunks(text, rng):
+    scanner = JSONObjectScanner()
+    objects = []
+    for chunk in split_into_chunks(text, rng):
+        objects.extend(scanner.feed(chunk))
+    return objects, scanner
+
+
+class TestCorpus:
+    """測試固定語料"""
+
+    @pytest.mark.parametrize("name,text,expected", CORPUS, ids=[c[0] for c in CORPUS])
+    def test_extract_first(self, name, text, expected):
+        assert extract_first_json_object(text) == expected
+
+    @pytest.mark.parametrize("name,text,expected", CORPUS, ids=[c[0] for c in CORPUS])
+    def test_streaming_matches_one_shot(self, name, text, expected):
+        rng = random.Random(name)
+        objects, _ = feed_in_chunks(text, rng)
+        assert objects == iter_json_objects(text)
+        assert (objects[0] if objects else None) == expected
+
+    def test_agent_wrapper_delegates(self):
+        from agent import extract_json_from_text
+
+        assert extract_json_from_text('```json\n{"intent": "REST",}\n```') == {"intent": "REST"}
+        assert extract_json_from_text(None) is None
+
+
+class TestFuzz:
+    """測試隨機生成的變體（固定種子）"""
+
+    def test_fuzz_one_shot(self):
+        for text, expected in generate_fuzz_cases(seed=2024, count=300):
+            assert extract_first_json_object(text) == expected, text
+
+    def test_fuzz_streaming(self):
+        rng = random.Random(7)
+        for text, expected in generate_fuzz_cases(seed=99, count=150):
+            objects, scanner = feed_in_chunks(text, rng)
+            assert objects and objects[0] == expected, text
+            assert not scanner.pending
+
+    def test_random_garbage_never_raises(self):
+        rng = random.Random(1)
+        alphabet = '{}[]",:\\ 道a1\n'
+        for _ in range(500):
+            text = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 60)))
+            extract_first_json_object(text)
+            feed_in_chunks(text, rng)
+
+
+class TestScanner:
+    """測試掃描器行為"""
+
+    def test_each_candidate_parsed_once(self):
+        text = "說明 {a} {b} " + '{"narrative": "' + "{x} " * 500 + '"}'
+        scanner = JSONObjectScanner()
+        objects = scanner.feed(text)
+        assert len(objects) == 1
+        assert scanner.stats["candidates"] == 3
+        assert scanner.stats["failed"] == 2
+
+    def test_escape_split_across_chunks(self):
+        scanner = JSONObjectScanner()
+        assert scanner.feed('{"a": "x\\') == []
+        assert scanner.feed('"}"}') == [{"a": 'x"}'}]
+
+    def test_pending_and_reset(self):
+        scanner = JSONObjectScanner()
+        scanner.feed('前言 {"a": [1, 2')
+        assert scanner.pending
+        scanner.reset()
+        assert not scanner.pending
+        assert scanner.feed('{"b": 1}') == [{"b": 1}]
+
+    def test_buffer_is_compacted_between_objects(self):
+        scanner = JSONObjectScanner()
+        for i in range(100):
+            scanner.feed(f'雜訊 {{"i": {i}}} ')
+        assert len(scanner._buf) < 50
+
+    def test_max_objects_keeps_rest_for_next_feed(self):
+        scanner = JSONObjectScanner()
+        assert scanner.feed('{"a": 1} {"b": 2}', max_objects=1) == [{"a": 1}]
+        assert scanner.feed("") == [{"b": 2}]
+
+    def test_trailing_comma_repair_counted(self):
+        scanner = JSONObjectScanner()
+        assert scanner.feed('{"a": 1,}') == [{"a": 1}]
+        assert scanner.stats["repaired"] == 1
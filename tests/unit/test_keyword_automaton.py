@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+"""
+關鍵詞自動機單元測試
+測試 keyword_automaton.py 的匹配正確性，以及 ConsistencyValidator 的自動機重建
+"""
+
+import sys
+import random
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "src"))
+
+from keyword_automaton import KeywordAutomaton, KeywordMatch
+from validators import ConsistencyValidator
+
+
+def brute_force(keywords, text):
+    return sorted((i, k) for k in set(keywords) if k
+                  for i in range(len(text)) if text.startswith(k, i))
+
+
+class TestKeywordAutomaton:
+    """測試自動機本身"""
+
+    def test_overlapping_matches(self):
+        automaton = KeywordAutomaton(['你', '你的', '受損', '損傷'])
+        matches = automaton.find_all('你的法寶受損傷')
+        assert sorted(matches) == [
+            KeywordMatch(0, '你'), KeywordMatch(0, '你的'),
+            KeywordMatch(4, '受損'), KeywordMatch(5, '損傷'),
+        ]
+
+    def test_matches_brute_force_on_random_text(self):
+        rng = random.Random(31)
+        alphabet = "受傷損你的牠沒有"
+        for _ in range(500):
+            keywords = ["".join(rng.choice(alphabet) for _ in range(rng.randint(1, 4)))
+                        for _ in range(rng.randint(1, 12))]
+            text = "".join(rng.choice(alphabet + "。x") for _ in range(rng.randint(0, 60)))
+            got = sorted((m.start, m.keyword) for m in KeywordAutomaton(keywords).find_all(text))
+            assert got == brute_force(keywords, text), (keywords, text)
+
+    def test_search_returns_first_completed_match(self):
+        automaton = KeywordAutomaton(['的靈', '指導', '長老的指導'])
+        # 同一結束位置取最長的
+        assert automaton.search('長老的指導') == KeywordMatch(0, '長老的指導')
+        assert automaton.search('師父的指導') == KeywordMatch(3, '指導')
+        assert automaton.search('珍貴的靈草') == KeywordMatch(2, '的靈')
+        assert automaton.search('築基丹') is None
+        assert KeywordAutomaton([]).search('任何文字') is None
+
+    def test_empty_inputs(self):
+        assert KeywordAutomaton([]).find_all('任何文字') == []
+        assert KeywordAutomaton(['', '道']).keywords == ('道',)
+        assert KeywordAutomaton(['道']).find_all('') == []
+
+    def test_hits_range_queries_match_slicing(self):
+        text = '你沒有獲得靈石，牠卻獲得了靈石。你獲得'
+        hits = KeywordAutomaton(['獲得', '沒有', '靈石']).scan(text)
+
+        assert hits.first('獲得') == text.find('獲得')
+        assert hits.positions('獲得') == [3, 10, 17]
+        for lo in range(-3, len(text) + 2):
+            for hi in range(lo, len(text) + 3):
+                window = text[max(lo, 0):max(hi, 0)]
+                assert hits.any_within(['沒有'], lo, hi) == ('沒有' in window)
+                expected_last = window.rfind('獲得')
+                got_last = hits.last_within('獲得', lo, hi)
+                assert got_last == (-1 if expected_last < 0 else expected_last + max(lo, 0))
+
+
+class TestValidatorAutomaton:
+    """測試 ConsistencyValidator 使用的自動機"""
+
+    def test_scan_covers_validator_tables(self):
+        validator = ConsistencyValidator()
+        hits = validator.scan('你獲得了靈石，隨後來到山腳，受傷流血。')
+        assert hits.first('獲得') == 1
+        assert hits.first('來到') == 9
+        assert hits.has('受傷') and hits.has('流血')
+
+    def test_rebuild_after_list_change(self):
+        validator = ConsistencyValidator()
+        validator.gain_keywords.append('奪得')
+        validator.rebuild_automaton()
+        result = validator.validate('你奪得了寶劍。', {'items_gained': []})
+        assert any('奪得' in e for e in result['errors'])
@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+"""
+延遲初始化單元測試
+測試 LazyProxy 以及導入主要模組時不建立 OpenAI 客戶端、資料庫與 NPC 註冊表
+"""
+
+import sys
+import os
+import subprocess
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "src"))
+
+from lazy_init import LazyProxy
+
+
+SRC = Path(__file__).parent.parent.parent / "src"
+
+
+class Counter:
+    created = 0
+
+    def __init__(self):
+        Counter.created += 1
+        self.value = 1
+
+    def bump(self):
+        self.value += 1
+        return self.value
+
+
+class TestLazyProxy:
+    """測試代理行為"""
+
+    def setup_method(self):
+        Counter.created = 0
+
+    def test_created_on_first_attribute_access(self):
+        proxy = LazyProxy(Counter)
+        assert not proxy.initialized()
+        assert proxy.peek() is None
+        assert "未初始化" in repr(proxy)
+
+        assert proxy.bump() == 2
+        assert proxy.initialized()
+        assert proxy.peek() is proxy.instance()
+        assert Counter.created == 1
+
+    def test_setattr_and_delattr_forwarded(self, monkeypatch):
+        proxy = LazyProxy(Counter)
+        proxy.value = 10
+        assert proxy.instance().value == 10
+
+        monkeypatch.setattr(proxy, "bump", lambda: "patched")
+        assert proxy.bump() == "patched"
+        monkeypatch.undo()
+        assert proxy.bump() == 11
+
+        del proxy.value
+        assert not hasattr(proxy.instance(), "value")
+
+    def test_concurrent_first_access_creates_once(self):
+        def slow_factory():
+            time.sleep(0.05)
+            return Counter()
+
+        proxy = LazyProxy(slow_factory)
+        threads = [threading.Thread(target=proxy.bump) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert Counter.created == 1
+        assert proxy.value == 9
+
+
+class TestImportSideEffects:
+    """導入模組不觸發重量級初始化"""
+
+    def run_in_subprocess(self, code):
+        env = dict(os.environ, OPENAI_API_KEY="sk-test")
+        result = subprocess.run([sys.executable, "-c", code], cwd=SRC, env=env,
+                                capture_output=True, text=True)
+        assert result.returncode == 0, result.stderr
+        return result.stdout
+
+    def test_validators_and_cultivation_skip_openai(self):
+        self.run_in_subprocess(
+            "import sys, validators, cultivation\n"
+            "assert 'openai' not in sys.modules\n"
+        )
+
+    def test_main_import_defers_singletons(self):
+        self.run_in_subprocess(
+            "import sys, main, agent, game_state, npc_manager, world_registry\n"
+            "assert 'openai' not in sys.modules\n"
+            "assert not agent.client.initialized()\n"
+            "assert not game_state.game_db.initialized()\n"
+            "assert not npc_manager.npc_manager.initialized()\n"
+            "assert not world_registry.world_registry._loaded\n"
+            "assert npc_manager.npc_manager.get_npc_by_name('玄靈子')\n"
+            "assert world_registry.world_registry._loaded\n"
+        )
@@ -0,0 +1,239 @@
+# -*- coding: utf-8 -*-
+"""
+LLM 延遲感知機制單元測試
+測試 llm_resilience.py 的自適應超時、熔斷器與對沖請求
+"""
+
+import sys
+import time
+import pytest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "src"))
+
+import config
+from llm_resilience import (
+    LatencyTracker, CircuitBreaker, HedgeTimeoutError, hedged_call,
+    llm_metrics, reset_resilience_state,
+)
+
+
+@pytest.fixture(autouse=True)
+def _reset_state():
+    reset_resilience_state()
+    yield
+    reset_resilience_state()
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestLatencyTracker:
+    """測試延遲統計與自適應超時"""
+
+    def test_no_samples_uses_fixed_timeout(self):
+        tracker = LatencyTracker()
+        key = ("observer", "gpt-4o-mini")
+        assert tracker.percentile(key, 0.95) is None
+        assert tracker.adaptive_timeout(key) == config.API_TIMEOUT
+        assert tracker.hedge_delay(key) is None
+
+    def test_adaptive_timeout_follows_p95(self, monkeypatch):
+        monkeypatch.setattr(config, "API_TIMEOUT_MIN", 0.1)
+        tracker = LatencyTracker()
+        key = ("director", "gpt-4o-mini")
+        for latency in [1.0] * 19 + [3.0]:
+            tracker.record(key, latency)
+
+        assert tracker.percentile(key, 0.95) == 1.0
+        assert tracker.adaptive_timeout(key) == pytest.approx(1.0 * config.API_TIMEOUT_P95_MULTIPLIER)
+
+    def test_adaptive_timeout_is_clamped(self, monkeypatch):
+        monkeypatch.setattr(config, "API_TIMEOUT_MIN", 2.0)
+        tracker = LatencyTracker()
+        fast, slow = ("observer", "m"), ("drama", "m")
+        for _ in range(10):
+            tracker.record(fast, 0.1)
+            tracker.record(slow, 100.0)
+
+        assert tracker.adaptive_timeout(fast) == 2.0
+        assert tracker.adaptive_timeout(slow) == config.API_TIMEOUT
+
+    def test_samples_are_per_agent_and_model(self):
+        tracker = LatencyTracker()
+        for _ in range(10):
+            tracker.record(("observer", "a"), 0.5)
+        assert tracker.percentile(("observer", "b"), 0.95) is None
+        assert tracker.percentile(("logic", "a"), 0.95) is None
+
+    def test_window_drops_old_samples(self):
+        tracker = LatencyTracker(window_size=5)
+        key = ("logic", "m")
+        for _ in range(5):
+            tracker.record(key, 10.0)
+        for _ in range(5):
+            tracker.record(key, 1.0)
+        assert tracker.percentile(key, 0.95) == 1.0
+
+
+class TestCircuitBreaker:
+    """測試熔斷器狀態轉換"""
+
+    def test_opens_after_threshold(self):
+        breaker = CircuitBreaker(failure_threshold=3, cooldown=10, clock=FakeClock())
+        for _ in range(2):
+            breaker.record_failure()
+            assert breaker.allow_request()
+        breaker.record_failure()
+        assert breaker.state == CircuitBreaker.OPEN
+        assert not breaker.allow_request()
+
+    def test_success_resets_failure_count(self):
+        breaker = CircuitBreaker(failure_threshold=2, cooldown=10, clock=FakeClock())
+        breaker.record_failure()
+        breaker.record_success()
+        breaker.record_failure()
+        assert breaker.state == CircuitBreaker.CLOSED
+
+    def test_half_open_allows_single_probe(self):
+        clock = FakeClock()
+        breaker = CircuitBreaker(failure_threshold=1, cooldown=10, clock=clock)
+        breaker.record_failure()
+        assert not breaker.allow_request()
+
+        clock.now = 10.0
+        assert breaker.state == CircuitBreaker.HALF_OPEN
+        assert breaker.allow_request()
+        assert not breaker.allow_request()  # 探測進行中，其他請求仍被拒絕
+
+        breaker.record_success()
+        assert breaker.state == CircuitBreaker.CLOSED
+
+    def test_failed_probe_reopens(self):
+        clock = FakeClock()
+        breaker = CircuitBreaker(failure_threshold=5, cooldown=10, clock=clock)
+        for _ in range(5):
+            breaker.record_failure()
+        clock.now = 10.0
+        assert breaker.allow_request()
+        breaker.record_failure()
+        assert breaker.state == CircuitBreaker.OPEN
+
+
+    def test_unrecorded_probe_released(self):
+        """探測既沒成功也沒失敗（如認證錯誤）：release_probe 後可再探測，不會卡在 half_open"""
+        clock = FakeClock()
+        breaker = CircuitBreaker(failure_threshold=1, cooldown=10, clock=clock)
+        breaker.record_failure()
+        clock.now = 10.0
+        assert breaker.allow_request()
+        assert not breaker.allow_request()
+
+        breaker.release_probe()
+        clock.now = 1000.0
+        assert breaker.state == CircuitBreaker.HALF_OPEN
+        assert breaker.allow_request()
+
+    def test_release_only_by_probe_owner(self):
+        import threading
+
+        clock = FakeClock()
+        breaker = CircuitBreaker(failure_threshold=1, cooldown=10, clock=clock)
+        breaker.record_failure()
+        clock.now = 10.0
+        assert breaker.allow_request()
+
+        other = threading.Thread(target=breaker.release_probe)
+        other.start()
+        other.join()
+        assert not breaker.allow_request()  # 其他線程不能歸還不屬於它的名額
+
+    def test_release_after_record_is_noop(self):
+        clock = FakeClock()
+        breaker = CircuitBreaker(failure_threshold=1, cooldown=10, clock=clock)
+        breaker.record_failure()
+        clock.now = 10.0
+        assert breaker.allow_request()
+        breaker.record_failure()
+        breaker.release_probe()
+        assert breaker.state == CircuitBreaker.OPEN
+        assert not breaker.allow_request()
+
+
+class TestResilientCallProbe:
+    """測試 _call_gpt_resilient 在半開狀態下的探測名額"""
+
+    def test_auth_error_probe_does_not_wedge_breaker(self, monkeypatch):
+        import httpx
+        import agent
+        from openai import AuthenticationError
+        from llm_resilience import get_circuit_breaker
+        sys.path.insert(0, str(Path(__file__).parent.parent))
+        from fixtures.fake_llm_client import FakeChatClient
+
+        monkeypatch.setattr(config, "CIRCUIT_BREAKER_COOLDOWN", 0.0)
+        monkeypatch.setattr(config, "API_HEDGE_ENABLED", False)
+        model = "probe-model"
+        breaker = get_circuit_breaker(model)
+        for _ in range(config.CIRCUIT_BREAKER_THRESHOLD):
+            breaker.record_failure()
+        assert breaker.state == CircuitBreaker.HALF_OPEN
+
+        request = httpx.Request("POST", "https://api.openai.com/v1/chat/completions")
+        responses = [AuthenticationError("bad key", response=httpx.Response(401, request=request), body=None)]
+
+        def responder(messages, kwargs):
+            if responses:
+                raise responses.pop()
+            return "恢復正常"
+
+        monkeypatch.setattr(agent, "client", FakeChatClient(responder=responder))
+        assert agent._call_gpt_resilient("sys", "msg", model, 0.7, "test") == ""
+        assert agent._call_gpt_resilient("sys", "msg", model, 0.7, "test") == "恢復正常"
+        assert breaker.state == CircuitBreaker.CLOSED
+
+
+class TestHedgedCall:
+    """測試對沖請求"""
+
+    def test_no_hedge_calls_inline(self):
+        result, hedged = hedged_call(lambda timeout: "ok", timeout=1.0, hedge_delay=None)
+        assert result == "ok"
+        assert hedged is False
+
+    def test_hedge_wins_over_slow_primary(self):
+        delays = [1.0, 0.0]
+
+        def request(timeout):
+            time.sleep(delays.pop(0))
+            return "done"
+
+        start = time.monotonic()
+        result, hedged = hedged_call(request, timeout=5.0, hedge_delay=0.05)
+        assert result == "done"
+        assert hedged is True
+        assert time.monotonic() - start < 0.5
+        assert llm_metrics["hedged"] == 1
+        assert llm_metrics["hedge_wins"] == 1
+
+    def test_fast_primary_does_not_hedge(self):
+        result, hedged = hedged_call(lambda timeout: "fast", timeout=5.0, hedge_delay=0.5)
+        assert result == "fast"
+        assert hedged is False
+        assert llm_metrics["hedged"] == 0
+
+    def test_timeout_raises(self):
+        with pytest.raises(HedgeTimeoutError):
+            hedged_call(lambda timeout: time.sleep(0.5), timeout=0.1, hedge_delay=0.02)
+
+    def test_primary_error_is_raised(self):
+        def request(timeout):
+            raise ValueError("boom")
+
+        with pytest.raises(ValueError):
+            hedged_call(request, timeout=1.0, hedge_delay=0.5)
@@ -0,0 +1,204 @@
+# -*- coding: utf-8 -*-
+"""
+長期事件記憶單元測試
+測試重要度評分、新近度（玩家自己的事件序）× 重要度 × 相關度排序、候選結構有界、v3 → v4 增量遷移
+"""
+
+import sys
+import sqlite3
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "src"))
+
+import config
+from game_state import DB_SCHEMA_VERSION, GameStateManager
+from memory import MemoryIndex, MemoryRecord, score_importance
+
+
+def log_many(db, count, **kwargs):
+    for i in range(count):
+        db.log_event(1, kwargs.get("location", "青雲門·山腳"), kwargs.get("event_type", "MOVE"),
+                     kwargs.get("description", f"趕路 {i}"))
+
+
+class TestImportance:
+
+    def test_event_type_ordering(self):
+        assert score_importance("BREAKTHROUGH_SUCCESS") > score_importance("TALK") > score_importance("REST")
+
+    def test_npc_and_state_changes_raise_importance(self):
+        base = score_importance("TALK")
+        assert score_importance("TALK", "npc_elder") > base
+        assert score_importance("ATTACK", state_changes={"hp_change": -40, "items_gained": ["靈石"]}) \
+            > score_importance("ATTACK")
+
+    def test_bounds_and_bad_input(self):
+        huge = {"hp_change": -999, "karma_change": 999, "tier_change": 1.0,
+                "items_gained": ["x"], "npc_relations_change": {"a": 99}}
+        assert score_importance("BREAKTHROUGH_SUCCESS", "npc", huge) == 10.0
+        assert score_importance("MOVE", state_changes={"hp_change": "很多"}) == score_importance("MOVE")
+
+
+class TestRecall:
+
+    def test_important_old_event_beats_trivial_recent(self, db):
+        db.log_event(1, "青雲門·廣場", "BREAKTHROUGH_SUCCESS", "突破至練氣二層",
+                     state_changes={"tier_change": 0.1})
+        log_many(db, 20)
+
+        memories = db.recall_memories(1, limit=5)
+        assert len(memories) == 5
+        assert "突破至練氣二層" in [m["description"] for m in memories]
+
+    def test_target_npc_relevance(self, db):
+        db.log_event(1, "青雲門·藏經閣", "TALK", "向守閣長老請教劍訣", "elder_library")
+        for i in range(30):
+            db.log_event(1, "青雲門·練武場", "ATTACK", f"與師兄切磋 {i}")
+
+        without_target = [m["description"] for m in db.recall_memories(1, limit=3)]
+        with_target = [m["description"] for m in db.recall_memories(1, npc_id="elder_library", limit=3)]
+        assert "向守閣長老請教劍訣" not in without_target
+        assert "向守閣長老請教劍訣" in with_target
+
+    def test_location_and_keyword_relevance(self, db):
+        db.log_event(1, "青雲門·藏經閣", "INSPECT", "翻到一本殘缺的劍譜")
+        log_many(db, 15, location="青雲門·廣場", event_type="INSPECT", description="四處張望")
+
+        assert "翻到一本殘缺的劍譜" not in [m["description"] for m in db.recall_memories(1, limit=3)]
+        at_library = db.recall_memories(1, location="青雲門·藏經閣", limit=3)
+        assert "翻到一本殘缺的劍譜" in [m["description"] for m in at_library]
+        by_keyword = db.recall_memories(1, keywords=["劍譜"], limit=3)
+        assert "翻到一本殘缺的劍譜" in [m["description"] for m in by_keyword]
+
+    def test_newest_first_and_event_format(self, db):
+        log_many(db, 3)
+        memories = db.recall_memories(1)
+        assert [m["description"] for m in memories] == ["趕路 2", "趕路 1", "趕路 0"]
+        assert set(db.get_recent_events(1)[0]) <= set(memories[0])
+
+    def test_new_events_visible_after_warm_up(self, db):
+        log_many(db, 3)
+        db.recall_memories(1, location="青雲門·山腳")
+        assert 1 in db.memory
+
+        db.log_event(1, "青雲門·山腳", "ATTACK", "擊退山賊", state_changes={"hp_change": -30})
+        assert db.recall_memories(1, location="青雲門·山腳", limit=1)[0]["description"] == "擊退山賊"
+
+    def test_cold_and_warm_agree(self, db):
+        for i in range(200):
+            db.log_event(1, f"地點{i % 7}", ["MOVE", "TALK", "ATTACK"][i % 3], f"事件 {i}",
+                         "npc_a" if i % 11 == 0 else None, state_changes={"hp_change": -(i % 50)})
+        warm = db.recall_memories(1, location="地點3", npc_id="npc_a")
+        db.memory.forget()
+        assert db.recall_memories(1, location="地點3", npc_id="npc_a") == warm
+
+    def test_cold_and_warm_agree_beyond_horizon(self, db, monkeypatch):
+        monkeypatch.setattr(config, "MEMORY_RECENCY_HORIZON", 10)
+        db.recall_memories(1)
+        for i in range(60):
+            db.log_event(1, "青雲門·廣場", ["MOVE", "TALK", "ATTACK"][i % 3], f"事件 {i}",
+                         state_changes={"hp_change": -(i * 7 % 50)})
+        warm = [m["id"] for m in db.recall_memories(1, limit=8)]
+        db.memory.forget()
+        assert [m["id"] for m in db.recall_memories(1, limit=8)] == warm
+
+    def test_recency_ignores_other_players_events(self, db):
+        """新近度以玩家自己的事件序計算：其他玩家穿插的事件不會讓較舊的重要事件衰減"""
+        db.log_event(1, "青雲門·廣場", "BREAKTHROUGH_FAIL", "衝關失敗，經脈受損")
+        db.recall_memories(1)  # 之後的事件走記憶體中的候選結構
+        for i in range(200):
+            db.log_event(2, "青雲鎮·酒館", "MOVE", f"別人趕路 {i}")
+        db.log_event(1, "青雲門·廣場", "ATTACK", "擊退野狼")
+
+        warm = [m["description"] for m in db.recall_memories(1, limit=1)]
+        db.memory.forget()
+        cold = [m["description"] for m in db.recall_memories(1, limit=1)]
+        assert warm == cold == ["衝關失敗，經脈受損"]
+
+    def test_other_players_isolated(self, db):
+        db.log_event(2, "青雲鎮·酒館", "TALK", "別人的事")
+        log_many(db, 2)
+        assert all(m["description"] != "別人的事" for m in db.recall_memories(1))
+
+
+class TestMemoryIndexBounds:
+
+    class ListSource:
+        def __init__(self, records):
+            self.records = records
+            self.calls = []
+
+        def fetch_memories(self, player_id, kind, key, limit):
+            self.calls.append((kind, key))
+            rows = self.records
+            if kind == "location":
+                rows = [r for r in rows if r.location == key]
+            if kind == "npc":
+                rows = [r for r in rows if r.npc_involved == key]
+            order = (lambda r: (r.importance, r.id)) if kind == "important" else (lambda r: r.id)
+            return sorted(rows, key=order, reverse=True)[:limit]
+
+    def test_candidate_pool_is_bounded(self):
+        index = MemoryIndex(recent_size=8, important_size=8, bucket_size=4)
+        source = self.ListSource([])
+        index.recall(1, source, location="甲")
+        for i in range(1, 5001):
+            index.observe(1, MemoryRecord(i, "MOVE", f"事件 {i}", "甲", None, (i % 97) / 10 + 0.1))
+
+        memory = index._players[1]
+        assert len(memory.candidates("甲", None)) <= 8 + 8 + 4
+        assert len(index.recall(1, source, location="甲")) == 5
+
+    def test_buckets_loaded_once_and_players_evicted(self):
+        index = MemoryIndex(max_players=2)
+        source = self.ListSource([MemoryRecord(1, "TALK", "談話", "甲", "npc", 2.0)])
+        index.recall(1, source, location="甲", npc_id="npc")
+        index.recall(1, source, location="甲", npc_id="npc")
+        assert source.calls.count(("location", "甲")) == 1
+        assert source.calls.count(("npc", "npc")) == 1
+
+        index.recall(2, source)
+        index.recall(3, source)
+        assert 1 not in index and 3 in index
+
+
+class TestSchemaMigration:
+
+    def test_v3_database_upgraded_in_place(self, tmp_path, monkeypatch):
+        path = tmp_path / "legacy.db"
+        conn = sqlite3.connect(path)
+        conn.executescript("""
+            CREATE TABLE schema_version (version INTEGER PRIMARY KEY);
+            INSERT INTO schema_version VALUES (3);
+            CREATE TABLE players (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT UNIQUE NOT NULL,
+                location_id TEXT NOT NULL DEFAULT 'qingyun_foot', tier REAL NOT NULL DEFAULT 1.0,
+                current_tick INTEGER NOT NULL DEFAULT 0, state_json TEXT NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP, last_save_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                playtime_seconds INTEGER DEFAULT 0);
+            CREATE TABLE event_logs (id INTEGER PRIMARY KEY AUTOINCREMENT, player_id INTEGER NOT NULL,
+                timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP, location TEXT NOT NULL,
+                event_type TEXT NOT NULL, description TEXT, npc_involved TEXT);
+            INSERT INTO players (name, state_json) VALUES ('老玩家', '{"name": "老玩家"}');
+            INSERT INTO event_logs (player_id, location, event_type, description, npc_involved)
+                VALUES (1, '青雲門·廣場', 'BREAKTHROUGH_SUCCESS', '突破', NULL),
+                       (1, '青雲門·廣場', 'TALK', '拜見長老', 'elder');
+        """)
+        conn.commit()
+        conn.close()
+
+        monkeypatch.setattr(config, "DB_PATH", path)
+        db = GameStateManager()
+
+        assert db.load_player("老玩家")["state"]["name"] == "老玩家"
+        conn = sqlite3.connect(path)
+        importance = dict(conn.execute("SELECT event_type, importance FROM event_logs").fetchall())
+        indexes = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+        version = conn.execute("SELECT version FROM schema_version").fetchone()[0]
+        conn.close()
+
+        assert importance["BREAKTHROUGH_SUCCESS"] == score_importance("BREAKTHROUGH_SUCCESS")
+        assert importance["TALK"] == score_importance("TALK", "elder")
+        assert "idx_event_logs_player_importance" in indexes
+        assert version == DB_SCHEMA_VERSION
+        for backup in tmp_path.glob("legacy.db.backup_*"):
+            backup.unlink()
@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+"""
+敘述提取管線單元測試
+測試 NarrativeExtractor 與舊版（逐次 re.findall / re.search）提取結果一致
+"""
+
+import sys
+import re
+import random
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "src"))
+
+from keyword_tables import (
+    REGEX_ITEM_GAIN, REGEX_HP_DAMAGE, REGEX_MOVEMENT,
+    INVALID_ITEM_WORDS, INVALID_ITEM_PATTERNS,
+)
+from validators import NarrativeExtractor, narrative_extractor, auto_fix_state
+
+
+def legacy_extract_items(narrative):
+    raw_items = set(match[1] for match in re.findall(REGEX_ITEM_GAIN, narrative))
+    return {item for item in raw_items
+            if not any(word in item for word in INVALID_ITEM_WORDS)
+            and not any(re.search(pattern, item) for pattern in INVALID_ITEM_PATTERNS)}
+
+
+PIECES = [
+    '你', '獲得', '得到', '賜予', '了', '一枚', '一把', '築基丹', '靈劍', '長老的指導',
+    '一些珍貴', '更多的', '珍貴的靈', '，', '。', '失去了', ' 20 ', '點生命', '受傷',
+    '來到', '進入了', '靈獸森林', '青雲門', '信心', '靈石', '的', '撿起',
+]
+
+
+class TestNarrativeExtractor:
+    """測試提取管線"""
+
+    def test_extract_items_filters_invalid(self):
+        items, rejected = narrative_extractor.extract_items(
+            "長老賜予你一枚築基丹，你獲得了長老的指導，又得到一些珍貴。")
+        assert items == ["築基丹"]
+        assert ("長老的指導", "抽象概念") in rejected
+        assert ("一些珍貴", "模式匹配") in rejected
+
+    def test_items_deduplicated_in_order(self):
+        items, _ = narrative_extractor.extract_items("你獲得靈石，又獲得靈劍，再獲得靈石")
+        assert items == ["靈石", "靈劍"]
+
+    def test_hp_and_destination(self):
+        assert narrative_extractor.extract_hp_damage("你失去了 20 點生命。") == 20
+        assert narrative_extractor.extract_hp_damage("你受傷了。") is None
+        assert narrative_extractor.extract_destination("你終於進入了靈獸森林。") == "靈獸森林"
+        assert narrative_extractor.extract_destination("你原地打坐。") is None
+
+    def test_custom_tables(self):
+        extractor = NarrativeExtractor(invalid_words=["靈石"], invalid_patterns=[])
+        items, rejected = extractor.extract_items("你獲得信心，又獲得靈石")
+        assert items == ["信心"]
+        assert rejected == [("靈石", "抽象概念")]
+
+    def test_matches_legacy_on_random_narratives(self):
+        rng = random.Random(34)
+        for _ in range(500):
+            narrative = "".join(rng.choice(PIECES) for _ in range(rng.randint(1, 25)))
+            items, _ = narrative_extractor.extract_items(narrative)
+            assert set(items) == legacy_extract_items(narrative), narrative
+
+            legacy_damage = re.search(REGEX_HP_DAMAGE, narrative)
+            assert narrative_extractor.extract_hp_damage(narrative) == \
+                (int(legacy_damage.group(1)) if legacy_damage else None)
+
+            legacy_move = re.search(REGEX_MOVEMENT, narrative)
+            assert narrative_extractor.extract_destination(narrative) == \
+                (legacy_move.group(2) if legacy_move else None)
+
+    def test_auto_fix_does_not_override_existing_items(self):
+        fixed = auto_fix_state("你獲得了靈石。", {"items_gained": ["下品靈石"]})
+        assert fixed["items_gained"] == ["下品靈石"]
@@ -0,0 +1,181 @@
+# -*- coding: utf-8 -*-
+"""
+敘述索引單元測試
+測試 narrative_index.py 的子句切分與逐次出現分析，
+以及 ConsistencyValidator 改為檢查每一次出現後的誤判減少
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "src"))
+
+from keyword_tables import NPC_INDICATORS, PLAYER_INDICATORS
+from validators import ConsistencyValidator
+
+
+def flags(validator, text, keyword, field):
+    return [getattr(o, field) for o in validator.index(text).occurrences(keyword)]
+
+
+class TestClauses:
+    """測試子句切分"""
+
+    def test_clause_of(self):
+        index = ConsistencyValidator().index('你來到山腳，獲得靈石。')
+        assert index.clause_of(0) == 0
+        assert index.clause_of(6) == 1
+        clause = index.clause(1)
+        assert (clause.start, clause.end) == (6, 10)
+
+    def test_clause_flags(self):
+        index = ConsistencyValidator().index('你沒有獲得靈石，靈獸受傷，你打算前往')
+        assert index.clause(0).has_negation
+        assert index.clause(1).has_npc_word and not index.clause(1).has_negation
+        assert index.clause(2).has_intention
+
+    def test_empty_text(self):
+        index = ConsistencyValidator().index('')
+        assert index.occurrences('獲得') == []
+
+
+class TestOccurrences:
+    """測試每一次出現的旗標"""
+
+    def test_negation_applies_to_next_keyword_only(self):
+        validator = ConsistencyValidator()
+        text = '你沒有獲得靈石…後來獲得了靈草'
+        assert flags(validator, text, '獲得', 'negated') == [True, False]
+
+    def test_negation_does_not_cross_clauses(self):
+        validator = ConsistencyValidator()
+        assert flags(validator, '你沒有退路，只好踏入洞中，受傷', '受傷', 'negated') == [False]
+        assert flags(validator, '你並未受傷', '受傷', 'negated') == [True]
+
+    def test_overlapping_keywords_share_negation(self):
+        validator = ConsistencyValidator()
+        text = '你的法寶沒有受損傷'
+        assert flags(validator, text, '受損', 'negated') == [True]
+        assert flags(validator, text, '損傷', 'negated') == [True]
+
+    def test_intention_per_occurrence(self):
+        validator = ConsistencyValidator()
+        text = '你打算前往藥園，途中卻前往了後山'
+        assert flags(validator, text, '前往', 'intention') == [True, False]
+
+    def test_subject_per_occurrence(self):
+        validator = ConsistencyValidator()
+        text = '靈獸受傷倒地，你也受傷了，受傷的師兄在一旁喘息'
+        assert flags(validator, text, '受傷', 'player_subject') == [False, True, False]
+
+    def test_first_affirmed_and_actual(self):
+        index = ConsistencyValidator().index('你沒有獲得靈石，最後獲得靈草；你想要前往')
+        assert index.first_affirmed('獲得').start == 10
+        assert index.first_actual('前往') is None
+
+
+# ============ 與舊版（只看第一次出現）的對比 ============
+
+def legacy_is_negative_context(text, keyword):
+    keyword_pos = text.find(keyword)
+    if keyword_pos == -1:
+        return False
+    context = text[max(0, keyword_pos - 10):keyword_pos + len(keyword)]
+    return any(w in context for w in ['沒有', '無法', '未能', '不曾', '並未', '從未'])
+
+
+def legacy_is_intention_context(text, keyword):
+    keyword_pos = text.find(keyword)
+    if keyword_pos == -1:
+        return False
+    context = text[max(0, keyword_pos - 8):keyword_pos]
+    return any(w in context for w in ['想', '想要', '打算', '準備', '計劃', '希望', '試圖'])
+
+
+def legacy_is_player_subject(text, keyword):
+    keyword_pos = text.find(keyword)
+    if keyword_pos == -1:
+        return False
+    context_before = text[max(0, keyword_pos - 30):keyword_pos]
+    context_after = text[keyword_pos:keyword_pos + 10]
+    npc_words = ['靈獸', '妖獸', '魔獸', '野獸', '師兄', '師姐', '弟子', '對手', '敵人', '修士', '道人']
+    for npc_word in npc_words:
+        if npc_word in context_before:
+            between = context_before[context_before.rfind(npc_word) + len(npc_word):]
+            if not any(sep in between for sep in ['。', '，', '！', '？']):
+                return False
+    for npc_word in npc_words:
+        if npc_word in context_after and '的' in context_after[:context_after.find(npc_word)]:
+            return False
+    closest_pronoun, closest_pos = None, -1
+    for pronoun in ['牠', '他', '她', '它', '你', '您', '我']:
+        pos = context_before.rfind(pronoun)
+        if pos > closest_pos:
+            closest_pos, closest_pronoun = pos, pronoun
+    if closest_pronoun in ['牠', '他', '她', '它']:
+        return False
+    if closest_pronoun in ['你', '您', '我']:
+        return True
+    if any(i in context_before for i in NPC_INDICATORS):
+        return False
+    if any(i in context_before for i in PLAYER_INDICATORS):
+        return True
+    return True
+
+
+def legacy_needs_retry(validator, narrative, update):
+    """舊版 validate 的關鍵詞檢查（只看每個關鍵詞的第一次出現）"""
+    for keyword in validator.gain_keywords:
+        if keyword in narrative and not legacy_is_negative_context(narrative, keyword):
+            if not update.get('items_gained'):
+                return True
+            break
+    hp_change = update.get('hp_change', 0)
+    for keyword in validator.hp_loss_keywords:
+        if keyword in narrative and not legacy_is_negative_context(narrative, keyword):
+            is_player = legacy_is_player_subject(narrative, keyword)
+            if (is_player and hp_change >= 0) or (not is_player and hp_change < 0):
+                return True
+    for keyword in validator.move_keywords:
+        if keyword in narrative and not legacy_is_intention_context(narrative, keyword):
+            if not update.get('location_new'):
+                return True
+            break
+    return False
+
+
+# (敘述, 狀態更新, 是否真的一致)
+LABELLED_CASES = [
+    ('靈獸受傷倒地，你也受傷了。', {'hp_change': -10}, True),
+    ('你一拳擊中敵人，敵人受傷倒退，你的手臂也一陣疼痛。', {'hp_change': -5}, True),
+    ('妖獸受傷逃走，你趁機來到洞口，手臂被碎石劃破流血。', {'hp_change': -3, 'location_new': '洞口'}, True),
+    ('你搜索了房間，但沒有獲得任何有用的東西。', {'items_gained': []}, True),
+    ('你打算來到青雲門，但路途遙遠，需要準備。', {'location_new': None}, True),
+    ('你一劍刺中霜焰獅，牠痛苦地吼叫，身上受傷流血。', {'hp_change': 0}, True),
+    ('你沒有獲得任何東西…後來在石縫裡獲得了一株靈草。', {'items_gained': []}, False),
+    ('你想起師父的叮囑，來到了後山。', {'location_new': None}, False),
+    ('那一掌打在你胸口，你感到劇烈的疼痛。', {'hp_change': 0}, False),
+]
+
+
+class TestFalsePositiveRetries:
+    """逐次出現分析應減少誤判（多餘的 Level 2 重新調用與漏判）"""
+
+    def test_labelled_cases(self):
+        validator = ConsistencyValidator()
+        for narrative, update, consistent in LABELLED_CASES:
+            result = validator.validate(narrative, update)
+            assert result['valid'] == consistent, (narrative, result['errors'])
+
+    def test_fewer_retries_than_first_occurrence_check(self):
+        validator = ConsistencyValidator()
+        legacy_false_retries = sum(
+            1 for narrative, update, consistent in LABELLED_CASES
+            if consistent and legacy_needs_retry(validator, narrative, update)
+        )
+        false_retries = sum(
+            1 for narrative, update, consistent in LABELLED_CASES
+            if consistent and not validator.validate(narrative, update)['valid']
+        )
+        assert false_retries == 0
+        assert legacy_false_retries >= 2
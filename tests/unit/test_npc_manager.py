@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+"""
+NPC 註冊表單元測試
+測試 NPCManager 的名稱/別名/地點索引與增刪改後的一致性
+"""
+
+import sys
+import pytest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "src"))
+
+from npc_manager import NPCManager
+
+
+@pytest.fixture
+def manager():
+    return NPCManager()
+
+
+def linear_by_location(manager, location_id):
+    return [npc for npc in manager.npcs.values() if npc.get('location_id') == location_id]
+
+
+class TestIndexes:
+    """索引查詢與線性掃描結果一致"""
+
+    def test_lookups_match_linear_scan(self, manager):
+        assert manager.npcs, "需要 data/npcs.json"
+        for npc_id, npc in manager.npcs.items():
+            assert manager.get_npc_by_name(npc['name']) is npc
+            assert manager.get_npc_by_name(npc_id) is npc
+            assert manager.get_npc_id_by_name(npc['name']) == npc_id
+            location_id = npc['location_id']
+            assert manager.get_npcs_by_location(location_id) == linear_by_location(manager, location_id)
+
+    def test_title_resolves_but_not_as_name(self, manager):
+        assert manager.resolve_name('青雲門掌門') == 'npc_001_master_qingyun'
+        assert manager.get_npc_by_name('青雲門掌門')['name'] == '玄靈子'
+        # get_npc_id_by_name 只比對名稱
+        assert manager.get_npc_id_by_name('青雲門掌門') is None
+
+    def test_unknown_names(self, manager):
+        assert manager.get_npc_by_name('不存在的人') is None
+        assert manager.get_npcs_by_location('nowhere') == []
+
+    def test_resolve_names_bulk(self, manager):
+        assert manager.resolve_names(['玄靈子', '藥王谷長老', '師兄']) == {
+            '玄靈子': 'npc_001_master_qingyun',
+            '藥王谷長老': 'npc_002_elder_herb',
+            '師兄': None,
+        }
+
+
+class TestUpdates:
+    """增刪改後索引保持一致"""
+
+    def test_add_npc_with_aliases(self, manager):
+        manager.add_npc({'id': 'npc_x', 'name': '無塵', 'title': '遊方道士',
+                         'aliases': ['老道'], 'location_id': 'qingyun_foot'})
+        assert manager.resolve_name('老道') == 'npc_x'
+        assert manager.resolve_name('遊方道士') == 'npc_x'
+        assert manager.get_npcs_by_location('qingyun_foot')[-1]['id'] == 'npc_x'
+
+    def test_update_moves_location_and_keeps_order(self, manager):
+        npc_id = 'npc_001_master_qingyun'
+        old_location = manager.get_npc(npc_id)['location_id']
+        target = 'qingyun_foot'
+        manager.update_npc(npc_id, location_id=target)
+
+        assert npc_id not in [npc['id'] for npc in manager.get_npcs_by_location(old_location)]
+        assert manager.get_npcs_by_location(target) == linear_by_location(manager, target)
+
+    def test_update_renames(self, manager):
+        npc_id = 'npc_003_merchant_fang'
+        manager.update_npc(npc_id, name='方四塊')
+        assert manager.get_npc_id_by_name('方三塊') is None
+        assert manager.get_npc_id_by_name('方四塊') == npc_id
+
+    def test_remove_restores_shadowed_name(self, manager):
+        manager.add_npc({'id': 'npc_dup', 'name': '玄靈子', 'location_id': 'qingyun_foot'})
+        assert manager.get_npc_id_by_name('玄靈子') == 'npc_001_master_qingyun'
+
+        manager.remove_npc('npc_001_master_qingyun')
+        assert manager.get_npc_id_by_name('玄靈子') == 'npc_dup'
+        assert manager.resolve_name('青雲門掌門') is None
+
+    def test_update_missing_npc(self, manager):
+        assert manager.update_npc('npc_missing', name='x') is None
+        assert manager.remove_npc('npc_missing') is None
+
+    def test_rebuild_after_direct_mutation(self, manager):
+        manager.npcs['npc_raw'] = {'id': 'npc_raw', 'name': '直寫', 'location_id': 'qingyun_foot'}
+        manager.rebuild_indexes()
+        assert manager.get_npc_id_by_name('直寫') == 'npc_raw'
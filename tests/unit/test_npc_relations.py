@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+"""
+NPC 好感度單元測試
+測試讀檔時的批次載入、初始好感度、每回合一批 UPSERT 寫回，以及寫入失敗時保留變動、不切換玩家
+"""
+
+import sys
+import sqlite3
+import pytest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "src"))
+
+from game_state import DB_SCHEMA_VERSION, GameStateManager
+from npc_relations import AffinityCache, default_affinity
+
+MASTER = "npc_001_master_qingyun"  # npcs.json：player_default_affinity = -15
+
+
+@pytest.fixture
+def player_id(db):
+    return db.create_new_player("清風")["player_id"]
+
+
+def stored(db, player_id):
+    conn = sqlite3.connect(db.db_path)
+    rows = dict(conn.execute("SELECT npc_id, affinity_score FROM npc_relations WHERE player_id = ?", (player_id,)))
+    conn.close()
+    return rows
+
+
+class TestGameStateRelations:
+
+    def test_update_is_additive_upsert(self, db, player_id):
+        assert db.update_npc_relation(player_id, "npc_x", 5)
+        assert db.update_npc_relation(player_id, "npc_x", -2)
+        assert stored(db, player_id) == {"npc_x": 3}
+        assert db.get_npc_relation(player_id, "npc_x") == 3
+
+    def test_first_update_starts_from_default(self, db, player_id):
+        assert db.get_npc_relation(player_id, MASTER) == -15
+        assert db.update_npc_relation(player_id, MASTER, 5)
+        assert db.get_npc_relation(player_id, MASTER) == -10
+
+    def test_v10_offsets_migrated_to_absolute(self, db, player_id):
+        """舊存檔的 affinity_score 是相對 0 的變動：升級後加上初始好感度"""
+        conn = sqlite3.connect(db.db_path)
+        conn.executemany("INSERT INTO npc_relations (player_id, npc_id, affinity_score) VALUES (?, ?, ?)",
+                         [(player_id, MASTER, 5), (player_id, "npc_unknown", 3)])
+        conn.execute("UPDATE schema_version SET version = 10")
+        conn.commit()
+        conn.close()
+
+        upgraded = GameStateManager()
+        assert stored(db, player_id) == {MASTER: -10, "npc_unknown": 3}
+        cache = AffinityCache(lambda: upgraded)
+        cache.load(player_id)
+        assert cache.get(MASTER) == -10
+        assert cache.get("npc_002_elder_herb") == default_affinity("npc_002_elder_herb")
+
+        conn = sqlite3.connect(db.db_path)
+        assert conn.execute("SELECT version FROM schema_version").fetchone()[0] == DB_SCHEMA_VERSION
+        conn.close()
+
+    def test_batch_upsert_writes_absolute_scores(self, db, player_id):
+        db.update_npc_relation(player_id, "npc_a", 10)
+        assert db.upsert_npc_relations(player_id, {"npc_a": 4, "npc_b": -1})
+        assert stored(db, player_id) == {"npc_a": 4, "npc_b": -1}
+        assert db.load_npc_relations(player_id) == {"npc_a": 4, "npc_b": -1}
+
+
+class TestAffinityCache:
+
+    def test_default_from_npc_data(self, db, player_id):
+        cache = AffinityCache(lambda: db)
+        cache.load(player_id)
+        assert default_affinity(MASTER) == -15
+        assert cache.get(MASTER) == -15
+        assert cache.get("npc_unknown") == 0
+        assert cache.get(MASTER, default=7) == 7
+
+    def test_adjust_flushes_once_per_turn(self, db, player_id, monkeypatch):
+        cache = AffinityCache(lambda: db)
+        cache.load(player_id)
+        calls = []
+        upsert = db.upsert_npc_relations
+        monkeypatch.setattr(db, "upsert_npc_relations", lambda pid, scores: calls.append(dict(scores)) or upsert(pid, scores))
+
+        assert cache.adjust(MASTER, 5) == -10
+        cache.adjust("npc_b", 3)
+        cache.adjust("npc_b", 2)
+        assert stored(db, player_id) == {}  # 回合中只改快取
+        assert cache.flush()
+        assert calls == [{MASTER: -10, "npc_b": 5}]
+        assert stored(db, player_id) == {MASTER: -10, "npc_b": 5}
+
+        assert cache.flush() and len(calls) == 1  # 沒有變動不寫入
+
+    def test_load_reads_saved_scores(self, db, player_id):
+        db.upsert_npc_relations(player_id, {MASTER: 42})
+        cache = AffinityCache(lambda: db)
+        cache.load(player_id)
+        assert cache.get(MASTER) == 42
+        assert cache.snapshot() == {MASTER: 42}
+
+    def test_failed_flush_kept_for_next_turn(self, db, player_id, monkeypatch):
+        cache = AffinityCache(lambda: db)
+        cache.load(player_id)
+        cache.adjust("npc_b", 1)
+        monkeypatch.setattr(db, "upsert_npc_relations", lambda pid, scores: False)
+        assert not cache.flush()
+        assert cache.dirty
+        monkeypatch.undo()
+        assert cache.flush()
+        assert stored(db, player_id) == {"npc_b": 1}
+
+    def test_switching_player_flushes_previous(self, db, player_id):
+        other = db.create_new_player("明月")["player_id"]
+        cache = AffinityCache(lambda: db)
+        cache.load(player_id)
+        cache.adjust("npc_b", 8)
+        assert cache.load(other)
+        assert stored(db, player_id) == {"npc_b": 8}
+        assert cache.get("npc_b") == 0
+
+    def test_failed_flush_blocks_switch(self, db, player_id, monkeypatch):
+        """寫回失敗時不切換玩家，變動保留到寫回成功為止"""
+        other = db.create_new_player("明月")["player_id"]
+        cache = AffinityCache(lambda: db)
+        cache.load(player_id)
+        cache.adjust("npc_b", 8)
+        attempts = []
+        monkeypatch.setattr(db, "upsert_npc_relations", lambda pid, scores: attempts.append(pid) and False)
+
+        assert not cache.load(other)
+        assert attempts == [player_id, player_id]  # 重試一次
+        assert cache.player_id == player_id and cache.dirty
+        assert cache.get("npc_b") == 8
+
+        monkeypatch.undo()
+        assert cache.load(other)
+        assert stored(db, player_id) == {"npc_b": 8}
+        assert cache.player_id == other
+
+    def test_reload_same_player_keeps_changes(self, db, player_id):
+        cache = AffinityCache(lambda: db)
+        cache.load(player_id)
+        cache.adjust("npc_b", 3)
+        assert cache.load(player_id)
+        assert cache.get("npc_b") == 3
+        assert stored(db, player_id) == {"npc_b": 3}
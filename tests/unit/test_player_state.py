@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+"""
+PlayerState 單元測試
+測試 dict 介面相容性、變動追蹤與 diff()，以及 save_player 對無變動狀態的略過
+"""
+
+import sys
+import json
+import copy
+import sqlite3
+import pytest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "src"))
+
+import config
+from game_state import GameStateManager
+from player_state import REMOVED, PlayerState
+
+
+@pytest.fixture
+def state():
+    return PlayerState(copy.deepcopy(config.INITIAL_PLAYER_STATE))
+
+
+class TestMappingInterface:
+
+    def test_behaves_like_dict(self, state):
+        assert state["hp"] == 100 and state.get("mp") == 50
+        assert state.get("current_tick") is None and "current_tick" not in state
+        assert dict(state) == config.INITIAL_PLAYER_STATE
+        assert state == config.INITIAL_PLAYER_STATE
+        assert {**state, "hp": 1}["hp"] == 1
+        assert json.loads(json.dumps(state.to_dict(), ensure_ascii=False)) == config.INITIAL_PLAYER_STATE
+        with pytest.raises(KeyError):
+            state["current_tick"]
+
+    def test_unknown_keys_and_attributes(self, state):
+        state["level"] = 3
+        assert state["level"] == 3 and "level" in state
+        state.hp = 80
+        assert state["hp"] == 80
+        with pytest.raises(AttributeError):
+            state.level = 4  # __slots__：未知鍵只能用 dict 介面
+
+    def test_no_instance_dict(self, state):
+        assert not hasattr(state, "__dict__")
+
+
+class TestDiff:
+
+    def test_clean_after_construction(self, state):
+        assert state.diff() == {} and not state.dirty
+
+    def test_assignment(self, state):
+        state["hp"] = 90
+        state.mp = 50  # 值未變
+        state["current_tick"] = 5
+        assert state.diff() == {"hp": 90, "current_tick": 5}
+
+    def test_in_place_mutation(self, state):
+        state["inventory"].append("靈草")
+        state["relations"]["elder"] = 3
+        assert state.diff() == {"inventory": ["布衣", "乾糧", "靈草"], "relations": {"elder": 3}}
+
+    def test_revert_is_clean(self, state):
+        state["hp"] = 10
+        state["hp"] = 100
+        state["skills"].append("御風術")
+        state["skills"].remove("御風術")
+        assert not state.dirty
+
+    def test_removed_keys(self, state):
+        del state["karma"]
+        state["level"] = 1
+        del state["level"]
+        assert state.diff() == {"karma": REMOVED}
+
+    def test_mark_clean(self, state):
+        state["inventory"].append("靈草")
+        state.mark_clean()
+        assert not state.dirty
+        state["inventory"].append("丹藥")
+        assert state.diff() == {"inventory": ["布衣", "乾糧", "靈草", "丹藥"]}
+
+
+class TestSaveSkipping:
+
+    def test_clean_state_not_written(self, db):
+        created = db.create_new_player("青雲")
+        state = created["state"]
+        assert isinstance(state, PlayerState) and not state.dirty
+
+        assert db.save_player(created["player_id"], state)
+        assert db.save_stats == {"requested": 1, "written": 0, "skipped": 1}
+
+        state["inventory"].append("靈草")
+        assert db.save_player(created["player_id"], state)
+        assert not state.dirty
+        assert db.save_player(created["player_id"], state)
+        assert db.save_stats == {"requested": 3, "written": 1, "skipped": 2}
+        assert GameStateManager().load_player("青雲")["state"]["inventory"][-1] == "靈草"
+
+    def test_loaded_state_is_clean(self, db):
+        db.create_new_player("青雲")
+        loaded = db.load_player("青雲")
+        assert isinstance(loaded["state"], PlayerState) and not loaded["state"].dirty
+        db.save_player(loaded["player_id"], loaded["state"])
+        assert db.save_stats["skipped"] == 1
+
+    def test_other_objects_are_written(self, db):
+        created = db.create_new_player("青雲")
+        copy_state = PlayerState(created["state"])  # 乾淨但不是資料庫對應的那一份
+        copy_state["hp"] = 1
+        copy_state.mark_clean()
+        db.save_player(created["player_id"], copy_state)
+        db.save_player(created["player_id"], {**created["state"]})  # 普通 dict 照常寫入
+        assert db.save_stats == {"requested": 2, "written": 2, "skipped": 0}
+
+        conn = sqlite3.connect(db.db_path)
+        assert conn.execute("SELECT hp FROM players").fetchone() == (100,)
+        conn.close()
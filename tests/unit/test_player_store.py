@@ -0,0 +1,226 @@
+# -*- coding: utf-8 -*-
+"""
+玩家存檔單元測試
+測試正規化欄位 / 物品表的讀寫、增量保存的比對結果，以及舊 state_json 存檔的轉換
+"""
+
+import sys
+import json
+import copy
+import random
+import sqlite3
+import pytest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "src"))
+
+import config
+from game_state import DB_SCHEMA_VERSION, GameStateManager
+from player_store import LAYOUT_JSON, LAYOUT_NORMALIZED, diff_slots, plan_save
+
+
+def diff(old, new):
+    """以 [(slot, item)] 表示舊列表，返回 (deletes, upserts, [(slot, item)])"""
+    deletes, upserts, slots = diff_slots([slot for slot, _ in old], [item for _, item in old], new)
+    return deletes, upserts, list(zip(slots, new))
+
+
+def slots_of(items, start=0):
+    return list(enumerate(items, start))
+
+
+class TestDiffSlots:
+
+    def test_unchanged(self):
+        assert diff(slots_of(["劍", "丹", "符"]), ["劍", "丹", "符"]) == \
+            ([], [], slots_of(["劍", "丹", "符"]))
+
+    def test_append_writes_one_row(self):
+        deletes, upserts, slots = diff(slots_of(["劍", "丹"]), ["劍", "丹", "丹"])
+        assert deletes == [] and upserts == [(2, "丹")]
+        assert slots == slots_of(["劍", "丹", "丹"])
+
+    def test_remove_deletes_one_row(self):
+        old = slots_of(["劍", "丹", "符", "丹"])
+        deletes, upserts, slots = diff(old, ["劍", "符", "丹"])
+        assert deletes == [1] and upserts == []
+        assert [item for _, item in slots] == ["劍", "符", "丹"]
+
+    def test_duplicates_remove_last(self):
+        deletes, upserts, _ = diff(slots_of(["丹", "丹", "丹"]), ["丹", "丹"])
+        assert (deletes, upserts) == ([2], [])
+
+    def test_insert_into_gap(self):
+        old = [(0, "劍"), (5, "符")]
+        deletes, upserts, slots = diff(old, ["劍", "丹", "符"])
+        assert deletes == [] and upserts == [(1, "丹")]
+        assert slots == [(0, "劍"), (1, "丹"), (5, "符")]
+
+    def test_insert_without_gap_renumbers_tail(self):
+        old = slots_of(["劍", "符", "鼎"])
+        deletes, upserts, slots = diff(old, ["劍", "丹", "符", "鼎"])
+        assert deletes == []
+        assert upserts == [(1, "丹"), (2, "符"), (3, "鼎")]
+        assert slots == slots_of(["劍", "丹", "符", "鼎"])
+
+    def test_replace_reuses_slot(self):
+        deletes, upserts, _ = diff(slots_of(["劍", "丹", "符"]), ["劍", "鼎", "符"])
+        assert (deletes, upserts) == ([], [(1, "鼎")])
+
+    def test_remove_and_append_in_one_turn(self):
+        old = slots_of([f"物品{i}" for i in range(1000)])
+        new = [item for _, item in old if item != "物品500"] + ["戰利品"]
+        deletes, upserts, _ = diff(old, new)
+        assert (deletes, upserts) == ([500], [(1000, "戰利品")])
+
+    @pytest.mark.parametrize("seed", range(5))
+    def test_random_edits_apply_cleanly(self, seed):
+        rng = random.Random(seed)
+        table = dict(slots_of([rng.choice("劍丹符鼎") for _ in range(30)]))
+        for _ in range(200):
+            items = [table[slot] for slot in sorted(table)]
+            for _ in range(rng.randint(1, 3)):
+                op = rng.random()
+                if op < 0.4 or not items:
+                    items.insert(rng.randint(0, len(items)), rng.choice("劍丹符鼎草"))
+                elif op < 0.8:
+                    items.pop(rng.randrange(len(items)))
+                else:
+                    items[rng.randrange(len(items))] = rng.choice("劍丹符鼎草")
+            deletes, upserts, slots = diff(sorted(table.items()), items)
+            for slot in deletes:
+                del table[slot]
+            table.update(upserts)
+            assert sorted(table.items()) == slots
+            assert [table[slot] for slot in sorted(table)] == items
+
+
+class TestPlanSave:
+
+    def test_only_changed_fields(self):
+        state = copy.deepcopy(config.INITIAL_PLAYER_STATE)
+        first = plan_save(None, state)
+        assert first.full
+
+        state["hp"] -= 10
+        state["inventory"].append("靈草")
+        plan = plan_save(first.snapshot, state)
+        assert plan.columns == {"hp": 90}
+        assert plan.extras_json is None
+        assert plan.upserts["player_inventory"] == [(2, "靈草")]
+        assert plan.writes == 2
+        assert plan_save(plan.snapshot, state).writes == 0
+
+    def test_extras_rewritten_when_changed(self):
+        state = copy.deepcopy(config.INITIAL_PLAYER_STATE)
+        snapshot = plan_save(None, state).snapshot
+        state["relations"]["elder"] = 5
+        plan = plan_save(snapshot, state)
+        assert json.loads(plan.extras_json)["relations"] == {"elder": 5}
+        assert plan.columns == {}
+
+
+class TestPlayerPersistence:
+
+    def test_round_trip(self, db):
+        created = db.create_new_player("青雲")
+        state = created["state"]
+        state["hp"] = 42
+        state["inventory"] += ["靈草"] * 3
+        state["inventory"].remove("布衣")
+        state["skills"].append("御風術")
+        state["relations"] = {"elder": 12}
+        assert db.save_player(created["player_id"], state)
+
+        loaded = GameStateManager().load_player("青雲")["state"]
+        assert loaded == state
+
+    def test_state_is_queryable(self, db):
+        hero = db.create_new_player("甲")
+        db.create_new_player("乙")
+        hero["state"]["hp"] = 5
+        hero["state"]["inventory"].append("九葉靈草")
+        db.save_player(hero["player_id"], hero["state"])
+
+        conn = sqlite3.connect(db.db_path)
+        low_hp = conn.execute("SELECT name FROM players WHERE hp < 20").fetchall()
+        holders = conn.execute("""
+            SELECT DISTINCT p.name FROM players p JOIN player_inventory i ON i.player_id = p.id
+            WHERE i.item = '九葉靈草'
+        """).fetchall()
+        conn.close()
+        assert low_hp == [("甲",)] and holders == [("甲",)]
+
+    def test_large_inventory_save_touches_one_row(self, db):
+        created = db.create_new_player("富翁")
+        state = created["state"]
+        state["inventory"] = [f"物品{i}" for i in range(5000)]
+        db.save_player(created["player_id"], state)
+
+        state["inventory"].remove("物品10")
+        state["mp"] -= 5
+        plan = plan_save(db._snapshots[created["player_id"]], state)
+        assert plan.writes == 2
+        db.save_player(created["player_id"], state)
+        assert GameStateManager().load_player("富翁")["state"]["inventory"] == state["inventory"]
+
+    def test_non_string_list_kept_in_json(self, db):
+        created = db.create_new_player("怪人")
+        state = created["state"]
+        state["inventory"] = [{"name": "法寶", "level": 3}]
+        state["hp"] = None
+        db.save_player(created["player_id"], state)
+        loaded = GameStateManager().load_player("怪人")["state"]
+        assert loaded["inventory"] == [{"name": "法寶", "level": 3}]
+        assert loaded["hp"] is None
+
+
+class TestLegacySaves:
+
+    def test_json_layout_still_readable(self, db):
+        legacy = {"name": "舊人", "hp": 77, "inventory": ["古劍"], "skills": [], "location_id": "qingyun_plaza",
+                  "tier": 1.5, "current_tick": 12}
+        conn = sqlite3.connect(db.db_path)
+        conn.execute("INSERT INTO players (name, state_json, state_layout) VALUES (?, ?, ?)",
+                     ("舊人", json.dumps(legacy, ensure_ascii=False), LAYOUT_JSON))
+        conn.commit()
+        conn.close()
+
+        result = db.load_player("舊人")
+        assert result["state"] == legacy
+        legacy["hp"] = 70
+        assert db.save_player(result["player_id"], legacy)
+
+        conn = sqlite3.connect(db.db_path)
+        row = conn.execute("SELECT hp, state_layout FROM players WHERE name = '舊人'").fetchone()
+        conn.close()
+        assert row == (70, LAYOUT_NORMALIZED)
+        assert GameStateManager().load_player("舊人")["state"] == legacy
+
+    def test_v6_database_converted_on_upgrade(self, db):
+        state = copy.deepcopy(config.INITIAL_PLAYER_STATE)
+        state.update(name="老玩家", hp=33, current_tick=7, inventory=["布衣", "布衣", "乾糧"])
+
+        # 模擬 v6：players 只有 state_json
+        conn = sqlite3.connect(db.db_path)
+        conn.executescript("""
+            DROP TABLE players;
+            CREATE TABLE players (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT UNIQUE NOT NULL,
+                location_id TEXT NOT NULL DEFAULT 'qingyun_foot', tier REAL NOT NULL DEFAULT 1.0,
+                current_tick INTEGER NOT NULL DEFAULT 0, state_json TEXT NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP, last_save_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                playtime_seconds INTEGER DEFAULT 0);
+            UPDATE schema_version SET version = 6;
+        """)
+        conn.execute("INSERT INTO players (name, state_json) VALUES (?, ?)",
+                     ("老玩家", json.dumps(state, ensure_ascii=False)))
+        conn.commit()
+        conn.close()
+
+        upgraded = GameStateManager()
+        conn = sqlite3.connect(db.db_path)
+        assert conn.execute("SELECT hp, state_layout FROM players").fetchone() == (33, LAYOUT_NORMALIZED)
+        assert conn.execute("SELECT COUNT(*) FROM player_inventory").fetchone()[0] == 3
+        assert conn.execute("SELECT version FROM schema_version").fetchone()[0] == DB_SCHEMA_VERSION
+        conn.close()
+        assert upgraded.load_player("老玩家")["state"] == state
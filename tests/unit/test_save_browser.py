@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+"""
+存檔瀏覽單元測試
+測試依最後保存時間的 keyset 分頁（含同一秒保存的存檔）、名稱前綴查詢、摘要欄位與遊戲時間累計
+"""
+
+import sys
+import sqlite3
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "src"))
+
+import game_state
+from save_browser import (
+    browse_players, count_players, format_playtime, format_summary, iter_players, prefix_upper_bound,
+)
+
+
+def set_save_times(db, times):
+    """times: {name: last_save_at}"""
+    conn = sqlite3.connect(db.db_path)
+    conn.executemany("UPDATE players SET last_save_at = ? WHERE name = ?",
+                     [(stamp, name) for name, stamp in times.items()])
+    conn.commit()
+    conn.close()
+
+
+def query_plan(db, sql, params):
+    conn = sqlite3.connect(db.db_path)
+    plan = " ".join(row[-1] for row in conn.execute("EXPLAIN QUERY PLAN " + sql, params))
+    conn.close()
+    return plan
+
+
+class TestKeysetPagination:
+
+    def test_pages_cover_all_saves_in_order(self, db):
+        names = [f"弟子{i:02d}" for i in range(25)]
+        for name in names:
+            db.create_new_player(name)
+        # 多個存檔在同一秒保存：以 id 決定先後，翻頁不重複不遺漏
+        set_save_times(db, {name: f"2026-01-01 00:00:{i // 3:02d}" for i, name in enumerate(names)})
+
+        seen, after = [], None
+        while True:
+            page = browse_players(db, limit=4, after=after)
+            seen.extend(save.name for save in page.saves)
+            if page.next_after is None:
+                break
+            after = page.next_after
+        assert seen == list(reversed(names))
+
+    def test_first_page_and_next_cursor(self, db):
+        for name in ("甲", "乙", "丙"):
+            db.create_new_player(name)
+        page = browse_players(db, limit=3)
+        assert len(page.saves) == 3 and page.next_after is None
+        page = browse_players(db, limit=2)
+        assert page.next_after == (page.saves[-1].last_save_at, page.saves[-1].id)
+
+    def test_empty(self, db):
+        assert browse_players(db) == ([], None)
+
+    def test_uses_index(self, db):
+        plan = query_plan(db, "SELECT id FROM players WHERE (last_save_at, id) < (?, ?) "
+                                    "ORDER BY last_save_at DESC, id DESC LIMIT 10", ("2026", 1))
+        assert "idx_players_last_save" in plan
+
+
+class TestPrefixSearch:
+
+    def test_prefix_matches_sorted_by_name(self, db):
+        for name in ("青雲子", "青鋒", "紫霞", "青", "青雲"):
+            db.create_new_player(name)
+        assert [save.name for save in browse_players(db, prefix="青雲").saves] == ["青雲", "青雲子"]
+        assert count_players(db, prefix="青") == 4
+        assert count_players(db) == 5
+
+    def test_prefix_pages(self, db):
+        for i in range(7):
+            db.create_new_player(f"劍{i}")
+        db.create_new_player("刀")
+        names = [save.name for save in iter_players(db, prefix="劍", page_size=3)]
+        assert names == [f"劍{i}" for i in range(7)]
+
+    def test_prefix_uses_name_index(self, db):
+        plan = query_plan(db, "SELECT id FROM players WHERE name >= ? AND name < ? ORDER BY name",
+                          ("青", prefix_upper_bound("青")))
+        assert "INDEX" in plan and "SCAN players" not in plan
+
+    def test_upper_bound(self):
+        assert prefix_upper_bound("ab") == "ac"
+        assert prefix_upper_bound("a" + chr(0x10FFFF)) == "b"
+        assert prefix_upper_bound(chr(0x10FFFF)) is None
+
+
+class TestSummary:
+
+    def test_summary_columns_without_state_json(self, db):
+        created = db.create_new_player("行者")
+        state = created["state"]
+        state["tier"] = 2.0
+        state["location_id"] = "qingyun_plaza"
+        state["location"] = "青雲廣場"
+        db.save_player(created["player_id"], state)
+
+        # 摘要不讀 state_json：即使內容損壞也能列出
+        conn = sqlite3.connect(db.db_path)
+        conn.execute("UPDATE players SET state_json = 'broken'")
+        conn.commit()
+        conn.close()
+
+        save = browse_players(db).saves[0]
+        assert (save.name, save.tier, save.location, save.playtime_seconds) == ("行者", 2.0, "青雲廣場", 0)
+        assert "青雲廣場" in format_summary(save)
+
+    def test_playtime_accumulates_on_save(self, db, monkeypatch):
+        clock = [1000.0]
+        monkeypatch.setattr(game_state.time, "monotonic", lambda: clock[0])
+        created = db.create_new_player("行者")
+        state = created["state"]
+
+        clock[0] += 90.6
+        state["hp"] -= 1
+        db.save_player(created["player_id"], state)
+        clock[0] += 30.5
+        state["hp"] -= 1
+        db.save_player(created["player_id"], state)
+        assert browse_players(db).saves[0].playtime_seconds == 121
+
+    def test_format_playtime(self):
+        assert format_playtime(0) == "不到 1 分"
+        assert format_playtime(720) == "12 分"
+        assert format_playtime(3900) == "1 小時 5 分"
@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+"""
+存檔排程單元測試
+測試視窗內的合併寫入、立即寫入、序號保護、last_event_id 與未存檔事件數，以及 v7 → v8 升級
+"""
+
+import sys
+import time
+import sqlite3
+import pytest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "src"))
+
+from game_state import DB_SCHEMA_VERSION, GameStateManager
+from save_scheduler import SaveScheduler
+
+
+@pytest.fixture
+def player(db):
+    created = db.create_new_player("凌霄")
+    return created["player_id"], created["state"]
+
+
+def saved_hp(name="凌霄"):
+    return GameStateManager().load_player(name)["state"]["hp"]
+
+
+def wait_until(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return predicate()
+
+
+class TestCoalescing:
+
+    def test_marks_within_window_write_once(self, db, player):
+        player_id, state = player
+        saver = SaveScheduler(lambda: db, window=0.1)
+        for hp in (90, 80, 70):
+            state["hp"] = hp
+            saver.mark_dirty(player_id, state)
+        assert saver.pending
+        assert wait_until(lambda: saver.stats["written"] == 1)
+        assert saver.stats["coalesced"] == 2
+        assert saved_hp() == 70
+        saver.close()
+
+    def test_clean_state_not_captured(self, db, player):
+        player_id, state = player
+        saver = SaveScheduler(lambda: db, window=10)
+        saver.mark_dirty(player_id, state)
+        assert saver.stats["captured"] == 0 and not saver.pending
+
+    def test_new_event_captured_without_state_change(self, db, player):
+        player_id, state = player
+        saver = SaveScheduler(lambda: db, window=10)
+        db.log_event(player_id, "青雲山腳", "INSPECT", "觀察四周")
+        saver.mark_dirty(player_id, state)
+        assert saver.pending
+        saver.close()
+        assert db.load_player("凌霄")["unsaved_events"] == 0
+
+
+class TestImmediate:
+
+    def test_flush_writes_now(self, db, player):
+        player_id, state = player
+        saver = SaveScheduler(lambda: db, window=10)
+        state["hp"] = 12
+        assert saver.flush(player_id, state)
+        assert saver.stats["immediate"] == 1 and not saver.pending
+        assert saved_hp() == 12
+
+    def test_flush_writes_pending_capture(self, db, player):
+        player_id, state = player
+        saver = SaveScheduler(lambda: db, window=10)
+        state["hp"] = 33
+        saver.mark_dirty(player_id, state)
+        assert saver.flush()
+        assert saved_hp() == 33
+
+    def test_close_is_reusable(self, db, player):
+        player_id, state = player
+        saver = SaveScheduler(lambda: db, window=0.05)
+        state["hp"] = 50
+        assert saver.close(player_id, state)
+        state["hp"] = 40
+        saver.mark_dirty(player_id, state)
+        assert wait_until(lambda: saver.stats["written"] == 2)
+        assert saved_hp() == 40
+        saver.close()
+
+    def test_stale_capture_not_written(self, db, player):
+        player_id, state = player
+        saver = SaveScheduler(lambda: db, window=10)
+        state["hp"] = 60
+        stale = saver._capture(player_id, state)
+        state["hp"] = 55
+        saver.flush(player_id, state)
+        assert saver._write(stale)
+        assert saved_hp() == 55
+        assert saver.stats["written"] == 1
+
+    def test_failed_write_requeued(self, db, player, monkeypatch):
+        player_id, state = player
+        saver = SaveScheduler(lambda: db, window=10)
+        monkeypatch.setattr(db, "save_player", lambda *args, **kwargs: False)
+        state["hp"] = 1
+        assert not saver.flush(player_id, state)
+        assert saver.pending and saver.stats["failed"] == 1
+        monkeypatch.undo()
+        saver.close()
+
+
+class TestEventOrdering:
+
+    def test_last_event_id_saved_with_state(self, db, player):
+        player_id, state = player
+        saver = SaveScheduler(lambda: db, window=10)
+        db.log_event(player_id, "青雲山腳", "COMBAT", "擊退山賊")
+        event_id = db.last_event_id(player_id)
+        state["hp"] -= 10
+        saver.flush(player_id, state)
+
+        conn = sqlite3.connect(db.db_path)
+        row = conn.execute("SELECT last_event_id FROM players WHERE id = ?", (player_id,)).fetchone()
+        conn.close()
+        assert event_id > 0 and row == (event_id,)
+
+    def test_crash_within_window_recovered_from_journal(self, db, player):
+        player_id, state = player
+        saver = SaveScheduler(lambda: db, window=10)
+        state["hp"] = 70
+        saver.flush(player_id, state)
+        # 之後的事件與狀態變動都已記錄，但存檔還在視窗內（模擬異常結束）
+        for text in ("拾得靈草", "遭遇妖獸"):
+            db.log_event(player_id, "青雲山腳", "INSPECT", text)
+        state["hp"] = 20
+        saver.mark_dirty(player_id, state)
+        # 指令處理到一半：事件已寫入，狀態尚未擷取
+        db.log_event(player_id, "青雲山腳", "COMBAT", "反擊")
+
+        loaded = GameStateManager().load_player("凌霄")
+        assert loaded["recovered_deltas"] == 1
+        assert loaded["state"]["hp"] == 20
+        assert loaded["unsaved_events"] == 1
+
+    def test_v7_database_backfilled_on_upgrade(self, db, player):
+        player_id, _ = player
+        for i in range(3):
+            db.log_event(player_id, "青雲山腳", "INSPECT", f"事件{i}")
+        last = db.last_event_id(player_id)
+
+        conn = sqlite3.connect(db.db_path)
+        conn.executescript("""
+            ALTER TABLE players DROP COLUMN last_event_id;
+            UPDATE schema_version SET version = 7;
+        """)
+        conn.commit()
+        conn.close()
+
+        upgraded = GameStateManager()
+        conn = sqlite3.connect(db.db_path)
+        assert conn.execute("SELECT last_event_id FROM players").fetchone() == (last,)
+        assert conn.execute("SELECT version FROM schema_version").fetchone()[0] == DB_SCHEMA_VERSION
+        conn.close()
+        assert upgraded.load_player("凌霄")["unsaved_events"] == 0
@@ -0,0 +1,247 @@
+# -*- coding: utf-8 -*-
+"""
+結構化輸出單元測試
+測試 schemas.py 的驗證器、解析統計，以及 call_gpt 的 response_format 傳遞與降級
+"""
+
+import sys
+import json
+import httpx
+import pytest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "src"))
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import agent
+import config
+from fixtures.fake_llm_client import FakeChatClient
+from llm_resilience import reset_resilience_state
+from llm_resilience import CircuitBreaker, get_circuit_breaker
+from schemas import (
+    DECISION, INTENT, INTENT_FALLBACK, get_schema_stats, parse_structured, reset_schema_stats,
+)
+
+
+@pytest.fixture(autouse=True)
+def clean_state(monkeypatch):
+    reset_resilience_state()
+    reset_schema_stats()
+    monkeypatch.setattr(agent, "_structured_output_unsupported", set())
+    yield
+    reset_resilience_state()
+
+
+class TestIntentSchema:
+    """測試意圖 Schema"""
+
+    def test_valid_intent_passes_through(self):
+        intent, errors = INTENT.validate(
+            {"intent": "MOVE", "target": "north", "details": "", "confidence": 0.9})
+        assert intent == {"intent": "MOVE", "target": "north", "details": "", "confidence": 0.9}
+        assert errors == []
+
+    def test_missing_optional_fields_get_defaults(self):
+        intent, errors = INTENT.validate({"intent": "REST"})
+        assert intent == {"intent": "REST", "target": None, "details": "", "confidence": 0.0}
+
+    def test_unknown_intent_rejected(self):
+        intent, errors = INTENT.validate({"intent": "FLY", "confidence": 0.9})
+        assert intent is None
+        assert errors
+
+    def test_fallback_unknown_intent_becomes_unknown(self):
+        """降級為一般文本時：未知意圖改為 UNKNOWN、多餘欄位丟棄，其餘欄位保留"""
+        intent, errors = INTENT_FALLBACK.validate(
+            {"intent": "FLY", "target": "山頂", "confidence": 0.8, "reason": "想飛"})
+        assert intent == {"intent": "UNKNOWN", "target": "山頂", "details": "", "confidence": 0.8}
+        assert len(errors) == 2
+
+    def test_confidence_string_coerced(self):
+        intent, _ = INTENT.validate({"intent": "TALK", "confidence": "0.7"})
+        assert intent["confidence"] == 0.7
+
+    def test_api_schema_has_no_local_keywords(self):
+        api_format = INTENT.response_format()
+        assert api_format["type"] == "json_schema"
+        assert api_format["json_schema"]["strict"] is True
+        assert "default" not in json.dumps(api_format)
+
+
+class TestDecisionSchema:
+    """測試決策 Schema"""
+
+    def test_string_numbers_coerced(self):
+        decision, errors = DECISION.validate({
+            "narrative": "你受了傷。",
+            "state_update": {"hp_change": "-10", "mp_change": 5.0, "tier_change": "0.1"},
+        })
+        assert decision["state_update"] == {"hp_change": -10, "mp_change": 5, "tier_change": 0.1}
+        assert errors == []
+
+    def test_invalid_fields_dropped(self):
+        decision, errors = DECISION.validate({
+            "narrative": "你撿到一株靈草。",
+            "state_update": {
+                "hp_change": "很多",
+                "items_gained": ["靈草", 3, None],
+                "npc_relations_change": {"npc_001_master_qingyun": "5", "npc_x": "大幅"},
+                "custom_field": 1,
+            },
+        })
+        update = decision["state_update"]
+        assert "hp_change" not in update
+        assert update["items_gained"] == ["靈草"]
+        assert update["npc_relations_change"] == {"npc_001_master_qingyun": 5}
+        assert update["custom_field"] == 1  # 未知欄位保留（非 strict）
+        assert len(errors) == 4
+
+    def test_missing_state_update_defaults_to_empty(self):
+        decision, _ = DECISION.validate({"narrative": "風平浪靜。"})
+        assert decision["state_update"] == {}
+
+    def test_state_update_default_not_shared(self):
+        first, _ = DECISION.validate({"narrative": "a"})
+        first["state_update"]["hp_change"] = 1
+        second, _ = DECISION.validate({"narrative": "b"})
+        assert second["state_update"] == {}
+
+    def test_missing_narrative_is_invalid(self):
+        decision, errors = DECISION.validate({"state_update": {}})
+        assert decision is None
+        assert any("narrative" in e for e in errors)
+
+
+class TestParseStructured:
+    """測試解析與統計"""
+
+    def test_pure_json(self):
+        intent, errors = parse_structured('{"intent": "INSPECT", "confidence": 0.8}', INTENT)
+        assert intent["intent"] == "INSPECT"
+        stats = get_schema_stats()["observer_intent"]
+        assert stats["calls"] == 1
+        assert stats["rescued"] == 0
+        assert stats["avg_parse_ms"] >= 0
+
+    def test_non_json_response_rescued_by_scanner(self):
+        text = '好的：\n```json\n{"narrative": "你打坐。", "state_update": {},}\n```'
+        decision, _ = parse_structured(text, DECISION)
+        assert decision == {"narrative": "你打坐。", "state_update": {}}
+        assert get_schema_stats()["director_decision"]["rescued"] == 1
+
+    def test_failure_recorded(self):
+        assert parse_structured("", INTENT) == (None, ["無法解析 JSON"])
+        assert parse_structured("沒有 JSON", INTENT)[0] is None
+        assert get_schema_stats()["observer_intent"]["parse_failures"] == 2
+
+
+def bad_request(message="response_format is not supported"):
+    from openai import BadRequestError
+
+    request = httpx.Request("POST", "https://api.openai.com/v1/chat/completions")
+    return BadRequestError(message, response=httpx.Response(400, request=request), body=None)
+
+
+class TestCallGptStructuredOutput:
+    """測試 call_gpt 的 response_format 傳遞與降級"""
+
+    def test_response_format_forwarded(self, monkeypatch):
+        client = FakeChatClient(responder='{"intent": "MOVE", "target": "north", '
+                                          '"details": "", "confidence": 0.9}')
+        monkeypatch.setattr(agent, "client", client)
+
+        intent = agent.agent_observer("往北走")
+
+        assert intent["intent"] == "MOVE"
+        assert client.requests[0]["response_format"] == INTENT.response_format()
+
+    def test_disabled_by_config(self, monkeypatch):
+        client = FakeChatClient(responder='{"intent": "REST"}')
+        monkeypatch.setattr(agent, "client", client)
+        monkeypatch.setattr(config, "STRUCTURED_OUTPUT_ENABLED", False)
+
+        intent = agent.agent_observer("休息")
+
+        assert intent["intent"] == "REST"
+        assert "response_format" not in client.requests[0]
+
+    def test_rejected_schema_falls_back_to_text(self, monkeypatch):
+        def responder(messages, kwargs):
+            if "response_format" in kwargs:
+                raise bad_request()
+            return '說明文字 {"narrative": "你靜坐片刻。", "state_update": {"mp_change": "5"}}'
+
+        client = FakeChatClient(responder=responder)
+        monkeypatch.setattr(agent, "client", client)
+        monkeypatch.setattr(config, "API_RETRY_BASE_DELAY", 0.0)
+
+        decision = agent.agent_director({"name": "測試", "tier": 1.0, "hp": 100, "max_hp": 100,
+                                         "mp": 50, "max_mp": 50, "karma": 0,
+                                         "location": "青雲門·山腳", "inventory": []},
+                                        "邏輯報告", "戲劇提案", {"intent": "REST"})
+
+        assert decision["state_update"] == {"mp_change": 5}
+        assert client.calls == 2
+        assert config.MODEL_DIRECTOR in agent._structured_output_unsupported
+
+        # 之後同一模型直接以一般文本調用
+        agent.call_gpt("sys", "再來一次", model=config.MODEL_DIRECTOR,
+                       response_format=DECISION.response_format())
+        assert "response_format" not in client.requests[-1]
+
+    def test_observer_text_fallback_tolerates_unknown_intent(self, monkeypatch):
+        client = FakeChatClient(responder='{"intent": "FLY", "target": "山頂", "extra": 1}')
+        monkeypatch.setattr(agent, "client", client)
+        monkeypatch.setattr(config, "STRUCTURED_OUTPUT_ENABLED", False)
+
+        intent = agent.agent_observer("飛上山頂")
+
+        assert intent["intent"] == "UNKNOWN"
+        assert intent["target"] == "山頂"
+        assert "extra" not in intent
+
+
+def half_open_breaker(monkeypatch, model):
+    monkeypatch.setattr(config, "CIRCUIT_BREAKER_COOLDOWN", 0.0)
+    breaker = get_circuit_breaker(model)
+    for _ in range(config.CIRCUIT_BREAKER_THRESHOLD):
+        breaker.record_failure()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    return breaker
+
+
+class TestRejectedSchemaDuringProbe:
+    """半開狀態的探測請求被拒絕 response_format（400）時，改用一般文本重試不會被熔斷擋下"""
+
+    @staticmethod
+    def responder(messages, kwargs):
+        if "response_format" in kwargs:
+            raise bad_request()
+        return '{"intent": "REST"}'
+
+    def test_call_gpt_retries_as_text(self, monkeypatch):
+        monkeypatch.setattr(config, "API_RETRY_BASE_DELAY", 0.0)
+        monkeypatch.setattr(config, "API_HEDGE_ENABLED", False)
+        breaker = half_open_breaker(monkeypatch, config.MODEL_OBSERVER)
+        client = FakeChatClient(responder=self.responder)
+        monkeypatch.setattr(agent, "client", client)
+
+        result = agent.call_gpt("sys", "休息", model=config.MODEL_OBSERVER,
+                                response_format=INTENT.response_format())
+
+        assert result == '{"intent": "REST"}'
+        assert client.calls == 2
+        assert breaker.state == CircuitBreaker.CLOSED
+
+    def test_stream_falls_back_to_text(self, monkeypatch):
+        monkeypatch.setattr(config, "API_STREAMING_ENABLED", True)
+        monkeypatch.setattr(config, "API_HEDGE_ENABLED", False)
+        breaker = half_open_breaker(monkeypatch, config.MODEL_OBSERVER)
+        client = FakeChatClient(responder=self.responder)
+        monkeypatch.setattr(agent, "client", client)
+
+        result = agent.call_gpt_stream("sys", "休息", model=config.MODEL_OBSERVER,
+                                       response_format=INTENT.response_format())
+
+        assert result == '{"intent": "REST"}'
+        assert breaker.state == CircuitBreaker.CLOSED
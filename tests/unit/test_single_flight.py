@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+"""
+請求合併單元測試
+測試 single_flight.py 與 call_gpt 的並發合併行為
+"""
+
+import sys
+import threading
+import time
+import pytest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "src"))
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import agent
+import config
+from fixtures.fake_llm_client import FakeChatClient
+from llm_resilience import llm_metrics, reset_resilience_state
+from single_flight import SingleFlight, request_fingerprint, single_flight
+
+
+def run_concurrently(fn, count: int):
+    """用 Barrier 讓 count 個執行緒同時調用 fn，返回所有結果"""
+    barrier = threading.Barrier(count)
+    results = [None] * count
+    errors = []
+
+    def worker(index):
+        barrier.wait()
+        try:
+            results[index] = fn(index)
+        except Exception as e:  # pragma: no cover - 失敗時才會走到
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(count)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(timeout=10)
+
+    assert not errors, errors
+    return results
+
+
+@pytest.fixture
+def fake_client(monkeypatch):
+    reset_resilience_state()
+    single_flight.reset_stats()
+    client = FakeChatClient(responder="你環顧四周，廣場上人聲鼎沸。", delay=0.2)
+    monkeypatch.setattr(agent, "client", client)
+    yield client
+    reset_resilience_state()
+
+
+class TestRequestFingerprint:
+    """測試請求指紋"""
+
+    def test_same_request_same_fingerprint(self):
+        a = request_fingerprint("m", 0.5, "sys", "看看四周")
+        b = request_fingerprint("m", 0.5, "sys", "看看四周")
+        assert a == b
+
+    def test_any_parameter_changes_fingerprint(self):
+        base = request_fingerprint("m", 0.5, "sys", "看看四周")
+        assert request_fingerprint("m2", 0.5, "sys", "看看四周") != base
+        assert request_fingerprint("m", 0.7, "sys", "看看四周") != base
+        assert request_fingerprint("m", 0.5, "sys2", "看看四周") != base
+        assert request_fingerprint("m", 0.5, "sys", "往北走") != base
+
+
+class TestSingleFlight:
+    """測試 SingleFlight 本身"""
+
+    def test_concurrent_same_key_executes_once(self):
+        flight = SingleFlight()
+        executed = []
+
+        def slow():
+            executed.append(1)
+            time.sleep(0.1)
+            return "result"
+
+        results = run_concurrently(lambda i: flight.do("key", slow), 8)
+
+        assert len(executed) == 1
+        assert all(result == "result" for result, _ in results)
+        assert sum(1 for _, shared in results if shared) == 7
+        assert flight.get_stats() == {"calls": 8, "executed": 1, "coalesced": 7}
+        assert flight.in_flight() == 0
+
+    def test_different_keys_run_independently(self):
+        flight = SingleFlight()
+        results = run_concurrently(lambda i: flight.do(f"key-{i}", lambda: i), 4)
+        assert sorted(r for r, _ in results) == [0, 1, 2, 3]
+        assert flight.get_stats()["coalesced"] == 0
+
+    def test_sequential_calls_are_not_coalesced(self):
+        flight = SingleFlight()
+        flight.do("key", lambda: 1)
+        result, shared = flight.do("key", lambda: 2)
+        assert result == 2
+        assert shared is False
+
+    def test_leader_error_propagates_to_waiters(self):
+        flight = SingleFlight()
+
+        def failing():
+            time.sleep(0.1)
+            raise RuntimeError("upstream down")
+
+        errors = []
+
+        def call(i):
+            try:
+                flight.do("key", failing)
+            except RuntimeError as e:
+                errors.append(e)
+
+        run_concurrently(call, 4)
+        assert len(errors) == 4
+        assert flight.in_flight() == 0
+
+
+class TestCallGptCoalescing:
+    """測試 call_gpt 下的合併層（假後端）"""
+
+    def test_identical_concurrent_calls_share_one_upstream(self, fake_client):
+        count = 10
+        results = run_concurrently(
+            lambda i: agent.call_gpt("sys", "我要查看周圍環境", agent_name="observer"),
+            count
+        )
+
+        assert fake_client.calls == 1
+        assert set(results) == {"你環顧四周，廣場上人聲鼎沸。"}
+        assert llm_metrics["coalesced"] == count - 1
+        assert single_flight.get_stats()["coalesced"] == count - 1
+
+    def test_distinct_prompts_are_not_coalesced(self, fake_client):
+        run_concurrently(
+            lambda i: agent.call_gpt("sys", f"玩家 {i} 的行動", agent_name="observer"),
+            5
+        )
+        assert fake_client.calls == 5
+        assert llm_metrics["coalesced"] == 0
+
+    def test_coalescing_can_be_disabled(self, fake_client, monkeypatch):
+        monkeypatch.setattr(config, "API_COALESCE_ENABLED", False)
+        run_concurrently(
+            lambda i: agent.call_gpt("sys", "我要查看周圍環境", agent_name="observer"),
+            4
+        )
+        assert fake_client.calls == 4
+        assert llm_metrics["coalesced"] == 0
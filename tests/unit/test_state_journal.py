@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+"""
+狀態日誌單元測試
+測試 delta 的編碼 / 套用、讀檔時的重播（異常結束後恢復），以及 v8 → v9 升級
+"""
+
+import sys
+import copy
+import json
+import random
+import sqlite3
+import pytest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "src"))
+
+import config
+from game_state import DB_SCHEMA_VERSION, GameStateManager
+from player_state import PlayerState
+from save_scheduler import SaveScheduler
+from state_journal import apply_delta, encode_delta, replay
+
+
+def record(state: PlayerState) -> dict:
+    """編碼自上次 mark_clean 以來的變動並重設基準"""
+    delta = encode_delta(state.baseline, state.diff())
+    state.mark_clean()
+    return delta
+
+
+def delta_rows(db, player_id):
+    conn = sqlite3.connect(db.db_path)
+    rows = conn.execute("SELECT delta FROM state_deltas WHERE player_id = ? ORDER BY id", (player_id,)).fetchall()
+    conn.close()
+    return [json.loads(row[0]) for row in rows]
+
+
+class TestEncodeDelta:
+
+    def test_scalars_are_assigned(self):
+        state = PlayerState({"hp": 100, "karma": 0})
+        state["hp"] = 80
+        assert record(state) == {"s": {"hp": 80}}
+
+    def test_list_append_and_remove_are_compact(self):
+        state = PlayerState({"inventory": [f"物品{i}" for i in range(100)]})
+        state["inventory"].remove("物品3")
+        state["inventory"].append("靈草")
+        assert record(state) == {"r": {"inventory": ["物品3"]}, "a": {"inventory": ["靈草"]}}
+
+    def test_reordered_list_falls_back_to_full_value(self):
+        state = PlayerState({"skills": ["甲", "乙"]})
+        state["skills"].reverse()
+        assert record(state) == {"s": {"skills": ["乙", "甲"]}}
+
+    def test_deleted_key(self):
+        state = PlayerState({"hp": 1, "buff": "護體"})
+        del state["buff"]
+        assert record(state) == {"d": ["buff"]}
+
+    def test_no_changes(self):
+        assert record(PlayerState({"hp": 1})) == {}
+
+    @pytest.mark.parametrize("seed", range(5))
+    def test_random_edits_replay_exactly(self, seed):
+        rng = random.Random(seed)
+        state = PlayerState(copy.deepcopy(config.INITIAL_PLAYER_STATE))
+        replayed = copy.deepcopy(state.to_dict())
+        for _ in range(300):
+            roll = rng.random()
+            if roll < 0.3:
+                state["inventory"].append(rng.choice("劍丹符鼎"))
+            elif roll < 0.5 and state["inventory"]:
+                state["inventory"].remove(rng.choice(state["inventory"]))
+            elif roll < 0.6 and state["inventory"]:
+                state["inventory"].insert(rng.randrange(len(state["inventory"])), "草")
+            elif roll < 0.7:
+                state["relations"][rng.choice("ab")] = rng.randint(-5, 5)
+            else:
+                state["hp"] = rng.randint(0, 100)
+            apply_delta(replayed, json.loads(json.dumps(record(state))))
+            assert replayed == state.to_dict()
+
+
+class TestReplay:
+
+    def test_replay_counts_and_last_ids(self):
+        state = {"hp": 10, "inventory": []}
+        rows = [(3, 7, '{"s":{"hp":9}}'), (5, 7, '{"a":{"inventory":["丹"]}}'), (8, 9, '{"s":{"hp":4}}')]
+        assert replay(state, rows) == (3, 8, 9)
+        assert state == {"hp": 4, "inventory": ["丹"]}
+
+    def test_replay_nothing(self):
+        assert replay({}, []) == (0, 0, 0)
+
+
+class TestCrashRecovery:
+
+    def test_unsaved_turns_replayed_on_load(self, db):
+        created = db.create_new_player("玄機")
+        player_id, state = created["player_id"], created["state"]
+        saver = SaveScheduler(lambda: db, window=60)
+        for turn in range(5):
+            state["hp"] -= 3
+            state["inventory"].append(f"戰利品{turn}")
+            state["current_tick"] += 1
+            saver.mark_dirty(player_id, state)
+        assert saver.stats["written"] == 0  # 視窗未到，只有日誌
+        assert len(delta_rows(db, player_id)) == 5
+
+        loaded = GameStateManager().load_player("玄機")
+        assert loaded["recovered_deltas"] == 5
+        assert loaded["state"] == state
+
+        # 重播後已寫入新快照：再次讀檔不需重播
+        again = GameStateManager().load_player("玄機")
+        assert again["recovered_deltas"] == 0
+        assert again["state"] == state
+
+    def test_direct_save_covers_journal(self, db):
+        created = db.create_new_player("玄機")
+        player_id, state = created["player_id"], created["state"]
+        state["inventory"].append("靈草")
+        db.append_delta(player_id, state.baseline, state.diff())
+        assert db.save_player(player_id, state)
+
+        loaded = GameStateManager().load_player("玄機")
+        assert loaded["recovered_deltas"] == 0
+        assert loaded["state"]["inventory"].count("靈草") == 1
+
+    def test_journal_kept_after_snapshot(self, db):
+        created = db.create_new_player("玄機")
+        player_id, state = created["player_id"], created["state"]
+        saver = SaveScheduler(lambda: db, window=60)
+        state["karma"] = 3
+        saver.flush(player_id, state)
+        state["karma"] = 5
+        saver.flush(player_id, state)
+        assert delta_rows(db, player_id) == [{"s": {"karma": 3}}, {"s": {"karma": 5}}]
+
+
+class TestMigration:
+
+    def test_v8_database_upgraded(self, db):
+        db.create_new_player("舊友")
+        conn = sqlite3.connect(db.db_path)
+        conn.executescript("""
+            ALTER TABLE players DROP COLUMN last_delta_id;
+            DROP TABLE state_deltas;
+            UPDATE schema_version SET version = 8;
+        """)
+        conn.commit()
+        conn.close()
+
+        upgraded = GameStateManager()
+        conn = sqlite3.connect(db.db_path)
+        assert conn.execute("SELECT last_delta_id FROM players").fetchone() == (0,)
+        assert conn.execute("SELECT version FROM schema_version").fetchone()[0] == DB_SCHEMA_VERSION
+        conn.close()
+        assert upgraded.load_player("舊友")["recovered_deltas"] == 0
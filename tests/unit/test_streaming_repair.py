@@ -0,0 +1,232 @@
+# -*- coding: utf-8 -*-
+"""
+串流增量驗證與 Director 修復模式單元測試
+測試 json_patch.py、StreamingValidator、call_gpt_stream 與 agent_director_repair
+"""
+
+import sys
+import json
+import pytest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "src"))
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import agent
+import config
+from fixtures.fake_llm_client import FakeChatClient
+from json_patch import apply_json_patch
+from llm_resilience import reset_resilience_state, llm_metrics
+from validators import StreamingValidator, ConsistencyValidator
+
+
+PLAYER = {"name": "測試", "tier": 1.0, "hp": 100, "max_hp": 100, "mp": 50, "max_mp": 50,
+          "karma": 0, "location": "青雲門·山腳", "inventory": []}
+
+BAD_DECISION = {"narrative": "妖獸一爪抓中你的肩膀，你受傷流血。", "state_update": {"hp_change": 0}}
+
+
+@pytest.fixture(autouse=True)
+def clean_state(monkeypatch):
+    reset_resilience_state()
+    monkeypatch.setattr(agent, "_structured_output_unsupported", set())
+    monkeypatch.setattr(config, "API_HEDGE_ENABLED", False)
+    monkeypatch.setattr(config, "API_RETRY_BASE_DELAY", 0.0)
+    yield
+    reset_resilience_state()
+
+
+class TestJsonPatch:
+    """測試 JSON Patch 套用"""
+
+    def test_replace_add_remove(self):
+        doc = {"narrative": "a", "state_update": {"hp_change": 0, "items_lost": ["x"]}}
+        patched, errors = apply_json_patch(doc, [
+            {"op": "replace", "path": "/state_update/hp_change", "value": -10},
+            {"op": "add", "path": "/state_update/items_gained", "value": ["靈草"]},
+            {"op": "remove", "path": "/state_update/items_lost"},
+        ])
+        assert errors == []
+        assert patched["state_update"] == {"hp_change": -10, "items_gained": ["靈草"]}
+        assert doc["state_update"] == {"hp_change": 0, "items_lost": ["x"]}
+
+    def test_list_operations(self):
+        patched, errors = apply_json_patch({"items": ["a", "b"]}, [
+            {"op": "add", "path": "/items/-", "value": "c"},
+            {"op": "add", "path": "/items/0", "value": "z"},
+            {"op": "remove", "path": "/items/1"},
+        ])
+        assert patched["items"] == ["z", "b", "c"]
+        assert errors == []
+
+    def test_invalid_operations_skipped(self):
+        patched, errors = apply_json_patch({"state_update": {}}, [
+            {"op": "move", "path": "/state_update/a"},
+            {"op": "replace", "path": "/state_update/missing", "value": 1},
+            {"op": "add", "path": "/nowhere/x", "value": 1},
+            {"op": "add", "path": "state_update/x", "value": 1},
+            {"op": "add", "path": "/state_update/ok", "value": 1},
+        ])
+        assert patched == {"state_update": {"ok": 1}}
+        assert len(errors) == 4
+
+    def test_allowed_prefixes(self):
+        patched, errors = apply_json_patch({"narrative": "a", "state_update": {}}, [
+            {"op": "replace", "path": "/narrative", "value": "b"},
+            {"op": "add", "path": "/narrative_extra", "value": "x"},
+            {"op": "add", "path": "/state_update/hp_change", "value": -1},
+        ], allowed_prefixes=("/state_update/", "/narrative"))
+        assert patched == {"narrative": "b", "state_update": {"hp_change": -1}}
+        assert len(errors) == 1
+
+    def test_escaped_pointer(self):
+        patched, _ = apply_json_patch({"a/b": {"c~d": 1}}, [
+            {"op": "replace", "path": "/a~1b/c~0d", "value": 2},
+        ])
+        assert patched == {"a/b": {"c~d": 2}}
+
+
+class TestStreamingValidator:
+    """測試增量驗證"""
+
+    def test_flags_mismatch_when_object_completes(self):
+        text = "```json\n" + json.dumps(BAD_DECISION, ensure_ascii=False) + "\n```\n以上是決策。"
+        stream_validator = StreamingValidator(PLAYER, "ATTACK")
+        closed_at = text.index("```\n以上")
+
+        completed_chunk = None
+        for start in range(0, len(text), 5):
+            if stream_validator.feed(text[start:start + 5]):
+                completed_chunk = start
+                break
+
+        assert completed_chunk is not None and completed_chunk < closed_at
+        assert stream_validator.result["valid"] is False
+        assert stream_validator.result["error_fields"] == ["hp_change"]
+
+    def test_result_matches_batch_validation(self):
+        stream_validator = StreamingValidator(PLAYER, "ATTACK")
+        stream_validator.feed(json.dumps(BAD_DECISION, ensure_ascii=False))
+        expected = ConsistencyValidator().validate(
+            BAD_DECISION["narrative"], BAD_DECISION["state_update"], PLAYER, "ATTACK")
+        assert stream_validator.result == expected
+
+    def test_finish_rescans_full_text(self):
+        stream_validator = StreamingValidator(PLAYER, "REST")
+        stream_validator.feed('{"narrative": "你靜')  # 串流中斷
+        stream_validator.finish('{"narrative": "你靜坐片刻。", "state_update": {}}')
+        assert stream_validator.done
+        assert stream_validator.result["valid"] is True
+
+    def test_matches_detects_later_changes(self):
+        stream_validator = StreamingValidator(PLAYER, "REST")
+        stream_validator.feed('{"narrative": "你靜坐片刻。", "state_update": {}}')
+        assert stream_validator.matches("你靜坐片刻。", {})
+        assert not stream_validator.matches("某人靜坐片刻。", {})
+
+    def test_object_without_narrative_ignored(self):
+        stream_validator = StreamingValidator()
+        assert stream_validator.feed('{"note": 1} {"narrative": "好", "state_update": {}}')
+        assert stream_validator.decision["narrative"] == "好"
+
+
+class TestCallGptStream:
+    """測試串流調用"""
+
+    def test_early_stop_reads_fewer_chunks(self, monkeypatch):
+        content = json.dumps(BAD_DECISION, ensure_ascii=False) + "\n" + "補充說明" * 50
+        client = FakeChatClient(responder=content, stream_chunk_size=4)
+        monkeypatch.setattr(agent, "client", client)
+        stream_validator = StreamingValidator(PLAYER, "ATTACK")
+
+        response = agent.call_gpt_stream("sys", "msg", on_chunk=stream_validator.feed)
+
+        total_chunks = -(-len(content) // 4)
+        assert stream_validator.done
+        assert client.streamed_chunks < total_chunks
+        assert response.startswith("{") and len(response) < len(content)
+        assert llm_metrics["stream_early_stops"] == 1
+        assert client.requests[0]["stream"] is True
+
+    def test_stream_failure_falls_back(self, monkeypatch):
+        def responder(messages, kwargs):
+            if kwargs.get("stream"):
+                raise ConnectionError("stream reset")
+            return "完整回應"
+
+        client = FakeChatClient(responder=responder)
+        monkeypatch.setattr(agent, "client", client)
+
+        assert agent.call_gpt_stream("sys", "msg") == "完整回應"
+        assert llm_metrics["stream_fallbacks"] == 1
+        assert "stream" not in client.requests[-1]
+
+    def test_disabled_by_config(self, monkeypatch):
+        client = FakeChatClient(responder="一般回應")
+        monkeypatch.setattr(agent, "client", client)
+        monkeypatch.setattr(config, "API_STREAMING_ENABLED", False)
+
+        assert agent.call_gpt_stream("sys", "msg") == "一般回應"
+        assert "stream" not in client.requests[0]
+
+    def test_director_streaming_decision(self, monkeypatch):
+        client = FakeChatClient(
+            responder=json.dumps(BAD_DECISION, ensure_ascii=False) + "\n說明文字" * 20)
+        monkeypatch.setattr(agent, "client", client)
+        stream_validator = StreamingValidator(PLAYER, "ATTACK")
+
+        decision = agent.agent_director(PLAYER, "邏輯報告", "戲劇提案", {"intent": "ATTACK"},
+                                        stream_validator=stream_validator)
+
+        assert decision == BAD_DECISION
+        assert stream_validator.matches(decision["narrative"], decision["state_update"])
+        assert stream_validator.result["valid"] is False
+
+
+class TestDirectorRepair:
+    """測試修復模式"""
+
+    def validation(self):
+        return ConsistencyValidator().validate(
+            BAD_DECISION["narrative"], BAD_DECISION["state_update"], PLAYER, "ATTACK")
+
+    def test_patch_applied(self, monkeypatch):
+        client = FakeChatClient(responder=json.dumps({"patch": [
+            {"op": "replace", "path": "/state_update/hp_change", "value": -12},
+        ]}))
+        monkeypatch.setattr(agent, "client", client)
+
+        repaired = agent.agent_director_repair(
+            BAD_DECISION["narrative"], BAD_DECISION["state_update"], self.validation(), PLAYER)
+
+        assert repaired == {"narrative": BAD_DECISION["narrative"], "state_update": {"hp_change": -12}}
+        assert ConsistencyValidator().validate(
+            repaired["narrative"], repaired["state_update"], PLAYER, "ATTACK")["valid"]
+        assert llm_metrics["repairs"] == 1
+
+        # 修復請求只帶出錯欄位，不帶邏輯/戲劇報告
+        user_message = client.requests[0]["messages"][1]["content"]
+        assert '{"hp_change": 0}' in user_message
+        assert "邏輯分析" not in user_message
+        assert client.requests[0]["response_format"]["json_schema"]["name"] == "director_repair_patch"
+
+    def test_disallowed_paths_ignored(self, monkeypatch):
+        client = FakeChatClient(responder=json.dumps({"patch": [
+            {"op": "add", "path": "/npc_secret", "value": 1},
+            {"op": "replace", "path": "/state_update/hp_change", "value": "-5"},
+        ]}))
+        monkeypatch.setattr(agent, "client", client)
+
+        repaired = agent.agent_director_repair(
+            BAD_DECISION["narrative"], BAD_DECISION["state_update"], self.validation())
+
+        assert repaired == {"narrative": BAD_DECISION["narrative"], "state_update": {"hp_change": -5}}
+
+    def test_unusable_response_returns_none(self, monkeypatch):
+        monkeypatch.setattr(agent, "client", FakeChatClient(responder="我無法修正"))
+        assert agent.agent_director_repair(
+            BAD_DECISION["narrative"], BAD_DECISION["state_update"], self.validation()) is None
+
+        monkeypatch.setattr(agent, "client", FakeChatClient(responder='{"patch": []}'))
+        assert agent.agent_director_repair(
+            BAD_DECISION["narrative"], BAD_DECISION["state_update"], self.validation()) is None
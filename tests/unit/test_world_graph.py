@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+"""
+世界路網單元測試
+測試 WorldGraph 的境界分層最短路徑、可達性、名稱解析與 goto 快速旅行
+"""
+
+import sys
+import random
+import pytest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "src"))
+
+import main
+from main import DaoGame
+from world_data import WORLD_MAP
+from world_graph import WorldGraph, get_world_graph
+from world_map import get_location_mp_cost, get_location_time_cost
+
+
+def random_world(size, seed):
+    """隨機稀疏地圖：每個地點 1-4 個出口，境界要求 1.0/2.0/3.0"""
+    rng = random.Random(seed)
+    ids = [f"loc_{i}" for i in range(size)]
+    locations = {}
+    for loc_id in ids:
+        exits = {f"d{k}": rng.choice(ids) for k in range(rng.randint(1, 4))}
+        locations[loc_id] = {"id": loc_id, "name": loc_id, "exits": exits,
+                             "tier_requirement": rng.choice([1.0, 1.0, 2.0, 3.0])}
+    costs = {}
+
+    def edge_cost(from_id, to_id):
+        return costs.setdefault((from_id, to_id), (rng.randint(1, 9), rng.randint(0, 9)))
+
+    return locations, edge_cost
+
+
+def floyd_warshall(graph, tier):
+    """參考實作：以 (時間, 法力) 字典序比較的 Floyd-Warshall"""
+    size = len(graph.ids)
+    infinity = (float("inf"), float("inf"))
+    dist = [[infinity] * size for _ in range(size)]
+    for u in range(size):
+        dist[u][u] = (0, 0)
+        for v, _, time_cost, mp_cost in graph.adjacency[u]:
+            if graph.tier_of[v] <= tier and v != u:
+                dist[u][v] = min(dist[u][v], (time_cost, mp_cost))
+    for k in range(size):
+        for i in range(size):
+            if dist[i][k] == infinity:
+                continue
+            for j in range(size):
+                through = (dist[i][k][0] + dist[k][j][0], dist[i][k][1] + dist[k][j][1])
+                if through < dist[i][j]:
+                    dist[i][j] = through
+    return dist
+
+
+class TestWorldMapRoutes:
+    """真實地圖上的路線"""
+
+    def test_multi_hop_route_with_costs(self):
+        graph = get_world_graph()
+        route = graph.route("qingyun_foot", "qingyun_sword_dojo", 2.0)
+
+        assert route.path == ["qingyun_foot", "qingyun_plaza", "qingyun_training_hall", "qingyun_sword_dojo"]
+        assert route.time_cost == sum(get_location_time_cost(a, b) for a, b in zip(route.path, route.path[1:]))
+        assert route.mp_cost == sum(get_location_mp_cost(a, b) for a, b in zip(route.path, route.path[1:]))
+        # 每一步都是真實出口
+        for step in route.steps:
+            assert WORLD_MAP[step.from_id]["exits"][step.direction] == step.to_id
+
+    def test_tier_gated_edges(self):
+        graph = get_world_graph()
+        assert graph.route("qingyun_foot", "qingyun_sword_dojo", 1.0) is None
+        assert graph.required_tier("qingyun_foot", "qingyun_sword_dojo") == 2.0
+        assert "qingyun_sword_dojo" not in graph.reachable("qingyun_foot", 1.5)
+        assert "qingyun_sword_dojo" in graph.reachable("qingyun_foot", 2.0)
+
+    def test_unreachable_and_trivial(self):
+        graph = get_world_graph()
+        # 青雲鎮與青雲門之間沒有出口相連
+        assert graph.route("qingyun_foot", "town_tavern", 9.0) is None
+        assert graph.required_tier("qingyun_foot", "town_tavern") is None
+        assert graph.route("qingyun_foot", "qingyun_foot", 1.0).path == ["qingyun_foot"]
+        assert graph.route("qingyun_foot", "nowhere", 1.0) is None
+
+    def test_resolve_names(self):
+        graph = get_world_graph()
+        assert graph.resolve("qingyun_herb") == "qingyun_herb"
+        assert graph.resolve("青雲門·靈草堂") == "qingyun_herb"
+        assert graph.resolve("靈草堂") == "qingyun_herb"
+        assert graph.resolve("內門") == "qingyun_inner"  # 短名完全相符優先於部分比對
+        assert graph.resolve("內門入") == "qingyun_inner_gate"
+        assert graph.resolve("青雲") is None  # 部分比對不唯一
+        assert graph.resolve("不存在") is None
+
+    def test_graph_cached_per_world_version(self):
+        assert get_world_graph() is get_world_graph()
+
+
+class TestShortestPaths:
+    """與 Floyd-Warshall 參考實作比對"""
+
+    @pytest.mark.parametrize("seed", [1, 2, 3])
+    def test_matches_floyd_warshall(self, seed):
+        locations, edge_cost = random_world(40, seed)
+        graph = WorldGraph(locations, edge_cost=edge_cost)
+
+        for tier in (1.0, 2.5, 3.0):
+            reference = floyd_warshall(graph, tier)
+            for source in graph.ids:
+                for target in graph.ids:
+                    expected = reference[graph.index[source]][graph.index[target]]
+                    route = graph.route(source, target, tier)
+                    if expected[0] == float("inf"):
+                        assert route is None
+                    else:
+                        assert (route.time_cost, route.mp_cost) == expected
+
+    def test_lazy_mode_bounded_cache(self):
+        locations, edge_cost = random_world(300, 7)
+        eager = WorldGraph(locations, edge_cost=edge_cost, precompute=True)
+        lazy = WorldGraph(locations, edge_cost=edge_cost, precompute=False, cache_size=16)
+
+        rng = random.Random(7)
+        for _ in range(200):
+            source, target = rng.choice(lazy.ids), rng.choice(lazy.ids)
+            assert lazy.distance(source, target, 2.0) == eager.distance(source, target, 2.0)
+        assert len(lazy._trees) <= 16
+
+    def test_below_lowest_tier(self):
+        locations, edge_cost = random_world(10, 1)
+        graph = WorldGraph(locations, edge_cost=edge_cost)
+        assert graph.band_for(0.5) is None
+        assert graph.reachable("loc_0", 0.5) == []
+
+
+class RecordingDB:
+    def __init__(self):
+        self.events = []
+        self.saves = 0
+
+    def log_event(self, **kwargs):
+        self.events.append(kwargs)
+
+    def save_player(self, player_id, state):
+        self.saves += 1
+
+
+class TestGotoCommand:
+    """goto 快速旅行"""
+
+    @pytest.fixture
+    def game(self, monkeypatch):
+        monkeypatch.setattr(main, "game_db", RecordingDB())
+        game = DaoGame()
+        game.player_id = 999
+        game.player_state = {
+            'name': '旅人', 'location_id': 'qingyun_foot', 'location': '青雲門·山腳',
+            'hp': 100, 'max_hp': 100, 'mp': 50, 'max_mp': 50, 'tier': 2.0,
+            'inventory': [], 'skills': [], 'karma': 0,
+        }
+        return game
+
+    def test_travel_in_one_turn(self, game):
+        route = get_world_graph().route("qingyun_foot", "qingyun_sword_dojo", 2.0)
+        assert game.handle_travel_command("問劍堂")
+
+        assert game.player_state['location_id'] == "qingyun_sword_dojo"
+        assert game.player_state['location'] == "青雲門·問劍堂"
+        assert game.player_state['mp'] == 50 - route.mp_cost
+        assert len(main.game_db.events) == 1
+
+    def test_insufficient_mp(self, game, capsys):
+        game.player_state['mp'] = 3
+        assert not game.handle_travel_command("問劍堂")
+        assert game.player_state['location_id'] == "qingyun_foot"
+        assert "法力不足" in capsys.readouterr().out
+
+    def test_tier_too_low(self, game, capsys):
+        game.player_state['tier'] = 1.0
+        assert not game.handle_travel_command("問劍堂")
+        assert "境界不足" in capsys.readouterr().out
+
+    def test_list_destinations(self, game, capsys):
+        assert not game.handle_travel_command("")
+        output = capsys.readouterr().out
+        assert "可前往的地點" in output and "青雲門·問劍堂" in output
@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+"""
+地圖一致性檢查單元測試
+測試 analyze_world_graph 的強連通分量、孤立地點、單向出口、境界死路與事件池可達性
+"""
+
+import sys
+import time
+import random
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "src"))
+
+from world_loader import WorldSettings, analyze_world_graph, format_graph_report
+
+
+def make_map(exits, tiers=None):
+    """exits: {地點: {方向: 目的地}}"""
+    tiers = tiers or {}
+    return {loc_id: {"id": loc_id, "exits": dict(loc_exits),
+                     "tier_requirement": tiers.get(loc_id, 1.0)}
+            for loc_id, loc_exits in exits.items()}
+
+
+class TestSyntheticMaps:
+    """小型手工地圖"""
+
+    def test_fully_bidirectional_map_is_clean(self):
+        locations = make_map({
+            "a": {"east": "b"},
+            "b": {"west": "a", "east": "c"},
+            "c": {"west": "b"},
+        })
+        report = analyze_world_graph(locations, ["a", "c"], start_id="a")
+        assert format_graph_report(report) == []
+        assert report["components"] == []
+
+    def test_one_way_trap_and_asymmetric_exit(self):
+        locations = make_map({
+            "a": {"east": "b"},
+            "b": {"west": "a", "down": "pit"},
+            "pit": {},
+        })
+        report = analyze_world_graph(locations, start_id="a")
+        assert report["asymmetric_exits"] == [("b", "down", "pit")]
+        assert report["one_way_traps"] == ["pit"]
+        assert report["unreachable"] == []
+        assert sorted(map(sorted, report["components"])) == [["a", "b"], ["pit"]]
+
+    def test_orphans_and_unreachable_event_pools(self):
+        locations = make_map({
+            "a": {},
+            "island_1": {"east": "island_2"},
+            "island_2": {"west": "island_1"},
+        })
+        report = analyze_world_graph(locations, ["a", "island_2"], start_id="a")
+        assert report["unreachable"] == ["island_1", "island_2"]
+        assert report["unreachable_event_pools"] == ["island_2"]
+
+    def test_tier_dead_end(self):
+        # 低境界能走 a → b，但 b 唯一的回程經過要求 2.0 的 gate
+        locations = make_map({
+            "a": {"east": "b"},
+            "b": {"north": "gate"},
+            "gate": {"west": "a"},
+        }, tiers={"gate": 2.0})
+        report = analyze_world_graph(locations, start_id="a")
+        assert report["tier_dead_ends"] == {1.0: ["b"]}
+        assert report["one_way_traps"] == []
+
+    def test_dangling_exit(self):
+        locations = make_map({"a": {"north": "nowhere"}})
+        report = analyze_world_graph(locations, start_id="a")
+        assert report["dangling_exits"] == [("a", "north", "nowhere")]
+
+    def test_unknown_start_skips_reachability(self):
+        locations = make_map({"a": {"east": "b"}, "b": {}})
+        report = analyze_world_graph(locations, start_id="missing")
+        assert report["unreachable"] == []
+        assert report["asymmetric_exits"] == [("a", "east", "b")]
+
+
+class TestRealWorldData:
+    """目前的 locations.json"""
+
+    def test_report_attached_to_settings(self):
+        settings = WorldSettings()
+        report = settings.graph_report
+
+        assert report["dangling_exits"] == []
+        # 內門入口、祠堂、靈泉只有出口通往廣場，沒有入口
+        for loc_id in ("qingyun_inner_gate", "qingyun_temple", "qingyun_pool"):
+            assert loc_id in report["unreachable"]
+        # 青雲鎮與青雲門之間沒有出口相連
+        assert {"town_tavern", "nearby_market", "wildlands_forest"} <= set(report["unreachable"])
+        assert ("qingyun_inner_gate", "north", "qingyun_inner") in report["asymmetric_exits"]
+        assert "qingyun_foot" not in report["unreachable"]
+        assert settings.graph_warnings == format_graph_report(report)
+
+
+class TestLinearScaling:
+    """大型程序生成地圖"""
+
+    def test_large_generated_map(self):
+        rng = random.Random(5)
+        size = 20000
+        ids = [f"loc_{i}" for i in range(size)]
+        exits = {loc_id: {f"d{k}": rng.choice(ids) for k in range(rng.randint(1, 3))} for loc_id in ids}
+        tiers = {loc_id: rng.choice([1.0, 2.0, 3.0, 4.0]) for loc_id in ids}
+        tiers["loc_0"] = 1.0
+        locations = make_map(exits, tiers)
+
+        start = time.perf_counter()
+        report = analyze_world_graph(locations, ids[:100], start_id="loc_0")
+        elapsed = time.perf_counter() - start
+
+        assert sum(len(component) for component in report["components"]) == size
+        assert elapsed < 5.0
@@ -0,0 +1,211 @@
+# -*- coding: utf-8 -*-
+"""
+世界資料註冊表單元測試
+測試 WorldRegistry 的單次載入、熱重載、驗證失敗保留舊快照、LiveView 與編譯快照
+"""
+
+import sys
+import os
+import json
+import time
+import pickle
+import shutil
+import pytest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "src"))
+
+import config
+import world_registry as world_registry_module
+from world_registry import WorldRegistry, WORLD_FILES, world_registry, compile_world, source_hash
+from npc_manager import NPCManager, npc_manager
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    for filename in WORLD_FILES:
+        source = config.DATA_PATH / filename
+        if source.exists():
+            shutil.copy(source, tmp_path / filename)
+    return tmp_path
+
+
+def rewrite(path, mutate):
+    """修改 JSON 檔並確保 mtime 改變"""
+    data = json.loads(path.read_text(encoding="utf-8"))
+    mutate(data)
+    stat = path.stat()
+    path.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+
+def first_event_pool(data):
+    return data["events"][0]
+
+
+class TestSharedLoad:
+    """各模組共用同一份快照"""
+
+    def test_world_data_and_event_pools_use_registry(self):
+        from world_data import WORLD_MAP
+        from event_pools import EVENT_POOLS
+
+        snapshot = world_registry.snapshot
+        assert snapshot.version >= 1
+        assert dict(WORLD_MAP) == dict(snapshot.locations)
+        assert dict(EVENT_POOLS) == dict(snapshot.event_pools)
+        assert set(npc_manager.npcs) == set(snapshot.npcs_by_id)
+
+    def test_snapshot_is_read_only(self):
+        snapshot = world_registry.snapshot
+        with pytest.raises(TypeError):
+            snapshot.locations["x"] = {}
+        with pytest.raises(AttributeError):
+            snapshot.extra = 1
+
+    def test_npc_updates_do_not_touch_snapshot(self):
+        manager = NPCManager()
+        npc_id = next(iter(manager.npcs))
+        manager.update_npc(npc_id, name="改名")
+        assert world_registry.snapshot.npcs_by_id[npc_id]["name"] != "改名"
+
+
+class TestReload:
+    """熱重載"""
+
+    def test_unchanged_files_not_reloaded(self, data_dir):
+        registry = WorldRegistry(data_dir)
+        assert registry.version == 1
+        assert registry.reload() is False
+        assert registry.changed_files() == []
+
+    def test_changed_file_swaps_snapshot(self, data_dir):
+        registry = WorldRegistry(data_dir)
+        view = registry.view("event_pools")
+        old_snapshot = registry.snapshot
+        location_id = first_event_pool(json.loads((data_dir / "events.json").read_text(encoding="utf-8")))["location_id"]
+
+        rewrite(data_dir / "events.json",
+                lambda data: first_event_pool(data).__setitem__("treasures", [{"type": "item", "item_id": "x"}]))
+        assert registry.changed_files() == ["events.json"]
+        assert registry.reload() is True
+
+        assert registry.version == 2
+        assert view[location_id]["treasures"] == [{"type": "item", "item_id": "x"}]
+        # 已取出的舊快照不受影響
+        assert old_snapshot.event_pools[location_id]["treasures"] != [{"type": "item", "item_id": "x"}]
+
+    def test_broken_json_keeps_old_snapshot(self, data_dir, capsys):
+        registry = WorldRegistry(data_dir)
+        path = data_dir / "locations.json"
+        stat = path.stat()
+        path.write_text("{ 寫到一半", encoding="utf-8")
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+        assert registry.reload() is False
+        assert registry.version == 1
+        assert registry.snapshot.locations
+        assert "保留版本 1" in capsys.readouterr().out
+
+        # 同一組檔案版本不重複驗證
+        assert registry.reload() is False
+        assert "保留版本" not in capsys.readouterr().out
+
+    def test_dangling_reference_rejected(self, data_dir):
+        registry = WorldRegistry(data_dir)
+        rewrite(data_dir / "npcs.json", lambda data: data["npcs"][0].__setitem__("location_id", "nowhere"))
+        assert registry.reload() is False
+        assert registry.version == 1
+
+    def test_subscribers_receive_new_snapshot(self, data_dir):
+        registry = WorldRegistry(data_dir)
+        manager = NPCManager()
+        registry.subscribe(manager.load_npcs)
+        npc_id = registry.snapshot.npcs[0]["id"]
+
+        rewrite(data_dir / "npcs.json", lambda data: data["npcs"][0].__setitem__("name", "新名字"))
+        assert registry.reload() is True
+        assert manager.get_npc_id_by_name("新名字") == npc_id
+
+    def test_watcher_picks_up_changes(self, data_dir):
+        registry = WorldRegistry(data_dir)
+        registry.start_watching(interval=0.01)
+        try:
+            rewrite(data_dir / "items.json", lambda data: data["items"].append({"id": "item_new"}))
+            deadline = time.monotonic() + 5
+            while registry.version == 1 and time.monotonic() < deadline:
+                time.sleep(0.01)
+            assert "item_new" in registry.snapshot.items_by_id
+        finally:
+            registry.stop_watching(timeout=1)
+        assert not registry.watching
+
+
+class TestLiveView:
+    """LiveView 的內建資料回退"""
+
+    def test_fallback_when_no_json(self, tmp_path):
+        registry = WorldRegistry(tmp_path)
+        view = registry.view("locations", fallback={"builtin": {"id": "builtin"}})
+        assert "builtin" in view
+        assert list(view) == ["builtin"]
+        assert view.get("missing") is None
+
+
+class TestCompiledSnapshot:
+    """編譯快照"""
+
+    def test_compiled_matches_json(self, data_dir):
+        compile_world(data_dir)
+        compiled = WorldRegistry(data_dir)
+        parsed = WorldRegistry(data_dir, use_compiled=False)
+
+        assert compiled.snapshot.source == "compiled"
+        assert parsed.snapshot.source == "json"
+        for attr in ("locations", "npcs_by_id", "event_pools", "items_by_id", "skills_by_id"):
+            assert dict(getattr(compiled.snapshot, attr)) == dict(getattr(parsed.snapshot, attr))
+        assert compiled.snapshot.npcs == parsed.snapshot.npcs
+        # npcs 與 npcs_by_id 共享條目
+        npc = compiled.snapshot.npcs[0]
+        assert compiled.snapshot.npcs_by_id[npc["id"]] is npc
+
+    def test_compiled_skips_validation(self, data_dir, monkeypatch):
+        compile_world(data_dir)
+
+        def fail(*args, **kwargs):
+            raise AssertionError("不應解析 JSON")
+
+        monkeypatch.setattr(world_registry_module, "WorldSettings", fail)
+        assert WorldRegistry(data_dir).snapshot.source == "compiled"
+
+    def test_stale_snapshot_falls_back_to_json(self, data_dir):
+        compile_world(data_dir)
+        rewrite(data_dir / "npcs.json", lambda data: data["npcs"][0].__setitem__("name", "新名字"))
+
+        registry = WorldRegistry(data_dir)
+        assert registry.snapshot.source == "json"
+        assert registry.snapshot.npcs[0]["name"] == "新名字"
+
+    def test_hot_reload_with_stale_snapshot(self, data_dir):
+        compile_world(data_dir)
+        registry = WorldRegistry(data_dir)
+        rewrite(data_dir / "items.json", lambda data: data["items"].append({"id": "item_new"}))
+
+        assert registry.reload() is True
+        assert registry.snapshot.source == "json"
+        assert "item_new" in registry.snapshot.items_by_id
+
+    def test_corrupt_or_foreign_snapshot_ignored(self, data_dir, capsys):
+        snapshot_path = data_dir / config.WORLD_SNAPSHOT_FILENAME
+        snapshot_path.write_bytes(b"not a pickle")
+        assert WorldRegistry(data_dir).snapshot.source == "json"
+        assert "編譯快照損壞" in capsys.readouterr().out
+
+        snapshot_path.write_bytes(pickle.dumps({"format": -1, "hash": source_hash(data_dir), "tables": {}}))
+        assert WorldRegistry(data_dir).snapshot.source == "json"
+
+    def test_compile_rejects_invalid_data(self, data_dir):
+        rewrite(data_dir / "npcs.json", lambda data: data["npcs"][0].__setitem__("location_id", "nowhere"))
+        with pytest.raises(ValueError):
+            compile_world(data_dir)
+        assert not (data_dir / config.WORLD_SNAPSHOT_FILENAME).exists()